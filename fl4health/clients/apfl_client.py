@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Dict, Optional, Sequence, Tuple, Union
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 import torch
 from flwr.common.typing import Config
@@ -27,6 +27,9 @@ class ApflClient(BasicClient):
         self.model: ApflModule
         self.learning_rate: float
         self.optimizers: Dict[str, torch.optim.Optimizer]
+        # Gradients of the personal loss with respect to the global model parameters, accumulated over the
+        # micro-batches of the current gradient accumulation cycle, if any
+        self.personal_loss_global_gradients: Optional[List[Optional[torch.Tensor]]] = None
 
     def is_start_of_local_training(self, step: int) -> bool:
         return step == 0
@@ -39,6 +42,26 @@ class ApflClient(BasicClient):
         if self.is_start_of_local_training(step) and self.model.adaptive_alpha:
             self.model.update_alpha()
 
+    def swap_global_model_gradients(
+        self, gradients: Optional[List[Optional[torch.Tensor]]]
+    ) -> List[Optional[torch.Tensor]]:
+        """
+        Replaces the gradients of the global model parameters, so that the gradients of the global and personal
+        losses with respect to these parameters can be accumulated separately over micro-batches.
+
+        Args:
+            gradients (Optional[List[Optional[torch.Tensor]]]): The new gradients of the global model parameters. If
+                None, the gradients are cleared.
+
+        Returns:
+            List[Optional[torch.Tensor]]: The replaced gradients of the global model parameters.
+        """
+        parameters = list(self.model.global_model.parameters())
+        replaced_gradients = [parameter.grad for parameter in parameters]
+        for index, parameter in enumerate(parameters):
+            parameter.grad = None if gradients is None else gradients[index]
+        return replaced_gradients
+
     def train_step(
         self, input: TorchInputType, target: torch.Tensor
     ) -> Tuple[TrainingLosses, Dict[str, torch.Tensor]]:
@@ -49,18 +72,20 @@ class ApflClient(BasicClient):
 
         # Forward pass on global model and update global parameters
         assert isinstance(input, torch.Tensor)
-        self.optimizers["global"].zero_grad()
+        self.maybe_zero_grad(self.optimizers["global"])
         global_pred = self.model.global_forward(input)
         global_loss = self.criterion(global_pred, target)
-        global_loss.backward()
-        self.optimizers["global"].step()
+        self.accumulate_backward(global_loss)
+        self.maybe_step(self.optimizers["global"])
 
         # Make sure gradients are zero prior to forward passes of global and local model
         # to generate personalized predictions
         # NOTE: We zero the global optimizer grads because they are used (after the backward calculation below)
-        # to update the scalar alpha (see update_alpha() where .grad is called.)
-        self.optimizers["global"].zero_grad()
-        self.optimizers["local"].zero_grad()
+        # to update the scalar alpha (see update_alpha() where .grad is called.) With gradient accumulation, the
+        # global loss gradients accumulated so far are set aside, rather than zeroed, while those of the personal loss
+        # accumulate separately.
+        global_loss_gradients = self.swap_global_model_gradients(self.personal_loss_global_gradients)
+        self.maybe_zero_grad(self.optimizers["local"])
 
         # Personal predictions are generated as a convex combination of the output
         # of local and global models
@@ -68,12 +93,31 @@ class ApflClient(BasicClient):
         # Parameters of local model are updated to minimize loss of personalized model
         losses = self.compute_training_loss(preds, features, target)
 
-        losses.backward["backward"].backward()
-        self.optimizers["local"].step()
+        self.accumulate_backward(losses.backward["backward"])
+        self.maybe_step(self.optimizers["local"])
+
+        if self.is_end_of_accumulation():
+            # The personal loss gradients are left on the global model for the update of alpha
+            self.personal_loss_global_gradients = None
+        else:
+            self.personal_loss_global_gradients = self.swap_global_model_gradients(global_loss_gradients)
 
         # Return dictionary of predictions where key is used to name respective MetricMeters
         return losses, preds
 
+    def rescale_accumulated_gradients(self, scale: float) -> None:
+        super().rescale_accumulated_gradients(scale)
+        if self.personal_loss_global_gradients is not None:
+            for gradient in self.personal_loss_global_gradients:
+                if gradient is not None:
+                    gradient.mul_(scale)
+
+    def step_deferred_optimizers(self) -> None:
+        super().step_deferred_optimizers()
+        # The personal loss gradients are left on the global model for the update of alpha
+        self.swap_global_model_gradients(self.personal_loss_global_gradients)
+        self.personal_loss_global_gradients = None
+
     def get_parameter_exchanger(self, config: Config) -> FixedLayerExchanger:
         return FixedLayerExchanger(self.model.layers_to_exchange())
 
@@ -1,10 +1,13 @@
 import copy
 import datetime
+import math
 import random
 import string
+from contextlib import nullcontext
 from logging import INFO
+from multiprocessing.shared_memory import SharedMemory
 from pathlib import Path
-from typing import Any, Dict, Optional, Sequence, Tuple, Type, TypeVar, Union
+from typing import Any, ContextManager, Dict, Iterable, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 
 import torch
 import torch.nn as nn
@@ -16,17 +19,47 @@ from torch.optim import Optimizer
 from torch.utils.data import DataLoader
 
 from fl4health.checkpointing.client_module import CheckpointMode, ClientCheckpointModule
+from fl4health.parameter_exchange.delta_exchanger import DeltaParameterExchanger
+from fl4health.parameter_exchange.exchange_instrumentation import ExchangeInstrumentation, model_state_bytes
 from fl4health.parameter_exchange.full_exchanger import FullParameterExchanger
+from fl4health.parameter_exchange.packing_exchanger import ParameterExchangerWithPacking
 from fl4health.parameter_exchange.parameter_exchanger_base import ParameterExchanger
+from fl4health.parameter_exchange.partial_parameter_exchanger import PartialParameterExchanger
+from fl4health.parameter_exchange.quantized_exchanger import QuantizedParameterExchanger
 from fl4health.reporting.fl_wandb import ClientWandBReporter
 from fl4health.reporting.metrics import MetricsReporter
 from fl4health.utils.losses import EvaluationLosses, LossMeter, LossMeterType, TrainingLosses
 from fl4health.utils.metrics import Metric, MetricManager
+from fl4health.utils.prefetch import PrefetchLoader
+from fl4health.utils.shared_memory import (
+    SHARED_MEMORY_PARAMETERS_KEY,
+    SHARED_MEMORY_WRITE_BACK_KEY,
+    attach_shared_memory,
+    close_shared_memory,
+    read_ndarrays_from_shared_memory,
+    write_parameters_for_server,
+)
 
 T = TypeVar("T")
 TorchInputType = TypeVar("TorchInputType", torch.Tensor, Dict[str, torch.Tensor])
 
 
+def create_grad_scaler(device: torch.device) -> "torch.amp.GradScaler":
+    """
+    Creates a gradient scaler for float16 mixed precision training on the device.
+
+    Args:
+        device (torch.device): The device the model is trained on.
+
+    Returns:
+        torch.amp.GradScaler: The gradient scaler.
+    """
+    # The device generic torch.amp.GradScaler was only added in torch 2.3. Earlier versions only scale on CUDA.
+    if hasattr(torch.amp, "GradScaler"):
+        return torch.amp.GradScaler(device.type)
+    return torch.cuda.amp.GradScaler()  # type: ignore
+
+
 class BasicClient(NumPyClient):
     def __init__(
         self,
@@ -36,11 +69,19 @@ class BasicClient(NumPyClient):
         loss_meter_type: LossMeterType = LossMeterType.AVERAGE,
         checkpointer: Optional[ClientCheckpointModule] = None,
         metrics_reporter: Optional[MetricsReporter] = None,
+        instrument_parameter_exchange: bool = False,
+        prefetch_batches: int = 0,
+        gradient_accumulation_steps: int = 1,
+        autocast_dtype: Optional[torch.dtype] = None,
     ) -> None:
         """
         Base FL Client with functionality to train, evaluate, log, report and checkpoint.
         User is responsible for implementing methods: get_model, get_optimizer, get_data_loaders, get_criterion
         Other methods can be overridden to achieve custom functionality.
+        Subclasses that do not expose the instrumentation, prefetching, gradient accumulation or mixed precision
+        arguments below can still enable them by setting the corresponding attributes (exchange_instrumentation,
+        prefetch_batches, gradient_accumulation_steps, autocast_dtype and, for float16, grad_scaler, see
+        create_grad_scaler) after calling this constructor and before the client is set up.
 
         Args:
             data_path (Path): path to the data to be used to load the data for client-side training
@@ -53,6 +94,27 @@ class BasicClient(NumPyClient):
                 checkpointing. Defaults to None.
             metrics_reporter (Optional[MetricsReporter], optional): A metrics reporter instance to record the metrics
                 during the execution. Defaults to an instance of MetricsReporter with default init parameters.
+            instrument_parameter_exchange (bool, optional): If True, the payload size (total and per tensor), the
+                compression ratio relative to the full model state and the time spent encoding (getting) and decoding
+                (setting) parameters are recorded each round through the metrics reporter, under the
+                "parameter_exchange" key. Packing exchangers also record the time spent packing and the size of the
+                additional parameters they pack. Defaults to False.
+            prefetch_batches (int, optional): If positive, training and validation batches are loaded in a
+                background thread, up to this many batches ahead, and moved to the device ahead of their use (see
+                PrefetchLoader). On GPU, batches are pinned and copied asynchronously, overlapping the copy of the
+                next batch with the current step. Defaults to 0, in which case batches are loaded and moved
+                synchronously.
+            gradient_accumulation_steps (int, optional): The number of batches (micro-batches) whose gradients are
+                accumulated before each optimizer step, so that the effective batch size is this many times the batch
+                size of the train loader without the memory cost of larger batches. Local steps, the loss meters and
+                update_after_step count optimizer steps rather than micro-batches. Defaults to 1, in which case the
+                optimizers step after every batch.
+            autocast_dtype (Optional[torch.dtype], optional): If set, forward passes and losses of train and
+                validation steps run under torch.autocast with this dtype (i.e. torch.bfloat16, which CPUs with
+                AVX-512 BF16 or AMX and recent GPUs execute natively, or torch.float16 on GPU), while parameters,
+                gradients and optimizer steps stay in full precision. For float16, losses are scaled with a
+                GradScaler to prevent gradients from underflowing. Predictions are cast back to full precision before
+                metrics are computed. Defaults to None, in which case training runs in full precision.
         """
 
         self.data_path = data_path
@@ -66,11 +128,34 @@ class BasicClient(NumPyClient):
             self.metrics_reporter = metrics_reporter
         else:
             self.metrics_reporter = MetricsReporter(run_id=self.client_name)
+        self.exchange_instrumentation: Optional[ExchangeInstrumentation] = (
+            ExchangeInstrumentation() if instrument_parameter_exchange else None
+        )
+
+        self.prefetch_batches = prefetch_batches
+        assert gradient_accumulation_steps >= 1, "gradient_accumulation_steps must be at least 1"
+        self.gradient_accumulation_steps = gradient_accumulation_steps
+        self.autocast_dtype = autocast_dtype
+        # bfloat16 has the exponent range of float32, so only float16 losses need to be scaled
+        self.grad_scaler: Optional["torch.amp.GradScaler"] = (
+            create_grad_scaler(device) if autocast_dtype == torch.float16 else None
+        )
+        # Position of the current micro-batch within its gradient accumulation cycle and the number of micro-batches
+        # in the cycle. These are set by the training loops before each train step.
+        self.accumulation_index = 0
+        self.accumulation_length = 1
+        # Optimizers whose step was deferred to the end of the current accumulation cycle
+        self.deferred_optimizers: List[torch.optim.Optimizer] = []
 
         self.initialized = False  # Whether or not the client has been setup
+        # Shared memory segments holding global parameters mapped by the client, closed once no longer referenced
+        self.shared_memory_segments: List[SharedMemory] = []
 
         # Loss and Metric management
         self.train_loss_meter = LossMeter[TrainingLosses](loss_meter_type, TrainingLosses)
+        # Sums the losses of the micro-batches of a gradient accumulation cycle, merged into train_loss_meter once
+        # the optimizers step
+        self.accumulation_loss_meter = LossMeter[TrainingLosses](LossMeterType.ACCUMULATION, TrainingLosses)
         self.val_loss_meter = LossMeter[EvaluationLosses](loss_meter_type, EvaluationLosses)
         self.train_metric_manager = MetricManager(metrics=self.metrics, metric_manager_name="train")
         self.val_metric_manager = MetricManager(metrics=self.metrics, metric_manager_name="val")
@@ -147,6 +232,8 @@ class BasicClient(NumPyClient):
                 This is used to help determine which parameter exchange should be used for pulling parameters.
                 A full parameter exchanger is only used if the current federated learning round is the very
                 first fitting round.
+                In fitting rounds, a DeltaParameterExchanger records the global weights after they are set, so that
+                the deltas pushed after training are computed against them.
         """
         assert self.model is not None
         current_server_round = self.narrow_config_type(config, "current_server_round", int)
@@ -155,6 +242,94 @@ class BasicClient(NumPyClient):
         else:
             assert self.parameter_exchanger is not None
             self.parameter_exchanger.pull_parameters(parameters, self.model, config)
+        if fitting_round and isinstance(self.parameter_exchanger, DeltaParameterExchanger):
+            self.parameter_exchanger.record_global_weights(self.model)
+
+    def maybe_map_shared_parameters(self, parameters: NDArrays, config: Config) -> NDArrays:
+        """
+        If the server published the global parameters to shared memory (i.e. with a SharedMemoryParameterPublisher),
+        maps them read-only from the segment named in the config rather than using the (empty) parameters sent.
+        Segments mapped in previous rounds are closed, unless arrays mapped from them are still referenced.
+
+        Args:
+            parameters (NDArrays): The parameters sent by the server.
+            config (Config): The config from the server.
+
+        Returns:
+            NDArrays: Read-only views of the published parameters, or the parameters sent if none were published.
+        """
+        if SHARED_MEMORY_PARAMETERS_KEY not in config:
+            return parameters
+        self.shared_memory_segments = close_shared_memory(self.shared_memory_segments)
+        segment = attach_shared_memory(self.narrow_config_type(config, SHARED_MEMORY_PARAMETERS_KEY, str))
+        self.shared_memory_segments.append(segment)
+        return read_ndarrays_from_shared_memory(segment)
+
+    def maybe_write_back_parameters(
+        self, parameters: NDArrays, metrics: Dict[str, Scalar], config: Config
+    ) -> Tuple[NDArrays, Dict[str, Scalar]]:
+        """
+        If the server requested it, writes the parameters to be sent to a new shared memory segment, which the
+        server reads and unlinks. The name of the segment is sent in the metrics in place of the parameters.
+
+        Args:
+            parameters (NDArrays): The parameters to be sent to the server.
+            metrics (Dict[str, Scalar]): The metrics to be sent to the server.
+            config (Config): The config from the server.
+
+        Returns:
+            Tuple[NDArrays, Dict[str, Scalar]]: The parameters and metrics to be sent to the server.
+        """
+        if not config.get(SHARED_MEMORY_WRITE_BACK_KEY, False):
+            return parameters, metrics
+        return [], {**metrics, SHARED_MEMORY_PARAMETERS_KEY: write_parameters_for_server(parameters)}
+
+    def time_parameter_exchange(self, key: str) -> ContextManager[None]:
+        """
+        Times the wrapped block (i.e. setting or getting parameters) if parameter exchange instrumentation is enabled.
+
+        Args:
+            key (str): The key under which the elapsed time is recorded.
+
+        Returns:
+            ContextManager[None]: The timing context, which does nothing if instrumentation is disabled.
+        """
+        if self.exchange_instrumentation is None:
+            return nullcontext()
+        return self.exchange_instrumentation.timed(key)
+
+    def report_parameter_exchange(
+        self,
+        current_server_round: int,
+        received_parameters: NDArrays,
+        sent_parameters: Optional[NDArrays] = None,
+        metrics_key: str = "parameter_exchange",
+    ) -> None:
+        """
+        If parameter exchange instrumentation is enabled, records the size of the received and sent payloads, along
+        with the compression ratio of the sent payload relative to the full model state, and reports everything
+        collected since the last report through the metrics reporter.
+
+        Args:
+            current_server_round (int): The current server round.
+            received_parameters (NDArrays): The parameters received from the server.
+            sent_parameters (Optional[NDArrays], optional): The parameters to be sent to the server, if any.
+                Defaults to None.
+            metrics_key (str, optional): The key under which the values are reported. Defaults to
+                "parameter_exchange".
+        """
+        if self.exchange_instrumentation is None:
+            return
+        self.exchange_instrumentation.record_payload("received", received_parameters)
+        if sent_parameters is not None:
+            sent_bytes = self.exchange_instrumentation.record_payload("sent", sent_parameters)
+            model_bytes = model_state_bytes(self.model)
+            self.exchange_instrumentation.record("model_bytes", model_bytes)
+            if sent_bytes > 0:
+                self.exchange_instrumentation.record("compression_ratio", model_bytes / sent_bytes)
+        self.metrics_reporter.add_to_metrics_at_round(
+            current_server_round, data={metrics_key: self.exchange_instrumentation.pop_metrics()}
+        )
 
     def initialize_all_model_weights(self, parameters: NDArrays, config: Config) -> None:
         """
@@ -199,6 +374,7 @@ class BasicClient(NumPyClient):
         """
         if self.wandb_reporter:
             self.wandb_reporter.shutdown_reporter()
+        self.shared_memory_segments = close_shared_memory(self.shared_memory_segments)
 
         self.metrics_reporter.add_to_metrics({"shutdown": datetime.datetime.now()})
 
@@ -264,13 +440,17 @@ class BasicClient(NumPyClient):
             data={"fit_start": datetime.datetime.now()},
         )
 
-        self.set_parameters(parameters, config, fitting_round=True)
+        parameters = self.maybe_map_shared_parameters(parameters, config)
+        with self.time_parameter_exchange("decode_time"):
+            self.set_parameters(parameters, config, fitting_round=True)
+        received_parameters = parameters
 
         self.update_before_train(current_server_round)
 
         if local_epochs is not None:
             loss_dict, metrics = self.train_by_epochs(local_epochs, current_server_round)
-            local_steps = len(self.train_loader) * local_epochs  # total steps over training round
+            # Total (optimizer) steps over training round
+            local_steps = math.ceil(len(self.train_loader) / self.gradient_accumulation_steps) * local_epochs
         elif local_steps is not None:
             loss_dict, metrics = self.train_by_steps(local_steps, current_server_round)
         else:
@@ -295,10 +475,25 @@ class BasicClient(NumPyClient):
             },
         )
 
+        with self.time_parameter_exchange("encode_time"):
+            parameters = self.get_parameters(config)
+        self.report_parameter_exchange(current_server_round, received_parameters, parameters)
+        if isinstance(self.parameter_exchanger, (QuantizedParameterExchanger, DeltaParameterExchanger)):
+            # Report the size of the encoded upload, along with the size it would have had at full precision
+            self.metrics_reporter.add_to_metrics_at_round(
+                current_server_round,
+                data={
+                    "upload_bytes": self.parameter_exchanger.encoded_bytes,
+                    "full_precision_upload_bytes": self.parameter_exchanger.full_precision_bytes,
+                },
+            )
+
+        parameters, metrics = self.maybe_write_back_parameters(parameters, metrics, config)
+
         # FitRes should contain local parameters, number of examples on client, and a dictionary holding metrics
         # calculation results.
         return (
-            self.get_parameters(config),
+            parameters,
             self.num_train_samples,
             metrics,
         )
@@ -339,7 +534,10 @@ class BasicClient(NumPyClient):
             data={"evaluate_start": datetime.datetime.now()},
         )
 
-        self.set_parameters(parameters, config, fitting_round=False)
+        parameters = self.maybe_map_shared_parameters(parameters, config)
+        with self.time_parameter_exchange("decode_time"):
+            self.set_parameters(parameters, config, fitting_round=False)
+        self.report_parameter_exchange(current_server_round, parameters, metrics_key="evaluate_parameter_exchange")
         loss, metrics = self.validate()
 
         # Checkpoint based on the loss and metrics produced during validation AFTER server-side aggregation
@@ -458,6 +656,21 @@ class BasicClient(NumPyClient):
         else:
             raise TypeError("data must be of type torch.Tensor or Dict[str, torch.Tensor].")
 
+    def maybe_prefetch(self, data_loader: DataLoader) -> Iterable[Tuple[TorchInputType, torch.Tensor]]:
+        """
+        Wraps a data loader in a PrefetchLoader if prefetching is enabled (i.e. prefetch_batches is positive), so
+        that its batches are loaded and moved to self.device ahead of their use.
+
+        Args:
+            data_loader (DataLoader): The data loader to iterate over.
+
+        Returns:
+            Iterable[Tuple[TorchInputType, torch.Tensor]]: The data loader, or its prefetching wrapper.
+        """
+        if self.prefetch_batches <= 0:
+            return data_loader
+        return PrefetchLoader(data_loader, self.device, self.prefetch_batches)
+
     def is_empty_batch(self, input: Union[torch.Tensor, Dict[str, torch.Tensor]]) -> bool:
         """
         Check whether input, which represents a batch of inputs to a model, is empty.
@@ -489,13 +702,181 @@ class BasicClient(NumPyClient):
         else:
             raise TypeError("Input must be of type torch.Tensor or Dict[str, torch.Tensor].")
 
+    def autocast(self) -> ContextManager[None]:
+        """
+        Mixed precision context for forward passes and loss computations, if autocast_dtype is set.
+
+        Returns:
+            ContextManager[None]: The torch.autocast context, or a context that does nothing if mixed precision is
+                disabled.
+        """
+        if self.autocast_dtype is None:
+            return nullcontext()
+        return torch.autocast(device_type=self.device.type, dtype=self.autocast_dtype)
+
+    def full_precision_predictions(self, preds: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+        """
+        Casts reduced precision predictions, produced under autocast, to float32 so that metrics are computed in full
+        precision (numpy, for instance, has no bfloat16 type).
+
+        Args:
+            preds (Dict[str, torch.Tensor]): Prediction(s) of the model(s) indexed by name.
+
+        Returns:
+            Dict[str, torch.Tensor]: The predictions, with reduced precision floating point tensors cast to float32.
+        """
+        if self.autocast_dtype is None:
+            return preds
+        return {
+            name: pred.float() if pred.is_floating_point() and pred.element_size() < 4 else pred
+            for name, pred in preds.items()
+        }
+
+    def set_accumulation_position(self, micro_batch: int, remaining_batches: int) -> None:
+        """
+        Sets the position of the next micro-batch within its gradient accumulation cycle. A new cycle starts every
+        gradient_accumulation_steps micro-batches. Cycles are cut short at the end of the batches to be trained on, so
+        that the last optimizer step is not skipped.
+
+        Args:
+            micro_batch (int): The number of micro-batches trained on so far in the training loop.
+            remaining_batches (int): The number of batches left in the training loop, including the next one.
+        """
+        self.accumulation_index = micro_batch % self.gradient_accumulation_steps
+        if self.accumulation_index == 0:
+            self.accumulation_length = min(self.gradient_accumulation_steps, remaining_batches)
+            self.deferred_optimizers = []
+
+    def is_end_of_accumulation(self) -> bool:
+        """
+        Returns:
+            bool: Whether the current micro-batch is the last of its gradient accumulation cycle, after which the
+                optimizers take a step.
+        """
+        return self.accumulation_index >= self.accumulation_length - 1
+
+    def maybe_zero_grad(self, optimizer: torch.optim.Optimizer) -> None:
+        """
+        Clears the gradients of the optimizer at the start of a gradient accumulation cycle only, so that the
+        gradients of the micro-batches of a cycle accumulate.
+
+        Args:
+            optimizer (torch.optim.Optimizer): The optimizer whose gradients are cleared.
+        """
+        if self.accumulation_index == 0:
+            optimizer.zero_grad()
+
+    def accumulate_backward(self, loss: torch.Tensor) -> None:
+        """
+        Computes the backward pass of a micro-batch loss. The loss is scaled by the number of micro-batches in the
+        gradient accumulation cycle, so that the accumulated gradients are those of the average loss over the cycle,
+        and by the gradient scaler, if any.
+
+        Args:
+            loss (torch.Tensor): The loss of the micro-batch.
+        """
+        if self.accumulation_length > 1:
+            loss = loss / self.accumulation_length
+        if self.grad_scaler is not None:
+            loss = self.grad_scaler.scale(loss)
+        loss.backward()
+
+    def maybe_step(self, optimizer: torch.optim.Optimizer) -> None:
+        """
+        Updates the parameters with the optimizer at the end of a gradient accumulation cycle only. If there is a
+        gradient scaler, the gradients are unscaled first and the step is skipped if they are not finite.
+
+        Args:
+            optimizer (torch.optim.Optimizer): The optimizer taking the step.
+        """
+        if not self.is_end_of_accumulation():
+            if all(optimizer is not deferred for deferred in self.deferred_optimizers):
+                self.deferred_optimizers.append(optimizer)
+            return
+        if self.grad_scaler is not None:
+            self.grad_scaler.step(optimizer)
+        else:
+            optimizer.step()
+
+    def close_accumulation_cycle(self) -> bool:
+        """
+        Closes a gradient accumulation cycle left open at the end of a training loop. This happens when the last
+        batches counted in the cycle turn out to be empty (i.e. with Poisson batch sampling) and are skipped. The
+        gradients accumulated so far are rescaled to those of the average loss over the micro-batches actually trained
+        on and the deferred optimizer steps are taken.
+
+        Returns:
+            bool: Whether a cycle was open and the optimizers stepped.
+        """
+        if self.is_end_of_accumulation():
+            return False
+        num_micro_batches = self.accumulation_index + 1
+        self.rescale_accumulated_gradients(self.accumulation_length / num_micro_batches)
+        self.accumulation_length = num_micro_batches
+        self.step_deferred_optimizers()
+        return True
+
+    def rescale_accumulated_gradients(self, scale: float) -> None:
+        """
+        Multiplies the gradients accumulated for the deferred optimizer steps by scale.
+
+        Args:
+            scale (float): The factor by which the gradients are multiplied.
+        """
+        for optimizer in self.deferred_optimizers:
+            for param_group in optimizer.param_groups:
+                for parameter in param_group["params"]:
+                    if parameter.grad is not None:
+                        parameter.grad.mul_(scale)
+
+    def step_deferred_optimizers(self) -> None:
+        """
+        Takes the optimizer steps deferred during an accumulation cycle that was cut short by close_accumulation_cycle.
+        Clients applying corrections to the accumulated gradients before their optimizer steps should override this
+        to apply them as well.
+        """
+        for optimizer in self.deferred_optimizers:
+            self.maybe_step(optimizer)
+        self.deferred_optimizers = []
+
+    def accumulate_training_losses(self, losses: TrainingLosses) -> None:
+        """
+        Adds the losses of a micro-batch to those of its gradient accumulation cycle. Without gradient accumulation,
+        they are added to the train loss meter directly.
+
+        Args:
+            losses (TrainingLosses): The losses of the micro-batch.
+        """
+        if self.gradient_accumulation_steps == 1:
+            self.train_loss_meter.update(losses)
+        else:
+            self.accumulation_loss_meter.update(losses)
+
+    def end_optimizer_step(self, step: int) -> None:
+        """
+        Wraps up an optimizer step once its accumulation cycle ends. The gradient scaler, if any, is updated, the
+        losses of the micro-batches of the cycle are counted as one step in the train loss meter and
+        update_after_step is called.
+
+        Args:
+            step (int): The local step that ended.
+        """
+        if self.grad_scaler is not None:
+            self.grad_scaler.update()
+        if self.gradient_accumulation_steps > 1:
+            self.train_loss_meter.merge(self.accumulation_loss_meter, weight=1.0 / self.accumulation_length)
+            self.accumulation_loss_meter.clear()
+        self.update_after_step(step)
+        self.total_steps += 1
+
     def train_step(
         self, input: TorchInputType, target: torch.Tensor
     ) -> Tuple[TrainingLosses, Dict[str, torch.Tensor]]:
         """
         Given a single batch of input and target data, generate predictions, compute loss, update parameters and
         optionally update metrics if they exist. (ie backprop on a single batch of data).
-        Assumes self.model is in train mode already.
+        Assumes self.model is in train mode already. With gradient accumulation, the batch is a micro-batch and the
+        parameters are only updated at the end of its accumulation cycle.
 
         Args:
             input (TorchInputType): The input to be fed into the model.
@@ -506,17 +887,18 @@ class BasicClient(NumPyClient):
                 a dictionary of any predictions produced by the model.
         """
         # Clear gradients from optimizer if they exist
-        self.optimizers["global"].zero_grad()
+        self.maybe_zero_grad(self.optimizers["global"])
 
         # Call user defined methods to get predictions and compute loss
-        preds, features = self.predict(input)
-        losses = self.compute_training_loss(preds, features, target)
+        with self.autocast():
+            preds, features = self.predict(input)
+            losses = self.compute_training_loss(preds, features, target)
 
         # Compute backward pass and update parameters with optimizer
-        losses.backward["backward"].backward()
-        self.optimizers["global"].step()
+        self.accumulate_backward(losses.backward["backward"])
+        self.maybe_step(self.optimizers["global"])
 
-        return losses, preds
+        return losses, self.full_precision_predictions(preds)
 
     def val_step(
         self, input: TorchInputType, target: torch.Tensor
@@ -535,11 +917,11 @@ class BasicClient(NumPyClient):
         """
 
         # Get preds and compute loss
-        with torch.no_grad():
+        with torch.no_grad(), self.autocast():
             preds, features = self.predict(input)
             losses = self.compute_evaluation_loss(preds, features, target)
 
-        return losses, preds
+        return losses, self.full_precision_predictions(preds)
 
     def train_by_epochs(
         self, epochs: int, current_round: Optional[int] = None
@@ -557,10 +939,12 @@ class BasicClient(NumPyClient):
         """
         self.model.train()
         local_step = 0
+        num_batches = len(self.train_loader)
         for local_epoch in range(epochs):
             self.train_metric_manager.clear()
             self.train_loss_meter.clear()
-            for input, target in self.train_loader:
+            micro_batch = 0
+            for batch_index, (input, target) in enumerate(self.maybe_prefetch(self.train_loader)):
                 # Assume first dimension is batch size. Sampling iterators (such as Poisson batch sampling), can
                 # construct empty batches. We skip the iteration if this occurs.
                 if self.is_empty_batch(input):
@@ -568,11 +952,17 @@ class BasicClient(NumPyClient):
                     continue
 
                 input, target = self._move_input_data_to_device(input), target.to(self.device)
+                self.set_accumulation_position(micro_batch, num_batches - batch_index)
                 losses, preds = self.train_step(input, target)
-                self.train_loss_meter.update(losses)
+                self.accumulate_training_losses(losses)
                 self.train_metric_manager.update(preds, target)
-                self.update_after_step(local_step)
-                self.total_steps += 1
+                micro_batch += 1
+                if self.is_end_of_accumulation():
+                    self.end_optimizer_step(local_step)
+                    local_step += 1
+            # Skipped empty batches at the end of the epoch may leave the last accumulation cycle open
+            if self.close_accumulation_cycle():
+                self.end_optimizer_step(local_step)
                 local_step += 1
             metrics = self.train_metric_manager.compute()
             loss_dict = self.train_loss_meter.compute().as_dict()
@@ -588,7 +978,8 @@ class BasicClient(NumPyClient):
         self, steps: int, current_round: Optional[int] = None
     ) -> Tuple[Dict[str, float], Dict[str, Scalar]]:
         """
-        Train locally for the specified number of steps.
+        Train locally for the specified number of steps. With gradient accumulation, each step is an optimizer
+        step over gradient_accumulation_steps batches.
 
         Args:
             steps (int): The number of steps to train locally.
@@ -600,17 +991,20 @@ class BasicClient(NumPyClient):
         self.model.train()
 
         # Pass loader to iterator so we can step through train loader
-        train_iterator = iter(self.train_loader)
+        train_iterator = iter(self.maybe_prefetch(self.train_loader))
 
         self.train_loss_meter.clear()
         self.train_metric_manager.clear()
-        for step in range(steps):
+        step = 0
+        micro_batch = 0
+        num_batches = steps * self.gradient_accumulation_steps
+        for batch_index in range(num_batches):
             try:
                 input, target = next(train_iterator)
             except StopIteration:
                 # StopIteration is thrown if dataset ends
                 # reinitialize data loader
-                train_iterator = iter(self.train_loader)
+                train_iterator = iter(self.maybe_prefetch(self.train_loader))
                 input, target = next(train_iterator)
 
             # Assume first dimension is batch size. Sampling iterators (such as Poisson batch sampling), can
@@ -620,11 +1014,17 @@ class BasicClient(NumPyClient):
                 continue
 
             input, target = self._move_input_data_to_device(input), target.to(self.device)
+            self.set_accumulation_position(micro_batch, num_batches - batch_index)
             losses, preds = self.train_step(input, target)
-            self.train_loss_meter.update(losses)
+            self.accumulate_training_losses(losses)
             self.train_metric_manager.update(preds, target)
-            self.update_after_step(step)
-            self.total_steps += 1
+            micro_batch += 1
+            if self.is_end_of_accumulation():
+                self.end_optimizer_step(step)
+                step += 1
+        # Skipped empty batches at the end of the steps may leave the last accumulation cycle open
+        if self.close_accumulation_cycle():
+            self.end_optimizer_step(step)
 
         loss_dict = self.train_loss_meter.compute().as_dict()
         metrics = self.train_metric_manager.compute()
@@ -646,7 +1046,7 @@ class BasicClient(NumPyClient):
         self.val_metric_manager.clear()
         self.val_loss_meter.clear()
         with torch.no_grad():
-            for input, target in self.val_loader:
+            for input, target in self.maybe_prefetch(self.val_loader):
                 input, target = self._move_input_data_to_device(input), target.to(self.device)
                 losses, preds = self.val_step(input, target)
                 self.val_loss_meter.update(losses)
@@ -700,6 +1100,10 @@ class BasicClient(NumPyClient):
 
         self.criterion = self.get_criterion(config).to(self.device)
         self.parameter_exchanger = self.get_parameter_exchanger(config)
+        if self.exchange_instrumentation is not None and isinstance(
+            self.parameter_exchanger, (PartialParameterExchanger, ParameterExchangerWithPacking)
+        ):
+            self.parameter_exchanger.instrumentation = self.exchange_instrumentation
 
         self.wandb_reporter = ClientWandBReporter.from_config(self.client_name, config)
 
@@ -109,8 +109,11 @@ class NumpyClippingClient(BasicClient):
         if current_server_round == 1 and fitting_round:
             # Initialize all model weights as this is the first time things have been set
             self.initialize_all_model_weights(server_model_parameters, config)
-            # Extract only the initial weights that we care about clipping and exchanging
-            self.initial_weights = self.parameter_exchanger.push_parameters(self.model, config=config)
+            # Extract only the initial weights that we care about clipping and exchanging. These are copied, as the
+            # pushed arrays are views of the model weights, which change during training.
+            self.initial_weights = [
+                weights.copy() for weights in self.parameter_exchanger.push_parameters(self.model, config=config)
+            ]
         else:
             # Store the starting parameters without clipping bound before client optimization steps
             self.initial_weights = server_model_parameters
@@ -25,6 +25,7 @@ class DittoClient(BasicClient):
         loss_meter_type: LossMeterType = LossMeterType.AVERAGE,
         checkpointer: Optional[ClientCheckpointModule] = None,
         lam: float = 1.0,
+        autocast_dtype: Optional[torch.dtype] = None,
     ) -> None:
         """
         This client implements the Ditto algorithm from Ditto: Fair and Robust Federated Learning Through
@@ -44,6 +45,9 @@ class DittoClient(BasicClient):
             metrics_reporter (Optional[MetricsReporter], optional): A metrics reporter instance to record the metrics
                 during the execution. Defaults to an instance of MetricsReporter with default init parameters.
             lam (float, optional): weight applied to the Ditto drift loss. Defaults to 1.0.
+            autocast_dtype (Optional[torch.dtype], optional): If set, the forward passes and losses of both the
+                global and local models are computed in mixed precision with this dtype. Defaults to None, in which
+                case training runs in full precision.
         """
         super().__init__(
             data_path=data_path,
@@ -51,6 +55,7 @@ class DittoClient(BasicClient):
             device=device,
             loss_meter_type=loss_meter_type,
             checkpointer=checkpointer,
+            autocast_dtype=autocast_dtype,
         )
         self.initial_global_tensors: List[torch.Tensor]
         self.lam = lam
@@ -209,27 +214,28 @@ class DittoClient(BasicClient):
         """
 
         # Clear gradients from optimizers if they exist
-        self.optimizers["global"].zero_grad()
-        self.optimizers["local"].zero_grad()
+        self.maybe_zero_grad(self.optimizers["global"])
+        self.maybe_zero_grad(self.optimizers["local"])
 
         # Forward pass on both the global and local models
-        preds, features = self.predict(input)
+        with self.autocast():
+            preds, features = self.predict(input)
 
-        # Compute all relevant losses
-        # NOTE: features here should be a blank dictionary, as we're not using them
-        assert len(features) == 0
-        losses = self.compute_training_loss(preds, features, target)
+            # Compute all relevant losses
+            # NOTE: features here should be a blank dictionary, as we're not using them
+            assert len(features) == 0
+            losses = self.compute_training_loss(preds, features, target)
 
         # Take a step with the global model vanilla loss
-        losses.additional_losses["global_loss"].backward()
-        self.optimizers["global"].step()
+        self.accumulate_backward(losses.additional_losses["global_loss"])
+        self.maybe_step(self.optimizers["global"])
 
         # Take a step with the local model using the local loss and Ditto constraint
-        losses.backward["backward"].backward()
-        self.optimizers["local"].step()
+        self.accumulate_backward(losses.backward["backward"])
+        self.maybe_step(self.optimizers["local"])
 
         # Return dictionary of predictions where key is used to name respective MetricMeters
-        return losses, preds
+        return losses, self.full_precision_predictions(preds)
 
     def predict(
         self,
@@ -95,16 +95,16 @@ class EnsembleClient(BasicClient):
         """
         assert isinstance(input, torch.Tensor)
         for optimizer in self.optimizers.values():
-            optimizer.zero_grad()
+            self.maybe_zero_grad(optimizer)
 
         preds, features = self.predict(input)
         losses = self.compute_training_loss(preds, features, target)
 
         for loss in losses.backward.values():
-            loss.backward()
+            self.accumulate_backward(loss)
 
         for optimizer in self.optimizers.values():
-            optimizer.step()
+            self.maybe_step(optimizer)
 
         return losses, preds
 
@@ -219,7 +219,10 @@ class FedRepClient(BasicClient):
             data={"fit_start": datetime.datetime.now()},
         )
 
-        self.set_parameters(parameters, config, fitting_round=True)
+        parameters = self.maybe_map_shared_parameters(parameters, config)
+        with self.time_parameter_exchange("decode_time"):
+            self.set_parameters(parameters, config, fitting_round=True)
+        received_parameters = parameters
 
         self.update_before_train(current_server_round)
 
@@ -249,10 +252,15 @@ class FedRepClient(BasicClient):
             },
         )
 
+        with self.time_parameter_exchange("encode_time"):
+            parameters = self.get_parameters(config)
+        self.report_parameter_exchange(current_server_round, received_parameters, parameters)
+        parameters, metrics = self.maybe_write_back_parameters(parameters, metrics, config)
+
         # FitRes should contain local parameters, number of examples on client, and a dictionary holding metrics
         # calculation results.
         return (
-            self.get_parameters(config),
+            parameters,
             self.num_train_samples,
             metrics,
         )
@@ -348,20 +356,20 @@ class FedRepClient(BasicClient):
         """
 
         # Clear gradients from the optimizers if they exits. We do both regardless of the client mode.
-        self.optimizers["representation"].zero_grad()
-        self.optimizers["head"].zero_grad()
+        self.maybe_zero_grad(self.optimizers["representation"])
+        self.maybe_zero_grad(self.optimizers["head"])
 
         # Perform forward pass on the full model
         preds, features = self.predict(input)
 
         # Compute all relevant losses
         losses = self.compute_training_loss(preds, features, target)
-        losses.backward["backward"].backward()
+        self.accumulate_backward(losses.backward["backward"])
 
         if self.fedrep_train_mode == FedRepTrainMode.HEAD:
-            self.optimizers["head"].step()
+            self.maybe_step(self.optimizers["head"])
         elif self.fedrep_train_mode == FedRepTrainMode.REPRESENTATION:
-            self.optimizers["representation"].step()
+            self.maybe_step(self.optimizers["representation"])
         else:
             raise ValueError("Training Mode in an invalid state")
 
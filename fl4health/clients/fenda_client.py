@@ -25,6 +25,7 @@ class FendaClient(BasicClient):
         perfcl_loss_weights: Optional[Tuple[float, float]] = None,
         cos_sim_loss_weight: Optional[float] = None,
         contrastive_loss_weight: Optional[float] = None,
+        autocast_dtype: Optional[torch.dtype] = None,
     ) -> None:
         super().__init__(
             data_path=data_path,
@@ -32,6 +33,7 @@ class FendaClient(BasicClient):
             device=device,
             loss_meter_type=loss_meter_type,
             checkpointer=checkpointer,
+            autocast_dtype=autocast_dtype,
         )
         """This module is used to init FENDA client with various auxiliary loss functions.
         These losses will be activated only when their weights are not 0.0.
@@ -46,6 +48,8 @@ class FendaClient(BasicClient):
             Each value associate with one of two contrastive losses in PerFCL loss.
             cos_sim_loss_weight: Weight to be used for cosine similarity loss.
             contrastive_loss_weight: Weight to be used for contrastive loss.
+            autocast_dtype: Dtype in which forward passes and losses are computed under mixed precision. If None,
+            training runs in full precision.
         """
         self.perfcl_loss_weights = perfcl_loss_weights
         self.cos_sim_loss_weight = cos_sim_loss_weight
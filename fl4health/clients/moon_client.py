@@ -27,6 +27,7 @@ class MoonClient(BasicClient):
         temperature: float = 0.5,
         contrastive_weight: Optional[float] = None,
         len_old_models_buffer: int = 1,
+        autocast_dtype: Optional[torch.dtype] = None,
     ) -> None:
         super().__init__(
             data_path=data_path,
@@ -34,6 +35,7 @@ class MoonClient(BasicClient):
             device=device,
             loss_meter_type=loss_meter_type,
             checkpointer=checkpointer,
+            autocast_dtype=autocast_dtype,
         )
         self.cos_sim = torch.nn.CosineSimilarity(dim=-1).to(self.device)
         self.ce_criterion = torch.nn.CrossEntropyLoss().to(self.device)
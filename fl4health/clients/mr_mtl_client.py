@@ -24,6 +24,7 @@ class MrMtlClient(BasicClient):
         loss_meter_type: LossMeterType = LossMeterType.AVERAGE,
         checkpointer: Optional[ClientCheckpointModule] = None,
         lam: float = 1.0,
+        autocast_dtype: Optional[torch.dtype] = None,
     ) -> None:
         """
         This client implements the MR-MTL algorithm from MR-MTL: On Privacy and Personalization in Cross-Silo
@@ -44,6 +45,8 @@ class MrMtlClient(BasicClient):
             metrics_reporter (Optional[MetricsReporter], optional): A metrics reporter instance to record the metrics
                 during the execution. Defaults to an instance of MetricsReporter with default init parameters.
             lam (float, optional): weight applied to the MR-MTL drift loss. Defaults to 1.0.
+            autocast_dtype (Optional[torch.dtype], optional): If set, forward passes and losses are computed in mixed
+                precision with this dtype. Defaults to None, in which case training runs in full precision.
         """
         super().__init__(
             data_path=data_path,
@@ -51,6 +54,7 @@ class MrMtlClient(BasicClient):
             device=device,
             loss_meter_type=loss_meter_type,
             checkpointer=checkpointer,
+            autocast_dtype=autocast_dtype,
         )
         self.lam = lam
         self.initial_global_model: nn.Module
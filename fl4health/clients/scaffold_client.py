@@ -187,18 +187,31 @@ class ScaffoldClient(BasicClient):
         # torch.Tensor and Dict[str, torch.Tensor].
 
         # Clear gradients from optimizer if they exist
-        self.optimizers["global"].zero_grad()
+        self.maybe_zero_grad(self.optimizers["global"])
 
         # Get predictions and compute loss
-        preds, features = self.predict(input)
-        losses = self.compute_training_loss(preds, features, target)
-
-        # Calculate backward pass, modify grad to account for client drift, update params
-        losses.backward["backward"].backward()
+        with self.autocast():
+            preds, features = self.predict(input)
+            losses = self.compute_training_loss(preds, features, target)
+
+        # Calculate backward pass, modify grad to account for client drift, update params. With gradient accumulation,
+        # the drift correction is applied once to the accumulated gradients, before the optimizer step. Scaled
+        # gradients must be unscaled before they are corrected.
+        self.accumulate_backward(losses.backward["backward"])
+        if self.is_end_of_accumulation():
+            if self.grad_scaler is not None:
+                self.grad_scaler.unscale_(self.optimizers["global"])
+            self.modify_grad()
+        self.maybe_step(self.optimizers["global"])
+
+        return losses, self.full_precision_predictions(preds)
+
+    def step_deferred_optimizers(self) -> None:
+        # The drift correction is also applied to the gradients of an accumulation cycle closed early
+        if self.grad_scaler is not None:
+            self.grad_scaler.unscale_(self.optimizers["global"])
         self.modify_grad()
-        self.optimizers["global"].step()
-
-        return losses, preds
+        super().step_deferred_optimizers()
 
     def get_parameter_exchanger(self, config: Config) -> ParameterExchanger:
         assert self.model is not None
@@ -0,0 +1,202 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch.nn as nn
+from flwr.common.typing import Config, NDArray, NDArrays
+
+from fl4health.parameter_exchange.parameter_exchanger_base import ParameterExchanger
+from fl4health.parameter_exchange.quantization import (
+    QuantizationType,
+    dequantize_array,
+    is_quantizable,
+    pack_quantized_tensors,
+    quantize_array,
+)
+
+# Codes identifying how each tensor is encoded on the wire. Deltas are sent for the tensors that can be quantized
+# (non-empty floating point tensors), other tensors (i.e. batch norm counters) are sent as absolute values.
+_ABSOLUTE = 0
+_DENSE_DELTA = 1
+_SPARSE_DELTA = 2
+
+
+def decode_delta_ndarrays(packed_arrays: NDArrays, global_weights: NDArrays) -> NDArrays:
+    """
+    Decodes the arrays pushed by a DeltaParameterExchanger (after dequantization, if the deltas were quantized) into
+    a dense delta for each floating point tensor and the absolute value of every other tensor.
+
+    Args:
+        packed_arrays (NDArrays): The arrays received from the client.
+        global_weights (NDArrays): The global weights the client's deltas were computed against. These provide the
+            shapes of the sparse deltas.
+
+    Returns:
+        NDArrays: The dense deltas and absolute tensors, in the order of the global weights.
+    """
+    assert len(packed_arrays) > 0, "Delta encoded parameters must end with the encoding of each tensor"
+    kinds = packed_arrays[-1].tolist()
+    assert len(kinds) == len(global_weights), "Delta encoded parameters do not match the global weights"
+    ndarrays: NDArrays = []
+    array_index = 0
+    for kind, global_array in zip(kinds, global_weights):
+        if kind == _SPARSE_DELTA:
+            indices, values = packed_arrays[array_index : array_index + 2]
+            delta = np.zeros(global_array.shape, dtype=values.dtype)
+            np.put(delta, indices, values)
+            ndarrays.append(delta)
+            array_index += 2
+        else:
+            ndarrays.append(packed_arrays[array_index])
+            array_index += 1
+    assert array_index == len(packed_arrays) - 1, "Delta encoded parameters do not match their encodings"
+    return ndarrays
+
+
+def add_delta_ndarrays(global_weights: NDArrays, deltas: NDArrays) -> NDArrays:
+    """
+    Applies (aggregated) deltas decoded with decode_delta_ndarrays to the global weights. Tensors that are not sent as
+    deltas replace the global tensor. New arrays are returned, the global weights are not modified.
+
+    Args:
+        global_weights (NDArrays): The global weights the deltas were computed against.
+        deltas (NDArrays): The deltas of the floating point tensors and the absolute values of the other tensors.
+
+    Returns:
+        NDArrays: The updated weights, with the dtypes of the global weights.
+    """
+    assert len(global_weights) == len(deltas)
+    return [
+        (global_array + delta).astype(global_array.dtype, copy=False) if is_quantizable(global_array) else delta
+        for global_array, delta in zip(global_weights, deltas)
+    ]
+
+
+class DeltaParameterExchanger(ParameterExchanger):
+    def __init__(
+        self,
+        parameter_exchanger: ParameterExchanger,
+        top_k_fraction: Optional[float] = None,
+        quantization_type: Optional[QuantizationType] = None,
+        error_feedback: bool = False,
+    ) -> None:
+        """
+        Wraps a parameter exchanger so that, instead of the absolute weights, the difference between the local
+        weights after training and the global weights received at the start of the round is pushed to the server.
+        Local updates are much smaller in magnitude than the weights themselves, and concentrated in fewer entries,
+        so they compress far better. The deltas can optionally be sparsified, keeping only the top-k entries by
+        magnitude of each tensor, and/or quantized (FP16, BF16 or INT8). Tensors that are not floating point (i.e.
+        batch norm counters) are sent as absolute values. Parameters pulled from the server are absolute and are
+        passed to the wrapped exchanger unchanged.
+
+        The global weights are recorded with record_global_weights, which BasicClient calls once the global weights
+        have been loaded at the start of each fitting round. The server strategy must hold the global model and add
+        the aggregated deltas to it (see the delta_aggregation argument of BasicFedAvg). If the deltas are quantized,
+        the strategy must also dequantize the client parameters (see dequantize_client_parameters).
+
+        With error feedback, the part of each delta that is dropped by sparsification or lost to quantization is kept
+        on the client and added to the delta of the next round, so that compression errors are eventually sent rather
+        than discarded. As with QuantizedParameterExchanger, residuals are tracked by the position of the tensor in
+        the pushed parameters.
+
+        Args:
+            parameter_exchanger (ParameterExchanger): The exchanger producing the tensors whose deltas are sent.
+            top_k_fraction (Optional[float], optional): If provided, only this fraction of the entries of each delta,
+                those with the largest magnitudes, are sent along with their flat indices. Defaults to None.
+            quantization_type (Optional[QuantizationType], optional): If provided, the delta values are quantized.
+                Defaults to None.
+            error_feedback (bool, optional): Whether to carry the compression error over to the next round.
+                Defaults to False.
+        """
+        assert top_k_fraction is None or 0.0 < top_k_fraction <= 1.0, "top_k_fraction must be in (0, 1]"
+        self.parameter_exchanger = parameter_exchanger
+        self.top_k_fraction = top_k_fraction
+        self.quantization_type = quantization_type
+        self.error_feedback = error_feedback
+        self.global_weights: Optional[NDArrays] = None
+        self.residuals: Dict[int, NDArray] = {}
+        # Sizes of the most recently pushed parameters, before and after encoding
+        self.full_precision_bytes = 0
+        self.encoded_bytes = 0
+
+    def record_global_weights(self, model: nn.Module) -> None:
+        """
+        Stores a copy of the tensors the wrapped exchanger pushes for the model, which the deltas of the round are
+        computed against. This should be called right after the global weights are loaded into the model.
+
+        Args:
+            model (nn.Module): The model holding the global weights.
+        """
+        # Pushed arrays may be views of the model weights, which are about to be trained
+        self.global_weights = [np.array(array, copy=True) for array in self.parameter_exchanger.push_parameters(model)]
+
+    def _select_top_k(self, flat_delta: NDArray) -> Optional[NDArray]:
+        if self.top_k_fraction is None:
+            return None
+        k = max(1, int(np.ceil(self.top_k_fraction * flat_delta.size)))
+        if k >= flat_delta.size:
+            return None
+        indices = np.argpartition(np.abs(flat_delta), flat_delta.size - k)[flat_delta.size - k :]
+        # Sorted indices make the scatter on the server sequential in memory
+        indices.sort()
+        index_dtype = np.int32 if flat_delta.size <= np.iinfo(np.int32).max else np.int64
+        return indices.astype(index_dtype)
+
+    def _encode_values(self, values: NDArray) -> Tuple[Tuple[Optional[QuantizationType], NDArrays], NDArray]:
+        # Returns the encoded values along with the values the server will decode
+        if self.quantization_type is None:
+            return (None, [values]), values
+        encoded_arrays = quantize_array(values, self.quantization_type)
+        return (self.quantization_type, encoded_arrays), dequantize_array(encoded_arrays, self.quantization_type)
+
+    def push_parameters(
+        self, model: nn.Module, initial_model: Optional[nn.Module] = None, config: Optional[Config] = None
+    ) -> NDArrays:
+        assert self.global_weights is not None, "record_global_weights must be called before deltas are pushed"
+        ndarrays = self.parameter_exchanger.push_parameters(model, initial_model, config)
+        assert len(ndarrays) == len(self.global_weights), "Pushed tensors do not match the recorded global weights"
+
+        encoded_tensors: List[Tuple[Optional[QuantizationType], NDArrays]] = []
+        kinds: List[int] = []
+        for tensor_index, (array, global_array) in enumerate(zip(ndarrays, self.global_weights)):
+            if not is_quantizable(array):
+                encoded_tensors.append((None, [array]))
+                kinds.append(_ABSOLUTE)
+                continue
+            assert array.shape == global_array.shape, "Pushed tensors do not match the recorded global weights"
+            delta = array - global_array
+            if self.error_feedback:
+                residual = self.residuals.get(tensor_index)
+                if residual is not None and residual.shape == delta.shape:
+                    delta += residual
+
+            flat_delta = delta.reshape(-1)
+            indices = self._select_top_k(flat_delta)
+            if indices is None:
+                encoded_values, decoded_values = self._encode_values(delta)
+                encoded_tensors.append(encoded_values)
+                kinds.append(_DENSE_DELTA)
+                if self.error_feedback and self.quantization_type is not None:
+                    self.residuals[tensor_index] = delta - decoded_values
+                elif self.error_feedback:
+                    # The delta, including any previous residual, is sent exactly
+                    self.residuals.pop(tensor_index, None)
+            else:
+                encoded_values, decoded_values = self._encode_values(flat_delta[indices])
+                encoded_tensors.extend([(None, [indices]), encoded_values])
+                kinds.append(_SPARSE_DELTA)
+                if self.error_feedback:
+                    # The selected values were copied out of delta, so it can hold the residual
+                    flat_delta[indices] -= decoded_values
+                    self.residuals[tensor_index] = delta
+
+        encoded_tensors.append((None, [np.array(kinds, dtype=np.int8)]))
+        if self.quantization_type is None:
+            packed_arrays = [array for _, encoded_arrays in encoded_tensors for array in encoded_arrays]
+        else:
+            packed_arrays = pack_quantized_tensors(encoded_tensors)
+        self.full_precision_bytes = sum(array.nbytes for array in ndarrays)
+        self.encoded_bytes = sum(array.nbytes for array in packed_arrays)
+        return packed_arrays
+
+    def pull_parameters(self, parameters: NDArrays, model: nn.Module, config: Optional[Config] = None) -> None:
+        self.parameter_exchanger.pull_parameters(parameters, model, config)
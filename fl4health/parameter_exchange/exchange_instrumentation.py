@@ -0,0 +1,97 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Sequence
+
+import torch.nn as nn
+from flwr.common.typing import NDArray
+
+
+def payload_tensor_bytes(ndarrays: Sequence[NDArray]) -> List[int]:
+    """
+    Computes the size of the data of each array to be exchanged. The .npy header added to each array when it is
+    serialized (typically 128 bytes) is not included.
+
+    Args:
+        ndarrays (Sequence[NDArray]): The arrays to be exchanged.
+
+    Returns:
+        List[int]: The number of bytes of each array.
+    """
+    return [int(ndarray.nbytes) for ndarray in ndarrays]
+
+
+def model_state_bytes(model: nn.Module) -> int:
+    """
+    Computes the size of the full state of a model, which is what a FullParameterExchanger sends, for comparison
+    with the payloads of other exchangers.
+
+    Args:
+        model (nn.Module): The model.
+
+    Returns:
+        int: The number of bytes of the model's state dictionary.
+    """
+    return sum(tensor.numel() * tensor.element_size() for tensor in model.state_dict().values())
+
+
+class ExchangeInstrumentation:
+    def __init__(self) -> None:
+        """
+        Opt-in collector of payload sizes and encode/decode timings of parameter exchange. Clients time the pushing
+        and pulling of parameters through it, packing exchangers (i.e. ParameterExchangerWithPacking and
+        PartialParameterExchanger) time their packers through it and record the size of what is packed alongside
+        the model weights (i.e. Scaffold control variates, sparse COO indices or layer names). The collected values
+        are popped once per round and reported through a MetricsReporter.
+        """
+        self.metrics: Dict[str, Any] = {}
+
+    @contextmanager
+    def timed(self, key: str) -> Iterator[None]:
+        """
+        Times the wrapped block and adds the elapsed wall time (in seconds) to the value stored under key, so that
+        repeated operations within a round are accumulated.
+
+        Args:
+            key (str): The key under which the time is accumulated.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.metrics[key] = self.metrics.get(key, 0.0) + time.perf_counter() - start_time
+
+    def record_payload(self, key: str, ndarrays: Sequence[NDArray]) -> int:
+        """
+        Records the size of each array of a payload under {key}_tensor_bytes and their total under {key}_bytes.
+
+        Args:
+            key (str): Prefix of the keys under which the sizes are recorded.
+            ndarrays (Sequence[NDArray]): The arrays of the payload.
+
+        Returns:
+            int: The total number of bytes of the payload.
+        """
+        tensor_bytes = payload_tensor_bytes(ndarrays)
+        self.metrics[f"{key}_tensor_bytes"] = tensor_bytes
+        self.metrics[f"{key}_bytes"] = sum(tensor_bytes)
+        return sum(tensor_bytes)
+
+    def record(self, key: str, value: Any) -> None:
+        """
+        Records an arbitrary value.
+
+        Args:
+            key (str): The key under which the value is recorded.
+            value (Any): The value.
+        """
+        self.metrics[key] = value
+
+    def pop_metrics(self) -> Dict[str, Any]:
+        """
+        Returns the values collected since the last call and clears them.
+
+        Returns:
+            Dict[str, Any]: The collected values.
+        """
+        metrics, self.metrics = self.metrics, {}
+        return metrics
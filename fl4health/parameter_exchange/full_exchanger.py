@@ -1,24 +1,53 @@
-from collections import OrderedDict
 from typing import Optional
 
-import torch
 import torch.nn as nn
 from flwr.common.typing import Config, NDArrays
 
 from fl4health.parameter_exchange.parameter_exchanger_base import ParameterExchanger
+from fl4health.utils.serialization import copy_ndarray_into_tensor
 
 
 class FullParameterExchanger(ParameterExchanger):
     def push_parameters(
         self, model: nn.Module, initial_model: Optional[nn.Module] = None, config: Optional[Config] = None
     ) -> NDArrays:
-        # Sending all of parameters ordered by state_dict keys
-        # NOTE: Order matters, because it is relied upon by pull_parameters below
-        return [val.cpu().numpy() for _, val in model.state_dict().items()]
+        """
+        Sends all of the model's state ordered by state_dict keys. For models on the CPU, the arrays are zero-copy
+        numpy views of the model's parameter and buffer storage, so no model-sized copies are made. They are
+        serialized when sent to the server, but callers that keep them as a snapshot of the model must copy them,
+        as they will change as the model is trained.
+
+        NOTE: Order matters, because it is relied upon by pull_parameters below
+
+        Args:
+            model (nn.Module): The model whose state is to be sent.
+            initial_model (Optional[nn.Module], optional): Unused. Defaults to None.
+            config (Optional[Config], optional): Unused. Defaults to None.
+
+        Returns:
+            NDArrays: The model state, ordered by state_dict keys.
+        """
+        return [val.cpu().numpy() for val in model.state_dict().values()]
 
     def pull_parameters(self, parameters: NDArrays, model: nn.Module, config: Optional[Config] = None) -> None:
-        # Assumes all model parameters are contained in parameters
-        # The state_dict is reconstituted because parameters is simply a list of bytes
-        params_dict = zip(model.state_dict().keys(), parameters)
-        state_dict = OrderedDict({k: torch.tensor(v) for k, v in params_dict})
-        model.load_state_dict(state_dict, strict=True)
+        """
+        Assumes all model parameters are contained in parameters, ordered by state_dict keys. Rather than
+        reconstituting a state_dict of new tensors and loading it, which copies the model twice, each array is wrapped
+        as a tensor without copying (torch.from_numpy) and copied directly into the existing parameter or buffer
+        storage of the model. Read-only arrays (i.e. views of serialized parameters) are copied in bounded chunks.
+
+        Args:
+            parameters (NDArrays): The model state, ordered by state_dict keys.
+            model (nn.Module): The model into which the state is loaded.
+            config (Optional[Config], optional): Unused. Defaults to None.
+        """
+        # The state_dict tensors are detached, but share storage with the model's parameters and buffers
+        state_dict = model.state_dict()
+        assert len(parameters) == len(
+            state_dict
+        ), f"Received {len(parameters)} arrays, but the model has {len(state_dict)} state_dict entries"
+        for (name, tensor), array in zip(state_dict.items(), parameters):
+            assert (
+                tuple(tensor.shape) == array.shape
+            ), f"Size mismatch for {name}: received {array.shape}, the model has {tuple(tensor.shape)}"
+            copy_ndarray_into_tensor(array, tensor)
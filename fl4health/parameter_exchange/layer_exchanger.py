@@ -1,12 +1,13 @@
-from typing import Callable, List, Optional, Set, Tuple, Type, TypeVar
+from typing import Callable, Dict, List, Optional, Set, Tuple, Type, TypeVar
 
 import torch
 import torch.nn as nn
 from flwr.common.typing import Config, NDArrays
 
 from fl4health.parameter_exchange.parameter_exchanger_base import ParameterExchanger
-from fl4health.parameter_exchange.parameter_packer import ParameterPackerWithLayerNames
+from fl4health.parameter_exchange.parameter_packer import ParameterPackerWithLayerIds, ParameterPackerWithLayerNames
 from fl4health.parameter_exchange.partial_parameter_exchanger import PartialParameterExchanger
+from fl4health.utils.serialization import copy_ndarray_into_tensor
 
 TorchModule = TypeVar("TorchModule", bound=nn.Module)
 LayerSelectionFunction = Callable[[nn.Module, nn.Module], Tuple[NDArrays, List[str]]]
@@ -65,8 +66,14 @@ class LayerExchangerWithExclusions(ParameterExchanger):
         # module and then an identifier for the specific parameters.
         # Ex. named module: name: "fc1" module: nn.Linear(10, 10, bias=True)
         # The state_dict has keys fc1.weight and fc1.bias with associated parameters
-        # We filter out any parameters prefixed with the name of an excluded module, as stored in modules_to_filter
-        return any([layer_name.startswith(module_to_filter) for module_to_filter in self.modules_to_filter])
+        # We filter out any parameters prefixed with the name of an excluded module, as stored in modules_to_filter.
+        # Rather than scanning every excluded module, we look up each of the (dot separated) module prefixes of the
+        # layer name, so the cost depends on the depth of the layer rather than the number of excluded modules.
+        name_components = layer_name.split(".")
+        return any(
+            ".".join(name_components[:prefix_length]) in self.modules_to_filter
+            for prefix_length in range(1, len(name_components))
+        )
 
     def get_layers_to_transfer(self, model: nn.Module) -> List[str]:
         # We store the state dictionary keys that do not correspond to excluded modules as held in modules_to_filter
@@ -93,10 +100,7 @@ class LayerExchangerWithExclusions(ParameterExchanger):
 
 
 class DynamicLayerExchanger(PartialParameterExchanger[List[str]]):
-    def __init__(
-        self,
-        layer_selection_function: LayerSelectionFunction,
-    ) -> None:
+    def __init__(self, layer_selection_function: LayerSelectionFunction, use_layer_ids: bool = False) -> None:
         """
         This exchanger uses "layer_selection_function" to select a subset of a model's layers
         at the end of each training round. Only the selected layers are exchanged with the server.
@@ -108,9 +112,45 @@ class DynamicLayerExchanger(PartialParameterExchanger[List[str]]):
                 the class LayerSelectionFunctionConstructor, so it only needs to take
                 in two nn.Module objects as inputs. For more details, please see the
                 docstring of LayerSelectionFunctionConstructor.
+            use_layer_ids (bool, optional): If True, the selected layers are identified by integer ids rather than
+                by their names when exchanged with the server. A layer's id is its position in the model's state
+                dictionary, which every client sharing the model architecture derives locally, so only small integers
+                are sent each round. The server must use the same setting (see FedAvgDynamicLayer).
+                Defaults to False.
         """
         self.layer_selection_function = layer_selection_function
+        self.use_layer_ids = use_layer_ids
         self.parameter_packer = ParameterPackerWithLayerNames()
+        self.layer_id_packer = ParameterPackerWithLayerIds()
+        self.instrumentation = None
+        # The layer id schema, set from the model the first time parameters are exchanged
+        self.layer_names: Optional[List[str]] = None
+        self.layer_ids: Dict[str, int] = {}
+
+    def initialize_layer_ids(self, model: nn.Module) -> None:
+        """
+        Sets the mapping between layer names and integer ids from the order of the model's state dictionary, if it
+        has not been set already.
+
+        Args:
+            model (nn.Module): The model whose layers are exchanged.
+        """
+        if self.layer_names is None:
+            self.layer_names = list(model.state_dict().keys())
+            self.layer_ids = {layer_name: layer_id for layer_id, layer_name in enumerate(self.layer_names)}
+
+    def pack_parameters(self, model_weights: NDArrays, additional_parameters: List[str]) -> NDArrays:
+        if not self.use_layer_ids:
+            return super().pack_parameters(model_weights, additional_parameters)
+        layer_ids = [self.layer_ids[layer_name] for layer_name in additional_parameters]
+        return self.pack_with_packer(self.layer_id_packer, model_weights, layer_ids)
+
+    def unpack_parameters(self, packed_parameters: NDArrays) -> Tuple[NDArrays, List[str]]:
+        if not self.use_layer_ids:
+            return super().unpack_parameters(packed_parameters)
+        assert self.layer_names is not None, "Layer ids are only known after initialize_layer_ids has been called"
+        layer_params, layer_ids = self.unpack_with_packer(self.layer_id_packer, packed_parameters)
+        return layer_params, [self.layer_names[layer_id] for layer_id in layer_ids]
 
     def select_parameters(
         self, model: nn.Module, initial_model: Optional[nn.Module] = None
@@ -122,13 +162,14 @@ class DynamicLayerExchanger(PartialParameterExchanger[List[str]]):
         self, model: nn.Module, initial_model: Optional[nn.Module] = None, config: Optional[Config] = None
     ) -> NDArrays:
         assert initial_model is not None
+        self.initialize_layer_ids(model)
         layers_to_transfer, layer_names = self.select_parameters(model, initial_model)
         return self.pack_parameters(layers_to_transfer, layer_names)
 
     def pull_parameters(self, parameters: NDArrays, model: nn.Module, config: Optional[Config] = None) -> None:
+        self.initialize_layer_ids(model)
+        # The state dictionary shares storage with the model, so the received layers are copied into it in place
         current_state = model.state_dict()
-        # update the correct layers to new parameters
         layer_params, layer_names = self.unpack_parameters(parameters)
         for layer_name, layer_param in zip(layer_names, layer_params):
-            current_state[layer_name] = torch.tensor(layer_param)
-        model.load_state_dict(current_state, strict=True)
+            copy_ndarray_into_tensor(layer_param, current_state[layer_name])
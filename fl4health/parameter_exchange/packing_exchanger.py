@@ -1,7 +1,8 @@
-from typing import Generic, Tuple, TypeVar
+from typing import Generic, Optional, Tuple, TypeVar
 
 from flwr.common.typing import NDArrays
 
+from fl4health.parameter_exchange.exchange_instrumentation import ExchangeInstrumentation
 from fl4health.parameter_exchange.full_exchanger import FullParameterExchanger
 from fl4health.parameter_exchange.parameter_packer import ParameterPacker
 
@@ -12,9 +13,20 @@ class ParameterExchangerWithPacking(FullParameterExchanger, Generic[T]):
     def __init__(self, parameter_packer: ParameterPacker[T]) -> None:
         super().__init__()
         self.parameter_packer = parameter_packer
+        # If set (i.e. by a client), packing is timed and the size of the packed additional parameters is recorded
+        self.instrumentation: Optional[ExchangeInstrumentation] = None
 
     def pack_parameters(self, model_weights: NDArrays, additional_parameters: T) -> NDArrays:
-        return self.parameter_packer.pack_parameters(model_weights, additional_parameters)
+        if self.instrumentation is None:
+            return self.parameter_packer.pack_parameters(model_weights, additional_parameters)
+        with self.instrumentation.timed("pack_time"):
+            packed_parameters = self.parameter_packer.pack_parameters(model_weights, additional_parameters)
+        # Everything packed after the model weights is overhead of the exchange (i.e. control variates)
+        self.instrumentation.record_payload("packed_extra", packed_parameters[len(model_weights) :])
+        return packed_parameters
 
     def unpack_parameters(self, packed_parameters: NDArrays) -> Tuple[NDArrays, T]:
-        return self.parameter_packer.unpack_parameters(packed_parameters)
+        if self.instrumentation is None:
+            return self.parameter_packer.unpack_parameters(packed_parameters)
+        with self.instrumentation.timed("unpack_time"):
+            return self.parameter_packer.unpack_parameters(packed_parameters)
@@ -6,6 +6,12 @@ import torch
 from flwr.common.typing import List, NDArray, NDArrays
 from torch import Tensor
 
+from fl4health.parameter_exchange.sparse_index_encoding import (
+    SparseIndexEncoding,
+    decode_sparse_indices,
+    encode_sparse_indices,
+)
+
 T = TypeVar("T")
 
 
@@ -75,6 +81,22 @@ class ParameterPackerWithLayerNames(ParameterPacker[List[str]]):
         return model_parameters, param_names
 
 
+class ParameterPackerWithLayerIds(ParameterPacker[List[int]]):
+    def pack_parameters(self, model_weights: NDArrays, weights_ids: List[int]) -> NDArrays:
+        return model_weights + [np.array(weights_ids, dtype=np.int32)]
+
+    def unpack_parameters(self, packed_parameters: NDArrays) -> Tuple[NDArrays, List[int]]:
+        """
+        Assumption: packed_parameters is a list containing model parameters followed by an NDArray that contains the
+        integer ids of those parameters. A layer's id is its position in the model's state dictionary, so that
+        clients sharing a model architecture agree on the ids without exchanging layer names.
+        """
+        split_size = len(packed_parameters) - 1
+        model_parameters = packed_parameters[:split_size]
+        param_ids = packed_parameters[split_size:][0].astype(np.int64).tolist()
+        return model_parameters, param_ids
+
+
 class SparseCooParameterPacker(ParameterPacker[Tuple[NDArrays, NDArrays, List[str]]]):
     """
     This parameter packer is responsible for selecting an arbitrary set of parameters
@@ -89,6 +111,19 @@ class SparseCooParameterPacker(ParameterPacker[Tuple[NDArrays, NDArrays, List[st
 
     """
 
+    def __init__(self, index_encoding: SparseIndexEncoding = SparseIndexEncoding.COORDINATES) -> None:
+        """
+        Args:
+            index_encoding (SparseIndexEncoding, optional): How the indices of the selected parameters are encoded
+                by extract_sparse_info_from_dense. COORDINATES stores one int64 coordinate per tensor dimension for
+                each parameter (as torch.nonzero does), which for a 4-D convolutional weight is 8x the size of the
+                float32 values it describes. The other encodings store linear indices in the narrowest sufficient
+                dtype, gaps between consecutive indices or a bitmask, and AUTO chooses the smallest of these for each
+                tensor. Indices in any encoding are decoded by flat_indices_from_sparse_info. Defaults to COORDINATES.
+        """
+        super().__init__()
+        self.index_encoding = index_encoding
+
     def pack_parameters(
         self, model_parameters: NDArrays, additional_parameters: Tuple[NDArrays, NDArrays, List[str]]
     ) -> NDArrays:
@@ -126,3 +161,40 @@ class SparseCooParameterPacker(ParameterPacker[Tuple[NDArrays, NDArrays, List[st
         selected_indices = torch.nonzero(x, as_tuple=False).cpu().numpy()
         tensor_shape = np.array(list(x.shape))
         return selected_parameters, selected_indices, tensor_shape
+
+    def extract_sparse_info_from_dense(self, x: Tensor) -> Tuple[NDArray, NDArray, NDArray]:
+        """
+        Same as extract_coo_info_from_dense, except that the indices of the nonzero values are encoded with the
+        index encoding of the packer.
+
+        Args:
+            x (Tensor): Input dense tensor.
+
+        Returns:
+            Tuple[NDArray, NDArray, NDArray]: The nonzero values of x,
+            the encoded indices of those values within x, and the shape of x.
+        """
+        if self.index_encoding == SparseIndexEncoding.COORDINATES:
+            return self.extract_coo_info_from_dense(x)
+        flat_x = x.reshape(-1)
+        # Indices of the nonzero values are returned in ascending order
+        flat_indices = torch.nonzero(flat_x, as_tuple=True)[0]
+        selected_parameters = flat_x[flat_indices].cpu().numpy()
+        selected_indices = encode_sparse_indices(flat_indices.cpu().numpy(), tuple(x.shape), self.index_encoding)
+        tensor_shape = np.array(list(x.shape))
+        return selected_parameters, selected_indices, tensor_shape
+
+    @staticmethod
+    def flat_indices_from_sparse_info(selected_indices: NDArray, tensor_shape: NDArray) -> NDArray:
+        """
+        Decodes the indices of the selected parameters of a tensor, in any index encoding, into linear indices
+        within the flattened tensor.
+
+        Args:
+            selected_indices (NDArray): The encoded indices (or coordinates) of the selected parameters.
+            tensor_shape (NDArray): The shape of the tensor.
+
+        Returns:
+            NDArray: The int64 linear indices of the selected parameters.
+        """
+        return decode_sparse_indices(selected_indices, tuple(tensor_shape.tolist()))
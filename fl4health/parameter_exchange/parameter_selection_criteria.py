@@ -1,4 +1,5 @@
 import math
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from typing import Callable, Dict, List, Optional, Tuple
 
@@ -12,7 +13,12 @@ LayerSelectionFunction = Callable[[nn.Module, nn.Module], Tuple[NDArrays, List[s
 
 class LayerSelectionFunctionConstructor:
     def __init__(
-        self, norm_threshold: float, exchange_percentage: float, normalize: bool = True, select_drift_more: bool = True
+        self,
+        norm_threshold: float,
+        exchange_percentage: float,
+        normalize: bool = True,
+        select_drift_more: bool = True,
+        num_workers: int = 1,
     ) -> None:
         """
         This class leverages functools.partial to construct layer selection functions,
@@ -26,6 +32,8 @@ class LayerSelectionFunctionConstructor:
                 we also divide by the number of parameters in that layer. Defaults to True.
             select_drift_more (bool, optional): Indicates whether layers with larger
                 drift norm are selected. Defaults to True.
+            num_workers (int, optional): Number of threads used to compute the drift norms of the layers. Useful
+                for models trained on the CPU. Defaults to 1.
         """
         assert 0 < exchange_percentage <= 1
         assert 0 < norm_threshold
@@ -33,6 +41,7 @@ class LayerSelectionFunctionConstructor:
         self.exchange_percentage = exchange_percentage
         self.normalize = normalize
         self.select_drift_more = select_drift_more
+        self.num_workers = num_workers
 
     def select_by_threshold(self) -> LayerSelectionFunction:
         return partial(
@@ -40,6 +49,7 @@ class LayerSelectionFunctionConstructor:
             self.norm_threshold,
             self.normalize,
             self.select_drift_more,
+            num_workers=self.num_workers,
         )
 
     def select_by_percentage(self) -> LayerSelectionFunction:
@@ -48,17 +58,84 @@ class LayerSelectionFunctionConstructor:
             self.exchange_percentage,
             self.normalize,
             self.select_drift_more,
+            num_workers=self.num_workers,
         )
 
 
 # Selection criteria functions for selecting entire layers. Intended to be used
 # by the DynamicLayerExchanger class via the LayerSelectionFunctionConstructor class.
-def _calculate_drift_norm(t1: torch.Tensor, t2: torch.Tensor, normalize: bool) -> float:
-    t_diff = (t1 - t2).float()
-    drift_norm = torch.linalg.norm(t_diff)
+def _group_layers(layers: List[Tensor], group_size: int) -> List[slice]:
+    # Splits consecutive layers into groups holding roughly group_size elements that live on the same device, so
+    # that each group can be processed by a single fused (foreach) call.
+    groups = []
+    group_start, group_numel = 0, 0
+    for layer_index, layer in enumerate(layers):
+        if layer_index > group_start and (group_numel >= group_size or layer.device != layers[group_start].device):
+            groups.append(slice(group_start, layer_index))
+            group_start, group_numel = layer_index, 0
+        group_numel += layer.numel()
+    groups.append(slice(group_start, len(layers)))
+    return groups
+
+
+def _group_drift_norms(model_layers: List[Tensor], initial_layers: List[Tensor]) -> Tensor:
+    # The differences of the whole group are computed, and then reduced to their norms, with one fused call each.
+    layer_diffs = torch._foreach_sub(
+        [layer.float() for layer in model_layers], [layer.float() for layer in initial_layers]
+    )
+    return torch.stack(torch._foreach_norm(layer_diffs))
+
+
+def compute_drift_norms(
+    model: nn.Module,
+    initial_model: nn.Module,
+    normalize: bool,
+    num_workers: int = 1,
+    group_size: int = 2**18,
+) -> Dict[str, float]:
+    """
+    Computes the drift (l2 norm of the difference) of every layer of model away from the corresponding layer of
+    initial_model. Rather than computing the norm of each layer separately and transferring it to the host, the layers
+    are processed in groups with fused (foreach) kernels, the norms stay on the device, and all of them are
+    transferred to the host at once. Groups are bounded in size so that the temporary differences do not require
+    a copy of the whole model.
+
+    Args:
+        model (nn.Module): The model whose layer drift is measured.
+        initial_model (nn.Module): The model the drift is measured from.
+        normalize (bool): Whether the norm of each layer is divided by the number of parameters in that layer.
+        num_workers (int, optional): Number of threads used to process the groups of layers. Useful when the model
+            is on the CPU, as torch kernels release the GIL. Defaults to 1.
+        group_size (int, optional): Approximate number of parameters processed by each fused call. Defaults to
+            2**18.
+
+    Returns:
+        Dict[str, float]: The drift norm of each layer, keyed by layer name.
+    """
+    assert num_workers >= 1, "num_workers must be at least 1"
+    model_states = model.state_dict()
+    initial_model_states = initial_model.state_dict()
+    layer_names = list(model_states.keys())
+    if len(layer_names) == 0:
+        return {}
+    model_layers = [model_states[layer_name] for layer_name in layer_names]
+    initial_layers = [initial_model_states[layer_name] for layer_name in layer_names]
+
+    groups = _group_layers(model_layers, group_size)
+    if num_workers > 1 and len(groups) > 1:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            group_norms = list(
+                executor.map(lambda group: _group_drift_norms(model_layers[group], initial_layers[group]), groups)
+            )
+    else:
+        group_norms = [_group_drift_norms(model_layers[group], initial_layers[group]) for group in groups]
+
+    output_device = model_layers[0].device
+    drift_norms = torch.cat([norms.to(output_device) for norms in group_norms])
     if normalize:
-        drift_norm /= torch.numel(t_diff)
-    return drift_norm.item()
+        drift_norms /= torch.tensor([layer.numel() for layer in model_layers], device=output_device)
+    # The single transfer to the host
+    return dict(zip(layer_names, drift_norms.cpu().tolist()))
 
 
 def select_layers_by_threshold(
@@ -67,18 +144,19 @@ def select_layers_by_threshold(
     select_drift_more: bool,
     model: nn.Module,
     initial_model: nn.Module,
+    num_workers: int = 1,
 ) -> Tuple[NDArrays, List[str]]:
     """
     Return those layers of model that deviate (in l2 norm) away from corresponding layers of
-    self.initial_model by at least (or at most) self.threshold.
+    self.initial_model by at least (or at most) self.threshold. The drift norms of all layers are computed in
+    a batch (see compute_drift_norms), with num_workers threads.
     """
     layer_names = []
     layers_to_transfer = []
-    initial_model_states = initial_model.state_dict()
     model_states = model.state_dict()
+    names_to_norm_drift = compute_drift_norms(model, initial_model, normalize, num_workers)
     for layer_name, layer_param in model_states.items():
-        ghost_of_layer_params_past = initial_model_states[layer_name]
-        drift_norm = _calculate_drift_norm(layer_param, ghost_of_layer_params_past, normalize)
+        drift_norm = names_to_norm_drift[layer_name]
         if select_drift_more:
             if drift_norm > threshold:
                 layers_to_transfer.append(layer_param.cpu().numpy())
@@ -96,15 +174,10 @@ def select_layers_by_percentage(
     select_drift_more: bool,
     model: nn.Module,
     initial_model: nn.Module,
+    num_workers: int = 1,
 ) -> Tuple[NDArrays, List[str]]:
-    names_to_norm_drift = {}
-    initial_model_states = initial_model.state_dict()
     model_states = model.state_dict()
-
-    for layer_name, layer_param in model_states.items():
-        layer_param_past = initial_model_states[layer_name]
-        drift_norm = _calculate_drift_norm(layer_param, layer_param_past, normalize)
-        names_to_norm_drift[layer_name] = drift_norm
+    names_to_norm_drift = compute_drift_norms(model, initial_model, normalize, num_workers)
 
     total_param_num = len(names_to_norm_drift.keys())
     num_param_exchange = int(math.ceil(total_param_num * exchange_percentage))
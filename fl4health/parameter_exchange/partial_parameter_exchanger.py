@@ -4,22 +4,45 @@ from typing import Generic, Optional, Tuple, TypeVar
 import torch.nn as nn
 from flwr.common.typing import NDArrays
 
+from fl4health.parameter_exchange.exchange_instrumentation import ExchangeInstrumentation
 from fl4health.parameter_exchange.parameter_exchanger_base import ParameterExchanger
 from fl4health.parameter_exchange.parameter_packer import ParameterPacker
 
 T = TypeVar("T")
+S = TypeVar("S")
 
 
 class PartialParameterExchanger(ParameterExchanger, Generic[T]):
     def __init__(self, parameter_packer: ParameterPacker[T]) -> None:
         super().__init__()
         self.parameter_packer = parameter_packer
+        # If set (i.e. by a client), packing is timed and the size of the packed additional parameters is recorded
+        self.instrumentation: Optional[ExchangeInstrumentation] = None
 
     def pack_parameters(self, model_weights: NDArrays, additional_parameters: T) -> NDArrays:
-        return self.parameter_packer.pack_parameters(model_weights, additional_parameters)
+        return self.pack_with_packer(self.parameter_packer, model_weights, additional_parameters)
 
     def unpack_parameters(self, packed_parameters: NDArrays) -> Tuple[NDArrays, T]:
-        return self.parameter_packer.unpack_parameters(packed_parameters)
+        return self.unpack_with_packer(self.parameter_packer, packed_parameters)
+
+    def pack_with_packer(
+        self, parameter_packer: ParameterPacker[S], model_weights: NDArrays, additional_parameters: S
+    ) -> NDArrays:
+        if self.instrumentation is None:
+            return parameter_packer.pack_parameters(model_weights, additional_parameters)
+        with self.instrumentation.timed("pack_time"):
+            packed_parameters = parameter_packer.pack_parameters(model_weights, additional_parameters)
+        # Everything packed after the model weights is overhead of the exchange (i.e. indices or layer names)
+        self.instrumentation.record_payload("packed_extra", packed_parameters[len(model_weights) :])
+        return packed_parameters
+
+    def unpack_with_packer(
+        self, parameter_packer: ParameterPacker[S], packed_parameters: NDArrays
+    ) -> Tuple[NDArrays, S]:
+        if self.instrumentation is None:
+            return parameter_packer.unpack_parameters(packed_parameters)
+        with self.instrumentation.timed("unpack_time"):
+            return parameter_packer.unpack_parameters(packed_parameters)
 
     @abstractmethod
     def select_parameters(
@@ -0,0 +1,167 @@
+from enum import Enum
+from typing import List, Optional, Tuple
+
+import numpy as np
+from flwr.common.typing import NDArray, NDArrays
+
+
+class QuantizationType(Enum):
+    FP16 = "fp16"
+    BF16 = "bf16"
+    INT8 = "int8"
+
+
+# Codes identifying how each tensor is encoded on the wire. Code 0 denotes a tensor sent as is.
+_QUANTIZATION_TYPE_CODES = {QuantizationType.FP16: 1, QuantizationType.BF16: 2, QuantizationType.INT8: 3}
+_CODE_QUANTIZATION_TYPES = {code: quantization_type for quantization_type, code in _QUANTIZATION_TYPE_CODES.items()}
+# Number of arrays used to encode a tensor with each quantization type
+_NUM_ENCODED_ARRAYS = {QuantizationType.FP16: 1, QuantizationType.BF16: 1, QuantizationType.INT8: 3}
+
+
+def is_quantizable(array: NDArray) -> bool:
+    """
+    Only non-empty floating point tensors are quantized. Other tensors (i.e. batch norm counters, layer names or
+    sparse tensor indices) are sent as is.
+
+    Args:
+        array (NDArray): The tensor to be sent.
+
+    Returns:
+        bool: Whether the tensor is quantized.
+    """
+    return np.issubdtype(array.dtype, np.floating) and array.size > 0
+
+
+def _float32_to_bf16(array: NDArray) -> NDArray:
+    # bfloat16 is the upper half of a float32. Numpy does not support it, so the bits are sent as uint16, rounding to
+    # the nearest value (ties to even).
+    bits = np.ascontiguousarray(array, dtype=np.float32).view(np.uint32)
+    rounding_bias = ((bits >> 16) & 1) + np.uint32(0x7FFF)
+    return ((bits + rounding_bias) >> 16).astype(np.uint16)
+
+
+def _bf16_to_float32(array: NDArray) -> NDArray:
+    return (array.astype(np.uint32) << 16).view(np.float32)
+
+
+def quantize_array(array: NDArray, quantization_type: QuantizationType) -> NDArrays:
+    """
+    Encodes a floating point tensor with the provided quantization type.
+
+    FP16 and BF16 cast the whole tensor. INT8 uses asymmetric affine quantization with a scale and zero point per
+    channel, where the channels are along the first dimension (i.e. the output channels of convolutional and linear
+    layers). Tensors with fewer than two dimensions (i.e. biases) are quantized as a single channel. The range of each
+    channel is extended to include zero, so zero is represented exactly.
+
+    Args:
+        array (NDArray): The floating point tensor to be quantized.
+        quantization_type (QuantizationType): How the tensor is to be quantized.
+
+    Returns:
+        NDArrays: The arrays encoding the tensor. These are the cast tensor for FP16 and BF16, and the quantized
+            tensor followed by the per-channel scales and zero points for INT8.
+    """
+    if quantization_type == QuantizationType.FP16:
+        return [array.astype(np.float16)]
+    if quantization_type == QuantizationType.BF16:
+        return [_float32_to_bf16(array)]
+
+    channels = array.reshape(array.shape[0] if array.ndim > 1 else 1, -1).astype(np.float32)
+    channel_min = np.minimum(channels.min(axis=1), 0.0)
+    channel_max = np.maximum(channels.max(axis=1), 0.0)
+    scale = (channel_max - channel_min) / 255.0
+    # Channels that are entirely zero have a zero range, any scale represents them exactly
+    scale[scale == 0.0] = 1.0
+    zero_point = np.clip(np.round(-channel_min / scale) - 128.0, -128, 127)
+    quantized = np.clip(np.round(channels / scale[:, None]) + zero_point[:, None], -128, 127)
+    return [quantized.astype(np.int8).reshape(array.shape), scale.astype(np.float32), zero_point.astype(np.int8)]
+
+
+def dequantize_array(encoded_arrays: NDArrays, quantization_type: QuantizationType) -> NDArray:
+    """
+    Decodes a tensor encoded by quantize_array.
+
+    Args:
+        encoded_arrays (NDArrays): The arrays encoding the tensor.
+        quantization_type (QuantizationType): How the tensor was quantized.
+
+    Returns:
+        NDArray: The dequantized tensor, as float32.
+    """
+    if quantization_type == QuantizationType.FP16:
+        return encoded_arrays[0].astype(np.float32)
+    if quantization_type == QuantizationType.BF16:
+        return _bf16_to_float32(encoded_arrays[0])
+
+    quantized, scale, zero_point = encoded_arrays
+    channels = quantized.reshape(scale.shape[0], -1).astype(np.float32)
+    channels -= zero_point[:, None]
+    channels *= scale[:, None]
+    return channels.reshape(quantized.shape)
+
+
+def pack_quantized_tensors(encoded_tensors: List[Tuple[Optional[QuantizationType], NDArrays]]) -> NDArrays:
+    """
+    Flattens the encoded tensors into a single list of arrays to be sent, followed by an array identifying the
+    quantization type of each tensor so that they can be decoded by dequantize_ndarrays.
+
+    Args:
+        encoded_tensors (List[Tuple[Optional[QuantizationType], NDArrays]]): For each tensor, its quantization type
+            (None if it is sent as is) and the arrays encoding it.
+
+    Returns:
+        NDArrays: The arrays to be sent.
+    """
+    packed_arrays = [array for _, encoded_arrays in encoded_tensors for array in encoded_arrays]
+    codes = [
+        0 if quantization_type is None else _QUANTIZATION_TYPE_CODES[quantization_type]
+        for quantization_type, _ in encoded_tensors
+    ]
+    return packed_arrays + [np.array(codes, dtype=np.int8)]
+
+
+def quantize_ndarrays(ndarrays: NDArrays, quantization_type: QuantizationType) -> NDArrays:
+    """
+    Quantizes each floating point tensor with the provided quantization type. Other tensors are sent as is.
+
+    Args:
+        ndarrays (NDArrays): The tensors to be sent.
+        quantization_type (QuantizationType): How the floating point tensors are to be quantized.
+
+    Returns:
+        NDArrays: The arrays to be sent, to be decoded with dequantize_ndarrays.
+    """
+    return pack_quantized_tensors(
+        [
+            (quantization_type, quantize_array(array, quantization_type)) if is_quantizable(array) else (None, [array])
+            for array in ndarrays
+        ]
+    )
+
+
+def dequantize_ndarrays(packed_arrays: NDArrays) -> NDArrays:
+    """
+    Decodes the arrays produced by quantize_ndarrays (or pack_quantized_tensors). Quantized tensors are returned as
+    float32, other tensors are returned as they were sent.
+
+    Args:
+        packed_arrays (NDArrays): The arrays received.
+
+    Returns:
+        NDArrays: The decoded tensors.
+    """
+    assert len(packed_arrays) > 0, "Quantized parameters must end with the quantization type of each tensor"
+    codes = packed_arrays[-1].tolist()
+    ndarrays: NDArrays = []
+    array_index = 0
+    for code in codes:
+        if code == 0:
+            ndarrays.append(packed_arrays[array_index])
+            array_index += 1
+        else:
+            quantization_type = _CODE_QUANTIZATION_TYPES[code]
+            num_arrays = _NUM_ENCODED_ARRAYS[quantization_type]
+            ndarrays.append(dequantize_array(packed_arrays[array_index : array_index + num_arrays], quantization_type))
+            array_index += num_arrays
+    assert array_index == len(packed_arrays) - 1, "Quantized parameters do not match their quantization types"
+    return ndarrays
@@ -0,0 +1,75 @@
+from typing import Dict, List, Optional, Tuple
+
+import torch.nn as nn
+from flwr.common.typing import Config, NDArray, NDArrays
+
+from fl4health.parameter_exchange.parameter_exchanger_base import ParameterExchanger
+from fl4health.parameter_exchange.quantization import (
+    QuantizationType,
+    dequantize_array,
+    is_quantizable,
+    pack_quantized_tensors,
+    quantize_array,
+)
+
+
+class QuantizedParameterExchanger(ParameterExchanger):
+    def __init__(
+        self,
+        parameter_exchanger: ParameterExchanger,
+        quantization_type: QuantizationType,
+        error_feedback: bool = False,
+    ) -> None:
+        """
+        Wraps a parameter exchanger so that the floating point tensors it pushes to the server are quantized
+        (FP16, BF16 or INT8 with per-channel scales and zero points), which reduces the bytes uploaded each round.
+        Other tensors, such as batch norm counters or layer names, are sent as is. Parameters pulled from the server
+        are passed to the wrapped exchanger unchanged. The server strategy must dequantize the client parameters
+        before aggregation (see the dequantize_client_parameters argument of BasicFedAvg).
+
+        With error feedback, the quantization error of each tensor is kept on the client and added to the tensor
+        before it is quantized in the next round, so that the error does not accumulate in the global model across
+        rounds. The residuals are tracked by the position of the tensor in the pushed parameters, so error feedback
+        assumes that the wrapped exchanger pushes the same tensors every round. Residuals are discarded for tensors
+        whose shape has changed.
+
+        Args:
+            parameter_exchanger (ParameterExchanger): The exchanger producing the tensors to be quantized.
+            quantization_type (QuantizationType): How the floating point tensors are quantized.
+            error_feedback (bool, optional): Whether to carry the quantization error over to the next round.
+                Defaults to False.
+        """
+        self.parameter_exchanger = parameter_exchanger
+        self.quantization_type = quantization_type
+        self.error_feedback = error_feedback
+        self.residuals: Dict[int, NDArray] = {}
+        # Sizes of the most recently pushed parameters, before and after quantization
+        self.full_precision_bytes = 0
+        self.encoded_bytes = 0
+
+    def push_parameters(
+        self, model: nn.Module, initial_model: Optional[nn.Module] = None, config: Optional[Config] = None
+    ) -> NDArrays:
+        ndarrays = self.parameter_exchanger.push_parameters(model, initial_model, config)
+        encoded_tensors: List[Tuple[Optional[QuantizationType], NDArrays]] = []
+        for tensor_index, array in enumerate(ndarrays):
+            if not is_quantizable(array):
+                encoded_tensors.append((None, [array]))
+                continue
+            if self.error_feedback:
+                residual = self.residuals.get(tensor_index)
+                if residual is not None and residual.shape == array.shape:
+                    # A new array is created, as the pushed arrays may be views of the model weights
+                    array = array + residual
+            encoded_arrays = quantize_array(array, self.quantization_type)
+            if self.error_feedback:
+                self.residuals[tensor_index] = array - dequantize_array(encoded_arrays, self.quantization_type)
+            encoded_tensors.append((self.quantization_type, encoded_arrays))
+
+        packed_arrays = pack_quantized_tensors(encoded_tensors)
+        self.full_precision_bytes = sum(array.nbytes for array in ndarrays)
+        self.encoded_bytes = sum(array.nbytes for array in packed_arrays)
+        return packed_arrays
+
+    def pull_parameters(self, parameters: NDArrays, model: nn.Module, config: Optional[Config] = None) -> None:
+        self.parameter_exchanger.pull_parameters(parameters, model, config)
@@ -2,6 +2,7 @@ import math
 from logging import INFO, WARNING
 from typing import Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 import torch
 import torch.nn as nn
 from flwr.common.logger import log
@@ -11,12 +12,19 @@ from torch.nn.modules import Module
 
 from fl4health.parameter_exchange.parameter_packer import SparseCooParameterPacker
 from fl4health.parameter_exchange.partial_parameter_exchanger import PartialParameterExchanger
+from fl4health.parameter_exchange.sparse_index_encoding import SparseIndexEncoding
 
 ScoreGenFunction = Callable[[nn.Module, Optional[nn.Module]], Dict[str, Tensor]]
 
 
 class SparseCooParameterExchanger(PartialParameterExchanger[Tuple[NDArrays, NDArrays, List[str]]]):
-    def __init__(self, sparsity_level: float, score_gen_function: ScoreGenFunction) -> None:
+    def __init__(
+        self,
+        sparsity_level: float,
+        score_gen_function: ScoreGenFunction,
+        index_encoding: SparseIndexEncoding = SparseIndexEncoding.COORDINATES,
+        threshold_sample_size: Optional[int] = None,
+    ) -> None:
         """
         Parameter exchanger for sparse tensors.
 
@@ -36,24 +44,51 @@ class SparseCooParameterExchanger(PartialParameterExchanger[Tuple[NDArrays, NDAr
             In most cases, this function takes as inputs a current model and an initial model,
             and it returns a dictionary that maps the name of each of the current model's tensors to
             another tensor which contains the parameter scores.
+            index_encoding (SparseIndexEncoding, optional): How the indices of the selected parameters are encoded.
+            COORDINATES sends the int64 coordinates of each parameter, while AUTO chooses the most compact of linear
+            indices, delta encoded indices and bitmasks for each tensor. Parameters pulled from the server may use
+            any encoding. Defaults to COORDINATES.
+            threshold_sample_size (Optional[int], optional): If provided, and the model has more parameters than this,
+            the score threshold is estimated from a uniform random sample of this many scores rather than computed
+            from all of them. The fraction of parameters selected then deviates from sparsity_level by more than
+            sqrt(ln(2 / delta) / (2 * threshold_sample_size)) with probability at most delta (i.e. by less than
+            0.0043 with probability 0.99 for a sample of 100,000 scores), regardless of the size of the model.
+            Defaults to None.
         """
         assert 0 < sparsity_level <= 1
+        assert threshold_sample_size is None or threshold_sample_size > 0
         self.sparsity_level = sparsity_level
-        self.parameter_packer: SparseCooParameterPacker = SparseCooParameterPacker()
+        self.parameter_packer: SparseCooParameterPacker = SparseCooParameterPacker(index_encoding)
         self.score_gen_function = score_gen_function
+        self.threshold_sample_size = threshold_sample_size
+        self.instrumentation = None
 
     def generate_parameter_scores(self, model: nn.Module, initial_model: Optional[nn.Module]) -> Dict[str, Tensor]:
         """Calling the score generating function to produce parameter scores."""
         return self.score_gen_function(model, initial_model)
 
-    def _check_unique_score(self, param_scores: Tensor) -> None:
-        unique_score_values = torch.unique(input=param_scores, sorted=False, return_inverse=False, return_counts=False)
-        if len(unique_score_values) == 1:
-            log(
-                WARNING,
-                """All parameters have the same score.
-                The number of parameters selected may not match the intended sparsity level.""",
-            )
+    def compute_score_threshold(self, all_scores: Tensor) -> float:
+        """
+        Determines the score threshold such that the parameters whose scores are greater than or equal to it make up
+        the desired fraction of all parameters. Rather than sorting every score, the threshold is found with a
+        selection (torch.kthvalue), which runs in linear time. If threshold_sample_size is set, the selection is
+        applied to a uniform random sample of the scores instead, which bounds its cost independent of model size.
+
+        Args:
+            all_scores (Tensor): The flattened scores of every parameter of the model.
+
+        Returns:
+            float: The score threshold.
+        """
+        if self.threshold_sample_size is not None and len(all_scores) > self.threshold_sample_size:
+            sample_indices = torch.randint(len(all_scores), (self.threshold_sample_size,)).to(all_scores.device)
+            all_scores = all_scores[sample_indices]
+        n_top_scores = math.ceil(len(all_scores) * self.sparsity_level)
+        # Sanity check.
+        assert n_top_scores >= 1
+        # The n-th largest score is the (len - n + 1)-th smallest one.
+        score_threshold, _ = torch.kthvalue(all_scores, len(all_scores) - n_top_scores + 1)
+        return score_threshold.item()
 
     def select_parameters(
         self, model: nn.Module, initial_model: Optional[nn.Module] = None
@@ -67,7 +102,7 @@ class SparseCooParameterExchanger(PartialParameterExchanger[Tuple[NDArrays, NDAr
 
         Next, these scores are used to select the parameters to be exchanged by
         performing a thresholding operation on each of the model's tensors.
-        A threshold is determined according to the desired sparsity level,
+        A threshold is determined according to the desired sparsity level (see compute_score_threshold),
         then for each model tensor, parameters whose scores are less than this threshold
         are set to zero, while parameters whose scores are greater than or equal to
         this threshold retain their values.
@@ -75,7 +110,8 @@ class SparseCooParameterExchanger(PartialParameterExchanger[Tuple[NDArrays, NDAr
         Finally, the method extracts all the information required to represent
         the selected parameters in the sparse COO tensor format. More specifically,
         the information consists of the indices of the parameters within the tensor
-        to which they belong, the shape of that tensor, and also the name of it.
+        to which they belong (encoded according to the index encoding of the exchanger),
+        the shape of that tensor, and also the name of it.
 
         Args:
             model (nn.Module): Current model.
@@ -87,12 +123,9 @@ class SparseCooParameterExchanger(PartialParameterExchanger[Tuple[NDArrays, NDAr
         """
         all_parameter_scores = self.generate_parameter_scores(model, initial_model)
         all_scores = torch.cat([val.flatten() for _, val in all_parameter_scores.items()])
-        # Sorting all scores and determining the threshold.
-        sorted_scores, _ = torch.sort(all_scores, descending=True)
-        n_top_scores = math.ceil(len(sorted_scores) * self.sparsity_level)
-        # Sanity check.
-        assert n_top_scores >= 1
-        score_threshold = sorted_scores[(n_top_scores - 1)].item()
+        score_threshold = self.compute_score_threshold(all_scores)
+        n_top_scores = math.ceil(len(all_scores) * self.sparsity_level)
+        n_selected_scores = 0
 
         # Apply the score threshold to each model tensor to obtain the corresponding sparse tensor.
         selected_parameters_all_tensors = []
@@ -105,10 +138,10 @@ class SparseCooParameterExchanger(PartialParameterExchanger[Tuple[NDArrays, NDAr
             # Sanity check.
             assert model_tensor.shape == param_scores.shape
 
-            self._check_unique_score(param_scores=param_scores)
-
             # Use score_threshold to produce sparse tensors.
-            model_tensor_sparse = torch.where(param_scores >= score_threshold, input=model_tensor, other=0)
+            selection_mask = param_scores >= score_threshold
+            n_selected_scores += int(selection_mask.sum().item())
+            model_tensor_sparse = torch.where(selection_mask, input=model_tensor, other=0)
             # Tensors without any parameter or whose parameter values are all zero after thresholding
             # will not be exchanged, so we discard them.
             if not (model_tensor_sparse.shape == torch.Size([]) or (model_tensor_sparse == 0).all()):
@@ -116,12 +149,21 @@ class SparseCooParameterExchanger(PartialParameterExchanger[Tuple[NDArrays, NDAr
                     selected_parameters,
                     selected_indices,
                     tensor_shape,
-                ) = self.parameter_packer.extract_coo_info_from_dense(model_tensor_sparse)
+                ) = self.parameter_packer.extract_sparse_info_from_dense(model_tensor_sparse)
                 selected_parameters_all_tensors.append(selected_parameters)
                 selected_indices_all_tensors.append(selected_indices)
                 tensor_shapes.append(tensor_shape)
                 tensor_names.append(tensor_name)
 
+        if self.threshold_sample_size is None and n_selected_scores > 1.01 * n_top_scores:
+            # Scores tied with the threshold are all selected, which matters when many scores are tied (i.e. when all
+            # parameters of a tensor have the same score).
+            log(
+                WARNING,
+                f"""{n_selected_scores} parameters have scores at or above the threshold rather than {n_top_scores},
+                as some scores are tied.
+                The number of parameters selected does not match the intended sparsity level.""",
+            )
         log(INFO, f"Sparsity level used to select parameters for exchange: {self.sparsity_level}")
         return (selected_parameters_all_tensors, (selected_indices_all_tensors, tensor_shapes, tensor_names))
 
@@ -135,22 +177,18 @@ class SparseCooParameterExchanger(PartialParameterExchanger[Tuple[NDArrays, NDAr
         )
 
     def pull_parameters(self, parameters: NDArrays, model: Module, config: Optional[Config] = None) -> None:
-        selected_parameters, additional_info = self.parameter_packer.unpack_parameters(parameters)
+        selected_parameters, additional_info = self.unpack_parameters(parameters)
         indices, shapes, names = additional_info
         current_state = model.state_dict()
 
         # Sanity check.
         assert len(selected_parameters) == len(indices) == len(shapes) == len(names) and len(names) > 0
         for param_values, param_indices, param_shape, param_name in zip(selected_parameters, indices, shapes, names):
-            # Use parameter values, indices, and shape to create
-            # a sparse coo tensor, which is then converted to a dense tensor
-            # to allow for loading.
-            param_coo = torch.sparse_coo_tensor(
-                indices=torch.tensor(param_indices.T),
-                values=torch.tensor(param_values),
-                size=torch.Size(param_shape),
-            )
-            param_dense = param_coo.to_dense()
-            current_state[param_name] = param_dense
+            # Use parameter values, indices, and shape to scatter the values into a dense tensor to allow for loading.
+            flat_indices = self.parameter_packer.flat_indices_from_sparse_info(param_indices, param_shape)
+            values = torch.tensor(param_values)
+            param_dense = torch.zeros(int(np.prod(param_shape)), dtype=values.dtype)
+            param_dense[torch.from_numpy(flat_indices)] = values
+            current_state[param_name] = param_dense.reshape(torch.Size(param_shape.tolist()))
 
         model.load_state_dict(current_state, strict=True)
@@ -0,0 +1,112 @@
+from enum import Enum
+from typing import Dict, Tuple
+
+import numpy as np
+from flwr.common.typing import NDArray
+
+
+class SparseIndexEncoding(Enum):
+    # One row of int64 coordinates per selected entry, as produced by torch.nonzero
+    COORDINATES = "coordinates"
+    # Flattened (linear) indices in the narrowest unsigned integer dtype that holds them
+    LINEAR = "linear"
+    # Gaps between consecutive sorted linear indices in the narrowest unsigned integer dtype that holds them
+    DELTA = "delta"
+    # One bit per entry of the tensor, set for the selected entries
+    BITMASK = "bitmask"
+    # Whichever of LINEAR, DELTA and BITMASK produces the fewest bytes for each tensor
+    AUTO = "auto"
+
+
+# Apart from coordinates, which are two dimensional, encoded indices are one dimensional arrays whose first entry
+# identifies the encoding, followed by the encoded indices.
+_ENCODING_CODES: Dict[SparseIndexEncoding, int] = {
+    SparseIndexEncoding.LINEAR: 1,
+    SparseIndexEncoding.DELTA: 2,
+    SparseIndexEncoding.BITMASK: 3,
+}
+_CODE_ENCODINGS = {code: encoding for encoding, code in _ENCODING_CODES.items()}
+_UNSIGNED_DTYPES = (np.uint8, np.uint16, np.uint32, np.uint64)
+
+
+def _narrowest_unsigned_dtype(max_value: int) -> np.dtype:
+    for dtype in _UNSIGNED_DTYPES:
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    raise ValueError(f"Value {max_value} does not fit in an unsigned 64-bit integer")
+
+
+def _encoded_bytes(encoding: SparseIndexEncoding, flat_indices: NDArray, gaps: NDArray, tensor_size: int) -> int:
+    # Size of the encoded indices, including the leading code
+    if encoding == SparseIndexEncoding.BITMASK:
+        return 1 + (tensor_size + 7) // 8
+    if encoding == SparseIndexEncoding.DELTA:
+        max_value = int(gaps.max()) if len(gaps) > 0 else 0
+    else:
+        max_value = tensor_size - 1
+    return (len(flat_indices) + 1) * _narrowest_unsigned_dtype(max(max_value, len(_ENCODING_CODES))).itemsize
+
+
+def encode_sparse_indices(
+    flat_indices: NDArray, tensor_shape: Tuple[int, ...], encoding: SparseIndexEncoding
+) -> NDArray:
+    """
+    Encodes the positions of the selected entries of a tensor.
+
+    Args:
+        flat_indices (NDArray): The sorted linear indices of the selected entries within the flattened tensor.
+        tensor_shape (Tuple[int, ...]): The shape of the tensor.
+        encoding (SparseIndexEncoding): How the indices are encoded. With AUTO, the encoding producing the fewest
+            bytes is chosen. Dense selections favour bitmasks, while very sparse selections favour linear or delta
+            encoded indices.
+
+    Returns:
+        NDArray: The encoded indices, to be decoded with decode_sparse_indices.
+    """
+    if encoding == SparseIndexEncoding.COORDINATES:
+        return np.stack(np.unravel_index(flat_indices, tensor_shape), axis=1).astype(np.int64)
+
+    tensor_size = int(np.prod(tensor_shape))
+    # The first gap is the first index itself
+    gaps = np.diff(flat_indices, prepend=0)
+    if encoding == SparseIndexEncoding.AUTO:
+        encoding = min(
+            _ENCODING_CODES, key=lambda candidate: _encoded_bytes(candidate, flat_indices, gaps, tensor_size)
+        )
+
+    code = _ENCODING_CODES[encoding]
+    if encoding == SparseIndexEncoding.BITMASK:
+        mask = np.zeros(tensor_size, dtype=np.uint8)
+        mask[flat_indices] = 1
+        return np.concatenate([np.array([code], dtype=np.uint8), np.packbits(mask)])
+    values = gaps if encoding == SparseIndexEncoding.DELTA else flat_indices
+    max_value = int(values.max()) if len(values) > 0 else 0
+    dtype = _narrowest_unsigned_dtype(max(max_value, code))
+    encoded = np.empty(len(values) + 1, dtype=dtype)
+    encoded[0] = code
+    encoded[1:] = values
+    return encoded
+
+
+def decode_sparse_indices(encoded_indices: NDArray, tensor_shape: Tuple[int, ...]) -> NDArray:
+    """
+    Decodes indices encoded with encode_sparse_indices, or the coordinates produced by torch.nonzero.
+
+    Args:
+        encoded_indices (NDArray): The encoded indices.
+        tensor_shape (Tuple[int, ...]): The shape of the tensor.
+
+    Returns:
+        NDArray: The int64 linear indices of the selected entries within the flattened tensor.
+    """
+    if encoded_indices.ndim == 2:
+        return np.ravel_multi_index(tuple(encoded_indices.T), tensor_shape).astype(np.int64)
+
+    encoding = _CODE_ENCODINGS[int(encoded_indices[0])]
+    if encoding == SparseIndexEncoding.BITMASK:
+        tensor_size = int(np.prod(tensor_shape))
+        return np.flatnonzero(np.unpackbits(encoded_indices[1:], count=tensor_size)).astype(np.int64)
+    values = encoded_indices[1:].astype(np.int64)
+    if encoding == SparseIndexEncoding.DELTA:
+        return np.cumsum(values)
+    return values
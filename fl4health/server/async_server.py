@@ -0,0 +1,203 @@
+import concurrent.futures
+import datetime
+from logging import DEBUG, INFO
+from typing import Dict, List, Optional, Tuple, Union
+
+from flwr.common import Parameters
+from flwr.common.logger import log
+from flwr.common.typing import FitRes, Scalar
+from flwr.server.client_manager import ClientManager
+from flwr.server.client_proxy import ClientProxy
+from flwr.server.history import History
+from flwr.server.server import FitResultsAndFailures, _handle_finished_future_after_fit, fit_client
+
+from fl4health.checkpointing.checkpointer import TorchCheckpointer
+from fl4health.reporting.fl_wandb import ServerWandBReporter
+from fl4health.reporting.metrics import MetricsReporter
+from fl4health.server.base_server import FlServer
+from fl4health.strategies.fedbuff import BufferedFitResult, FedBuff
+
+
+class AsyncFlServer(FlServer):
+    def __init__(
+        self,
+        client_manager: ClientManager,
+        strategy: FedBuff,
+        wandb_reporter: Optional[ServerWandBReporter] = None,
+        checkpointer: Optional[TorchCheckpointer] = None,
+        metrics_reporter: Optional[MetricsReporter] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> None:
+        """
+        Asynchronous (buffered) FL server. Rather than waiting at a barrier for every sampled client in a round, each
+        server round tops up the set of training clients with idle clients, waits only until the strategy's buffer of
+        K client updates is filled, and then aggregates. Clients that have not yet finished keep training against the
+        global model they received and their updates are folded into a later round, down-weighted by staleness.
+        A server "round" therefore corresponds to a single buffered global model update.
+
+        The staleness of the aggregated updates is recorded for every round through the metrics reporter.
+
+        NOTE: Clients still training at the end of fit are waited on, but their updates are discarded.
+
+        Args:
+            client_manager (ClientManager): Determines the mechanism by which clients are sampled by the server, if
+                they are to be sampled at all.
+            strategy (FedBuff): The buffered aggregation strategy. It tracks global model versions so that client
+                deltas can be computed against the model each client trained from.
+            wandb_reporter (Optional[ServerWandBReporter], optional): To be provided if the server is to log
+                information and results to a Weights and Biases account. If None is provided, no logging occurs.
+                Defaults to None.
+            checkpointer (Optional[TorchCheckpointer], optional): To be provided if the server should perform
+                server side checkpointing based on some criteria. If none, then no server-side checkpointing is
+                performed. Defaults to None.
+            metrics_reporter (Optional[MetricsReporter], optional): A metrics reporter instance to record the metrics
+                during the execution. Defaults to an instance of MetricsReporter with default init parameters.
+            max_concurrency (Optional[int], optional): Maximum number of clients allowed to train concurrently. If
+                None, all clients sampled by the strategy are allowed to train. Defaults to None.
+        """
+        super().__init__(client_manager, strategy, wandb_reporter, checkpointer, metrics_reporter)
+        assert (
+            max_concurrency is None or max_concurrency >= strategy.buffer_size
+        ), "max_concurrency must be at least the buffer size of the strategy, otherwise the buffer can never fill"
+        self.max_concurrency = max_concurrency
+        self.executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        # Maps each outstanding fit request to the client and the global model version it is training from
+        self.in_flight: Dict[concurrent.futures.Future, Tuple[ClientProxy, int]] = {}
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        # The executor persists across rounds, as client requests outlive the round in which they are submitted.
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+
+    def _busy_client_ids(self) -> List[str]:
+        return [client.cid for client, _ in self.in_flight.values()]
+
+    def _dispatch_idle_clients(self, server_round: int, timeout: Optional[float]) -> int:
+        assert isinstance(self.strategy, FedBuff)
+        self.strategy.set_busy_clients(set(self._busy_client_ids()))
+        client_instructions = self.strategy.configure_fit(
+            server_round=server_round, parameters=self.parameters, client_manager=self._client_manager
+        )
+        if self.max_concurrency is not None:
+            client_instructions = client_instructions[: max(self.max_concurrency - len(self.in_flight), 0)]
+
+        for client_proxy, ins in client_instructions:
+            future = self._get_executor().submit(fit_client, client_proxy, ins, timeout)
+            self.in_flight[future] = (client_proxy, self.strategy.model_version)
+        self.strategy.set_busy_clients(set(self._busy_client_ids()))
+        return len(client_instructions)
+
+    def _collect_buffer(
+        self, buffer_size: int
+    ) -> Tuple[List[BufferedFitResult], List[Union[Tuple[ClientProxy, FitRes], BaseException]]]:
+        buffered_results: List[BufferedFitResult] = []
+        failures: List[Union[Tuple[ClientProxy, FitRes], BaseException]] = []
+        while len(buffered_results) < buffer_size and self.in_flight:
+            finished_fs, _ = concurrent.futures.wait(
+                fs=list(self.in_flight.keys()),
+                timeout=None,  # Handled in the respective communication stack
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            for future in finished_fs:
+                _, base_version = self.in_flight.pop(future)
+                results: List[Tuple[ClientProxy, FitRes]] = []
+                _handle_finished_future_after_fit(future=future, results=results, failures=failures)
+                buffered_results.extend((client, fit_res, base_version) for client, fit_res in results)
+        return buffered_results, failures
+
+    def fit_round(
+        self,
+        server_round: int,
+        timeout: Optional[float],
+    ) -> Optional[Tuple[Optional[Parameters], Dict[str, Scalar], FitResultsAndFailures]]:
+        """
+        Performs a single buffered update of the global model. Idle clients are dispatched with the current global
+        model, then the server waits until the strategy's buffer is full (or no clients remain in training) and
+        aggregates the buffered updates.
+
+        Args:
+            server_round (int): The current server round, corresponding to the number of buffered updates performed.
+            timeout (Optional[float]): Timeout passed along to the clients' fit requests.
+
+        Returns:
+            Optional[Tuple[Optional[Parameters], Dict[str, Scalar], FitResultsAndFailures]]: The updated global model,
+                the aggregated metrics and the results and failures folded into this update. None if there are no
+                clients training.
+        """
+        assert isinstance(self.strategy, FedBuff)
+        self.metrics_reporter.add_to_metrics_at_round(server_round, data={"fit_start": datetime.datetime.now()})
+
+        num_dispatched = self._dispatch_idle_clients(server_round, timeout)
+        if not self.in_flight:
+            log(INFO, "fit_round %s: no clients training, cancel", server_round)
+            return None
+        log(
+            DEBUG,
+            "fit_round %s: dispatched %s clients, %s clients training",
+            server_round,
+            num_dispatched,
+            len(self.in_flight),
+        )
+
+        buffered_results, failures = self._collect_buffer(self.strategy.buffer_size)
+        stalenesses = [self.strategy.model_version - base_version for _, _, base_version in buffered_results]
+        log(
+            DEBUG,
+            "fit_round %s received %s results and %s failures with staleness %s",
+            server_round,
+            len(buffered_results),
+            len(failures),
+            stalenesses,
+        )
+
+        parameters_aggregated, metrics_aggregated = self.strategy.aggregate_buffered_fit(
+            server_round, buffered_results, failures
+        )
+        # Global models that no outstanding client is training from are no longer needed to compute deltas
+        self.strategy.prune_model_versions({base_version for _, base_version in self.in_flight.values()})
+        self.strategy.set_busy_clients(set(self._busy_client_ids()))
+
+        self.metrics_reporter.add_to_metrics_at_round(
+            server_round,
+            data={
+                "metrics_aggregated": metrics_aggregated,
+                "staleness": {
+                    "mean": sum(stalenesses) / len(stalenesses) if stalenesses else 0.0,
+                    "max": max(stalenesses, default=0),
+                    "values": stalenesses,
+                },
+                "num_updates_aggregated": len(buffered_results),
+                "num_clients_in_flight": len(self.in_flight),
+                "fit_end": datetime.datetime.now(),
+            },
+        )
+
+        results = [(client, fit_res) for client, fit_res, _ in buffered_results]
+        self.release_unread_fit_results((results, failures))
+        return parameters_aggregated, metrics_aggregated, (results, failures)
+
+    def fit(self, num_rounds: int, timeout: Optional[float]) -> History:
+        history = super().fit(num_rounds, timeout)
+        self.drain_in_flight_clients()
+        return history
+
+    def drain_in_flight_clients(self) -> None:
+        """
+        Waits for any clients still training to return so that no requests are outstanding when the server shuts
+        down. Their updates are discarded, releasing any parameters they wrote back through shared memory.
+        """
+        if self.in_flight:
+            log(INFO, f"Waiting for {len(self.in_flight)} clients still training. Their updates will be discarded")
+            finished_fs, _ = concurrent.futures.wait(fs=list(self.in_flight.keys()), timeout=None)
+            discarded_results: List[Tuple[ClientProxy, FitRes]] = []
+            failures: List[Union[Tuple[ClientProxy, FitRes], BaseException]] = []
+            for future in finished_fs:
+                _handle_finished_future_after_fit(future=future, results=discarded_results, failures=failures)
+            self.release_unread_fit_results((discarded_results, failures))
+            self.in_flight = {}
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        assert isinstance(self.strategy, FedBuff)
+        self.strategy.set_busy_clients(set())
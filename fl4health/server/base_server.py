@@ -1,15 +1,24 @@
+import concurrent.futures
 import datetime
-from logging import INFO, WARNING
-from typing import Dict, Generic, List, Optional, Tuple, TypeVar
+import time
+from logging import DEBUG, INFO, WARNING
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar, Union
 
 import torch.nn as nn
 from flwr.common import Parameters
 from flwr.common.logger import log
-from flwr.common.parameter import parameters_to_ndarrays
-from flwr.common.typing import Scalar
+from flwr.common.typing import FitIns, FitRes, Scalar
 from flwr.server.client_manager import ClientManager
+from flwr.server.client_proxy import ClientProxy
 from flwr.server.history import History
-from flwr.server.server import EvaluateResultsAndFailures, FitResultsAndFailures, Server
+from flwr.server.server import (
+    EvaluateResultsAndFailures,
+    FitResultsAndFailures,
+    Server,
+    _handle_finished_future_after_fit,
+    fit_client,
+    fit_clients,
+)
 from flwr.server.strategy import Strategy
 
 from fl4health.checkpointing.checkpointer import TorchCheckpointer
@@ -17,7 +26,24 @@ from fl4health.parameter_exchange.parameter_exchanger_base import ParameterExcha
 from fl4health.reporting.fl_wandb import ServerWandBReporter
 from fl4health.reporting.metrics import MetricsReporter
 from fl4health.server.polling import poll_clients
+from fl4health.strategies.strategy_with_incremental_aggregation import StrategyWithIncrementalAggregation
 from fl4health.strategies.strategy_with_poll import StrategyWithPolling
+from fl4health.utils.serialization import parameters_to_ndarrays
+from fl4health.utils.shared_memory import unlink_unread_client_parameters
+
+
+def get_received_tensor_bytes(results: List[Tuple[ClientProxy, FitRes]]) -> Dict[str, List[int]]:
+    """
+    Args:
+        results (List[Tuple[ClientProxy, FitRes]]): The results of the clients' local training.
+
+    Returns:
+        Dict[str, List[int]]: The size, in bytes, of each serialized tensor received from each client, keyed by
+            client id.
+    """
+    return {
+        client_proxy.cid: [len(tensor) for tensor in fit_res.parameters.tensors] for client_proxy, fit_res in results
+    }
 
 
 class FlServer(Server):
@@ -82,10 +108,37 @@ class FlServer(Server):
     ) -> Optional[Tuple[Optional[Parameters], Dict[str, Scalar], FitResultsAndFailures]]:
         self.metrics_reporter.add_to_metrics_at_round(server_round, data={"fit_start": datetime.datetime.now()})
 
-        fit_round_results = super().fit_round(server_round, timeout)
+        # Any strategy can request the instrumentation (see BasicFedAvg), not only those deriving from BasicFedAvg
+        instrument_exchange = bool(getattr(self.strategy, "instrument_parameter_exchange", False))
+        # The global parameters sent to the clients this round, which client payloads are compared against
+        global_parameters = self.parameters
+        aggregation_time: Optional[float] = None
+        # The size of each tensor received from each client, recorded as the results arrive when aggregating
+        # incrementally, as the strategy may release the parameters of a result once it is accumulated
+        received_tensor_bytes: Dict[str, List[int]] = {}
+        if (
+            isinstance(self.strategy, StrategyWithIncrementalAggregation)
+            and self.strategy.supports_incremental_aggregation()
+        ):
+            # The aggregation times of incremental aggregation are reported separately
+            fit_round_results = self.fit_round_with_incremental_aggregation(
+                server_round, timeout, received_tensor_bytes
+            )
+        elif instrument_exchange:
+            fit_round_results, aggregation_time = self.fit_round_with_timed_aggregation(server_round, timeout)
+        else:
+            fit_round_results = super().fit_round(server_round, timeout)
 
         if fit_round_results is not None:
-            _, metrics_aggregated, _ = fit_round_results
+            parameters_aggregated, metrics_aggregated, results_and_failures = fit_round_results
+            self.release_unread_fit_results(results_and_failures)
+            if instrument_exchange:
+                results, _ = results_and_failures
+                if not received_tensor_bytes:
+                    received_tensor_bytes = get_received_tensor_bytes(results)
+                self.report_parameter_exchange(
+                    server_round, global_parameters, received_tensor_bytes, parameters_aggregated, aggregation_time
+                )
             self.metrics_reporter.add_to_metrics_at_round(
                 server_round,
                 data={
@@ -96,9 +149,222 @@ class FlServer(Server):
 
         return fit_round_results
 
+    def release_unread_fit_results(self, results_and_failures: Optional[FitResultsAndFailures]) -> None:
+        """
+        Unlinks the parameters written back through shared memory by the clients of a fit round that the strategy
+        did not read (i.e. those of failed clients, of a round that was not aggregated or of a strategy that does not
+        decode them), which would otherwise outlive the round.
+
+        Args:
+            results_and_failures (Optional[FitResultsAndFailures]): The results and failures of the fit round, if
+                any.
+        """
+        if results_and_failures is None:
+            return
+        results, failures = results_and_failures
+        unlink_unread_client_parameters(results)
+        unlink_unread_client_parameters(failures)
+
+    def configure_fit_round(self, server_round: int) -> List[Tuple[ClientProxy, FitIns]]:
+        """
+        Samples the clients participating in a fit round and their instructions from the strategy, as the flwr Server
+        does at the start of fit_round.
+
+        Args:
+            server_round (int): The current server round.
+
+        Returns:
+            List[Tuple[ClientProxy, FitIns]]: The sampled clients and their instructions. Empty if no clients were
+                selected.
+        """
+        client_instructions = self.strategy.configure_fit(
+            server_round=server_round,
+            parameters=self.parameters,
+            client_manager=self._client_manager,
+        )
+        if not client_instructions:
+            log(INFO, "fit_round %s: no clients selected, cancel", server_round)
+            return []
+        log(
+            DEBUG,
+            "fit_round %s: strategy sampled %s clients (out of %s)",
+            server_round,
+            len(client_instructions),
+            self._client_manager.num_available(),
+        )
+        return client_instructions
+
+    def fit_round_with_timed_aggregation(
+        self,
+        server_round: int,
+        timeout: Optional[float],
+    ) -> Tuple[Optional[Tuple[Optional[Parameters], Dict[str, Scalar], FitResultsAndFailures]], float]:
+        """
+        Performs a fit round equivalent to that of the flwr Server, while timing the strategy's aggregate_fit, which
+        covers decoding the client parameters, aggregating them and encoding the result.
+
+        Args:
+            server_round (int): The current server round.
+            timeout (Optional[float]): Timeout passed along to the clients' fit requests.
+
+        Returns:
+            Tuple[Optional[Tuple[Optional[Parameters], Dict[str, Scalar], FitResultsAndFailures]], float]: The
+                aggregated parameters, the aggregated metrics and the results and failures of the round (None if no
+                clients were selected), along with the time spent in aggregate_fit.
+        """
+        client_instructions = self.configure_fit_round(server_round)
+        if not client_instructions:
+            return None, 0.0
+        results, failures = fit_clients(
+            client_instructions=client_instructions,
+            max_workers=self.max_workers,
+            timeout=timeout,
+        )
+        log(
+            DEBUG,
+            "fit_round %s received %s results and %s failures",
+            server_round,
+            len(results),
+            len(failures),
+        )
+        aggregation_start = time.perf_counter()
+        parameters_aggregated, metrics_aggregated = self.strategy.aggregate_fit(server_round, results, failures)
+        aggregation_time = time.perf_counter() - aggregation_start
+        return (parameters_aggregated, metrics_aggregated, (results, failures)), aggregation_time
+
+    def report_parameter_exchange(
+        self,
+        server_round: int,
+        global_parameters: Parameters,
+        received_tensor_bytes: Dict[str, List[int]],
+        parameters_aggregated: Optional[Parameters],
+        aggregation_time: Optional[float],
+    ) -> None:
+        """
+        Reports the size of the serialized parameters exchanged in a fit round through the metrics reporter, under
+        the "parameter_exchange" key. This includes the size of each tensor received from each client, the size of
+        the aggregated parameters and the ratio between the size of the global parameters sent to the clients and
+        the average size of the client payloads.
+
+        Args:
+            server_round (int): The current server round.
+            global_parameters (Parameters): The global parameters sent to the clients at the start of the round.
+            received_tensor_bytes (Dict[str, List[int]]): The size of each tensor received from each successful
+                client, keyed by client id (see get_received_tensor_bytes).
+            parameters_aggregated (Optional[Parameters]): The aggregated parameters, if any.
+            aggregation_time (Optional[float]): The time spent in aggregate_fit, if it was measured.
+        """
+        received_bytes = {cid: sum(tensor_bytes) for cid, tensor_bytes in received_tensor_bytes.items()}
+        global_parameters_bytes = sum(len(tensor) for tensor in global_parameters.tensors)
+        exchange_metrics: Dict[str, Any] = {
+            "received_bytes": sum(received_bytes.values()),
+            "received_bytes_per_client": received_bytes,
+            "received_tensor_bytes": received_tensor_bytes,
+            "global_parameters_bytes": global_parameters_bytes,
+        }
+        if exchange_metrics["received_bytes"] > 0:
+            exchange_metrics["compression_ratio"] = (
+                global_parameters_bytes * len(received_tensor_bytes) / exchange_metrics["received_bytes"]
+            )
+        if parameters_aggregated is not None:
+            exchange_metrics["sent_bytes"] = sum(len(tensor) for tensor in parameters_aggregated.tensors)
+        if aggregation_time is not None:
+            exchange_metrics["aggregation_time"] = aggregation_time
+        self.metrics_reporter.add_to_metrics_at_round(server_round, data={"parameter_exchange": exchange_metrics})
+
+    def fit_round_with_incremental_aggregation(
+        self,
+        server_round: int,
+        timeout: Optional[float],
+        received_tensor_bytes: Optional[Dict[str, List[int]]] = None,
+    ) -> Optional[Tuple[Optional[Parameters], Dict[str, Scalar], FitResultsAndFailures]]:
+        """
+        Performs a fit round equivalent to that of the flwr Server, except that each client's result is folded into
+        the strategy's running aggregate as soon as it arrives, rather than after all clients have finished. Decoding
+        and accumulation therefore overlap with the training of the remaining clients and only the finalization of
+        the aggregate happens after the last client returns.
+
+        The aggregation work of the round is timed and recorded through the metrics reporter: the total time spent
+        aggregating, the time spent on the work that remains once the last client returns (the accumulation of the
+        last result, if any, and the finalization) and the difference between the two, which is the aggregation time
+        no longer spent at the barrier.
+
+        Args:
+            server_round (int): The current server round.
+            timeout (Optional[float]): Timeout passed along to the clients' fit requests.
+            received_tensor_bytes (Optional[Dict[str, List[int]]], optional): If provided, the size of each tensor
+                received from each successful client is recorded in it, keyed by client id, before the result is
+                accumulated. The strategy may release the parameters of the results it has accumulated (i.e. once
+                spilled to disk). Defaults to None.
+
+        Returns:
+            Optional[Tuple[Optional[Parameters], Dict[str, Scalar], FitResultsAndFailures]]: The aggregated
+                parameters, the aggregated metrics and the results and failures of the round. None if no clients
+                were selected.
+        """
+        assert isinstance(self.strategy, StrategyWithIncrementalAggregation)
+        client_instructions = self.configure_fit_round(server_round)
+        if not client_instructions:
+            return None
+
+        self.strategy.begin_incremental_aggregation(server_round)
+        results: List[Tuple[ClientProxy, FitRes]] = []
+        failures: List[Union[Tuple[ClientProxy, FitRes], BaseException]] = []
+        accumulation_time = 0.0
+        # Time spent accumulating the result of the last client to return, if it succeeded
+        last_accumulation_time = 0.0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            submitted_fs = {
+                executor.submit(fit_client, client_proxy, ins, timeout) for client_proxy, ins in client_instructions
+            }
+            for future in concurrent.futures.as_completed(submitted_fs):
+                num_results = len(results)
+                _handle_finished_future_after_fit(future=future, results=results, failures=failures)
+                last_accumulation_time = 0.0
+                if len(results) > num_results:
+                    accumulation_start = time.perf_counter()
+                    client_proxy, fit_res = results[-1]
+                    if received_tensor_bytes is not None:
+                        received_tensor_bytes.update(get_received_tensor_bytes([(client_proxy, fit_res)]))
+                    self.strategy.accumulate_fit_result(server_round, fit_res)
+                    last_accumulation_time = time.perf_counter() - accumulation_start
+                    accumulation_time += last_accumulation_time
+        log(
+            DEBUG,
+            "fit_round %s received %s results and %s failures",
+            server_round,
+            len(results),
+            len(failures),
+        )
+
+        finalize_start = time.perf_counter()
+        parameters_aggregated, metrics_aggregated = self.strategy.finalize_incremental_aggregation(
+            server_round, results, failures
+        )
+        finalize_time = time.perf_counter() - finalize_start
+
+        # Only the work on the last result and the finalization remain once the last client returns. The other
+        # accumulations overlapped with client training.
+        post_barrier_aggregation_time = last_accumulation_time + finalize_time
+        self.metrics_reporter.add_to_metrics_at_round(
+            server_round,
+            data={
+                "incremental_aggregation": {
+                    "total_aggregation_time": accumulation_time + finalize_time,
+                    "post_barrier_aggregation_time": post_barrier_aggregation_time,
+                    "barrier_time_saved": accumulation_time - last_accumulation_time,
+                }
+            },
+        )
+        return parameters_aggregated, metrics_aggregated, (results, failures)
+
     def shutdown(self) -> None:
         if self.wandb_reporter:
             self.wandb_reporter.shutdown_reporter()
+        # Strategies holding resources beyond the run (see BasicFedAvg) release them, flwr strategies have no such hook
+        strategy_shutdown = getattr(self.strategy, "shutdown", None)
+        if callable(strategy_shutdown):
+            strategy_shutdown()
 
     def _hydrate_model_for_checkpointing(self) -> nn.Module:
         """
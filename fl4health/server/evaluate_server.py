@@ -7,7 +7,6 @@ from typing import Dict, List, Optional, Tuple, Union
 import torch
 from flwr.common import EvaluateIns, EvaluateRes, MetricsAggregationFn, Parameters, Scalar
 from flwr.common.logger import log
-from flwr.common.parameter import ndarrays_to_parameters
 from flwr.server.client_manager import ClientManager
 from flwr.server.client_proxy import ClientProxy
 from flwr.server.history import History
@@ -15,6 +14,7 @@ from flwr.server.server import EvaluateResultsAndFailures, Server, evaluate_clie
 
 from fl4health.client_managers.base_sampling_manager import BaseFractionSamplingManager
 from fl4health.reporting.metrics import MetricsReporter
+from fl4health.utils.serialization import ndarrays_to_parameters
 
 
 class EvaluateServer(Server):
@@ -1,7 +1,7 @@
 from logging import DEBUG, ERROR, INFO
 from typing import Optional
 
-from flwr.common import Parameters, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.common import Parameters
 from flwr.common.logger import log
 from flwr.server.client_manager import ClientManager
 from flwr.server.history import History
@@ -12,6 +12,7 @@ from fl4health.reporting.fl_wandb import ServerWandBReporter
 from fl4health.server.base_server import FlServer
 from fl4health.server.instance_level_dp_server import InstanceLevelDpServer
 from fl4health.strategies.scaffold import OpacusScaffold, Scaffold
+from fl4health.utils.serialization import ndarrays_to_parameters, parameters_to_ndarrays
 
 
 class ScaffoldServer(FlServer):
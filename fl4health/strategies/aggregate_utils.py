@@ -1,12 +1,133 @@
 from functools import reduce
-from typing import List, Tuple
+from typing import Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
-from flwr.common import NDArrays
+from flwr.common import NDArray, NDArrays, Parameters
 from flwr.server.strategy.aggregate import aggregate, weighted_loss_avg
 
+from fl4health.strategies.parallel_aggregate import ParallelAggregationBackend, accumulate_scaled_layer
+from fl4health.utils.serialization import bytes_to_ndarray, read_tensor_header
 
-def aggregate_results(results: List[Tuple[NDArrays, int]], weighted: bool = True) -> NDArrays:
+
+class StreamingAggregator:
+    def __init__(
+        self, weighted: bool = True, aggregation_backend: Optional[ParallelAggregationBackend] = None
+    ) -> None:
+        """
+        Accumulates a weighted or unweighted average of model states one client at a time. Rather than holding every
+        client's decoded NDArrays in memory until all results are available, each client's arrays are decoded layer
+        by layer and immediately folded into a preallocated float64 running sum. The decoded buffers are released as
+        soon as they are accumulated so peak memory is O(model) rather than O(number of clients * model).
+
+        Args:
+            weighted (bool, optional): Whether or not the aggregation is a weighted average (by the sample counts
+                provided with each update) or a uniform average. Defaults to True.
+            aggregation_backend (Optional[ParallelAggregationBackend], optional): If provided, the accumulation of
+                large layers is split into chunks across the backend's thread pool. The running sums are identical
+                to those accumulated serially. Defaults to None.
+        """
+        self.weighted = weighted
+        self.aggregation_backend = aggregation_backend
+        self.running_sums: Optional[List[NDArray]] = None
+        self.layer_dtypes: List[np.dtype] = []
+        self.total_weight = 0.0
+        self.num_updates = 0
+
+    def clear(self) -> None:
+        """Resets the aggregator so that it may be reused for a new round of aggregation."""
+        self.running_sums = None
+        self.layer_dtypes = []
+        self.total_weight = 0.0
+        self.num_updates = 0
+
+    def _validate_update(self, shapes: Sequence[Tuple[int, ...]]) -> None:
+        # Checks the layer shapes of an update against those aggregated so far, before any state is modified, so
+        # that a mismatched update is rejected without leaving partial sums behind.
+        if self.num_updates == 0:
+            return
+        assert self.running_sums is not None
+        assert len(shapes) == len(
+            self.running_sums
+        ), f"Received {len(shapes)} layers, but the aggregator is tracking {len(self.running_sums)} layers"
+        for layer_index, (shape, running_sum) in enumerate(zip(shapes, self.running_sums)):
+            assert tuple(shape) == running_sum.shape, (
+                f"Layer {layer_index} has shape {tuple(shape)}, which does not match the aggregated shape "
+                f"{running_sum.shape}"
+            )
+
+    def _accumulate_layer(self, layer_index: int, layer: NDArray, weight: float) -> None:
+        assert self.running_sums is not None
+        if self.num_updates == 0:
+            # First update of the round, so we allocate the running sum buffer for this layer
+            self.running_sums.append(np.zeros(layer.shape, dtype=np.float64))
+            self.layer_dtypes.append(layer.dtype)
+        if self.aggregation_backend is not None:
+            self.aggregation_backend.accumulate_layer(self.running_sums[layer_index], layer, weight)
+        else:
+            accumulate_scaled_layer(self.running_sums[layer_index], layer, weight)
+
+    def _accumulate_update(self, layers: Iterable[NDArray], num_examples: int) -> None:
+        weight = float(num_examples) if self.weighted else 1.0
+        if self.num_updates == 0:
+            self.running_sums = []
+            self.layer_dtypes = []
+        for layer_index, layer in enumerate(layers):
+            self._accumulate_layer(layer_index, layer, weight)
+        self.total_weight += weight
+        self.num_updates += 1
+
+    def update_from_ndarrays(self, ndarrays: Sequence[NDArray], num_examples: int) -> None:
+        """
+        Folds a single client's arrays into the running sum. The layers of the update are validated against those
+        aggregated so far before any of them is accumulated.
+
+        Args:
+            ndarrays (Sequence[NDArray]): The client's arrays, in a consistent layer order across clients.
+            num_examples (int): The number of samples associated with the client's update. Only used in weighting if
+                the aggregator is weighted.
+        """
+        self._validate_update([layer.shape for layer in ndarrays])
+        self._accumulate_update(ndarrays, num_examples)
+
+    def update(self, parameters: Parameters, num_examples: int) -> None:
+        """
+        Decodes a client's serialized parameters one tensor at a time and folds them into the running sum. The layer
+        shapes are read from the tensor headers and validated before any tensor is decoded, so that only one layer
+        needs to be materialized at a time.
+
+        Args:
+            parameters (Parameters): Serialized client parameters (i.e. from a FitRes).
+            num_examples (int): The number of samples associated with the client's update.
+        """
+        self._validate_update([read_tensor_header(tensor)[0] for tensor in parameters.tensors])
+        # Writable copies are decoded, so that each layer can be scaled in place before it is accumulated
+        self._accumulate_update((bytes_to_ndarray(tensor, copy=True) for tensor in parameters.tensors), num_examples)
+
+    def compute(self) -> NDArrays:
+        """
+        Produces the average of all updates folded in so far. Floating point layers are cast back to the dtype of
+        the incoming updates, while other layers (i.e. integer counters) are returned as float64, matching the
+        behavior of aggregate_results.
+
+        Returns:
+            NDArrays: The weighted or unweighted average of the accumulated updates.
+        """
+        assert self.running_sums is not None and self.num_updates > 0, "No updates have been accumulated"
+        assert self.total_weight > 0.0, "Total weight of the accumulated updates must be positive"
+        aggregated_arrays: NDArrays = []
+        for running_sum, dtype in zip(self.running_sums, self.layer_dtypes):
+            averaged = running_sum / self.total_weight
+            if np.issubdtype(dtype, np.floating) and dtype != np.float64:
+                averaged = averaged.astype(dtype)
+            aggregated_arrays.append(averaged)
+        return aggregated_arrays
+
+
+def aggregate_results(
+    results: List[Tuple[NDArrays, int]],
+    weighted: bool = True,
+    aggregation_backend: Optional[ParallelAggregationBackend] = None,
+) -> NDArrays:
     """
     Compute weighted or unweighted average.
 
@@ -16,10 +137,19 @@ def aggregate_results(results: List[Tuple[NDArrays, int]], weighted: bool = True
             aggregated together in a weighted or unweighted average. The NDArrays most often represent model states.
         weighted (bool, optional): Whether or not the aggregation is a weighted average (by the sample counts
             provided in the tuple) or a uniform average. Defaults to True.
+        aggregation_backend (Optional[ParallelAggregationBackend], optional): If provided, the layer-wise
+            reductions are performed in parallel by the backend. The result is bit-identical to that computed without
+            a backend. Defaults to None.
 
     Returns:
         NDArrays: Aggregated numpy arrays by the desired averaging.
     """
+    if aggregation_backend is not None:
+        client_arrays = [weights for weights, _ in results]
+        if weighted:
+            client_scales = [num_examples for _, num_examples in results]
+            return aggregation_backend.sum_client_arrays(client_arrays, client_scales, sum(client_scales))
+        return aggregation_backend.sum_client_arrays(client_arrays, [1.0 / len(results)] * len(results))
     if weighted:
         # Uses the underlying flwr aggregation scheme
         return aggregate(results)
@@ -53,3 +183,32 @@ def aggregate_losses(results: List[Tuple[int, float]], weighted: bool = True) ->
     else:
         # standard averaging
         return sum([loss for _, loss in results]) / len(results)
+
+
+def streaming_aggregate_results(
+    results: Iterable[Tuple[Parameters, int]],
+    weighted: bool = True,
+    aggregation_backend: Optional[ParallelAggregationBackend] = None,
+) -> NDArrays:
+    """
+    Compute a weighted or unweighted average of serialized client parameters without decoding every client's model
+    at once. Each client's parameters are decoded one tensor at a time and folded into a float64 running sum, so the
+    peak memory is O(model) rather than O(number of clients * model). Produces the same result as decoding all
+    parameters and calling aggregate_results, up to floating point accumulation error.
+
+    Args:
+        results (Iterable[Tuple[Parameters, int]]): Serialized client parameters and the number of relevant samples
+            from each client (training or validation samples where appropriate).
+        weighted (bool, optional): Whether or not the aggregation is a weighted average (by the sample counts
+            provided in the tuple) or a uniform average. Defaults to True.
+        aggregation_backend (Optional[ParallelAggregationBackend], optional): If provided, the accumulation of each
+            client's layers is split into chunks across the backend's thread pool. The result is bit-identical to
+            that computed without a backend. Defaults to None.
+
+    Returns:
+        NDArrays: Aggregated numpy arrays by the desired averaging.
+    """
+    aggregator = StreamingAggregator(weighted, aggregation_backend)
+    for parameters, num_examples in results:
+        aggregator.update(parameters, num_examples)
+    return aggregator.compute()
@@ -1,5 +1,6 @@
+from dataclasses import replace
 from logging import INFO, WARNING
-from typing import Callable, Dict, List, Optional, Tuple, Union
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar, Union
 
 from flwr.common import (
     EvaluateIns,
@@ -7,12 +8,11 @@ from flwr.common import (
     FitIns,
     FitRes,
     GetPropertiesIns,
+    Metrics,
     MetricsAggregationFn,
     NDArrays,
     Parameters,
     Scalar,
-    ndarrays_to_parameters,
-    parameters_to_ndarrays,
 )
 from flwr.common.logger import log
 from flwr.server.client_manager import ClientManager
@@ -21,12 +21,29 @@ from flwr.server.strategy import FedAvg
 from opacus import GradSampleModule
 
 from fl4health.client_managers.base_sampling_manager import BaseFractionSamplingManager
-from fl4health.strategies.aggregate_utils import aggregate_losses, aggregate_results
+from fl4health.parameter_exchange.delta_exchanger import add_delta_ndarrays, decode_delta_ndarrays
+from fl4health.parameter_exchange.quantization import dequantize_ndarrays
+from fl4health.strategies.aggregate_utils import StreamingAggregator, aggregate_losses, streaming_aggregate_results
+from fl4health.strategies.memory_mapped_aggregate import MemoryMappedAggregator, decode_tensors
+from fl4health.strategies.parallel_aggregate import ParallelAggregationBackend
+from fl4health.strategies.server_optimizers import ServerOptimizer
+from fl4health.strategies.strategy_with_incremental_aggregation import StrategyWithIncrementalAggregation
 from fl4health.strategies.strategy_with_poll import StrategyWithPolling
+from fl4health.utils.metric_aggregation import get_incremental_metric_aggregator
 from fl4health.utils.parameter_extraction import get_all_model_parameters
+from fl4health.utils.serialization import ndarrays_to_parameters, parameters_to_ndarrays
+from fl4health.utils.shared_memory import (
+    SHARED_MEMORY_PARAMETERS_KEY,
+    SHARED_MEMORY_WRITE_BACK_KEY,
+    SharedMemoryParameterPublisher,
+    read_parameters_from_client,
+    unlink_unread_client_parameters,
+)
+
+Ins = TypeVar("Ins", FitIns, EvaluateIns)
 
 
-class BasicFedAvg(FedAvg, StrategyWithPolling):
+class BasicFedAvg(FedAvg, StrategyWithPolling, StrategyWithIncrementalAggregation):
     """Configurable FedAvg strategy implementation."""
 
     # pylint: disable=too-many-arguments,too-many-instance-attributes
@@ -52,6 +69,14 @@ class BasicFedAvg(FedAvg, StrategyWithPolling):
         evaluate_metrics_aggregation_fn: Optional[MetricsAggregationFn] = None,
         weighted_aggregation: bool = True,
         weighted_eval_losses: bool = True,
+        aggregation_backend: Optional[ParallelAggregationBackend] = None,
+        memory_mapped_aggregator: Optional[MemoryMappedAggregator] = None,
+        incremental_aggregation: bool = False,
+        server_optimizer: Optional[ServerOptimizer] = None,
+        dequantize_client_parameters: bool = False,
+        delta_aggregation: bool = False,
+        instrument_parameter_exchange: bool = False,
+        shared_memory_publisher: Optional[SharedMemoryParameterPublisher] = None,
     ) -> None:
         """
         Federated Averaging with Flexible Sampling. This implementation extends that of Flower in two ways. The first
@@ -93,6 +118,41 @@ class BasicFedAvg(FedAvg, StrategyWithPolling):
             weighted_eval_losses (bool, optional): Determines whether losses during evaluation are linearly weighted
                 averages or a uniform average. FedAvg default is weighted average of the losses by client dataset
                 counts. Defaults to True.
+            aggregation_backend (Optional[ParallelAggregationBackend], optional): If provided, the float64
+                accumulation of each client's parameters into the running aggregate is split into chunks across the
+                backend's thread pool. Clients are still decoded one at a time and the aggregated parameters are
+                bit-identical to those aggregated without a backend. Defaults to None.
+            memory_mapped_aggregator (Optional[MemoryMappedAggregator], optional): If provided, parameter aggregation
+                is performed out-of-core. Client updates are spilled to memory-mapped files and averaged chunk by
+                chunk, so that only the aggregated model needs to be held in memory. With servers supporting
+                incremental aggregation (i.e. FlServer), each update is spilled as soon as it arrives and its
+                serialized parameters are released, rather than holding every client's payload until the end of the
+                round (see accumulate_fit_result). This takes precedence over aggregation_backend. Defaults to None.
+            incremental_aggregation (bool, optional): If True, servers supporting it (i.e. FlServer) fold each
+                client's result into a running aggregate as soon as it arrives, rather than waiting for all clients
+                to finish training (see supports_incremental_aggregation). This overlaps decoding and accumulation
+                with the training of the remaining clients. The aggregated parameters are the same as those of
+                aggregate_fit. Always on with a memory_mapped_aggregator. Defaults to False.
+            server_optimizer (Optional[ServerOptimizer], optional): If provided, the aggregated weights are treated as
+                a pseudo-gradient step for a server-side optimizer (i.e. FedAdam, FedYogi or FedAvgM), which produces
+                the new global weights. If initial_parameters are provided, they are used as the initial global
+                weights of the optimizer. Defaults to None.
+            dequantize_client_parameters (bool, optional): Whether the clients send quantized parameters (i.e. with a
+                QuantizedParameterExchanger), which are dequantized before aggregation. Defaults to False.
+            delta_aggregation (bool, optional): Whether the clients send the difference between their local weights
+                and the global weights (i.e. with a DeltaParameterExchanger) rather than their local weights. The
+                strategy holds the global model, aggregates the deltas and adds them to it. Clients still receive the
+                absolute global weights. Requires initial_parameters. Defaults to False.
+            instrument_parameter_exchange (bool, optional): If True, servers supporting it (i.e. FlServer) record
+                the size of the parameters received from each client (total and per tensor), the size of the
+                aggregated parameters, the compression ratio of the client payloads relative to the global model and
+                the time spent in aggregate_fit (decoding, aggregation and encoding) each round through their metrics
+                reporter, under the "parameter_exchange" key. Defaults to False.
+            shared_memory_publisher (Optional[SharedMemoryParameterPublisher], optional): If provided, the global
+                parameters of each round are published once to POSIX shared memory and the clients, which must run on
+                the same host as the server, receive the name of the segment in their config rather than the
+                parameters themselves. If the publisher is configured to, the clients write their updated parameters
+                back through shared memory as well. Defaults to None.
         """
         super().__init__(
             fraction_fit=fraction_fit,
@@ -110,6 +170,34 @@ class BasicFedAvg(FedAvg, StrategyWithPolling):
         )
         self.weighted_aggregation = weighted_aggregation
         self.weighted_eval_losses = weighted_eval_losses
+        self.aggregation_backend = aggregation_backend
+        self.memory_mapped_aggregator = memory_mapped_aggregator
+        self.incremental_aggregation = incremental_aggregation
+        self.server_optimizer = server_optimizer
+        self.dequantize_client_parameters = dequantize_client_parameters
+        if delta_aggregation:
+            assert initial_parameters is not None, "delta_aggregation requires initial_parameters"
+            assert (
+                type(self).aggregate_fit is BasicFedAvg.aggregate_fit
+            ), "delta_aggregation is only supported by strategies using the BasicFedAvg aggregate_fit"
+        self.delta_aggregation = delta_aggregation
+        self.instrument_parameter_exchange = instrument_parameter_exchange
+        self.shared_memory_publisher = shared_memory_publisher
+        # The global model that the deltas sent by the clients are computed against, used when delta aggregation is on
+        self.global_model_weights: Optional[NDArrays] = (
+            parameters_to_ndarrays(initial_parameters)
+            if delta_aggregation and initial_parameters is not None
+            else None
+        )
+        if server_optimizer is not None and initial_parameters is not None:
+            server_optimizer.initialize(parameters_to_ndarrays(initial_parameters))
+        # Running aggregates for the current round, used when incremental aggregation is on. With a memory mapped
+        # aggregator, the parameters are spilled to it instead.
+        self.incremental_parameter_aggregator = StreamingAggregator(self.weighted_aggregation, aggregation_backend)
+        self.num_accumulated_results = 0
+        self.incremental_metric_aggregator = get_incremental_metric_aggregator(self.fit_metrics_aggregation_fn)
+        # Fallback for custom fit metric aggregation functions that cannot be computed incrementally
+        self.buffered_fit_metrics: List[Tuple[int, Metrics]] = []
 
     def configure_fit(
         self, server_round: int, parameters: Parameters, client_manager: ClientManager
@@ -143,10 +231,10 @@ class BasicFedAvg(FedAvg, StrategyWithPolling):
             clients = client_manager.sample_fraction(self.fraction_fit, self.min_available_clients)
 
             # Return client/config pairs
-            return [(client, fit_ins) for client in clients]
+            return self.maybe_share_parameters([(client, fit_ins) for client in clients])
         else:
             log(INFO, f"Using the standard Flower ClientManager: {type(client_manager)}")
-            return super().configure_fit(server_round, parameters, client_manager)
+            return self.maybe_share_parameters(super().configure_fit(server_round, parameters, client_manager))
 
     def configure_evaluate(
         self, server_round: int, parameters: Parameters, client_manager: ClientManager
@@ -185,10 +273,35 @@ class BasicFedAvg(FedAvg, StrategyWithPolling):
             clients = client_manager.sample_fraction(self.fraction_evaluate, self.min_available_clients)
 
             # Return client/config pairs
-            return [(client, evaluate_ins) for client in clients]
+            return self.maybe_share_parameters([(client, evaluate_ins) for client in clients])
         else:
             log(INFO, f"Using the standard Flower ClientManager: {type(client_manager)}")
-            return super().configure_evaluate(server_round, parameters, client_manager)
+            return self.maybe_share_parameters(super().configure_evaluate(server_round, parameters, client_manager))
+
+    def maybe_share_parameters(self, instructions: List[Tuple[ClientProxy, Ins]]) -> List[Tuple[ClientProxy, Ins]]:
+        """
+        If the strategy has a shared memory publisher, publishes the parameters of the instructions to shared memory
+        and replaces them with empty parameters and the name of the segment, added to the config. The parameters are
+        published once, as all clients receive the same parameters. The instructions themselves are not modified.
+
+        Args:
+            instructions (List[Tuple[ClientProxy, Ins]]): The client identifiers and the FitIns or EvaluateIns to be
+                sent to each client.
+
+        Returns:
+            List[Tuple[ClientProxy, Ins]]: The instructions with the parameters replaced by their segment.
+        """
+        if self.shared_memory_publisher is None or not instructions:
+            return instructions
+        segment_name = self.shared_memory_publisher.publish(instructions[0][1].parameters)
+        config_update: Dict[str, Scalar] = {SHARED_MEMORY_PARAMETERS_KEY: segment_name}
+        if self.shared_memory_publisher.write_back_updates:
+            config_update[SHARED_MEMORY_WRITE_BACK_KEY] = True
+        empty_parameters = Parameters(tensors=[], tensor_type=instructions[0][1].parameters.tensor_type)
+        return [
+            (client, replace(ins, parameters=empty_parameters, config={**ins.config, **config_update}))
+            for client, ins in instructions
+        ]
 
     def configure_poll(
         self, server_round: int, client_manager: ClientManager
@@ -242,20 +355,29 @@ class BasicFedAvg(FedAvg, StrategyWithPolling):
         Returns:
             Tuple[Optional[Parameters], Dict[str, Scalar]]: The aggregated model weights and the metrics dictionary.
         """
+        self.release_unread_fit_results(failures)
         if not results:
             return None, {}
         # Do not aggregate if there are failures and failures are not accepted
         if not self.accept_failures and failures:
+            self.release_unread_fit_results(results)
             return None, {}
 
-        # Convert results
-        weights_results = [
-            (parameters_to_ndarrays(fit_res.parameters), fit_res.num_examples) for _, fit_res in results
-        ]
-        # Aggregate them in a weighted or unweighted fashion based on settings.
-        aggregated_arrays = aggregate_results(weights_results, self.weighted_aggregation)
+        results = self.maybe_decode_results(results)
+        if self.memory_mapped_aggregator is not None:
+            # Spill each client's update to disk as it is decoded and aggregate out-of-core.
+            spilled_results = ((decode_tensors(fit_res.parameters), fit_res.num_examples) for _, fit_res in results)
+            aggregated_arrays = self.memory_mapped_aggregator.aggregate(spilled_results, self.weighted_aggregation)
+        else:
+            # Decode and aggregate the results one client at a time in a weighted or unweighted fashion based on
+            # settings. Streaming avoids holding every client's decoded model in memory simultaneously. With a
+            # backend, the accumulation of each client is parallelized.
+            parameters_results = [(fit_res.parameters, fit_res.num_examples) for _, fit_res in results]
+            aggregated_arrays = streaming_aggregate_results(
+                parameters_results, self.weighted_aggregation, self.aggregation_backend
+            )
         # Convert back to parameters
-        parameters_aggregated = ndarrays_to_parameters(aggregated_arrays)
+        parameters_aggregated = ndarrays_to_parameters(self.compute_global_weights(aggregated_arrays))
 
         # Aggregate custom metrics if aggregation fn was provided
         metrics_aggregated = {}
@@ -267,6 +389,236 @@ class BasicFedAvg(FedAvg, StrategyWithPolling):
 
         return parameters_aggregated, metrics_aggregated
 
+    def maybe_decode_results(self, results: List[Tuple[ClientProxy, FitRes]]) -> List[Tuple[ClientProxy, FitRes]]:
+        """
+        If the clients send quantized parameters and/or deltas, or write their parameters back through shared memory,
+        replaces the parameters of each result with their dequantized values and/or dense deltas. The results
+        themselves are not modified.
+
+        Args:
+            results (List[Tuple[ClientProxy, FitRes]]): The client identifiers and the results of their local training.
+
+        Returns:
+            List[Tuple[ClientProxy, FitRes]]: The results with full precision parameters.
+        """
+        if not (self.dequantize_client_parameters or self.delta_aggregation or self.shared_memory_publisher):
+            return results
+        return [(client_proxy, self.maybe_decode_fit_res(fit_res)) for client_proxy, fit_res in results]
+
+    def release_unread_fit_results(
+        self, fit_results: Sequence[Union[Tuple[ClientProxy, FitRes], BaseException]]
+    ) -> None:
+        """
+        If the clients write their parameters back through shared memory, unlinks the segments of results that are
+        not decoded (i.e. failures or the results of a round that is not aggregated), which would otherwise leak.
+
+        Args:
+            fit_results (Sequence[Union[Tuple[ClientProxy, FitRes], BaseException]]): Results and/or failures that
+                are not aggregated.
+        """
+        if self.shared_memory_publisher is not None:
+            unlink_unread_client_parameters(fit_results)
+
+    def maybe_decode_fit_res(self, fit_res: FitRes) -> FitRes:
+        if SHARED_MEMORY_PARAMETERS_KEY in fit_res.metrics:
+            # The client wrote its parameters to shared memory, which are read (and the segment unlinked)
+            metrics = dict(fit_res.metrics)
+            parameters = read_parameters_from_client(str(metrics.pop(SHARED_MEMORY_PARAMETERS_KEY)))
+            fit_res = replace(fit_res, parameters=parameters, metrics=metrics)
+        if not (self.dequantize_client_parameters or self.delta_aggregation):
+            return fit_res
+        ndarrays = parameters_to_ndarrays(fit_res.parameters)
+        if self.dequantize_client_parameters:
+            ndarrays = dequantize_ndarrays(ndarrays)
+        if self.delta_aggregation:
+            assert self.global_model_weights is not None
+            ndarrays = decode_delta_ndarrays(ndarrays, self.global_model_weights)
+        return replace(fit_res, parameters=ndarrays_to_parameters(ndarrays))
+
+    def compute_global_weights(self, aggregated_arrays: NDArrays) -> NDArrays:
+        """
+        Produces the new global weights from the arrays aggregated from the clients in this round. With delta
+        aggregation, the aggregated deltas are first added to the global model held by the strategy, which is then
+        replaced by the new global weights. If the strategy has a server optimizer, it then takes a step (see
+        maybe_apply_server_optimizer).
+
+        Args:
+            aggregated_arrays (NDArrays): The weights, or deltas, aggregated from the clients in this round.
+
+        Returns:
+            NDArrays: The new global weights.
+        """
+        if self.delta_aggregation:
+            assert self.global_model_weights is not None
+            aggregated_arrays = add_delta_ndarrays(self.global_model_weights, aggregated_arrays)
+        global_weights = self.maybe_apply_server_optimizer(aggregated_arrays)
+        if self.delta_aggregation:
+            self.global_model_weights = global_weights
+        return global_weights
+
+    def maybe_apply_server_optimizer(
+        self, aggregated_weights: NDArrays, layer_keys: Optional[List[str]] = None
+    ) -> NDArrays:
+        """
+        If the strategy has a server optimizer, takes an optimizer step using the aggregated weights to produce the
+        new global weights. Otherwise, the aggregated weights are the new global weights.
+
+        Args:
+            aggregated_weights (NDArrays): The weights aggregated from the clients in this round.
+            layer_keys (Optional[List[str]], optional): Keys identifying each layer for the optimizer state. If None,
+                layers are identified by their position. Defaults to None.
+
+        Returns:
+            NDArrays: The new global weights.
+        """
+        if self.server_optimizer is None:
+            return aggregated_weights
+        return self.server_optimizer.step(aggregated_weights, layer_keys)
+
+    def shutdown(self) -> None:
+        """
+        Releases the resources held by the strategy once the server is done with it. Called by servers supporting it
+        (i.e. FlServer) when they shut down.
+        """
+        if self.shared_memory_publisher is not None:
+            # Unlink the segment holding the last global parameters published to the clients
+            self.shared_memory_publisher.close()
+        if self.aggregation_backend is not None:
+            self.aggregation_backend.shutdown()
+        if self.memory_mapped_aggregator is not None:
+            self.memory_mapped_aggregator.clear()
+
+    def supports_incremental_aggregation(self) -> bool:
+        """
+        Subclasses overriding aggregate_fit should also override the incremental aggregation hooks (i.e.
+        accumulate_parameters and aggregate_accumulated_parameters), or this method to return False, so that servers
+        do not aggregate their results with the BasicFedAvg hooks.
+
+        Returns:
+            bool: Whether the strategy was configured with incremental_aggregation or a memory_mapped_aggregator.
+        """
+        return self.incremental_aggregation or self.memory_mapped_aggregator is not None
+
+    def begin_incremental_aggregation(self, server_round: int) -> None:
+        """
+        Resets the running aggregates at the start of a fit round in which results are aggregated incrementally.
+
+        Args:
+            server_round (int): Indicates the server round we're currently on.
+        """
+        self.clear_accumulated_parameters()
+        if self.incremental_metric_aggregator is not None:
+            self.incremental_metric_aggregator.clear()
+        self.buffered_fit_metrics = []
+        self.num_accumulated_results = 0
+
+    def accumulate_fit_result(self, server_round: int, fit_res: FitRes) -> None:
+        """
+        Folds a single successful client result into the running aggregates of the round. The client's parameters
+        are decoded and accumulated one tensor at a time and its metrics are folded into the metric aggregate. With a
+        memory mapped aggregator, the parameters are spilled to disk and then released from fit_res, so that the
+        server does not hold the payloads of the clients that have already returned until the end of the round.
+
+        Args:
+            server_round (int): Indicates the server round we're currently on.
+            fit_res (FitRes): The result of a client's local training.
+        """
+        decoded_fit_res = self.maybe_decode_fit_res(fit_res)
+        self.accumulate_parameters(decoded_fit_res)
+        if self.memory_mapped_aggregator is not None:
+            fit_res.parameters = Parameters(tensors=[], tensor_type=fit_res.parameters.tensor_type)
+        self.num_accumulated_results += 1
+        if self.incremental_metric_aggregator is not None:
+            self.incremental_metric_aggregator.update(decoded_fit_res.num_examples, decoded_fit_res.metrics)
+        elif self.fit_metrics_aggregation_fn:
+            self.buffered_fit_metrics.append((decoded_fit_res.num_examples, decoded_fit_res.metrics))
+
+    def accumulate_parameters(self, fit_res: FitRes) -> None:
+        """
+        Folds the parameters of a single (decoded) client result into the running aggregate of the round, spilling
+        them to the memory mapped aggregator if there is one.
+
+        Args:
+            fit_res (FitRes): The result of a client's local training, with full precision parameters.
+        """
+        if self.memory_mapped_aggregator is not None:
+            self.memory_mapped_aggregator.spill(decode_tensors(fit_res.parameters), fit_res.num_examples)
+        else:
+            self.incremental_parameter_aggregator.update(fit_res.parameters, fit_res.num_examples)
+
+    def compute_accumulated_arrays(self) -> NDArrays:
+        """
+        Returns:
+            NDArrays: The weighted or unweighted average of the parameters accumulated so far this round.
+        """
+        if self.memory_mapped_aggregator is not None:
+            return self.memory_mapped_aggregator.compute(self.weighted_aggregation)
+        return self.incremental_parameter_aggregator.compute()
+
+    def clear_accumulated_parameters(self) -> None:
+        """Discards the parameters accumulated so far this round, including any spill files."""
+        self.incremental_parameter_aggregator.clear()
+        if self.memory_mapped_aggregator is not None:
+            self.memory_mapped_aggregator.clear()
+
+    def aggregate_accumulated_parameters(self, server_round: int) -> Parameters:
+        """
+        Produces the new global parameters from the parameters accumulated this round. Subclasses with a different
+        server update override this method, in the same way as aggregate_fit.
+
+        Args:
+            server_round (int): Indicates the server round we're currently on.
+
+        Returns:
+            Parameters: The new global parameters.
+        """
+        return ndarrays_to_parameters(self.compute_global_weights(self.compute_accumulated_arrays()))
+
+    def finalize_incremental_aggregation(
+        self,
+        server_round: int,
+        results: List[Tuple[ClientProxy, FitRes]],
+        failures: List[Union[Tuple[ClientProxy, FitRes], BaseException]],
+    ) -> Tuple[Optional[Parameters], Dict[str, Scalar]]:
+        """
+        Produces the aggregated parameters and metrics once all client results of the round have been accumulated
+        with accumulate_fit_result. Equivalent to aggregate_fit called with the same results and failures.
+
+        Args:
+            server_round (int): Indicates the server round we're currently on.
+            results (List[Tuple[ClientProxy, FitRes]]): The client identifiers and the results of their local training
+                that have been accumulated.
+            failures (List[Union[Tuple[ClientProxy, FitRes], BaseException]]): These are the results and exceptions
+                from clients that experienced an issue during training, such as timeouts or exceptions.
+
+        Returns:
+            Tuple[Optional[Parameters], Dict[str, Scalar]]: The aggregated model weights and the metrics dictionary.
+        """
+        assert self.num_accumulated_results == len(
+            results
+        ), "Every result must be accumulated before finalizing the aggregation"
+        # The accumulated results have been decoded, only the failures may still hold parameters in shared memory
+        self.release_unread_fit_results(failures)
+        # Do not aggregate if there are no results, or there are failures and failures are not accepted
+        if not results or (not self.accept_failures and failures):
+            self.clear_accumulated_parameters()
+            return None, {}
+
+        try:
+            parameters_aggregated = self.aggregate_accumulated_parameters(server_round)
+        finally:
+            self.clear_accumulated_parameters()
+
+        metrics_aggregated = {}
+        if self.incremental_metric_aggregator is not None:
+            metrics_aggregated = self.incremental_metric_aggregator.compute()
+        elif self.fit_metrics_aggregation_fn:
+            metrics_aggregated = self.fit_metrics_aggregation_fn(self.buffered_fit_metrics)
+        elif server_round == 1:  # Only log this warning once
+            log(WARNING, "No fit_metrics_aggregation_fn provided")
+
+        return parameters_aggregated, metrics_aggregated
+
     def aggregate_evaluate(
         self,
         server_round: int,
@@ -12,8 +12,6 @@ from flwr.common import (
     Parameters,
     Scalar,
     ndarray_to_bytes,
-    ndarrays_to_parameters,
-    parameters_to_ndarrays,
 )
 from flwr.common.logger import log
 from flwr.server.client_manager import ClientManager
@@ -27,6 +25,9 @@ from fl4health.strategies.noisy_aggregate import (
     gaussian_noisy_unweighted_aggregate,
     gaussian_noisy_weighted_aggregate,
 )
+from fl4health.strategies.parallel_aggregate import ParallelAggregationBackend
+from fl4health.utils.flat_parameters import FlatParameters, flat_dtype
+from fl4health.utils.serialization import ndarrays_to_parameters, parameters_to_ndarrays
 
 
 class ClientLevelDPFedAvgM(BasicFedAvg):
@@ -60,6 +61,7 @@ class ClientLevelDPFedAvgM(BasicFedAvg):
         weight_noise_multiplier: float = 1.0,
         clipping_noise_multiplier: float = 1.0,
         beta: float = 0.9,
+        aggregation_backend: Optional[ParallelAggregationBackend] = None,
     ) -> None:
         """
         This strategy implements the Federated Learning with client-level DP approach discussed in
@@ -115,6 +117,10 @@ class ClientLevelDPFedAvgM(BasicFedAvg):
                 Defaults to 1.0.
             beta (float, optional): Momentum weight for previous weight updates. If it is 0, there is no momentum.
                 Defaults to 0.9.
+            aggregation_backend (Optional[ParallelAggregationBackend], optional): If provided, the layer-wise
+                reductions performed during aggregation are parallelized across the backend's thread pool. Each
+                element is reduced with the same operations, in the same order, as without a backend, so the results
+                are bit-identical. Defaults to None.
         """
         assert initial_parameters is not None
         assert 0.0 <= clipping_quantile <= 1.0
@@ -134,6 +140,7 @@ class ClientLevelDPFedAvgM(BasicFedAvg):
             evaluate_metrics_aggregation_fn=evaluate_metrics_aggregation_fn,
             weighted_aggregation=weighted_aggregation,
             weighted_eval_losses=weighted_eval_losses,
+            aggregation_backend=aggregation_backend,
         )
         # If per_client_example_cap is None, it will be set as the total samples across clients
         self.per_client_example_cap = per_client_example_cap
@@ -217,13 +224,19 @@ class ClientLevelDPFedAvgM(BasicFedAvg):
             round.
         """
         if not self.m_t:
-            self.m_t = weights_update
+            # The momentum is stored in a buffer owned by the strategy, so it can be updated in place in later rounds
+            self.m_t = FlatParameters.from_ndarrays(weights_update, copy=True).to_ndarrays()
         else:
-            self.m_t = [
-                # NOTE: This is not normalized (beta vs. 1-beta) as used in the original implementation
-                self.beta * prev_layer_update + noised_layer_update
-                for prev_layer_update, noised_layer_update in zip(self.m_t, weights_update)
-            ]
+            # m_t holds views of a single flat buffer, so it is wrapped without copying and updated as one operation
+            flat_m_t = FlatParameters.from_ndarrays(self.m_t)
+            flat_update = FlatParameters.from_ndarrays(weights_update)
+            assert flat_m_t.has_same_layout(flat_update), "Update does not match the layout of m_t"
+            if np.result_type(flat_m_t.dtype, flat_update.dtype) != flat_m_t.dtype:
+                flat_m_t = FlatParameters(flat_m_t.buffer.astype(flat_update.dtype), flat_m_t.shapes)
+            # NOTE: This is not normalized (beta vs. 1-beta) as used in the original implementation
+            np.multiply(flat_m_t.buffer, self.beta, out=flat_m_t.buffer)
+            np.add(flat_m_t.buffer, flat_update.buffer, out=flat_m_t.buffer)
+            self.m_t = flat_m_t.to_ndarrays()
 
     def update_current_weights(self) -> None:
         """
@@ -232,10 +245,16 @@ class ClientLevelDPFedAvgM(BasicFedAvg):
         NOTE: It assumes that the values in m_t are UPDATES rather than raw weights.
         """
         assert self.m_t is not None
-        self.current_weights = [
-            current_layer_weight + self.server_learning_rate * layer_mt
-            for current_layer_weight, layer_mt in zip(self.current_weights, self.m_t)
-        ]
+        flat_m_t = FlatParameters.from_ndarrays(self.m_t)
+        current_dtype = flat_dtype([layer.dtype for layer in self.current_weights])
+        # After the first update, current_weights holds views of a flat buffer owned by the strategy, which is wrapped
+        # without copying and updated in place.
+        flat_current_weights = FlatParameters.from_ndarrays(
+            self.current_weights, np.result_type(current_dtype, flat_m_t.dtype)
+        )
+        assert flat_current_weights.has_same_layout(flat_m_t), "m_t does not match the layout of the current weights"
+        flat_current_weights.buffer += self.server_learning_rate * flat_m_t.buffer
+        self.current_weights = flat_current_weights.to_ndarrays()
 
     def _update_clipping_bound_with_noised_bits(
         self,
@@ -333,12 +352,14 @@ class ClientLevelDPFedAvgM(BasicFedAvg):
                 self.fraction_fit,
                 self.per_client_example_cap,
                 self.total_client_weight,
+                self.aggregation_backend,
             )
         else:
             noised_aggregated_update = gaussian_noisy_unweighted_aggregate(
                 weights_and_counts,
                 noise_multiplier,
                 self.clipping_bound,
+                self.aggregation_backend,
             )
 
         # momentum calculation
@@ -1,23 +1,23 @@
 from collections import defaultdict
 from functools import reduce
 from logging import WARNING
-from typing import Callable, DefaultDict, Dict, List, Optional, Tuple, Union
+from typing import Callable, DefaultDict, Dict, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
-from flwr.common import (
-    MetricsAggregationFn,
-    NDArray,
-    NDArrays,
-    Parameters,
-    ndarrays_to_parameters,
-    parameters_to_ndarrays,
-)
+from flwr.common import MetricsAggregationFn, NDArray, NDArrays, Parameters
 from flwr.common.logger import log
 from flwr.common.typing import FitRes, Scalar
 from flwr.server.client_proxy import ClientProxy
 
-from fl4health.parameter_exchange.parameter_packer import ParameterPackerWithLayerNames
+from fl4health.parameter_exchange.parameter_packer import ParameterPackerWithLayerIds, ParameterPackerWithLayerNames
 from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.strategies.parallel_aggregate import ParallelAggregationBackend
+from fl4health.strategies.server_optimizers import ServerOptimizer
+from fl4health.utils.serialization import ndarrays_to_parameters, parameters_to_ndarrays
+from fl4health.utils.shared_memory import SharedMemoryParameterPublisher
+
+# Layers are identified by name, or by their integer id when clients exchange layer ids
+LayerKey = Union[str, int]
 
 
 class FedAvgDynamicLayer(BasicFedAvg):
@@ -43,6 +43,12 @@ class FedAvgDynamicLayer(BasicFedAvg):
         evaluate_metrics_aggregation_fn: Optional[MetricsAggregationFn] = None,
         weighted_aggregation: bool = True,
         weighted_eval_losses: bool = True,
+        aggregation_backend: Optional[ParallelAggregationBackend] = None,
+        server_optimizer: Optional[ServerOptimizer] = None,
+        dequantize_client_parameters: bool = False,
+        use_layer_ids: bool = False,
+        instrument_parameter_exchange: bool = False,
+        shared_memory_publisher: Optional[SharedMemoryParameterPublisher] = None,
     ) -> None:
         """
         A generalization of the FedAvg strategy where the server can receive any arbitrary subset of the layers from
@@ -75,6 +81,23 @@ class FedAvgDynamicLayer(BasicFedAvg):
             weighted_eval_losses (bool, optional): Determines whether losses during evaluation are linearly weighted
                 averages or a uniform average. FedAvg default is weighted average of the losses by client dataset
                 counts. Defaults to True.
+            aggregation_backend (Optional[ParallelAggregationBackend], optional): If provided, the layer-wise
+                reductions performed during aggregation are parallelized across the backend's thread pool. Each
+                element is reduced with the same operations, in the same order, as without a backend, so the results
+                are bit-identical. Defaults to None.
+            server_optimizer (Optional[ServerOptimizer], optional): If provided, each aggregated layer is used to take
+                a server-side optimizer step (i.e. FedAdam, FedYogi or FedAvgM). Optimizer state is tracked by layer
+                name, and a layer's global weights are set to its first aggregate. Defaults to None.
+            dequantize_client_parameters (bool, optional): Whether the clients send quantized parameters (i.e. with a
+                QuantizedParameterExchanger), which are dequantized before aggregation. Defaults to False.
+            use_layer_ids (bool, optional): Whether the clients identify the layers they send by integer ids rather
+                than by name (i.e. DynamicLayerExchanger with use_layer_ids=True). Layers are then aligned and
+                aggregated by id and the aggregated layers are sent back with their ids. Defaults to False.
+            instrument_parameter_exchange (bool, optional): If True, servers supporting it (i.e. FlServer) record
+                payload sizes and aggregation times each round through their metrics reporter. See BasicFedAvg.
+                Defaults to False.
+            shared_memory_publisher (Optional[SharedMemoryParameterPublisher], optional): If provided, parameters
+                are exchanged with co-located clients through POSIX shared memory. See BasicFedAvg. Defaults to None.
         """
         super().__init__(
             fraction_fit=fraction_fit,
@@ -91,8 +114,47 @@ class FedAvgDynamicLayer(BasicFedAvg):
             evaluate_metrics_aggregation_fn=evaluate_metrics_aggregation_fn,
             weighted_aggregation=weighted_aggregation,
             weighted_eval_losses=weighted_eval_losses,
+            aggregation_backend=aggregation_backend,
+            server_optimizer=server_optimizer,
+            dequantize_client_parameters=dequantize_client_parameters,
+            instrument_parameter_exchange=instrument_parameter_exchange,
+            shared_memory_publisher=shared_memory_publisher,
+        )
+        if server_optimizer is not None:
+            # Layers are tracked by name (or id) as they are aggregated, rather than by position in the initial
+            # parameters.
+            server_optimizer.reset()
+        self.use_layer_ids = use_layer_ids
+        self.parameter_packer: Union[ParameterPackerWithLayerNames, ParameterPackerWithLayerIds] = (
+            ParameterPackerWithLayerIds() if use_layer_ids else ParameterPackerWithLayerNames()
         )
-        self.parameter_packer = ParameterPackerWithLayerNames()
+
+    def pack_parameters(self, weights: NDArrays, layer_keys: Sequence[LayerKey]) -> NDArrays:
+        """
+        Packs the aggregated layers along with their names, or their ids if use_layer_ids is True.
+
+        Args:
+            weights (NDArrays): The aggregated layers.
+            layer_keys (Sequence[LayerKey]): The name (or id) of each layer.
+
+        Returns:
+            NDArrays: The layers followed by an array of their names (or ids).
+        """
+        if isinstance(self.parameter_packer, ParameterPackerWithLayerIds):
+            return self.parameter_packer.pack_parameters(weights, [int(key) for key in layer_keys])
+        return self.parameter_packer.pack_parameters(weights, [str(key) for key in layer_keys])
+
+    def unpack_parameters(self, packed_layers: NDArrays) -> Tuple[NDArrays, Sequence[LayerKey]]:
+        """
+        Unpacks the layers sent by a client along with their names, or their ids if use_layer_ids is True.
+
+        Args:
+            packed_layers (NDArrays): The layers followed by an array of their names (or ids).
+
+        Returns:
+            Tuple[NDArrays, Sequence[LayerKey]]: The layers and the name (or id) of each layer.
+        """
+        return self.parameter_packer.unpack_parameters(packed_layers)
 
     def aggregate_fit(
         self,
@@ -118,12 +180,16 @@ class FedAvgDynamicLayer(BasicFedAvg):
                 For dynamic layer exchange we also pack in the names of all of the layers that were aggregated in this
                 phase to allow client's to insert the values into the proper areas of their models.
         """
+        self.release_unread_fit_results(failures)
         if not results:
             return None, {}
         # Do not aggregate if there are failures and failures are not accepted
         if not self.accept_failures and failures:
+            self.release_unread_fit_results(results)
             return None, {}
 
+        results = self.maybe_decode_results(results)
+
         # Convert client layer weights and names into ndarrays
         weights_results = [
             (parameters_to_ndarrays(fit_res.parameters), fit_res.num_examples) for _, fit_res in results
@@ -132,13 +198,11 @@ class FedAvgDynamicLayer(BasicFedAvg):
         # For each layer of the model, perform weighted average of all received weights from clients
         aggregated_params = self.aggregate(weights_results)
 
-        weights_names = []
-        weights = []
-        for name in aggregated_params:
-            weights_names.append(name)
-            weights.append(aggregated_params[name])
+        weights_keys = list(aggregated_params.keys())
+        weights = [aggregated_params[key] for key in weights_keys]
+        weights = self.maybe_apply_server_optimizer(weights, [str(key) for key in weights_keys])
 
-        parameters = self.parameter_packer.pack_parameters(weights, weights_names)
+        parameters = self.pack_parameters(weights, weights_keys)
 
         # Aggregate custom metrics if aggregation fn was provided
         metrics_aggregated = {}
@@ -150,7 +214,7 @@ class FedAvgDynamicLayer(BasicFedAvg):
 
         return ndarrays_to_parameters(parameters), metrics_aggregated
 
-    def aggregate(self, results: List[Tuple[NDArrays, int]]) -> Dict[str, NDArray]:
+    def aggregate(self, results: List[Tuple[NDArrays, int]]) -> Dict[LayerKey, NDArray]:
         """
         Aggregate the different layers across clients that have contributed to a layer. This aggregation may be
         weighted or unweighted. The called functions handle layer alignment.
@@ -162,15 +226,15 @@ class FedAvgDynamicLayer(BasicFedAvg):
                 alignment during aggregation.
 
         Returns:
-            Dict[str, NDArray]: A dictionary mapping the name of the layer that was aggregated to the aggregated
-                weights.
+            Dict[LayerKey, NDArray]: A dictionary mapping the name (or id) of the layer that was aggregated to the
+                aggregated weights.
         """
         if self.weighted_aggregation:
             return self.weighted_aggregate(results)
         else:
             return self.unweighted_aggregate(results)
 
-    def weighted_aggregate(self, results: List[Tuple[NDArrays, int]]) -> Dict[str, NDArray]:
+    def weighted_aggregate(self, results: List[Tuple[NDArrays, int]]) -> Dict[LayerKey, NDArray]:
         """
         Results consists of the layer weights (and their names) sent by clients who participated in this round of
         training. Since each client can send an arbitrary subset of layers, the aggregate performs weighted averaging
@@ -183,18 +247,35 @@ class FedAvgDynamicLayer(BasicFedAvg):
                 alignment during aggregation.
 
         Returns:
-            Dict[str, NDArray]: A dictionary mapping the name of the layer that was aggregated to the aggregated
-                weights.
+            Dict[LayerKey, NDArray]: A dictionary mapping the name (or id) of the layer that was aggregated to the
+                aggregated weights.
         """
-        names_to_layers: DefaultDict[str, List[NDArray]] = defaultdict(list)
-        total_num_examples: DefaultDict[str, int] = defaultdict(int)
+        names_to_layers: DefaultDict[LayerKey, List[NDArray]] = defaultdict(list)
+        names_to_num_examples: DefaultDict[LayerKey, List[int]] = defaultdict(list)
+        total_num_examples: DefaultDict[LayerKey, int] = defaultdict(int)
 
         for packed_layers, num_examples in results:
-            layers, names = self.parameter_packer.unpack_parameters(packed_layers)
+            layers, names = self.unpack_parameters(packed_layers)
             for layer, name in zip(layers, names):
-                names_to_layers[name].append(layer * num_examples)
+                names_to_layers[name].append(layer)
+                names_to_num_examples[name].append(num_examples)
                 total_num_examples[name] += num_examples
 
+        if self.aggregation_backend is not None:
+            layer_names = list(names_to_layers.keys())
+            aggregated_layers = self.aggregation_backend.reduce_layers(
+                [names_to_layers[name_key] for name_key in layer_names],
+                scales=[names_to_num_examples[name_key] for name_key in layer_names],
+                divisors=[total_num_examples[name_key] for name_key in layer_names],
+            )
+            return dict(zip(layer_names, aggregated_layers))
+
+        for name_key in names_to_layers:
+            names_to_layers[name_key] = [
+                layer * num_examples
+                for layer, num_examples in zip(names_to_layers[name_key], names_to_num_examples[name_key])
+            ]
+
         name_to_layers_aggregated = {
             name_key: reduce(np.add, names_to_layers[name_key]) / total_num_examples[name_key]
             for name_key in names_to_layers
@@ -202,7 +283,7 @@ class FedAvgDynamicLayer(BasicFedAvg):
 
         return name_to_layers_aggregated
 
-    def unweighted_aggregate(self, results: List[Tuple[NDArrays, int]]) -> Dict[str, NDArray]:
+    def unweighted_aggregate(self, results: List[Tuple[NDArrays, int]]) -> Dict[LayerKey, NDArray]:
         """
         Results consists of the layer weights (and their names) sent by clients who participated in this round of
         training. Since each client can send an arbitrary subset of layers, the aggregate performs uniform averaging
@@ -215,18 +296,26 @@ class FedAvgDynamicLayer(BasicFedAvg):
                 alignment during aggregation.
 
         Returns:
-            Dict[str, NDArray]: A dictionary mapping the name of the layer that was aggregated to the aggregated
-                weights.
+            Dict[LayerKey, NDArray]: A dictionary mapping the name (or id) of the layer that was aggregated to the
+                aggregated weights.
         """
-        names_to_layers: DefaultDict[str, List[NDArray]] = defaultdict(list)
-        total_num_clients: DefaultDict[str, int] = defaultdict(int)
+        names_to_layers: DefaultDict[LayerKey, List[NDArray]] = defaultdict(list)
+        total_num_clients: DefaultDict[LayerKey, int] = defaultdict(int)
 
         for packed_layers, _ in results:
-            layers, names = self.parameter_packer.unpack_parameters(packed_layers)
+            layers, names = self.unpack_parameters(packed_layers)
             for layer, name in zip(layers, names):
                 names_to_layers[name].append(layer)
                 total_num_clients[name] += 1
 
+        if self.aggregation_backend is not None:
+            layer_names = list(names_to_layers.keys())
+            aggregated_layers = self.aggregation_backend.reduce_layers(
+                [names_to_layers[name_key] for name_key in layer_names],
+                divisors=[total_num_clients[name_key] for name_key in layer_names],
+            )
+            return dict(zip(layer_names, aggregated_layers))
+
         name_to_layers_aggregated = {
             name_key: reduce(np.add, names_to_layers[name_key]) / total_num_clients[name_key]
             for name_key in names_to_layers
@@ -1,17 +1,19 @@
 from collections import defaultdict
-from functools import reduce
 from logging import WARNING
 from typing import Callable, DefaultDict, Dict, List, Optional, Tuple, Union
 
 import torch
-from flwr.common import MetricsAggregationFn, NDArrays, Parameters, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.common import MetricsAggregationFn, NDArrays, Parameters
 from flwr.common.logger import log
 from flwr.common.typing import FitRes, Scalar
 from flwr.server.client_proxy import ClientProxy
 from torch import Tensor
 
 from fl4health.parameter_exchange.parameter_packer import SparseCooParameterPacker
+from fl4health.parameter_exchange.sparse_index_encoding import SparseIndexEncoding
 from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.utils.serialization import ndarrays_to_parameters, parameters_to_ndarrays
+from fl4health.utils.shared_memory import SharedMemoryParameterPublisher
 
 
 class FedAvgSparseCooTensor(BasicFedAvg):
@@ -37,6 +39,10 @@ class FedAvgSparseCooTensor(BasicFedAvg):
         evaluate_metrics_aggregation_fn: Optional[MetricsAggregationFn] = None,
         weighted_aggregation: bool = True,
         weighted_eval_losses: bool = True,
+        dequantize_client_parameters: bool = False,
+        index_encoding: SparseIndexEncoding = SparseIndexEncoding.COORDINATES,
+        instrument_parameter_exchange: bool = False,
+        shared_memory_publisher: Optional[SharedMemoryParameterPublisher] = None,
     ) -> None:
         """
         A generalization of the FedAvg strategy where the server can receive any arbitrary subset of parameters from
@@ -81,6 +87,17 @@ class FedAvgSparseCooTensor(BasicFedAvg):
             weighted_eval_losses (bool, optional): Determines whether losses during evaluation are linearly weighted
                 averages or a uniform average. FedAvg default is weighted average of the losses by client dataset
                 counts. Defaults to True.
+            dequantize_client_parameters (bool, optional): Whether the clients send quantized parameters (i.e. with a
+                QuantizedParameterExchanger), which are dequantized before aggregation. Defaults to False.
+            index_encoding (SparseIndexEncoding, optional): How the indices of the aggregated parameters sent back to
+                the clients are encoded. COORDINATES sends the int64 coordinates of each parameter, while AUTO chooses
+                the most compact of linear indices, delta encoded indices and bitmasks for each tensor. Client
+                parameters may use any encoding. Defaults to COORDINATES.
+            instrument_parameter_exchange (bool, optional): If True, servers supporting it (i.e. FlServer) record
+                payload sizes and aggregation times each round through their metrics reporter. See BasicFedAvg.
+                Defaults to False.
+            shared_memory_publisher (Optional[SharedMemoryParameterPublisher], optional): If provided, parameters
+                are exchanged with co-located clients through POSIX shared memory. See BasicFedAvg. Defaults to None.
         """
         super().__init__(
             fraction_fit=fraction_fit,
@@ -97,8 +114,11 @@ class FedAvgSparseCooTensor(BasicFedAvg):
             evaluate_metrics_aggregation_fn=evaluate_metrics_aggregation_fn,
             weighted_aggregation=weighted_aggregation,
             weighted_eval_losses=weighted_eval_losses,
+            dequantize_client_parameters=dequantize_client_parameters,
+            instrument_parameter_exchange=instrument_parameter_exchange,
+            shared_memory_publisher=shared_memory_publisher,
         )
-        self.parameter_packer = SparseCooParameterPacker()
+        self.parameter_packer = SparseCooParameterPacker(index_encoding)
 
     def aggregate_fit(
         self,
@@ -113,8 +133,9 @@ class FedAvgSparseCooTensor(BasicFedAvg):
 
         More precisely, this method performs the following steps:
             1. Align all tensors according to their names.
-            2. For tensors that have the same name, construct the sparse COO tensors and convert them to dense tensors.
-            3. Perform averaging on the dense tensors (can be weighted or unweighted).
+            2. For tensors that have the same name, scatter-add the (possibly weighted) nonzero values of each client
+            directly into a single dense accumulator, without materializing dense copies of client tensors.
+            3. Normalize the accumulated tensors to obtain the weighted or unweighted average.
             4. For every aggregated dense tensor, discard the zero values and retain all information needed
             to represent it in the sparse COO format.
 
@@ -131,12 +152,16 @@ class FedAvgSparseCooTensor(BasicFedAvg):
                 For sparse tensor exchange we also pack in the names of all of the tensors that were aggregated in this
                 phase to allow clients to insert the values into the proper areas of their models.
         """
+        self.release_unread_fit_results(failures)
         if not results:
             return None, {}
         # Do not aggregate if there are failures and failures are not accepted
         if not self.accept_failures and failures:
+            self.release_unread_fit_results(results)
             return None, {}
 
+        results = self.maybe_decode_results(results)
+
         # Convert client tensor weights and names into ndarrays
         weights_results = [
             (parameters_to_ndarrays(fit_res.parameters), fit_res.num_examples) for _, fit_res in results
@@ -151,7 +176,7 @@ class FedAvgSparseCooTensor(BasicFedAvg):
         tensor_shapes = []
 
         for tensor_name, aggregated_tensor in aggregated_tensors.items():
-            selected_parameters, selected_indices, tensor_shape = self.parameter_packer.extract_coo_info_from_dense(
+            selected_parameters, selected_indices, tensor_shape = self.parameter_packer.extract_sparse_info_from_dense(
                 aggregated_tensor
             )
             tensor_names.append(tensor_name)
@@ -203,16 +228,15 @@ class FedAvgSparseCooTensor(BasicFedAvg):
         the shape of that tensor, and finally the name of that tensor.
 
         The first three items constitute the information that is needed
-        to construct the tensor in the sparse COO format and convert
-        it to a regular dense tensor.
+        to represent the tensor in the sparse COO format.
         The tensor name is used to align tensors to ensure that averaging is performed only
         among tensors with the same name.
 
         This method performs the following steps:
             1. Align all tensors according to their names.
-            2. For tensors that have the same name, construct the sparse COO tensors and convert them to dense tensors.
-            3. Perform weighted averaging on the dense tensors according to
-            the number of training examples each client has.
+            2. For tensors that have the same name, scatter-add the nonzero values, scaled by the number of training
+            examples each client has, into a single dense accumulator.
+            3. Normalize by the total number of training examples of the contributing clients.
 
         Note: this method performs weighted averaging.
 
@@ -227,36 +251,7 @@ class FedAvgSparseCooTensor(BasicFedAvg):
             Dict[str, Tensor]: A dictionary mapping the name of the tensor that was aggregated to the aggregated
                 weights.
         """
-        names_to_dense_tensors: DefaultDict[str, List[Tensor]] = defaultdict(list)
-        total_num_examples: DefaultDict[str, int] = defaultdict(int)
-
-        for packed_parameters, num_examples in results:
-            nonzero_parameter_values, additional_info = self.parameter_packer.unpack_parameters(packed_parameters)
-            parameter_indices, tensor_shapes, tensor_names = additional_info
-
-            # Sanity check to ensure that they all have the same length and the length is > 0.
-            assert (
-                len(nonzero_parameter_values) == len(parameter_indices) == len(tensor_shapes) == len(tensor_names)
-                and len(tensor_names) > 0
-            )
-            for tensor_params, tensor_param_indices, tensor_shape, tensor_name in zip(
-                nonzero_parameter_values, parameter_indices, tensor_shapes, tensor_names
-            ):
-                coo_tensor = torch.sparse_coo_tensor(
-                    indices=torch.tensor(tensor_param_indices.T),
-                    values=torch.tensor(tensor_params),
-                    size=torch.Size(tensor_shape),
-                )
-                dense_tensor = coo_tensor.to_dense()
-                names_to_dense_tensors[tensor_name].append(dense_tensor * num_examples)
-                total_num_examples[tensor_name] += num_examples
-
-        names_to_tensors_aggregated = {
-            name_key: (reduce(torch.add, names_to_dense_tensors[name_key]) / total_num_examples[name_key])
-            for name_key in names_to_dense_tensors
-        }
-
-        return names_to_tensors_aggregated
+        return self._accumulate_sparse_tensors(results, weighted=True)
 
     def unweighted_aggregate(self, results: List[Tuple[NDArrays, int]]) -> Dict[str, Tensor]:
         """
@@ -265,15 +260,14 @@ class FedAvgSparseCooTensor(BasicFedAvg):
         the shape of that tensor, and finally the name of that tensor.
 
         The first three items constitute the information that is needed to
-        construct the tensor in the sparse COO format and convert
-        it to a regular dense tensor.
+        represent the tensor in the sparse COO format.
         The tensor name is used to align tensors to ensure that averaging is performed only
         among tensors with the same name.
 
         This method performs the following steps:
             1. Align all tensors according to their names.
-            2. For tensors that have the same name, construct the sparse COO tensors and convert them to dense tensors.
-            3. Perform uniform averaging on the dense tensors across all clients.
+            2. For tensors that have the same name, scatter-add the nonzero values into a single dense accumulator.
+            3. Normalize by the number of contributing clients.
 
         Note: this method performs uniform averaging.
 
@@ -288,14 +282,40 @@ class FedAvgSparseCooTensor(BasicFedAvg):
             Dict[str, Tensor]: A dictionary mapping the name of the tensor that was aggregated to the aggregated
                 weights.
         """
-        names_to_dense_tensors: DefaultDict[str, List[Tensor]] = defaultdict(list)
-        total_num_clients: DefaultDict[str, int] = defaultdict(int)
+        return self._accumulate_sparse_tensors(results, weighted=False)
+
+    def _accumulate_sparse_tensors(self, results: List[Tuple[NDArrays, int]], weighted: bool) -> Dict[str, Tensor]:
+        """
+        Aligns the sparse tensors sent by each client by name and averages them without ever materializing a dense
+        copy of any client's tensor. For each tensor name, a single dense accumulator is allocated the first time the
+        name is seen. Each client's nonzero values (scaled by the client's sample count if weighted) are then
+        scatter-added directly into the accumulator using the flattened COO indices. The total weight associated with
+        each tensor name is tracked alongside the accumulator and used to normalize at the end.
+
+        Server memory therefore scales with the size of the aggregated model plus the entries exchanged by a single
+        client, rather than with the number of clients times the model size. Clients that did not send a particular
+        entry of a tensor contribute zero to that entry, consistent with converting their COO tensors to dense.
+
+        Args:
+            results (List[Tuple[NDArrays, int]]): The packed sparse tensor information from each client and the
+                number of training samples held on each client.
+            weighted (bool): Whether to weight each client's values by its number of training samples.
+
+        Returns:
+            Dict[str, Tensor]: A dictionary mapping the name of the tensor that was aggregated to the aggregated
+                weights.
+        """
+        names_to_accumulators: Dict[str, Tensor] = {}
+        # The dtype of each aggregated tensor, promoted over the dtypes sent by the clients
+        names_to_dtypes: Dict[str, torch.dtype] = {}
+        total_weights: DefaultDict[str, int] = defaultdict(int)
 
-        for packed_parameters, _ in results:
+        for packed_parameters, num_examples in results:
             nonzero_parameter_values, additional_info = self.parameter_packer.unpack_parameters(packed_parameters)
             parameter_indices, tensor_shapes, tensor_names = additional_info
+            client_weight = num_examples if weighted else 1
 
-            # Sanity check.
+            # Sanity check to ensure that they all have the same length and the length is > 0.
             assert (
                 len(nonzero_parameter_values) == len(parameter_indices) == len(tensor_shapes) == len(tensor_names)
                 and len(tensor_names) > 0
@@ -303,18 +323,40 @@ class FedAvgSparseCooTensor(BasicFedAvg):
             for tensor_params, tensor_param_indices, tensor_shape, tensor_name in zip(
                 nonzero_parameter_values, parameter_indices, tensor_shapes, tensor_names
             ):
-                coo_tensor = torch.sparse_coo_tensor(
-                    indices=torch.tensor(tensor_param_indices.T),
-                    values=torch.tensor(tensor_params),
-                    size=torch.Size(tensor_shape),
-                )
-                dense_tensor = coo_tensor.to_dense()
-                names_to_dense_tensors[tensor_name].append(dense_tensor)
-                total_num_clients[tensor_name] += 1
-
-        names_to_tensors_aggregated = {
-            name_key: (reduce(torch.add, names_to_dense_tensors[name_key]) / total_num_clients[name_key])
-            for name_key in names_to_dense_tensors
+                values = torch.from_numpy(tensor_params)
+                # Values are accumulated in at least float32, so that reduced precision values sent by the clients
+                # are not summed in reduced precision.
+                accumulator_dtype = torch.promote_types(values.dtype, torch.float32)
+                if tensor_name not in names_to_accumulators:
+                    names_to_accumulators[tensor_name] = torch.zeros(
+                        torch.Size(tensor_shape.tolist()), dtype=accumulator_dtype
+                    )
+                    names_to_dtypes[tensor_name] = values.dtype
+                else:
+                    names_to_dtypes[tensor_name] = torch.promote_types(names_to_dtypes[tensor_name], values.dtype)
+                accumulator = names_to_accumulators[tensor_name]
+                if torch.promote_types(accumulator.dtype, accumulator_dtype) != accumulator.dtype:
+                    # A client sent values of a wider dtype than those accumulated so far
+                    accumulator = accumulator.to(torch.promote_types(accumulator.dtype, accumulator_dtype))
+                    names_to_accumulators[tensor_name] = accumulator
+                assert list(accumulator.shape) == tensor_shape.tolist(), f"Shape mismatch for tensor {tensor_name}"
+
+                if values.numel() > 0:
+                    # Decode the indices, in whichever encoding the client used, into linear indices into the
+                    # flattened accumulator.
+                    flat_indices = torch.from_numpy(
+                        self.parameter_packer.flat_indices_from_sparse_info(tensor_param_indices, tensor_shape)
+                    )
+                    values = values.to(accumulator.dtype)
+                    accumulator.view(-1).index_add_(0, flat_indices, values * client_weight if weighted else values)
+                total_weights[tensor_name] += client_weight
+
+        # Floating point tensors are cast back, once, to the dtype sent by the clients
+        return {
+            name_key: self._cast_aggregate(accumulator / total_weights[name_key], names_to_dtypes[name_key])
+            for name_key, accumulator in names_to_accumulators.items()
         }
 
-        return names_to_tensors_aggregated
+    @staticmethod
+    def _cast_aggregate(aggregate: Tensor, client_dtype: torch.dtype) -> Tensor:
+        return aggregate.to(client_dtype) if client_dtype.is_floating_point else aggregate
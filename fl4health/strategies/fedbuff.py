@@ -0,0 +1,309 @@
+from logging import WARNING
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from flwr.common import EvaluateIns, FitIns, MetricsAggregationFn, NDArrays, Parameters
+from flwr.common.logger import log
+from flwr.common.typing import FitRes, Scalar
+from flwr.server.client_manager import ClientManager
+from flwr.server.client_proxy import ClientProxy
+from flwr.server.criterion import Criterion
+
+from fl4health.client_managers.base_sampling_manager import BaseFractionSamplingManager
+from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.utils.serialization import ndarrays_to_parameters, parameters_to_ndarrays
+
+# A client result along with the version of the global model that the client started training from.
+BufferedFitResult = Tuple[ClientProxy, FitRes, int]
+
+
+class IdleClientCriterion(Criterion):
+    def __init__(self, busy_client_ids: Set[str]) -> None:
+        """
+        Criterion used to restrict client sampling to those clients that are not currently busy training.
+
+        Args:
+            busy_client_ids (Set[str]): The cids of the clients that should not be selected.
+        """
+        self.busy_client_ids = busy_client_ids
+
+    def select(self, client: ClientProxy) -> bool:
+        return client.cid not in self.busy_client_ids
+
+
+class FedBuff(BasicFedAvg):
+    def __init__(
+        self,
+        *,
+        initial_parameters: Parameters,
+        fraction_fit: float = 1.0,
+        fraction_evaluate: float = 1.0,
+        min_fit_clients: int = 2,
+        min_evaluate_clients: int = 2,
+        min_available_clients: int = 2,
+        evaluate_fn: Optional[
+            Callable[
+                [int, NDArrays, Dict[str, Scalar]],
+                Optional[Tuple[float, Dict[str, Scalar]]],
+            ]
+        ] = None,
+        on_fit_config_fn: Optional[Callable[[int], Dict[str, Scalar]]] = None,
+        on_evaluate_config_fn: Optional[Callable[[int], Dict[str, Scalar]]] = None,
+        accept_failures: bool = True,
+        fit_metrics_aggregation_fn: Optional[MetricsAggregationFn] = None,
+        evaluate_metrics_aggregation_fn: Optional[MetricsAggregationFn] = None,
+        weighted_aggregation: bool = True,
+        weighted_eval_losses: bool = True,
+        buffer_size: int = 2,
+        staleness_exponent: float = 0.5,
+        server_learning_rate: float = 1.0,
+    ) -> None:
+        """
+        Buffered asynchronous FedAvg (FedBuff). The server aggregates as soon as buffer_size client updates have
+        arrived, rather than waiting for every sampled client. Clients that are still training continue to do so
+        against the (older) global model they received, and their updates are down-weighted according to their
+        staleness once they arrive. Staleness is the number of global model updates that occurred between the client
+        receiving the model and its update being aggregated. This strategy is intended to be used with the
+        AsyncFlServer, but also functions with a synchronous server, where all updates have zero staleness.
+
+        Each client update is converted to a delta with respect to the global model it was trained from. Then
+                w = w + server_learning_rate * sum_k (n_k * s(tau_k) * delta_k) / sum_k n_k,
+        where n_k are the client sample counts (or 1 for uniform averaging) and s(tau) = (1 + tau)^(-a) is the
+        polynomial staleness weighting with a = staleness_exponent.
+
+        Paper: https://arxiv.org/abs/2106.06639
+
+        Args:
+            initial_parameters (Parameters): Initial global model parameters. Required to compute client deltas.
+            fraction_fit (float, optional): Fraction of the idle clients sampled for training each time the server
+                tops up the set of training clients. Defaults to 1.0.
+            fraction_evaluate (float, optional): Fraction of clients used during validation. Defaults to 1.0.
+            min_fit_clients (int, optional): Minimum number of clients used during training. Defaults to 2.
+            min_evaluate_clients (int, optional): Minimum number of clients used during validation. Defaults to 2.
+            min_available_clients (int, optional): Minimum number of total clients in the system.
+                Defaults to 2.
+            evaluate_fn (Optional[
+                Callable[[int, NDArrays, Dict[str, Scalar]], Optional[Tuple[float, Dict[str, Scalar]]]]
+            ]):
+                Optional function used for central server-side evaluation. Defaults to None.
+            on_fit_config_fn (Optional[Callable[[int], Dict[str, Scalar]]], optional):
+                Function used to configure training by providing a configuration dictionary. Defaults to None.
+            on_evaluate_config_fn (Optional[Callable[[int], Dict[str, Scalar]]], optional):
+                Function used to configure server-side central validation by providing a Config dictionary.
+                Defaults to None.
+            accept_failures (bool, optional): Whether or not accept rounds containing failures. Defaults to True.
+            fit_metrics_aggregation_fn (Optional[MetricsAggregationFn], optional): Metrics aggregation function.
+                Defaults to None.
+            evaluate_metrics_aggregation_fn (Optional[MetricsAggregationFn], optional): Metrics aggregation function.
+                Defaults to None.
+            weighted_aggregation (bool, optional): Determines whether the client deltas are weighted by client
+                dataset counts or uniformly in the buffered average. Defaults to True.
+            weighted_eval_losses (bool, optional): Determines whether losses during evaluation are linearly weighted
+                averages or a uniform average. FedAvg default is weighted average of the losses by client dataset
+                counts. Defaults to True.
+            buffer_size (int, optional): Number of client updates (K) to buffer before performing an aggregation.
+                Defaults to 2.
+            staleness_exponent (float, optional): Exponent of the polynomial staleness down-weighting. A value of 0
+                disables staleness weighting. Defaults to 0.5.
+            server_learning_rate (float, optional): Learning rate applied to the aggregated client delta.
+                Defaults to 1.0.
+        """
+        assert buffer_size >= 1, "buffer_size must be at least 1"
+        assert staleness_exponent >= 0.0, "staleness_exponent must be non-negative"
+        super().__init__(
+            fraction_fit=fraction_fit,
+            fraction_evaluate=fraction_evaluate,
+            min_fit_clients=min_fit_clients,
+            min_evaluate_clients=min_evaluate_clients,
+            min_available_clients=min_available_clients,
+            evaluate_fn=evaluate_fn,
+            on_fit_config_fn=on_fit_config_fn,
+            on_evaluate_config_fn=on_evaluate_config_fn,
+            accept_failures=accept_failures,
+            initial_parameters=initial_parameters,
+            fit_metrics_aggregation_fn=fit_metrics_aggregation_fn,
+            evaluate_metrics_aggregation_fn=evaluate_metrics_aggregation_fn,
+            weighted_aggregation=weighted_aggregation,
+            weighted_eval_losses=weighted_eval_losses,
+        )
+        self.buffer_size = buffer_size
+        self.staleness_exponent = staleness_exponent
+        self.server_learning_rate = server_learning_rate
+
+        self.server_model_weights = parameters_to_ndarrays(initial_parameters)
+        # The version of the global model is incremented each time an aggregation is performed. Older versions are
+        # retained only while clients that started from them are still training.
+        self.model_version = 0
+        self.model_versions: Dict[int, NDArrays] = {self.model_version: self.server_model_weights}
+        # Clients currently training (as tracked by the server) are excluded from sampling
+        self.busy_client_ids: Set[str] = set()
+
+    def staleness_weight(self, staleness: int) -> float:
+        """
+        Polynomial staleness weighting s(tau) = (1 + tau)^(-a).
+
+        Args:
+            staleness (int): Number of global model updates since the client received its model.
+
+        Returns:
+            float: Multiplicative weight applied to the client's update.
+        """
+        return float((1.0 + staleness) ** (-self.staleness_exponent))
+
+    def set_busy_clients(self, busy_client_ids: Set[str]) -> None:
+        """
+        Informs the strategy of which clients are currently training so that they are not sampled for further
+        training or evaluation until they have returned their updates.
+
+        Args:
+            busy_client_ids (Set[str]): cids of the clients that are currently training.
+        """
+        self.busy_client_ids = set(busy_client_ids)
+
+    def prune_model_versions(self, active_versions: Set[int]) -> None:
+        """
+        Discards stored global models that are no longer needed to compute client deltas. The current version is
+        always retained.
+
+        Args:
+            active_versions (Set[int]): Versions of the global model that clients still in training started from.
+        """
+        retained_versions = active_versions | {self.model_version}
+        self.model_versions = {
+            version: weights for version, weights in self.model_versions.items() if version in retained_versions
+        }
+
+    def configure_fit(
+        self, server_round: int, parameters: Parameters, client_manager: ClientManager
+    ) -> List[Tuple[ClientProxy, FitIns]]:
+        """
+        Samples idle clients for training. Clients that are currently training, as reported by the server through
+        set_busy_clients, are excluded from sampling.
+
+        Args:
+            server_round (int): Indicates the server round we're currently on.
+            parameters (Parameters): The parameters to be used to initialize the clients for the fit round.
+            client_manager (ClientManager): The manager used to sample from the available clients.
+
+        Returns:
+            List[Tuple[ClientProxy, FitIns]]: List of sampled client identifiers and the configuration/parameters to
+                be sent to each client (packaged as FitIns).
+        """
+        config = {}
+        if self.on_fit_config_fn is not None:
+            # Custom fit config function provided
+            config = self.on_fit_config_fn(server_round)
+        fit_ins = FitIns(parameters, config)
+        criterion = IdleClientCriterion(self.busy_client_ids)
+
+        if isinstance(client_manager, BaseFractionSamplingManager):
+            clients = client_manager.sample_fraction(self.fraction_fit, self.min_available_clients, criterion)
+        else:
+            num_available = client_manager.num_available()
+            num_idle = num_available - len(self.busy_client_ids & set(client_manager.all().keys()))
+            sample_size, _ = self.num_fit_clients(num_available)
+            sample_size = min(sample_size, num_idle)
+            if sample_size <= 0:
+                return []
+            clients = client_manager.sample(sample_size, self.min_available_clients, criterion)
+
+        return [(client, fit_ins) for client in clients]
+
+    def configure_evaluate(
+        self, server_round: int, parameters: Parameters, client_manager: ClientManager
+    ) -> List[Tuple[ClientProxy, EvaluateIns]]:
+        """
+        Configures federated evaluation as in BasicFedAvg, but skips clients that are still busy training.
+
+        Args:
+            server_round (int): Indicates the server round we're currently on.
+            parameters (Parameters): The parameters to be used to initialize the clients for the eval round.
+            client_manager (ClientManager): The manager used to sample from the available clients.
+
+        Returns:
+            List[Tuple[ClientProxy, EvaluateIns]]: List of sampled client identifiers and the configuration/parameters
+                to be sent to each client (packaged as EvaluateIns).
+        """
+        client_instructions = super().configure_evaluate(server_round, parameters, client_manager)
+        return [(client, ins) for client, ins in client_instructions if client.cid not in self.busy_client_ids]
+
+    def aggregate_fit(
+        self,
+        server_round: int,
+        results: List[Tuple[ClientProxy, FitRes]],
+        failures: List[Union[Tuple[ClientProxy, FitRes], BaseException]],
+    ) -> Tuple[Optional[Parameters], Dict[str, Scalar]]:
+        """
+        Synchronous entry point. All results are assumed to have been trained from the current global model, so they
+        have zero staleness.
+
+        Args:
+            server_round (int): Indicates the server round we're currently on.
+            results (List[Tuple[ClientProxy, FitRes]]): The client identifiers and the results of their local training
+                that need to be aggregated on the server-side.
+            failures (List[Union[Tuple[ClientProxy, FitRes], BaseException]]): These are the results and exceptions
+                from clients that experienced an issue during training, such as timeouts or exceptions.
+
+        Returns:
+            Tuple[Optional[Parameters], Dict[str, Scalar]]: The aggregated model weights and the metrics dictionary.
+        """
+        buffered_results = [(client, fit_res, self.model_version) for client, fit_res in results]
+        return self.aggregate_buffered_fit(server_round, buffered_results, failures)
+
+    def aggregate_buffered_fit(
+        self,
+        server_round: int,
+        results: List[BufferedFitResult],
+        failures: List[Union[Tuple[ClientProxy, FitRes], BaseException]],
+    ) -> Tuple[Optional[Parameters], Dict[str, Scalar]]:
+        """
+        Aggregates a buffer of client updates, each tagged with the version of the global model from which the
+        client started training. Updates are converted to deltas with respect to that version and down-weighted
+        according to their staleness before being applied to the current global model.
+
+        Args:
+            server_round (int): Indicates the server round we're currently on.
+            results (List[BufferedFitResult]): The client identifiers, the results of their local training and the
+                version of the global model that each client trained from.
+            failures (List[Union[Tuple[ClientProxy, FitRes], BaseException]]): These are the results and exceptions
+                from clients that experienced an issue during training, such as timeouts or exceptions.
+
+        Returns:
+            Tuple[Optional[Parameters], Dict[str, Scalar]]: The updated global model weights and the metrics
+                dictionary.
+        """
+        if not results:
+            return None, {}
+        # Do not aggregate if there are failures and failures are not accepted
+        if not self.accept_failures and failures:
+            return None, {}
+
+        running_sums = [np.zeros(weights.shape, dtype=np.float64) for weights in self.server_model_weights]
+        total_weight = 0.0
+        for _, fit_res, base_version in results:
+            assert base_version in self.model_versions, f"Global model version {base_version} is no longer stored"
+            sample_weight = float(fit_res.num_examples) if self.weighted_aggregation else 1.0
+            total_weight += sample_weight
+            update_weight = sample_weight * self.staleness_weight(self.model_version - base_version)
+            client_weights = parameters_to_ndarrays(fit_res.parameters)
+            for running_sum, client_layer, base_layer in zip(
+                running_sums, client_weights, self.model_versions[base_version]
+            ):
+                running_sum += update_weight * (client_layer - base_layer)
+
+        self.server_model_weights = [
+            (weights + (self.server_learning_rate / total_weight) * running_sum).astype(weights.dtype)
+            for weights, running_sum in zip(self.server_model_weights, running_sums)
+        ]
+        self.model_version += 1
+        self.model_versions[self.model_version] = self.server_model_weights
+
+        # Aggregate custom metrics if aggregation fn was provided
+        metrics_aggregated = {}
+        if self.fit_metrics_aggregation_fn:
+            fit_metrics = [(res.num_examples, res.metrics) for _, res, _ in results]
+            metrics_aggregated = self.fit_metrics_aggregation_fn(fit_metrics)
+        elif server_round == 1:  # Only log this warning once
+            log(WARNING, "No fit_metrics_aggregation_fn provided")
+
+        return ndarrays_to_parameters(self.server_model_weights), metrics_aggregated
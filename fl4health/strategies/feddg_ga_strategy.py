@@ -3,7 +3,7 @@ from logging import WARNING
 from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
-from flwr.common import MetricsAggregationFn, NDArrays, Parameters, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.common import MetricsAggregationFn, NDArrays, Parameters
 from flwr.common.logger import log
 from flwr.common.typing import EvaluateRes, FitIns, FitRes, Scalar
 from flwr.server.client_manager import ClientManager
@@ -11,6 +11,8 @@ from flwr.server.client_proxy import ClientProxy
 from flwr.server.strategy import FedAvg
 
 from fl4health.client_managers.fixed_sampling_client_manager import FixedSamplingClientManager
+from fl4health.utils.flat_parameters import FlatParameters, parameters_layout
+from fl4health.utils.serialization import ndarrays_to_parameters
 
 
 class SignalForTypeException(Exception):
@@ -187,6 +189,9 @@ class FedDgGaStrategy(FedAvg):
         self.num_rounds: Optional[int] = None
         self.initial_adjustment_weight: Optional[float] = None
         self.adjustment_weights: Dict[str, float] = {}
+        # Flat buffers for the weighted aggregation of client parameters, which persist across rounds
+        self.accumulation_buffer: Optional[FlatParameters] = None
+        self.decode_buffer: Optional[FlatParameters] = None
 
     def configure_fit(
         self,
@@ -305,15 +310,21 @@ class FedDgGaStrategy(FedAvg):
         """
         Aggregate results by weighing them against the adjustment weights and then summing them.
 
+        Each client's parameters are decoded into a single flat decode buffer and added, scaled by the client's
+        adjustment weight, to a flat accumulator in place. Both buffers persist across rounds, so aggregation holds
+        one accumulator and one decode buffer in memory regardless of the number of clients.
+
         Args:
             results: (List[Tuple[ClientProxy, FitRes]]) The clients' fit results.
 
         Returns:
-            (NDArrays) the weighted and aggregated results.
+            (NDArrays) the weighted and aggregated results. NOTE: These are views of the accumulator, which is
+            overwritten in the next call.
         """
+        assert len(results) > 0
+        accumulator, decode_buffer = self._maybe_allocate_aggregation_buffers(results[0][1].parameters)
 
-        aggregated_results: Optional[NDArrays] = None
-        for client_proxy, fit_res in results:
+        for client_index, (client_proxy, fit_res) in enumerate(results):
             cid = client_proxy.cid
 
             # initializing adjustment weights for this client if they don't exist yet
@@ -321,21 +332,29 @@ class FedDgGaStrategy(FedAvg):
                 assert self.initial_adjustment_weight is not None
                 self.adjustment_weights[cid] = self.initial_adjustment_weight
 
-            # apply adjustment weights
-            weighted_client_parameters = parameters_to_ndarrays(fit_res.parameters)
-            for i in range(len(weighted_client_parameters)):
-                weighted_client_parameters[i] = weighted_client_parameters[i] * self.adjustment_weights[cid]
-
-            # sum weighted parameters
-            if aggregated_results is None:
-                aggregated_results = weighted_client_parameters
+            # apply adjustment weights and sum weighted parameters in place
+            if client_index == 0:
+                FlatParameters.from_parameters(fit_res.parameters, out=accumulator)
+                np.multiply(accumulator.buffer, self.adjustment_weights[cid], out=accumulator.buffer)
             else:
-                assert len(weighted_client_parameters) == len(aggregated_results)
-                for i in range(len(weighted_client_parameters)):
-                    aggregated_results[i] = aggregated_results[i] + weighted_client_parameters[i]
-
-        assert aggregated_results is not None
-        return aggregated_results
+                FlatParameters.from_parameters(fit_res.parameters, out=decode_buffer)
+                np.multiply(decode_buffer.buffer, self.adjustment_weights[cid], out=decode_buffer.buffer)
+                np.add(accumulator.buffer, decode_buffer.buffer, out=accumulator.buffer)
+
+        return accumulator.to_ndarrays()
+
+    def _maybe_allocate_aggregation_buffers(self, parameters: Parameters) -> Tuple[FlatParameters, FlatParameters]:
+        # The buffers are reused across rounds as long as the layout of the client parameters does not change
+        shapes, dtype = parameters_layout(parameters)
+        if (
+            self.accumulation_buffer is None
+            or self.decode_buffer is None
+            or self.accumulation_buffer.shapes != shapes
+            or self.accumulation_buffer.dtype != dtype
+        ):
+            self.accumulation_buffer = FlatParameters.empty(shapes, dtype)
+            self.decode_buffer = FlatParameters.empty(shapes, dtype)
+        return self.accumulation_buffer, self.decode_buffer
 
     def update_weights_by_ga(self, server_round: int, cids: List[str]) -> None:
         """
@@ -379,25 +398,22 @@ class FedDgGaStrategy(FedAvg):
             normalized_generalization_gaps = (var_generalization_gaps * step_size) / max_var_generalization_gap
 
         # updating weights
-        new_total_weight = 0.0
-        for i in range(len(cids)):
-            cid = cids[i]
-            # For loss values, large and **positive** gaps imply worse generalization of global
-            # weights to local models. Therefore, we want to **increase** weight for these model
-            # parameters to improve generalization. So signal is positive. For accuracy, large
-            # **negative** gaps imply worse generalization. So the signal is -1.0, to increase
-            # weights for the associated model parameters.
-            self.adjustment_weights[cid] += self.fairness_metric.signal * normalized_generalization_gaps[i]
-
-            # Weight clip
-            # The paper states the clipping only happens for values below 0 but the reference
-            # implementation also clips values larger than 1, probably as an extra assurance.
-            clipped_weight = np.clip(self.adjustment_weights[cid], 0.0, 1.0)
-            self.adjustment_weights[cid] = clipped_weight
-            new_total_weight += clipped_weight
+        # For loss values, large and **positive** gaps imply worse generalization of global
+        # weights to local models. Therefore, we want to **increase** weight for these model
+        # parameters to improve generalization. So signal is positive. For accuracy, large
+        # **negative** gaps imply worse generalization. So the signal is -1.0, to increase
+        # weights for the associated model parameters.
+        adjustment_weights = np.array([self.adjustment_weights[cid] for cid in cids], dtype=np.float64)
+        adjustment_weights += self.fairness_metric.signal * normalized_generalization_gaps
 
-        for cid in cids:
-            self.adjustment_weights[cid] /= new_total_weight
+        # Weight clip
+        # The paper states the clipping only happens for values below 0 but the reference
+        # implementation also clips values larger than 1, probably as an extra assurance.
+        np.clip(adjustment_weights, 0.0, 1.0, out=adjustment_weights)
+        adjustment_weights /= np.sum(adjustment_weights)
+
+        for cid, adjustment_weight in zip(cids, adjustment_weights):
+            self.adjustment_weights[cid] = float(adjustment_weight)
 
     def get_current_weight_step_size(self, server_round: int) -> float:
         """
@@ -1,8 +1,9 @@
+from dataclasses import replace
 from logging import INFO, WARNING
 from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
-from flwr.common import MetricsAggregationFn, NDArrays, Parameters, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.common import MetricsAggregationFn, NDArrays, Parameters
 from flwr.common.logger import log
 from flwr.common.typing import FitRes, Scalar
 from flwr.server.client_proxy import ClientProxy
@@ -10,6 +11,10 @@ from flwr.server.client_proxy import ClientProxy
 from fl4health.parameter_exchange.parameter_packer import ParameterPackerFedProx
 from fl4health.strategies.aggregate_utils import aggregate_losses, aggregate_results
 from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.strategies.memory_mapped_aggregate import MemoryMappedAggregator, decode_tensors
+from fl4health.strategies.parallel_aggregate import ParallelAggregationBackend
+from fl4health.strategies.server_optimizers import ServerOptimizer
+from fl4health.utils.serialization import bytes_to_ndarray, ndarrays_to_parameters, parameters_to_ndarrays
 
 
 class FedProx(BasicFedAvg):
@@ -39,6 +44,9 @@ class FedProx(BasicFedAvg):
         proximal_weight_patience: int = 5,
         weighted_aggregation: bool = True,
         weighted_eval_losses: bool = True,
+        aggregation_backend: Optional[ParallelAggregationBackend] = None,
+        memory_mapped_aggregator: Optional[MemoryMappedAggregator] = None,
+        server_optimizer: Optional[ServerOptimizer] = None,
         weighted_train_losses: bool = False,
     ) -> None:
         """
@@ -87,6 +95,17 @@ class FedProx(BasicFedAvg):
             weighted_eval_losses (bool, optional): Determines whether losses during evaluation are linearly weighted
                 averages or a uniform average. FedAvg default is weighted average of the losses by client dataset
                 counts. Defaults to True.
+            aggregation_backend (Optional[ParallelAggregationBackend], optional): If provided, the layer-wise
+                reductions performed during aggregation are parallelized across the backend's thread pool. Each
+                element is reduced with the same operations, in the same order, as without a backend, so the results
+                are bit-identical. Defaults to None.
+            memory_mapped_aggregator (Optional[MemoryMappedAggregator], optional): If provided, model weights are
+                aggregated out-of-core by spilling client updates to memory-mapped files, as they arrive with servers
+                supporting incremental aggregation (see BasicFedAvg). This takes precedence over aggregation_backend.
+                Defaults to None.
+            server_optimizer (Optional[ServerOptimizer], optional): If provided, the aggregated model weights are used
+                to take a server-side optimizer step (i.e. FedAdam, FedYogi or FedAvgM), which produces the new
+                global model weights. Defaults to None.
             weighted_train_losses (bool, optional): Determines whether the training losses from the clients should be
                 aggregated using a weighted or unweighted average. These aggregated losses are used to adjust the
                 proximal weight in the adaptive setting. Defaults to False.
@@ -103,7 +122,6 @@ class FedProx(BasicFedAvg):
         self.previous_loss = float("inf")
 
         self.server_model_weights = parameters_to_ndarrays(initial_parameters)
-        initial_parameters.tensors.extend(ndarrays_to_parameters([np.array(proximal_weight)]).tensors)
 
         super().__init__(
             fraction_fit=fraction_fit,
@@ -120,9 +138,17 @@ class FedProx(BasicFedAvg):
             evaluate_metrics_aggregation_fn=evaluate_metrics_aggregation_fn,
             weighted_aggregation=weighted_aggregation,
             weighted_eval_losses=weighted_eval_losses,
+            aggregation_backend=aggregation_backend,
+            memory_mapped_aggregator=memory_mapped_aggregator,
+            server_optimizer=server_optimizer,
         )
+        # The proximal weight is packed in after the base class has initialized the server optimizer with the
+        # model weights.
+        initial_parameters.tensors.extend(ndarrays_to_parameters([np.array(proximal_weight)]).tensors)
         self.parameter_packer = ParameterPackerFedProx()
         self.weighted_train_losses = weighted_train_losses
+        # Training losses of the results accumulated this round, when results are aggregated incrementally
+        self.accumulated_train_losses_and_counts: List[Tuple[int, float]] = []
 
     def aggregate_fit(
         self,
@@ -153,19 +179,24 @@ class FedProx(BasicFedAvg):
         if not self.accept_failures and failures:
             return None, {}
 
-        # Convert results with packed params of model weights and training loss
-        weights_and_counts: List[Tuple[NDArrays, int]] = []
-        train_losses_and_counts: List[Tuple[int, float]] = []
-        for _, fit_res in results:
-            sample_count = fit_res.num_examples
-            updated_weights, train_loss = self.parameter_packer.unpack_parameters(
-                parameters_to_ndarrays(fit_res.parameters)
-            )
-            weights_and_counts.append((updated_weights, sample_count))
-            train_losses_and_counts.append((sample_count, train_loss))
+        if self.memory_mapped_aggregator is not None:
+            weights_aggregated, train_losses_and_counts = self._aggregate_out_of_core(results)
+        else:
+            # Convert results with packed params of model weights and training loss
+            weights_and_counts: List[Tuple[NDArrays, int]] = []
+            train_losses_and_counts = []
+            for _, fit_res in results:
+                sample_count = fit_res.num_examples
+                updated_weights, train_loss = self.parameter_packer.unpack_parameters(
+                    parameters_to_ndarrays(fit_res.parameters)
+                )
+                weights_and_counts.append((updated_weights, sample_count))
+                train_losses_and_counts.append((sample_count, train_loss))
 
-        # Aggregate them in a weighted or unweighted fashion based on settings.
-        weights_aggregated = aggregate_results(weights_and_counts, self.weighted_aggregation)
+            # Aggregate them in a weighted or unweighted fashion based on settings.
+            weights_aggregated = aggregate_results(
+                weights_and_counts, self.weighted_aggregation, self.aggregation_backend
+            )
 
         # Aggregate train loss
         train_losses_aggregated = aggregate_losses(train_losses_and_counts, self.weighted_train_losses)
@@ -180,9 +211,64 @@ class FedProx(BasicFedAvg):
         elif server_round == 1:  # Only log this warning once
             log(WARNING, "No fit_metrics_aggregation_fn provided")
 
+        weights_aggregated = self.maybe_apply_server_optimizer(weights_aggregated)
         parameters = self.parameter_packer.pack_parameters(weights_aggregated, self.proximal_weight)
         return ndarrays_to_parameters(parameters), metrics_aggregated
 
+    def _aggregate_out_of_core(
+        self, results: List[Tuple[ClientProxy, FitRes]]
+    ) -> Tuple[NDArrays, List[Tuple[int, float]]]:
+        assert self.memory_mapped_aggregator is not None
+        train_losses_and_counts: List[Tuple[int, float]] = []
+        for _, fit_res in results:
+            # The packer appends the training loss as the final tensor, so it can be decoded on its own.
+            train_loss = float(bytes_to_ndarray(fit_res.parameters.tensors[-1]))
+            train_losses_and_counts.append((fit_res.num_examples, train_loss))
+        # The model weights are decoded lazily, skipping the trailing loss, as they are spilled to disk.
+        weights_results = (
+            (decode_tensors(fit_res.parameters, end=-1), fit_res.num_examples) for _, fit_res in results
+        )
+        weights_aggregated = self.memory_mapped_aggregator.aggregate(weights_results, self.weighted_aggregation)
+        return weights_aggregated, train_losses_and_counts
+
+    def begin_incremental_aggregation(self, server_round: int) -> None:
+        super().begin_incremental_aggregation(server_round)
+        self.accumulated_train_losses_and_counts = []
+
+    def accumulate_parameters(self, fit_res: FitRes) -> None:
+        """
+        Records the training loss packed by the client and folds the client's model weights into the running
+        aggregate of the round.
+
+        Args:
+            fit_res (FitRes): The result of a client's local training, with the model weights and training loss
+                packed in its parameters.
+        """
+        # The packer appends the training loss as the final tensor, so it can be decoded on its own.
+        train_loss = float(bytes_to_ndarray(fit_res.parameters.tensors[-1]))
+        self.accumulated_train_losses_and_counts.append((fit_res.num_examples, train_loss))
+        weights = Parameters(tensors=fit_res.parameters.tensors[:-1], tensor_type=fit_res.parameters.tensor_type)
+        super().accumulate_parameters(replace(fit_res, parameters=weights))
+
+    def aggregate_accumulated_parameters(self, server_round: int) -> Parameters:
+        """
+        Produces the new global model weights from those accumulated this round and, if applicable, updates the
+        proximal weight based on the aggregated training loss, as in aggregate_fit.
+
+        Args:
+            server_round (int): Indicates the server round we're currently on.
+
+        Returns:
+            Parameters: The new global model weights, packed with the proximal weight.
+        """
+        weights_aggregated = self.compute_accumulated_arrays()
+        train_losses_aggregated = aggregate_losses(
+            self.accumulated_train_losses_and_counts, self.weighted_train_losses
+        )
+        self._maybe_update_proximal_weight_param(float(train_losses_aggregated))
+        weights_aggregated = self.maybe_apply_server_optimizer(weights_aggregated)
+        return ndarrays_to_parameters(self.parameter_packer.pack_parameters(weights_aggregated, self.proximal_weight))
+
     def _maybe_update_proximal_weight_param(self, loss: float) -> None:
         """
         Update proximal weight parameter if adaptive_proximal_weight is set to True. Regardless of whether adaptivity
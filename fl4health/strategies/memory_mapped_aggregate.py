@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from flwr.common import NDArray, NDArrays, Parameters
+
+from fl4health.utils.serialization import bytes_to_ndarray
+
+# (offset in bytes, shape, dtype) of each layer stored in a client's spill file
+SpillLayout = List[Tuple[int, Tuple[int, ...], np.dtype]]
+
+
+def decode_tensors(parameters: Parameters, start: int = 0, end: Optional[int] = None) -> Iterable[NDArray]:
+    """
+    Lazily decodes the serialized tensors of a Parameters object so that only one tensor needs to be in memory at
+    a time.
+
+    Args:
+        parameters (Parameters): Serialized parameters.
+        start (int, optional): Index of the first tensor to decode. Defaults to 0.
+        end (Optional[int], optional): Index one past the last tensor to decode. If None, decodes through the final
+            tensor. Defaults to None.
+
+    Yields:
+        NDArray: The decoded tensors in order.
+    """
+    for tensor in parameters.tensors[start:end]:
+        yield bytes_to_ndarray(tensor)
+
+
+class MemoryMappedAggregator:
+    def __init__(self, spill_directory: Optional[str] = None, chunk_size: int = 2**22) -> None:
+        """
+        Out-of-core aggregation of client updates for models that are too large to hold several copies of in memory.
+        Each client update is decoded one tensor at a time and written straight to a spill file as it arrives (see
+        spill), after which the serialized update can be released. The average is then computed by streaming over the
+        spill files chunk by chunk through np.memmap, so that only a single chunk per client (and the aggregated
+        model) is resident in memory. Spill files are removed as soon as the aggregation completes, even if it fails.
+
+        Args:
+            spill_directory (Optional[str], optional): Directory in which temporary spill files are created. If None,
+                the system default temporary directory is used. Defaults to None.
+            chunk_size (int, optional): Number of elements of each layer to aggregate at a time. Bounds the memory
+                used to accumulate each chunk. Defaults to 2**22.
+        """
+        assert chunk_size >= 1, "chunk_size must be at least 1"
+        self.spill_directory = spill_directory
+        self.chunk_size = chunk_size
+        # The directory holding the spill files of the updates of the current aggregation, created on the first spill
+        self.round_spill_directory: Optional[str] = None
+        self.spill_paths: List[str] = []
+        self.layouts: List[SpillLayout] = []
+        self.num_examples: List[int] = []
+
+    @property
+    def num_updates(self) -> int:
+        return len(self.spill_paths)
+
+    def clear(self) -> None:
+        """Removes the spill files of the updates spilled so far, so that the aggregator may be reused."""
+        if self.round_spill_directory is not None:
+            shutil.rmtree(self.round_spill_directory, ignore_errors=True)
+        self.round_spill_directory = None
+        self.spill_paths = []
+        self.layouts = []
+        self.num_examples = []
+
+    def spill(self, ndarrays: Iterable[NDArray], num_examples: int) -> None:
+        """
+        Writes a single client's update to a new spill file, consuming the arrays one at a time.
+
+        Args:
+            ndarrays (Iterable[NDArray]): The client's arrays, possibly lazily decoded (see decode_tensors).
+            num_examples (int): The number of relevant samples held by the client.
+        """
+        if self.round_spill_directory is None:
+            self.round_spill_directory = tempfile.mkdtemp(prefix="fl4health_spill_", dir=self.spill_directory)
+        spill_path = os.path.join(self.round_spill_directory, f"client_{self.num_updates}.bin")
+        layout: SpillLayout = []
+        with open(spill_path, "wb") as spill_file:
+            for layer in ndarrays:
+                layout.append((spill_file.tell(), layer.shape, layer.dtype))
+                np.ascontiguousarray(layer).tofile(spill_file)
+        self.spill_paths.append(spill_path)
+        self.layouts.append(layout)
+        self.num_examples.append(num_examples)
+
+    def _aggregate_layer(self, layer_index: int, weights: List[float]) -> NDArray:
+        _, shape, dtype = self.layouts[0][layer_index]
+        size = int(np.prod(shape))
+        total_weight = sum(weights)
+        output_dtype = dtype if np.issubdtype(dtype, np.floating) else np.dtype(np.float64)
+        aggregated_layer = np.empty(size, dtype=output_dtype)
+        if size == 0:
+            return aggregated_layer.reshape(shape)
+
+        client_layers = []
+        for spill_path, layout in zip(self.spill_paths, self.layouts):
+            offset, client_shape, client_dtype = layout[layer_index]
+            assert client_shape == shape, f"Layer {layer_index} has shape {client_shape}, expected {shape}"
+            client_layers.append(np.memmap(spill_path, dtype=client_dtype, mode="r", offset=offset, shape=(size,)))
+
+        for start in range(0, size, self.chunk_size):
+            end = min(start + self.chunk_size, size)
+            chunk_sum = np.zeros(end - start, dtype=np.float64)
+            for client_layer, weight in zip(client_layers, weights):
+                chunk_sum += weight * client_layer[start:end]
+            aggregated_layer[start:end] = chunk_sum / total_weight
+        # Release the mappings before the spill files are removed
+        del client_layers
+        return aggregated_layer.reshape(shape)
+
+    def compute(self, weighted: bool = True) -> NDArrays:
+        """
+        Computes the weighted or unweighted average of the updates spilled so far and removes the spill files.
+
+        Args:
+            weighted (bool, optional): Whether or not the aggregation is a weighted average (by the sample counts
+                provided with each update) or a uniform average. Defaults to True.
+
+        Returns:
+            NDArrays: Aggregated numpy arrays by the desired averaging. Floating point layers retain the dtype of the
+                client updates, other layers are averaged into float64.
+        """
+        try:
+            assert self.num_updates > 0, "No client updates were provided for aggregation"
+            num_layers = len(self.layouts[0])
+            assert all(
+                len(layout) == num_layers for layout in self.layouts
+            ), "Clients sent different numbers of layers"
+            weights = [float(num_examples) if weighted else 1.0 for num_examples in self.num_examples]
+            return [self._aggregate_layer(layer_index, weights) for layer_index in range(num_layers)]
+        finally:
+            self.clear()
+
+    def aggregate(self, results: Iterable[Tuple[Iterable[NDArray], int]], weighted: bool = True) -> NDArrays:
+        """
+        Computes the weighted or unweighted average of the client updates, spilling each update to disk as it is
+        consumed from results. The serialized updates are only released as they arrive when they are spilled with
+        spill instead (i.e. through incremental aggregation, see BasicFedAvg).
+
+        Args:
+            results (Iterable[Tuple[Iterable[NDArray], int]]): Each client's arrays (possibly lazily decoded, see
+                decode_tensors) and the number of relevant samples held by the client.
+            weighted (bool, optional): Whether or not the aggregation is a weighted average (by the sample counts
+                provided in the tuple) or a uniform average. Defaults to True.
+
+        Returns:
+            NDArrays: Aggregated numpy arrays by the desired averaging. Floating point layers retain the dtype of the
+                client updates, other layers are averaged into float64.
+        """
+        self.clear()
+        try:
+            for ndarrays, num_examples in results:
+                self.spill(ndarrays, num_examples)
+        except BaseException:
+            self.clear()
+            raise
+        return self.compute(weighted)
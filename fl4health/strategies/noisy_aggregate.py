@@ -1,9 +1,12 @@
 from functools import reduce
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import numpy as np
 from flwr.common import NDArray, NDArrays
 
+from fl4health.strategies.parallel_aggregate import ParallelAggregationBackend
+from fl4health.utils.flat_parameters import FlatParameters, flatten_client_ndarrays
+
 
 def add_noise_to_array(layer: NDArray, noise_std_dev: float, denominator: int) -> NDArray:
     """
@@ -22,7 +25,12 @@ def add_noise_to_array(layer: NDArray, noise_std_dev: float, denominator: int) -
     return (1.0 / denominator) * (layer + layer_noise)
 
 
-def add_noise_to_ndarrays(client_model_updates: List[NDArrays], sigma: float, n_clients: int) -> NDArrays:
+def add_noise_to_ndarrays(
+    client_model_updates: List[NDArrays],
+    sigma: float,
+    n_clients: int,
+    aggregation_backend: Optional[ParallelAggregationBackend] = None,
+) -> NDArrays:
     """
     This function adds centered gaussian noise (with standard deviation sigma) to the uniform average  of the list
     of the numpy arrays provided.
@@ -34,19 +42,52 @@ def add_noise_to_ndarrays(client_model_updates: List[NDArrays], sigma: float, n_
         sigma (float): The standard deviation of the centered gaussian noise to be added to each element.
         n_clients (int): The number of arrays in the average. This should be the same as the size of
             client_model_updates in almost all cases.
+        aggregation_backend (Optional[ParallelAggregationBackend], optional): If provided, the sums are computed in
+            parallel by the backend. Noise is still drawn serially in layer order. Defaults to None.
 
     Returns:
-        NDArrays: Average of the centered gaussian noised arrays.
+        NDArrays: Average of the centered gaussian noised arrays, as views of a single flat buffer.
     """
-    layer_sums: NDArrays = [
-        add_noise_to_array(reduce(np.add, layer_updates), sigma, n_clients)
-        for layer_updates in zip(*client_model_updates)
-    ]
-    return layer_sums
+    flat_updates = flatten_client_ndarrays(client_model_updates)
+    return add_noise_to_flat_parameters(flat_updates, sigma, n_clients, aggregation_backend).to_ndarrays()
+
+
+def add_noise_to_flat_parameters(
+    flat_client_model_updates: List[FlatParameters],
+    sigma: float,
+    n_clients: int,
+    aggregation_backend: Optional[ParallelAggregationBackend] = None,
+) -> FlatParameters:
+    """
+    Flat buffer version of add_noise_to_ndarrays. The client updates are summed and noised as single vectorized
+    operations over the flat buffers, rather than layer by layer. Noise is drawn in a single call, which yields the
+    same values as drawing it layer by layer in order.
+
+    Args:
+        flat_client_model_updates (List[FlatParameters]): The flattened model update of each client, all with the
+            same layout. These are not modified.
+        sigma (float): The standard deviation of the centered gaussian noise to be added to each element.
+        n_clients (int): The number of arrays in the average.
+        aggregation_backend (Optional[ParallelAggregationBackend], optional): If provided, the sum over the flat
+            buffers is computed in parallel chunks by the backend. Defaults to None.
+
+    Returns:
+        FlatParameters: Average of the centered gaussian noised updates.
+    """
+    if aggregation_backend is not None:
+        (update_sum,) = aggregation_backend.reduce_layers([[update.buffer for update in flat_client_model_updates]])
+    else:
+        update_sum = flat_client_model_updates[0].buffer.copy()
+        for update in flat_client_model_updates[1:]:
+            np.add(update_sum, update.buffer, out=update_sum)
+    return FlatParameters(add_noise_to_array(update_sum, sigma, n_clients), flat_client_model_updates[0].shapes)
 
 
 def gaussian_noisy_unweighted_aggregate(
-    results: List[Tuple[NDArrays, int]], noise_multiplier: float, clipping_bound: float
+    results: List[Tuple[NDArrays, int]],
+    noise_multiplier: float,
+    clipping_bound: float,
+    aggregation_backend: Optional[ParallelAggregationBackend] = None,
 ) -> NDArrays:
     """
     Compute unweighted average of weights. Apply gaussian noise to the sum of these weights prior to normalizing.
@@ -57,6 +98,8 @@ def gaussian_noisy_unweighted_aggregate(
         noise_multiplier (float): The multiplier on the clipping bound to determine the std of noise applied to weight
             updates.
         clipping_bound (float): The clipping bound applied to client model updates.
+        aggregation_backend (Optional[ParallelAggregationBackend], optional): If provided, the layer-wise sums are
+            computed in parallel by the backend. Noise is still drawn serially in layer order. Defaults to None.
 
     Returns:
         NDArrays: Model update for a given round.
@@ -65,7 +108,7 @@ def gaussian_noisy_unweighted_aggregate(
     # dropping number of data points component
     client_model_updates = [ndarrays for ndarrays, _ in results]
     sigma = noise_multiplier * clipping_bound
-    layer_sums = add_noise_to_ndarrays(client_model_updates, sigma, n_clients)
+    layer_sums = add_noise_to_ndarrays(client_model_updates, sigma, n_clients, aggregation_backend)
     return layer_sums
 
 
@@ -76,6 +119,7 @@ def gaussian_noisy_weighted_aggregate(
     fraction_fit: float,
     per_client_example_cap: float,
     total_client_weight: float,
+    aggregation_backend: Optional[ParallelAggregationBackend] = None,
 ) -> NDArrays:
     """
     Compute weighted average of weights. Apply gaussian noise to the sum of these weights prior to normalizing.
@@ -92,6 +136,8 @@ def gaussian_noisy_weighted_aggregate(
         fraction_fit (float): Fraction of clients sampled each round.
         per_client_example_cap (float): The maximum number samples per client.
         total_client_weight (float): The total client weight across samples.
+        aggregation_backend (Optional[ParallelAggregationBackend], optional): If provided, the layer-wise sums are
+            computed in parallel by the backend. Noise is still drawn serially in layer order. Defaults to None.
 
     Returns:
         NDArrays: Noised model update for a given round.
@@ -109,11 +155,12 @@ def gaussian_noisy_weighted_aggregate(
     # Scale coefficients by total expected client weight
     client_coefficients_scaled = [coef / (fraction_fit * total_client_weight) for coef in client_coefficients]
 
-    # Scale updates by coef for each client
-    client_model_updates = [
-        [layer_update * client_coef for layer_update in client_model_update]
-        for client_model_update, client_coef in zip(client_model_updates, client_coefficients_scaled)
-    ]  # Calculate model updates as linear combination of updates
+    # Scale updates by coef for each client. Each update is scaled in place as a single operation over its flat
+    # buffer, which is a copy of the client's update.
+    flat_client_model_updates = flatten_client_ndarrays(client_model_updates, copy=True)
+    for flat_update, client_coef in zip(flat_client_model_updates, client_coefficients_scaled):
+        np.multiply(flat_update.buffer, client_coef, out=flat_update.buffer, casting="unsafe")
+    # Calculate model updates as linear combination of updates
 
     # Update clipping bound as max(w_k) * clipping bound
     # We only require w_k * update is bounded
@@ -121,9 +168,7 @@ def gaussian_noisy_weighted_aggregate(
     updated_clipping_bound = clipping_bound * max(client_coefficients)
 
     sigma = (noise_multiplier * updated_clipping_bound) / fraction_fit
-    layer_sums = add_noise_to_ndarrays(client_model_updates, sigma, n_clients)
-
-    return layer_sums
+    return add_noise_to_flat_parameters(flat_client_model_updates, sigma, n_clients, aggregation_backend).to_ndarrays()
 
 
 def gaussian_noisy_aggregate_clipping_bits(bits: NDArrays, noise_std_dev: float) -> float:
@@ -0,0 +1,197 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from flwr.common import NDArray, NDArrays
+
+
+def accumulate_scaled_layer(running_sum: NDArray, layer: NDArray, weight: float) -> None:
+    """
+    Adds a layer scaled by weight to a float64 running sum in place (see StreamingAggregator). A writable floating
+    point layer is scaled in place, as it is discarded after accumulation, to avoid a temporary copy.
+
+    Args:
+        running_sum (NDArray): The float64 running sum, of the same shape as layer.
+        layer (NDArray): The layer to be accumulated.
+        weight (float): The factor by which the layer is scaled.
+    """
+    if weight == 1.0:
+        running_sum += layer
+    elif np.issubdtype(layer.dtype, np.floating) and layer.flags.writeable:
+        np.multiply(layer, weight, out=layer)
+        running_sum += layer
+    else:
+        running_sum += np.multiply(layer, weight, dtype=np.float64)
+
+
+class ParallelAggregationBackend:
+    def __init__(self, num_workers: Optional[int] = None, chunk_size: int = 2**20) -> None:
+        """
+        A shared aggregation backend that strategies can opt into in order to spread layer-wise reductions across
+        multiple cores. Each output layer is computed independently and very large layers are further split into
+        chunks of at most chunk_size elements. The chunks are reduced on a thread pool with NumPy kernels, which
+        release the GIL, so the reductions run concurrently.
+
+        The reduction for each element follows exactly the same sequence of operations as the serial path
+        (i.e. reduce(np.add, ...) over the clients in order, followed by an optional division), so the results are
+        bit-identical to the serial implementation. Likewise, accumulate_layer splits the float64 accumulation of a
+        single client's layer performed by StreamingAggregator into chunks, with the same operations per element.
+
+        Args:
+            num_workers (Optional[int], optional): Number of threads used to perform the reductions. If None, the
+                number of available cores is used. If 1, all reductions run serially on the calling thread.
+                Defaults to None.
+            chunk_size (int, optional): Maximum number of elements of a single layer to be reduced by one task.
+                Layers larger than this are split into several tasks. Defaults to 2**20.
+        """
+        self.num_workers = num_workers if num_workers is not None else (os.cpu_count() or 1)
+        assert self.num_workers >= 1, "num_workers must be at least 1"
+        assert chunk_size >= 1, "chunk_size must be at least 1"
+        self.chunk_size = chunk_size
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # The pool is created lazily and kept across rounds to avoid paying thread startup costs every round.
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.num_workers)
+        return self.executor
+
+    def shutdown(self) -> None:
+        """Releases the threads held by the backend. The backend may still be used afterwards."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def accumulate_layer(self, running_sum: NDArray, layer: NDArray, weight: float) -> None:
+        """
+        Adds a layer scaled by weight to a float64 running sum in place, as accumulate_scaled_layer does, with large
+        layers split into chunks accumulated concurrently. The running sum is bit-identical to that of the serial
+        accumulation.
+
+        Args:
+            running_sum (NDArray): The float64 running sum, of the same shape as layer.
+            layer (NDArray): The layer to be accumulated.
+            weight (float): The factor by which the layer is scaled.
+        """
+        if self.num_workers == 1 or layer.size <= self.chunk_size or not layer.flags.c_contiguous:
+            accumulate_scaled_layer(running_sum, layer, weight)
+            return
+        # Contiguous arrays are flattened into views, so the chunks are accumulated into the running sum itself
+        flat_sum = running_sum.reshape(-1)
+        flat_layer = layer.reshape(-1)
+        futures = [
+            self._get_executor().submit(
+                accumulate_scaled_layer,
+                flat_sum[start : start + self.chunk_size],
+                flat_layer[start : start + self.chunk_size],
+                weight,
+            )
+            for start in range(0, flat_layer.size, self.chunk_size)
+        ]
+        for future in futures:
+            # Surface any exceptions raised in the worker threads.
+            future.result()
+
+    def _reduce_chunk(
+        self,
+        out: NDArray,
+        layers: Sequence[NDArray],
+        scales: Optional[Sequence[float]],
+        divisor: Optional[float],
+        chunk: slice,
+    ) -> None:
+        if scales is None:
+            partial_sum = reduce(np.add, (layer[chunk] for layer in layers))
+        else:
+            partial_sum = reduce(np.add, (layer[chunk] * scale for layer, scale in zip(layers, scales)))
+        if divisor is not None:
+            partial_sum = partial_sum / divisor
+        out[chunk] = partial_sum
+
+    def reduce_layers(
+        self,
+        layer_groups: Sequence[Sequence[NDArray]],
+        scales: Optional[Sequence[Optional[Sequence[float]]]] = None,
+        divisors: Optional[Sequence[Optional[float]]] = None,
+    ) -> NDArrays:
+        """
+        Reduces each group of layers into a single layer. For group g this computes
+                (sum_i scales[g][i] * layer_groups[g][i]) / divisors[g],
+        where the scaling and division are skipped if the corresponding entries are None.
+
+        Args:
+            layer_groups (Sequence[Sequence[NDArray]]): Each entry is a list of same-shaped arrays (i.e. the
+                contributions of each client to a single layer) to be summed.
+            scales (Optional[Sequence[Optional[Sequence[float]]]], optional): Per-group, per-array multiplicative
+                factors applied before summation. Defaults to None.
+            divisors (Optional[Sequence[Optional[float]]], optional): Per-group value by which the sum is divided.
+                Defaults to None.
+
+        Returns:
+            NDArrays: The reduced layers, one per group, in the order of layer_groups.
+        """
+        group_scales = scales if scales is not None else [None] * len(layer_groups)
+        group_divisors = divisors if divisors is not None else [None] * len(layer_groups)
+        assert len(group_scales) == len(layer_groups) and len(group_divisors) == len(layer_groups)
+
+        if self.num_workers == 1:
+            return [
+                self._serial_reduce(layers, layer_scales, divisor)
+                for layers, layer_scales, divisor in zip(layer_groups, group_scales, group_divisors)
+            ]
+
+        reduced_layers: NDArrays = []
+        tasks: List[Tuple[NDArray, Sequence[NDArray], Optional[Sequence[float]], Optional[float], slice]] = []
+        for group_index, (layers, layer_scales, divisor) in enumerate(zip(layer_groups, group_scales, group_divisors)):
+            assert len(layers) > 0, f"Layer group {group_index} is empty"
+            if any(layer.dtype != layers[0].dtype for layer in layers) or layers[0].size == 0:
+                # Mixed precision inputs may promote differently in chunks, so fall back to the serial path.
+                reduced_layers.append(self._serial_reduce(layers, layer_scales, divisor))
+                continue
+            # Figure out the dtype of the serial result cheaply by reducing a single element of each array.
+            probe = self._serial_reduce([layer.reshape(-1)[:1] for layer in layers], layer_scales, divisor)
+            out = np.empty(layers[0].shape, dtype=probe.dtype)
+            reduced_layers.append(out)
+            flat_layers = [layer.reshape(-1) for layer in layers]
+            flat_out = out.reshape(-1)
+            for start in range(0, flat_out.size, self.chunk_size):
+                tasks.append((flat_out, flat_layers, layer_scales, divisor, slice(start, start + self.chunk_size)))
+
+        futures = [self._get_executor().submit(self._reduce_chunk, *task) for task in tasks]
+        for future in futures:
+            # Surface any exceptions raised in the worker threads.
+            future.result()
+        return reduced_layers
+
+    def _serial_reduce(
+        self, layers: Sequence[NDArray], layer_scales: Optional[Sequence[float]], divisor: Optional[float]
+    ) -> NDArray:
+        if layer_scales is None:
+            layer_sum = reduce(np.add, layers)
+        else:
+            layer_sum = reduce(np.add, [layer * scale for layer, scale in zip(layers, layer_scales)])
+        return layer_sum / divisor if divisor is not None else layer_sum
+
+    def sum_client_arrays(
+        self,
+        client_arrays: Sequence[NDArrays],
+        client_scales: Optional[Sequence[float]] = None,
+        divisor: Optional[float] = None,
+    ) -> NDArrays:
+        """
+        Layer-wise reduction of a list of client model states, all having the same layer structure.
+
+        Args:
+            client_arrays (Sequence[NDArrays]): One list of arrays per client.
+            client_scales (Optional[Sequence[float]], optional): A multiplicative factor applied to every layer of
+                the corresponding client before summation. Defaults to None.
+            divisor (Optional[float], optional): Value by which every summed layer is divided. Defaults to None.
+
+        Returns:
+            NDArrays: The layer-wise (scaled) sum, divided by divisor if provided.
+        """
+        layer_groups = list(zip(*client_arrays))
+        scales = [client_scales] * len(layer_groups) if client_scales is not None else None
+        return self.reduce_layers(layer_groups, scales, [divisor] * len(layer_groups))
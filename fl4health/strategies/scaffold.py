@@ -4,14 +4,7 @@ from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import torch.nn as nn
-from flwr.common import (
-    FitIns,
-    MetricsAggregationFn,
-    NDArrays,
-    Parameters,
-    ndarrays_to_parameters,
-    parameters_to_ndarrays,
-)
+from flwr.common import FitIns, MetricsAggregationFn, NDArrays, Parameters
 from flwr.common.logger import log
 from flwr.common.typing import FitRes, Scalar
 from flwr.server.client_manager import ClientManager
@@ -21,7 +14,11 @@ from opacus import GradSampleModule
 from fl4health.client_managers.base_sampling_manager import BaseFractionSamplingManager
 from fl4health.parameter_exchange.parameter_packer import ParameterPackerWithControlVariates
 from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.strategies.memory_mapped_aggregate import MemoryMappedAggregator, decode_tensors
+from fl4health.strategies.parallel_aggregate import ParallelAggregationBackend
+from fl4health.utils.flat_parameters import FlatParameters, restore_layer_dtypes
 from fl4health.utils.parameter_extraction import get_all_model_parameters
+from fl4health.utils.serialization import ndarrays_to_parameters, parameters_to_ndarrays
 
 
 class Scaffold(BasicFedAvg):
@@ -47,6 +44,9 @@ class Scaffold(BasicFedAvg):
         learning_rate: float = 1.0,
         initial_control_variates: Optional[Parameters] = None,
         model: Optional[nn.Module] = None,
+        aggregation_backend: Optional[ParallelAggregationBackend] = None,
+        memory_mapped_aggregator: Optional[MemoryMappedAggregator] = None,
+        instrument_parameter_exchange: bool = False,
     ) -> None:
         """
         Scaffold Federated Learning strategy. Implementation based on https://arxiv.org/pdf/1910.06378.pdf
@@ -81,9 +81,24 @@ class Scaffold(BasicFedAvg):
             model (Optional[nn.Module], optional): If provided and initial_control_variates is not, this is used to
                 set the server control variates and the initial control variates on the client side to all zeros.
                 If initial_control_variates are provided, they take precedence. Defaults to None.
+            aggregation_backend (Optional[ParallelAggregationBackend], optional): If provided, the layer-wise
+                reductions performed during aggregation (see aggregate) are parallelized across the backend's thread
+                pool, in place of the fused server update (see fused_server_update). The fused update accumulates in
+                the common floating point type of the weights and control variates, so the results of the two may
+                differ by floating point rounding when these types differ. Defaults to None.
+            memory_mapped_aggregator (Optional[MemoryMappedAggregator], optional): If provided, the client weights and
+                control variate updates are averaged out-of-core by spilling them to memory-mapped files, as they
+                arrive with servers supporting incremental aggregation (see BasicFedAvg). This takes precedence over
+                aggregation_backend. Defaults to None.
+            instrument_parameter_exchange (bool, optional): If True, servers supporting it (i.e. FlServer) record
+                payload sizes and aggregation times each round through their metrics reporter. See BasicFedAvg.
+                Defaults to False.
         """
 
         self.server_model_weights = parameters_to_ndarrays(initial_parameters)
+        # The server weights may be held in a single floating point flat buffer (see fused_server_update), so the
+        # original dtypes of the layers (i.e. integer batch norm counters) are restored when they are sent out
+        self.server_model_weight_dtypes = [weights.dtype for weights in self.server_model_weights]
         # Setup the initial control variates on the server-side and store them to be transmitted to the clients
         initial_control_variates = self.initialize_control_variates(initial_control_variates, model)
         initial_parameters.tensors.extend(initial_control_variates.tensors)
@@ -101,9 +116,15 @@ class Scaffold(BasicFedAvg):
             evaluate_metrics_aggregation_fn=evaluate_metrics_aggregation_fn,
             weighted_aggregation=False,
             weighted_eval_losses=weighted_eval_losses,
+            aggregation_backend=aggregation_backend,
+            memory_mapped_aggregator=memory_mapped_aggregator,
+            instrument_parameter_exchange=instrument_parameter_exchange,
         )
         self.learning_rate = learning_rate
         self.parameter_packer = ParameterPackerWithControlVariates(len(self.server_model_weights))
+        # Preallocated flat accumulation and decoding buffers for the fused server update. These persist across rounds.
+        self.accumulation_buffer: Optional[FlatParameters] = None
+        self.decode_buffer: Optional[FlatParameters] = None
 
     def initialize_control_variates(
         self, initial_control_variates: Optional[Parameters], model: Optional[nn.Module]
@@ -179,19 +200,30 @@ class Scaffold(BasicFedAvg):
         if not self.accept_failures and failures:
             return None, {}
 
-        # Convert results with packed params of model weights and client control variate updates
-        updated_params = [parameters_to_ndarrays(fit_res.parameters) for _, fit_res in results]
-
-        # x = 1 / |S| * sum(x_i) and c = 1 / |S| * sum(delta_c_i)
-        # Aggregation operation over packed params (includes both weights and control variate updates)
-        aggregated_params = self.aggregate(updated_params)
-
-        weights, control_variates_update = self.parameter_packer.unpack_parameters(aggregated_params)
-
-        self.server_model_weights = self.compute_updated_weights(weights)
-        self.server_control_variates = self.compute_updated_control_variates(control_variates_update)
-
-        parameters = self.parameter_packer.pack_parameters(self.server_model_weights, self.server_control_variates)
+        if self.memory_mapped_aggregator is None and self.aggregation_backend is None:
+            # Single pass over the clients with in-place updates of the server state
+            self.fused_server_update([fit_res.parameters for _, fit_res in results])
+        else:
+            # x = 1 / |S| * sum(x_i) and c = 1 / |S| * sum(delta_c_i)
+            # Aggregation operation over packed params (includes both weights and control variate updates)
+            if self.memory_mapped_aggregator is not None:
+                # Client packed params are spilled to disk as they are decoded and averaged out-of-core
+                packed_results = ((decode_tensors(fit_res.parameters), 1) for _, fit_res in results)
+                aggregated_params = self.memory_mapped_aggregator.aggregate(packed_results, weighted=False)
+            else:
+                # Convert results with packed params of model weights and client control variate updates
+                updated_params = [parameters_to_ndarrays(fit_res.parameters) for _, fit_res in results]
+                aggregated_params = self.aggregate(updated_params)
+
+            weights, control_variates_update = self.parameter_packer.unpack_parameters(aggregated_params)
+
+            self.server_model_weights = self.compute_updated_weights(weights)
+            self.server_control_variates = self.compute_updated_control_variates(control_variates_update)
+
+        parameters = self.parameter_packer.pack_parameters(
+            restore_layer_dtypes(self.server_model_weights, self.server_model_weight_dtypes),
+            self.server_control_variates,
+        )
 
         # Aggregate custom metrics if aggregation fn was provided
         metrics_aggregated = {}
@@ -203,6 +235,91 @@ class Scaffold(BasicFedAvg):
 
         return ndarrays_to_parameters(parameters), metrics_aggregated
 
+    def aggregate_accumulated_parameters(self, server_round: int) -> Parameters:
+        """
+        Updates the server model weights and control variates with the unweighted average of the packed client
+        parameters accumulated this round, as in aggregate_fit.
+
+        Args:
+            server_round (int): What round of FL we're on (from servers perspective).
+
+        Returns:
+            Parameters: The updated server model weights packed with the updated server control variates.
+        """
+        weights, control_variates_update = self.parameter_packer.unpack_parameters(self.compute_accumulated_arrays())
+        self.server_model_weights = self.compute_updated_weights(weights)
+        self.server_control_variates = self.compute_updated_control_variates(control_variates_update)
+        parameters = self.parameter_packer.pack_parameters(
+            restore_layer_dtypes(self.server_model_weights, self.server_model_weight_dtypes),
+            self.server_control_variates,
+        )
+        return ndarrays_to_parameters(parameters)
+
+    def _maybe_allocate_update_buffers(self) -> Tuple[FlatParameters, FlatParameters, FlatParameters]:
+        # The server weights and control variates are held as views into flat buffers, so that they can be updated in
+        # place as single vectorized operations. They are only copied into new buffers when they have been replaced
+        # (i.e. on the first round or after an update through the unfused path). Integer layers (i.e. batch norm
+        # counters) are converted to the floating point type of the model.
+        flat_weights = FlatParameters.from_ndarrays(self.server_model_weights)
+        flat_variates = FlatParameters.from_ndarrays(self.server_control_variates)
+        self.server_model_weights = flat_weights.to_ndarrays()
+        self.server_control_variates = flat_variates.to_ndarrays()
+
+        # The packed client parameters (weights followed by control variate updates) are summed into a single flat
+        # accumulation buffer, with each client's parameters decoded directly into a reusable flat decode buffer.
+        shapes = flat_weights.shapes + flat_variates.shapes
+        dtype = np.result_type(flat_weights.dtype, flat_variates.dtype)
+        if (
+            self.accumulation_buffer is None
+            or self.accumulation_buffer.shapes != shapes
+            or self.accumulation_buffer.dtype != dtype
+        ):
+            self.accumulation_buffer = FlatParameters.empty(shapes, dtype)
+            self.decode_buffer = FlatParameters.empty(shapes, dtype)
+        return flat_weights, flat_variates, self.accumulation_buffer
+
+    def fused_server_update(self, client_parameters: List[Parameters]) -> None:
+        """
+        Fused version of the SCAFFOLD server update. It is numerically equivalent to
+                y = self.aggregate(...), c_update = self.aggregate(...),
+                self.server_model_weights = self.compute_updated_weights(y),
+                self.server_control_variates = self.compute_updated_control_variates(c_update)
+        but the client weights and control variate updates are summed in a single pass over the clients into a
+        preallocated flat buffer that persists across rounds, and the server weights and control variates are then
+        updated in place. Each step is a single vectorized operation over the whole model rather than a loop over its
+        layers. Only one client's decoded parameters are held in memory at a time and no model-sized temporaries are
+        allocated per round.
+
+        Args:
+            client_parameters (List[Parameters]): The packed model weights and control variate updates from each
+                participating client.
+        """
+        num_clients = len(client_parameters)
+        flat_weights, flat_variates, accumulator = self._maybe_allocate_update_buffers()
+
+        for client_index, parameters in enumerate(client_parameters):
+            if client_index == 0:
+                FlatParameters.from_parameters(parameters, out=accumulator)
+            else:
+                assert self.decode_buffer is not None
+                FlatParameters.from_parameters(parameters, out=self.decode_buffer)
+                np.add(accumulator.buffer, self.decode_buffer.buffer, out=accumulator.buffer)
+
+        # The sum of the client weights is followed by the sum of the client control variate updates
+        weight_sum = accumulator.buffer[: flat_weights.size]
+        variate_sum = accumulator.buffer[flat_weights.size :]
+
+        # x = x + lr * (1 / |S| * sum(y_i) - x)
+        np.divide(weight_sum, num_clients, out=weight_sum)
+        np.subtract(weight_sum, flat_weights.buffer, out=weight_sum)
+        np.multiply(weight_sum, self.learning_rate, out=weight_sum)
+        np.add(flat_weights.buffer, weight_sum, out=flat_weights.buffer)
+
+        # c = c + |S| / N * (1 / |S| * sum(delta_c_i))
+        np.divide(variate_sum, num_clients, out=variate_sum)
+        np.multiply(variate_sum, self.fraction_fit, out=variate_sum)
+        np.add(flat_variates.buffer, variate_sum, out=flat_variates.buffer)
+
     def compute_parameter_delta(self, params_1: NDArrays, params_2: NDArrays) -> NDArrays:
         """
         Computes element-wise difference of two lists of NDarray where elements in params_2 are subtracted from
@@ -235,7 +352,6 @@ class Scaffold(BasicFedAvg):
         Returns:
             NDArrays: Updated numpy arrays according to original_params + scaling_coefficient * parameter_updates.
         """
-
         updated_parameters = [
             original_param + scaling_coefficient * update
             for original_param, update in zip(original_params, parameter_updates)
@@ -256,6 +372,9 @@ class Scaffold(BasicFedAvg):
         """
         num_clients = len(params)
 
+        if self.aggregation_backend is not None:
+            return self.aggregation_backend.sum_client_arrays(params, divisor=num_clients)
+
         # Compute average weights of each layer
         params_prime: NDArrays = [reduce(np.add, layer_updates) / num_clients for layer_updates in zip(*params)]
 
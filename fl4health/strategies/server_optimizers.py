@@ -0,0 +1,261 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from flwr.common import NDArray, NDArrays
+
+
+class ServerOptimizer(ABC):
+    # Number of model-sized buffers of optimizer state (i.e. momentum)
+    num_state_buffers: int = 0
+    # Number of model-sized buffers required to compute the update without allocating temporaries
+    num_scratch_buffers: int = 0
+
+    def __init__(self, learning_rate: float) -> None:
+        """
+        Base class for server-side optimizers, which treat the difference between the aggregated client weights and
+        the current global weights as a pseudo-gradient and apply an optimizer step to the global weights (see
+        Adaptive Federated Optimization, https://arxiv.org/abs/2003.00295). Any strategy extending BasicFedAvg may
+        apply one to its aggregated weights.
+
+        The global weights and all optimizer state are stored in contiguous, preallocated float32 buffers with one
+        slice per layer, and are updated in place every round. Layers are identified by keys (i.e. layer names for
+        dynamic layer exchange, or the position of the layer otherwise). The first time a layer is seen, its global
+        weights are set to the aggregated weights without taking a step. Non-floating point layers (i.e. batch
+        norm counters) are passed through unchanged.
+
+        Args:
+            learning_rate (float): Server-side learning rate.
+        """
+        self.learning_rate = learning_rate
+        self.reset()
+
+    def reset(self) -> None:
+        """Discards the tracked global weights and all optimizer state."""
+        # Maps each tracked layer key to its offset into the flat buffers and its shape
+        self.layer_layout: Dict[str, Tuple[int, Tuple[int, ...]]] = {}
+        self.num_elements = 0
+        self.global_weights = np.zeros(0, dtype=np.float32)
+        self.state_buffers = [np.zeros(0, dtype=np.float32) for _ in range(self.num_state_buffers)]
+        self.pseudo_gradient = np.zeros(0, dtype=np.float32)
+        self.scratch_buffers = [np.zeros(0, dtype=np.float32) for _ in range(self.num_scratch_buffers)]
+
+    def _track_layers(self, layers: Sequence[NDArray], layer_keys: Sequence[str]) -> None:
+        new_layers = [(key, layer) for key, layer in zip(layer_keys, layers) if key not in self.layer_layout]
+        if not new_layers:
+            return
+        # New layers are appended to the end of the flat buffers, so existing state is preserved. This only happens
+        # when layers are first seen, so buffers are not reallocated in a steady state.
+        offset = self.num_elements
+        for key, layer in new_layers:
+            self.layer_layout[key] = (offset, layer.shape)
+            offset += layer.size
+        num_new_elements = offset - self.num_elements
+        self.num_elements = offset
+
+        def grow(buffer: NDArray) -> NDArray:
+            return np.concatenate([buffer, np.zeros(num_new_elements, dtype=np.float32)])
+
+        self.global_weights = grow(self.global_weights)
+        self.state_buffers = [grow(buffer) for buffer in self.state_buffers]
+        self.pseudo_gradient = np.empty(self.num_elements, dtype=np.float32)
+        self.scratch_buffers = [np.empty(self.num_elements, dtype=np.float32) for _ in range(self.num_scratch_buffers)]
+        for key, layer in new_layers:
+            np.copyto(self._layer_view(self.global_weights, key), layer, casting="unsafe")
+
+    def _layer_view(self, buffer: NDArray, layer_key: str) -> NDArray:
+        offset, shape = self.layer_layout[layer_key]
+        return buffer[offset : offset + int(np.prod(shape))].reshape(shape)
+
+    @staticmethod
+    def _default_layer_keys(layers: Sequence[NDArray]) -> List[str]:
+        return [str(layer_index) for layer_index in range(len(layers))]
+
+    @staticmethod
+    def _is_optimized(layer: NDArray) -> bool:
+        return np.issubdtype(layer.dtype, np.floating)
+
+    def initialize(self, weights: NDArrays, layer_keys: Optional[List[str]] = None) -> None:
+        """
+        Sets the global weights from which the first optimizer step is taken, discarding any existing state.
+
+        Args:
+            weights (NDArrays): The initial global model weights.
+            layer_keys (Optional[List[str]], optional): Keys identifying each layer. If None, layers are identified
+                by their position. Defaults to None.
+        """
+        keys = layer_keys if layer_keys is not None else self._default_layer_keys(weights)
+        self.reset()
+        optimized = [(key, layer) for key, layer in zip(keys, weights) if self._is_optimized(layer)]
+        self._track_layers([layer for _, layer in optimized], [key for key, _ in optimized])
+
+    def step(self, aggregated_weights: NDArrays, layer_keys: Optional[List[str]] = None) -> NDArrays:
+        """
+        Computes the pseudo-gradient (aggregated_weights - global_weights) for each layer and applies an optimizer
+        step to the global weights in place.
+
+        Args:
+            aggregated_weights (NDArrays): The weights aggregated from the clients this round.
+            layer_keys (Optional[List[str]], optional): Keys identifying each layer. If None, layers are identified
+                by their position. Defaults to None.
+
+        Returns:
+            NDArrays: The updated global weights, in the order of aggregated_weights. float32 layers are views into
+                the optimizer's buffers and are only valid until the next step.
+        """
+        keys = layer_keys if layer_keys is not None else self._default_layer_keys(aggregated_weights)
+        assert len(keys) == len(aggregated_weights)
+        optimized = [(key, layer) for key, layer in zip(keys, aggregated_weights) if self._is_optimized(layer)]
+        # Only layers that were tracked before this round take a step.
+        stepped = [(key, layer) for key, layer in optimized if key in self.layer_layout]
+        self._track_layers([layer for _, layer in optimized], [key for key, _ in optimized])
+        for key, layer in stepped:
+            _, shape = self.layer_layout[key]
+            assert layer.shape == shape, f"Layer {key} has shape {layer.shape}, but the tracked shape is {shape}"
+            np.copyto(self._layer_view(self.pseudo_gradient, key), layer, casting="unsafe")
+        stepped_keys = [key for key, _ in stepped]
+
+        for segment in self._contiguous_segments(stepped_keys):
+            pseudo_gradient = self.pseudo_gradient[segment]
+            global_weights = self.global_weights[segment]
+            # pseudo_gradient = aggregated_weights - global_weights, then replaced by the step to be taken
+            np.subtract(pseudo_gradient, global_weights, out=pseudo_gradient)
+            self.compute_step(
+                pseudo_gradient,
+                [buffer[segment] for buffer in self.state_buffers],
+                [buffer[segment] for buffer in self.scratch_buffers],
+            )
+            np.add(global_weights, pseudo_gradient, out=global_weights)
+
+        updated_weights: NDArrays = []
+        for key, layer in zip(keys, aggregated_weights):
+            if not self._is_optimized(layer):
+                updated_weights.append(layer)
+                continue
+            global_layer = self._layer_view(self.global_weights, key)
+            updated_weights.append(global_layer if layer.dtype == np.float32 else global_layer.astype(layer.dtype))
+        return updated_weights
+
+    def _contiguous_segments(self, layer_keys: Sequence[str]) -> List[slice]:
+        # Coalesce adjacent layers so that the update runs over as few, as large, slices of the buffers as possible.
+        # When every tracked layer is stepped, this is a single slice covering the whole buffer.
+        ranges = sorted(
+            (offset, offset + int(np.prod(shape))) for offset, shape in (self.layer_layout[key] for key in layer_keys)
+        )
+        segments: List[slice] = []
+        for start, end in ranges:
+            if segments and segments[-1].stop == start:
+                segments[-1] = slice(segments[-1].start, end)
+            else:
+                segments.append(slice(start, end))
+        return segments
+
+    @abstractmethod
+    def compute_step(self, pseudo_gradient: NDArray, state: List[NDArray], scratch: List[NDArray]) -> None:
+        """
+        Updates the optimizer state with the pseudo-gradient and overwrites the pseudo-gradient with the step to be
+        added to the global weights. All arguments are flat float32 slices of the preallocated buffers and must be
+        updated in place.
+
+        Args:
+            pseudo_gradient (NDArray): The difference between the aggregated and global weights.
+            state (List[NDArray]): The optimizer state buffers.
+            scratch (List[NDArray]): Buffers which may be used to hold intermediate values.
+        """
+        raise NotImplementedError
+
+
+class FedAvgMServerOptimizer(ServerOptimizer):
+    num_state_buffers = 1
+
+    def __init__(self, learning_rate: float = 1.0, momentum: float = 0.9) -> None:
+        """
+        Server-side momentum (FedAvgM, https://arxiv.org/abs/1909.06335).
+                m = momentum * m + pseudo_gradient, global_weights = global_weights + learning_rate * m.
+        With momentum 0.0 and learning_rate 1.0 this is equivalent to FedAvg.
+
+        Args:
+            learning_rate (float, optional): Server-side learning rate. Defaults to 1.0.
+            momentum (float, optional): Momentum factor. Defaults to 0.9.
+        """
+        self.momentum = momentum
+        super().__init__(learning_rate)
+
+    def compute_step(self, pseudo_gradient: NDArray, state: List[NDArray], scratch: List[NDArray]) -> None:
+        (m_t,) = state
+        np.multiply(m_t, self.momentum, out=m_t)
+        np.add(m_t, pseudo_gradient, out=m_t)
+        np.multiply(m_t, self.learning_rate, out=pseudo_gradient)
+
+
+class FedAdamServerOptimizer(ServerOptimizer):
+    num_state_buffers = 2
+    num_scratch_buffers = 1
+
+    def __init__(
+        self, learning_rate: float = 0.1, beta_1: float = 0.9, beta_2: float = 0.99, tau: float = 1e-9
+    ) -> None:
+        """
+        Server-side Adam (FedAdam, https://arxiv.org/abs/2003.00295), with the same defaults as the Flower strategy.
+                m = beta_1 * m + (1 - beta_1) * pseudo_gradient, v = beta_2 * v + (1 - beta_2) * pseudo_gradient^2,
+                global_weights = global_weights + learning_rate * m / (sqrt(v) + tau).
+
+        Args:
+            learning_rate (float, optional): Server-side learning rate. Defaults to 0.1.
+            beta_1 (float, optional): Momentum parameter. Defaults to 0.9.
+            beta_2 (float, optional): Second moment parameter. Defaults to 0.99.
+            tau (float, optional): Controls the degree of adaptability. Defaults to 1e-9.
+        """
+        self.beta_1 = beta_1
+        self.beta_2 = beta_2
+        self.tau = tau
+        super().__init__(learning_rate)
+
+    def update_second_moment(self, v_t: NDArray, pseudo_gradient: NDArray, scratch: List[NDArray]) -> None:
+        squared_gradient = scratch[0]
+        np.multiply(pseudo_gradient, pseudo_gradient, out=squared_gradient)
+        np.multiply(squared_gradient, 1.0 - self.beta_2, out=squared_gradient)
+        np.multiply(v_t, self.beta_2, out=v_t)
+        np.add(v_t, squared_gradient, out=v_t)
+
+    def compute_step(self, pseudo_gradient: NDArray, state: List[NDArray], scratch: List[NDArray]) -> None:
+        m_t, v_t = state
+        np.multiply(m_t, self.beta_1, out=m_t)
+        # pseudo_gradient is still required for the second moment, so (1 - beta_1) * pseudo_gradient is formed in a
+        # scratch buffer
+        np.multiply(pseudo_gradient, 1.0 - self.beta_1, out=scratch[0])
+        np.add(m_t, scratch[0], out=m_t)
+        self.update_second_moment(v_t, pseudo_gradient, scratch)
+        np.sqrt(v_t, out=pseudo_gradient)
+        np.add(pseudo_gradient, self.tau, out=pseudo_gradient)
+        np.divide(m_t, pseudo_gradient, out=pseudo_gradient)
+        np.multiply(pseudo_gradient, self.learning_rate, out=pseudo_gradient)
+
+
+class FedYogiServerOptimizer(FedAdamServerOptimizer):
+    num_scratch_buffers = 2
+
+    def __init__(
+        self, learning_rate: float = 0.01, beta_1: float = 0.9, beta_2: float = 0.99, tau: float = 1e-3
+    ) -> None:
+        """
+        Server-side Yogi (FedYogi, https://arxiv.org/abs/2003.00295), with the same defaults as the Flower strategy.
+        Identical to FedAdam, except the second moment is updated additively:
+                v = v - (1 - beta_2) * pseudo_gradient^2 * sign(v - pseudo_gradient^2).
+
+        Args:
+            learning_rate (float, optional): Server-side learning rate. Defaults to 0.01.
+            beta_1 (float, optional): Momentum parameter. Defaults to 0.9.
+            beta_2 (float, optional): Second moment parameter. Defaults to 0.99.
+            tau (float, optional): Controls the degree of adaptability. Defaults to 1e-3.
+        """
+        super().__init__(learning_rate, beta_1, beta_2, tau)
+
+    def update_second_moment(self, v_t: NDArray, pseudo_gradient: NDArray, scratch: List[NDArray]) -> None:
+        squared_gradient, sign = scratch
+        np.multiply(pseudo_gradient, pseudo_gradient, out=squared_gradient)
+        np.subtract(v_t, squared_gradient, out=sign)
+        np.sign(sign, out=sign)
+        np.multiply(squared_gradient, sign, out=squared_gradient)
+        np.multiply(squared_gradient, 1.0 - self.beta_2, out=squared_gradient)
+        np.subtract(v_t, squared_gradient, out=v_t)
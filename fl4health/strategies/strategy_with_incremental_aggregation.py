@@ -0,0 +1,42 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple, Union
+
+from flwr.common import Parameters, Scalar
+from flwr.common.typing import FitRes
+from flwr.server.client_proxy import ClientProxy
+
+
+class StrategyWithIncrementalAggregation(ABC):
+    """
+    This abstract base class is used to ensure that an FL strategy class implements the hooks required to aggregate
+    client results as they arrive, and that any server wanting to aggregate incrementally (i.e. FlServer) can check
+    whether the strategy supports it. A fit round aggregated incrementally calls begin_incremental_aggregation once,
+    accumulate_fit_result for each successful result as it arrives and finalize_incremental_aggregation once all
+    clients have returned, in place of aggregate_fit.
+    """
+
+    @abstractmethod
+    def supports_incremental_aggregation(self) -> bool:
+        """
+        Returns:
+            bool: Whether the fit rounds of the strategy should be aggregated incrementally with the hooks below. This
+                should only be True if the hooks produce the same aggregate as the strategy's aggregate_fit.
+        """
+        pass
+
+    @abstractmethod
+    def begin_incremental_aggregation(self, server_round: int) -> None:
+        pass
+
+    @abstractmethod
+    def accumulate_fit_result(self, server_round: int, fit_res: FitRes) -> None:
+        pass
+
+    @abstractmethod
+    def finalize_incremental_aggregation(
+        self,
+        server_round: int,
+        results: List[Tuple[ClientProxy, FitRes]],
+        failures: List[Union[Tuple[ClientProxy, FitRes], BaseException]],
+    ) -> Tuple[Optional[Parameters], Dict[str, Scalar]]:
+        pass
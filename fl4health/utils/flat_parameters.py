@@ -0,0 +1,228 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from flwr.common import NDArray, NDArrays, Parameters
+
+from fl4health.utils.serialization import bytes_to_ndarray_into, read_tensor_header
+
+
+def flat_dtype(layer_dtypes: Sequence[np.dtype]) -> np.dtype:
+    """
+    Determines the dtype of a flat buffer holding layers with the provided dtypes. This is the common floating point
+    type of the floating point layers. Non-floating point layers (i.e. batch norm counters) are converted to it, so
+    that they do not promote a float32 model to float64. If there are no floating point layers, float64 is used.
+
+    Args:
+        layer_dtypes (Sequence[np.dtype]): The dtypes of the layers to be stored.
+
+    Returns:
+        np.dtype: The dtype of the flat buffer.
+    """
+    floating_dtypes = [dtype for dtype in layer_dtypes if np.issubdtype(dtype, np.floating)]
+    return np.result_type(*floating_dtypes) if floating_dtypes else np.dtype(np.float64)
+
+
+def parameters_layout(parameters: Parameters) -> Tuple[List[Tuple[int, ...]], np.dtype]:
+    """
+    Reads the layer shapes of serialized parameters and the dtype of a flat buffer holding them from the tensor
+    headers, without decoding the tensors. This allows flat buffers to be allocated (or reused) before decoding.
+
+    Args:
+        parameters (Parameters): The serialized parameters.
+
+    Returns:
+        Tuple[List[Tuple[int, ...]], np.dtype]: The shape of each layer and the dtype determined by flat_dtype.
+    """
+    headers = [read_tensor_header(tensor) for tensor in parameters.tensors]
+    return [shape for shape, _, _, _ in headers], flat_dtype([dtype for _, _, dtype, _ in headers])
+
+
+class FlatParameters:
+    def __init__(self, buffer: NDArray, shapes: Sequence[Tuple[int, ...]]) -> None:
+        """
+        Model state stored as a single contiguous 1D buffer, along with the shape of each layer. Layers are exposed as
+        zero-copy views into the buffer, so operations that treat every element of the model identically (i.e. deltas,
+        noising, momentum, weighting, norms) can be performed as a single vectorized operation over the buffer rather
+        than looping over the layers in Python. This matters for models with many small layers (biases, batch norm).
+
+        Args:
+            buffer (NDArray): Contiguous 1D buffer containing the values of all layers, in order.
+            shapes (Sequence[Tuple[int, ...]]): The shape of each layer.
+        """
+        assert buffer.ndim == 1 and buffer.flags.c_contiguous, "buffer must be a contiguous 1D array"
+        self.buffer = buffer
+        self.shapes = [tuple(shape) for shape in shapes]
+        self.offsets = [0]
+        for shape in self.shapes:
+            self.offsets.append(self.offsets[-1] + int(np.prod(shape)))
+        assert (
+            self.offsets[-1] == buffer.size
+        ), f"Layer shapes cover {self.offsets[-1]} values, buffer has {buffer.size}"
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.buffer.dtype
+
+    @property
+    def size(self) -> int:
+        return self.buffer.size
+
+    def __len__(self) -> int:
+        return len(self.shapes)
+
+    def layer(self, layer_index: int) -> NDArray:
+        """
+        Args:
+            layer_index (int): Index of the layer.
+
+        Returns:
+            NDArray: A view of the layer within the buffer.
+        """
+        start, end = self.offsets[layer_index], self.offsets[layer_index + 1]
+        return self.buffer[start:end].reshape(self.shapes[layer_index])
+
+    def to_ndarrays(self) -> NDArrays:
+        """
+        Returns:
+            NDArrays: Zero-copy views of each layer. Modifying them modifies the buffer and vice versa.
+        """
+        return [self.layer(layer_index) for layer_index in range(len(self))]
+
+    def has_same_layout(self, other: "FlatParameters") -> bool:
+        return self.shapes == other.shapes
+
+    def copy(self) -> "FlatParameters":
+        return FlatParameters(self.buffer.copy(), self.shapes)
+
+    @classmethod
+    def empty(cls, shapes: Sequence[Tuple[int, ...]], dtype: np.dtype) -> "FlatParameters":
+        return cls(np.empty(sum(int(np.prod(shape)) for shape in shapes), dtype=dtype), shapes)
+
+    @classmethod
+    def zeros_like(cls, other: "FlatParameters") -> "FlatParameters":
+        return cls(np.zeros_like(other.buffer), other.shapes)
+
+    @classmethod
+    def _wrap_views(cls, ndarrays: NDArrays, dtype: np.dtype) -> Optional["FlatParameters"]:
+        # If the arrays are consecutive views of a single contiguous buffer (i.e. produced by to_ndarrays), the
+        # buffer is wrapped directly without copying. Read-only buffers (i.e. zero-copy decoded parameters) are not
+        # wrapped, as flat parameters may be updated in place.
+        if len(ndarrays) == 0 or any(layer.size == 0 for layer in ndarrays):
+            return None
+        owner = ndarrays[0].base
+        if (
+            not isinstance(owner, np.ndarray)
+            or owner.dtype != dtype
+            or not owner.flags.c_contiguous
+            or not owner.flags.writeable
+        ):
+            return None
+        itemsize = dtype.itemsize
+        start_address = ndarrays[0].__array_interface__["data"][0]
+        offset = 0
+        for layer in ndarrays:
+            if (
+                layer.base is not owner
+                or layer.dtype != dtype
+                or not layer.flags.c_contiguous
+                or layer.__array_interface__["data"][0] != start_address + offset * itemsize
+            ):
+                return None
+            offset += layer.size
+        start_index, remainder = divmod(start_address - owner.__array_interface__["data"][0], itemsize)
+        if remainder != 0 or start_index < 0 or start_index + offset > owner.size:
+            return None
+        return cls(owner.reshape(-1)[start_index : start_index + offset], [layer.shape for layer in ndarrays])
+
+    @classmethod
+    def from_ndarrays(
+        cls, ndarrays: NDArrays, dtype: Optional[np.dtype] = None, copy: bool = False
+    ) -> "FlatParameters":
+        """
+        Constructs flat parameters from a list of arrays. If the arrays are already views of a single flat buffer
+        (as returned by to_ndarrays) of the right dtype, it is wrapped without copying unless copy is True.
+
+        Args:
+            ndarrays (NDArrays): The layers to be flattened.
+            dtype (Optional[np.dtype], optional): dtype of the buffer. If None, it is determined by flat_dtype.
+                Defaults to None.
+            copy (bool, optional): Whether to always copy the arrays into a new buffer. Defaults to False.
+
+        Returns:
+            FlatParameters: Flat parameters with the values of ndarrays.
+        """
+        buffer_dtype = np.dtype(dtype) if dtype is not None else flat_dtype([layer.dtype for layer in ndarrays])
+        if not copy:
+            wrapped = cls._wrap_views(ndarrays, buffer_dtype)
+            if wrapped is not None:
+                return wrapped
+        flat_parameters = cls.empty([layer.shape for layer in ndarrays], buffer_dtype)
+        for layer_index, layer in enumerate(ndarrays):
+            np.copyto(flat_parameters.layer(layer_index), layer, casting="unsafe")
+        return flat_parameters
+
+    @classmethod
+    def from_parameters(
+        cls, parameters: Parameters, dtype: Optional[np.dtype] = None, out: Optional["FlatParameters"] = None
+    ) -> "FlatParameters":
+        """
+        Decodes serialized parameters directly into a flat buffer, without materializing intermediate per-layer
+        arrays.
+
+        Args:
+            parameters (Parameters): The serialized parameters.
+            dtype (Optional[np.dtype], optional): dtype of the buffer. If None, it is determined by flat_dtype. Ignored
+                if out is provided. Defaults to None.
+            out (Optional[FlatParameters], optional): If provided, the parameters are decoded into this buffer,
+                which must have the same layout. Defaults to None.
+
+        Returns:
+            FlatParameters: Flat parameters with the decoded values (out, if it was provided).
+        """
+        if out is None:
+            shapes, buffer_dtype = parameters_layout(parameters)
+            out = cls.empty(shapes, np.dtype(dtype) if dtype is not None else buffer_dtype)
+        assert len(out) == len(parameters.tensors), "Decoded parameters do not match the layout of out"
+        for layer_index, tensor in enumerate(parameters.tensors):
+            bytes_to_ndarray_into(tensor, out.layer(layer_index))
+        return out
+
+
+def restore_layer_dtypes(ndarrays: NDArrays, layer_dtypes: Sequence[np.dtype]) -> NDArrays:
+    """
+    Casts layers split from a flat buffer back to their original dtypes. Layers that were converted to the
+    floating point type of the buffer (i.e. integer batch norm counters) are rounded and cast back. Other layers are
+    returned as is, without copying.
+
+    Args:
+        ndarrays (NDArrays): The layers, i.e. views of a flat buffer.
+        layer_dtypes (Sequence[np.dtype]): The original dtype of each layer.
+
+    Returns:
+        NDArrays: The layers with their original dtypes.
+    """
+    assert len(ndarrays) == len(layer_dtypes), "There must be one dtype per layer"
+    restored_ndarrays = []
+    for layer, dtype in zip(ndarrays, layer_dtypes):
+        if layer.dtype != dtype and np.issubdtype(dtype, np.integer) and np.issubdtype(layer.dtype, np.floating):
+            layer = np.rint(layer)
+        restored_ndarrays.append(layer.astype(dtype, copy=False))
+    return restored_ndarrays
+
+
+def flatten_client_ndarrays(client_ndarrays: Sequence[NDArrays], copy: bool = False) -> List[FlatParameters]:
+    """
+    Flattens several clients' arrays, all having the same layer structure, into flat buffers of a common dtype.
+
+    Args:
+        client_ndarrays (Sequence[NDArrays]): One list of arrays per client.
+        copy (bool, optional): Whether to always copy the arrays into new buffers, so that the flat buffers may be
+            modified without affecting client_ndarrays. Defaults to False.
+
+    Returns:
+        List[FlatParameters]: The flat parameters of each client.
+    """
+    dtype = flat_dtype([layer.dtype for ndarrays in client_ndarrays for layer in ndarrays])
+    flat_clients = [FlatParameters.from_ndarrays(ndarrays, dtype, copy) for ndarrays in client_ndarrays]
+    assert all(flat.has_same_layout(flat_clients[0]) for flat in flat_clients), "Client layouts differ"
+    return flat_clients
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Dict, Generic, List, Optional, TypeVar, Union
+from typing import Dict, Generic, Optional, Tuple, TypeVar, Union
 
 import torch
 
@@ -32,6 +32,16 @@ class Losses(ABC):
 
         return loss_dict
 
+    def as_tensor_dicts(self) -> Dict[str, Dict[str, torch.Tensor]]:
+        """
+        Produces the losses as tensors, grouped by the component of the object (i.e. additional_losses) they belong
+        to. These are the values accumulated by a LossMeter.
+
+        Returns:
+            Dict[str, Dict[str, torch.Tensor]]: A dictionary with the additional losses.
+        """
+        return {"additional_losses": self.additional_losses}
+
     @staticmethod
     @abstractmethod
     def aggregate(loss_meter: LossMeter) -> Losses:
@@ -72,6 +82,15 @@ class EvaluationLosses(Losses):
         loss_dict["checkpoint"] = float(self.checkpoint.item())
         return loss_dict
 
+    def as_tensor_dicts(self) -> Dict[str, Dict[str, torch.Tensor]]:
+        """
+        Produces the losses as tensors, grouped by the component of the object they belong to.
+
+        Returns:
+            Dict[str, Dict[str, torch.Tensor]]: A dictionary with the checkpoint loss and the additional losses.
+        """
+        return {"checkpoint": {"checkpoint": self.checkpoint}, **super().as_tensor_dicts()}
+
     @staticmethod
     def aggregate(loss_meter: LossMeter[EvaluationLosses]) -> EvaluationLosses:
         """
@@ -83,14 +102,9 @@ class EvaluationLosses(Losses):
         Returns:
             EvaluationLosses: An instance of EvaluationLosses with the aggregated losses.
         """
-        checkpoint_loss = torch.sum(
-            torch.FloatTensor([losses.checkpoint for losses in loss_meter.losses_list])  # type: ignore
-        )
-        if loss_meter.loss_meter_type == LossMeterType.AVERAGE:
-            checkpoint_loss /= len(loss_meter.losses_list)
-
-        additional_losses_list = [losses.additional_losses for losses in loss_meter.losses_list]
-        additional_losses_dict = LossMeter.aggregate_losses_dict(additional_losses_list, loss_meter.loss_meter_type)
+        aggregated_losses = loss_meter.aggregate_tensor_dicts()
+        checkpoint_loss = aggregated_losses["checkpoint"]["checkpoint"]
+        additional_losses_dict = aggregated_losses["additional_losses"]
 
         return EvaluationLosses(checkpoint=checkpoint_loss, additional_losses=additional_losses_dict)
 
@@ -129,6 +143,15 @@ class TrainingLosses(Losses):
 
         return loss_dict
 
+    def as_tensor_dicts(self) -> Dict[str, Dict[str, torch.Tensor]]:
+        """
+        Produces the losses as tensors, grouped by the component of the object they belong to.
+
+        Returns:
+            Dict[str, Dict[str, torch.Tensor]]: A dictionary with the backward losses and the additional losses.
+        """
+        return {"backward": self.backward, **super().as_tensor_dicts()}
+
     @staticmethod
     def aggregate(loss_meter: LossMeter[TrainingLosses]) -> TrainingLosses:
         """
@@ -140,21 +163,10 @@ class TrainingLosses(Losses):
         Returns:
             TrainingLosses: An instance of TrainingLosses with the aggregated losses.
         """
-        additional_losses_list = [losses.additional_losses for losses in loss_meter.losses_list]
-        additional_losses_dict = LossMeter.aggregate_losses_dict(additional_losses_list, loss_meter.loss_meter_type)
-
-        backward_losses_list = [losses.backward for losses in loss_meter.losses_list]  # type: ignore
-        if len(backward_losses_list) > 0 and isinstance(backward_losses_list[0], dict):
-            # if backward losses is a dictionary, aggregate the dictionary keys
-            backward_losses_dict = LossMeter.aggregate_losses_dict(backward_losses_list, loss_meter.loss_meter_type)
-            return TrainingLosses(backward=backward_losses_dict, additional_losses=additional_losses_dict)
-
-        # otherwise, calculate the average tensor
-        backward_losses = torch.sum(torch.FloatTensor(backward_losses_list))
-        if loss_meter.loss_meter_type == LossMeterType.AVERAGE:
-            backward_losses /= len(loss_meter.losses_list)
-
-        return TrainingLosses(backward=backward_losses, additional_losses=additional_losses_dict)
+        aggregated_losses = loss_meter.aggregate_tensor_dicts()
+        return TrainingLosses(
+            backward=aggregated_losses["backward"], additional_losses=aggregated_losses["additional_losses"]
+        )
 
 
 class LossMeterType(Enum):
@@ -168,7 +180,10 @@ LossesType = TypeVar("LossesType", bound=Losses)
 class LossMeter(Generic[LossesType]):
     def __init__(self, loss_meter_type: LossMeterType, losses_type: type[LossesType]) -> None:
         """
-        A meter to store a list of losses.
+        A meter to accumulate losses. Rather than storing every losses object, the meter keeps a running sum of each
+        loss, detached from the autograd graph, on the device the loss was computed on. Updating the meter therefore
+        uses constant memory and does not synchronize with the device. The sums are only transferred to the host,
+        at once, when the meter is computed.
 
         Args:
             loss_meter_type (LossMeterType): The type of this loss meter
@@ -176,60 +191,89 @@ class LossMeter(Generic[LossesType]):
                 of the subclasses of Losses
 
         """
-        self.losses_list: List[LossesType] = []
         self.loss_meter_type = loss_meter_type
         self.losses_type = losses_type
+        # Running sums of each loss, grouped as in Losses.as_tensor_dicts, and the number of losses summed
+        self.loss_sums: Dict[str, Dict[str, torch.Tensor]] = {}
+        self.num_losses = 0.0
 
     def update(self, losses: LossesType) -> None:
         """
-        Appends loss to list of losses.
+        Adds the losses to the running sums of the meter. The losses are detached, so that the autograd graph of the
+        step is not kept alive, and summed in full precision on their device.
 
         Args:
             losses (LossesType): A losses object with checkpoint, backward and additional losses.
         """
-        self.losses_list.append(losses)
+        for component, tensor_dict in losses.as_tensor_dicts().items():
+            component_sums = self.loss_sums.setdefault(component, {})
+            for key, loss in tensor_dict.items():
+                loss = loss.detach()
+                if key in component_sums:
+                    component_sums[key].add_(loss)
+                else:
+                    component_sums[key] = loss.to(torch.float32, copy=True)
+        self.num_losses += 1
+
+    def merge(self, other: "LossMeter[LossesType]", weight: float = 1.0) -> None:
+        """
+        Adds the running sums of another meter to those of this meter, without synchronizing with the device.
+
+        Args:
+            other (LossMeter[LossesType]): The meter whose losses are added.
+            weight (float, optional): The weight of the losses of the other meter, which are counted as this fraction
+                of a loss each. With gradient accumulation, the losses of the micro-batches of an optimizer step are
+                merged with weight one over the number of micro-batches, so that the meter counts optimizer steps.
+                Defaults to 1.0.
+        """
+        for component, other_sums in other.loss_sums.items():
+            component_sums = self.loss_sums.setdefault(component, {})
+            for key, loss_sum in other_sums.items():
+                if key in component_sums:
+                    component_sums[key].add_(loss_sum, alpha=weight)
+                else:
+                    component_sums[key] = loss_sum * weight
+        self.num_losses += other.num_losses * weight
 
     def clear(self) -> None:
         """
-        Resets the meter by re-initializing losses_list to be empty
+        Resets the meter by clearing the running sums
         """
-        self.losses_list = []
+        self.loss_sums = {}
+        self.num_losses = 0.0
 
     def compute(self) -> LossesType:
         """
-        Computes the aggregation of current list of losses if non-empty.
+        Computes the aggregation of the losses accumulated so far, if any.
 
         Returns:
-            LossesType: New Losses object with the aggregation of losses in losses_list.
+            LossesType: New Losses object with the aggregation of the accumulated losses.
         """
-        assert len(self.losses_list) > 0
+        assert self.num_losses > 0
         return self.losses_type.aggregate(self)  # type: ignore
 
-    @staticmethod
-    def aggregate_losses_dict(
-        loss_list: List[Dict[str, torch.Tensor]],
-        loss_meter_type: LossMeterType,
-    ) -> Dict[str, torch.Tensor]:
+    def aggregate_tensor_dicts(self) -> Dict[str, Dict[str, torch.Tensor]]:
         """
-        Aggregates a list of losses dictionaries into a single dictionary according to the loss meter aggregation type
-
-        Args:
-            loss_list (List[Dict[str, torch.Tensor]]): A list of loss dictionaries
-            loss_meter_type (LossMeterType): The type of the loss meter to perform the aggregation
+        Aggregates the running sums according to the loss meter aggregation type. The sums are moved to the host
+        together, in a single transfer per device, so that the values of the aggregated losses can be read without
+        further synchronization.
 
         Returns:
-            Dict[str, torch.Tensor]: A single dictionary with the aggregated losses according to the given loss
-                meter type
-        """
-        # We don't know the keys of the dict (backward or additional losses) beforehand. We obtain them
-        # from the first entry because we know all of the losses will have the same keys
-        loss_keys = loss_list[0].keys()
-        num_losses = len(loss_list)
-        loss_dict: Dict[str, torch.Tensor] = {}
-        for key in loss_keys:
-            loss = torch.sum(torch.FloatTensor([loss[key] for loss in loss_list]))
-            if loss_meter_type == LossMeterType.AVERAGE:
-                loss = loss / num_losses
-            loss_dict[key] = loss
-
-        return loss_dict
+            Dict[str, Dict[str, torch.Tensor]]: The aggregated losses, as CPU tensors, grouped as in
+                Losses.as_tensor_dicts.
+        """
+        keys = [(component, key) for component, component_sums in self.loss_sums.items() for key in component_sums]
+        sums = [self.loss_sums[component][key] for component, key in keys]
+        host_sums: Dict[Tuple[str, str], torch.Tensor] = {}
+        for device in {loss_sum.device for loss_sum in sums}:
+            device_keys = [loss_key for loss_key, loss_sum in zip(keys, sums) if loss_sum.device == device]
+            stacked_sums = torch.stack([self.loss_sums[component][key].reshape(()) for component, key in device_keys])
+            host_sums.update(zip(device_keys, stacked_sums.cpu().unbind()))
+
+        aggregated_losses: Dict[str, Dict[str, torch.Tensor]] = {component: {} for component in self.loss_sums}
+        for component, key in keys:
+            loss = host_sums[(component, key)]
+            if self.loss_meter_type == LossMeterType.AVERAGE:
+                loss = loss / self.num_losses
+            aggregated_losses[component][key] = loss
+        return aggregated_losses
@@ -1,5 +1,5 @@
 from collections import defaultdict
-from typing import DefaultDict, List, Tuple
+from typing import Callable, DefaultDict, List, Optional, Tuple
 
 from flwr.common.typing import Metrics
 
@@ -171,3 +171,82 @@ def uniform_evaluate_metrics_aggregation_fn(
     # NOTE: The first value of the tuple is number of examples for FedAvg, but it is not used here.
     total_client_count_by_metric, aggregated_metrics = uniform_metric_aggregation(all_client_metrics)
     return uniform_normalize_metrics(total_client_count_by_metric, aggregated_metrics)
+
+
+class IncrementalMetricAggregator:
+    def __init__(self, weighted: bool = True) -> None:
+        """
+        Accumulates client metrics one client at a time, so that metrics can be folded in as client results arrive
+        rather than all at once after every client has reported. Computes the same values as
+        fit_metrics_aggregation_fn (weighted) or uniform_evaluate_metrics_aggregation_fn (uniform).
+
+        Args:
+            weighted (bool, optional): Whether each client's metrics are weighted by its sample count and normalized
+                by the total number of samples, or uniformly averaged over the clients that reported each metric.
+                Defaults to True.
+        """
+        self.weighted = weighted
+        self.aggregated_metrics: Metrics = {}
+        self.total_client_count_by_metric: DefaultDict[str, int] = defaultdict(int)
+        self.total_examples = 0
+
+    def clear(self) -> None:
+        """Resets the aggregator so that it may be reused for a new round of aggregation."""
+        self.aggregated_metrics = {}
+        self.total_client_count_by_metric = defaultdict(int)
+        self.total_examples = 0
+
+    def update(self, num_examples: int, client_metrics: Metrics) -> None:
+        """
+        Folds a single client's metrics into the running aggregate.
+
+        Args:
+            num_examples (int): The number of samples on the client. Only used if the aggregation is weighted.
+            client_metrics (Metrics): The metrics reported by the client.
+        """
+        self.total_examples += num_examples
+        scale = num_examples if self.weighted else 1
+        for metric_name, metric_value in client_metrics.items():
+            if isinstance(metric_value, float):
+                current_metric_value = self.aggregated_metrics.get(metric_name, 0.0)
+                assert isinstance(current_metric_value, float)
+                self.aggregated_metrics[metric_name] = current_metric_value + scale * metric_value
+            elif isinstance(metric_value, int):
+                current_metric_value = self.aggregated_metrics.get(metric_name, 0)
+                assert isinstance(current_metric_value, int)
+                self.aggregated_metrics[metric_name] = current_metric_value + scale * metric_value
+            else:
+                raise ValueError("Metric type is not supported")
+            self.total_client_count_by_metric[metric_name] += 1
+
+    def compute(self) -> Metrics:
+        """
+        Normalizes the metrics accumulated so far.
+
+        Returns:
+            Metrics: The aggregated normalized metrics.
+        """
+        if self.weighted:
+            return normalize_metrics(self.total_examples, self.aggregated_metrics)
+        return uniform_normalize_metrics(self.total_client_count_by_metric, self.aggregated_metrics)
+
+
+def get_incremental_metric_aggregator(
+    metrics_aggregation_fn: Optional[Callable[[List[Tuple[int, Metrics]]], Metrics]]
+) -> Optional[IncrementalMetricAggregator]:
+    """
+    Provides an incremental equivalent of the library's metric aggregation functions.
+
+    Args:
+        metrics_aggregation_fn (Optional[Callable[[List[Tuple[int, Metrics]]], Metrics]]): A metrics aggregation
+            function, such as those defined in this module.
+
+    Returns:
+        Optional[IncrementalMetricAggregator]: An aggregator computing the same metrics incrementally, or None if
+            metrics_aggregation_fn has no known incremental equivalent.
+    """
+    if metrics_aggregation_fn in (fit_metrics_aggregation_fn, evaluate_metrics_aggregation_fn):
+        return IncrementalMetricAggregator(weighted=True)
+    if metrics_aggregation_fn is uniform_evaluate_metrics_aggregation_fn:
+        return IncrementalMetricAggregator(weighted=False)
+    return None
@@ -5,7 +5,6 @@ from typing import Dict, List, Sequence, Tuple
 import numpy as np
 import torch
 from flwr.common.typing import Metrics, Optional, Scalar
-from sklearn import metrics as sklearn_metrics
 from torchmetrics import Metric as TMetric
 
 
@@ -172,7 +171,106 @@ class SimpleMetric(Metric, ABC):
         raise NotImplementedError
 
 
-class BinarySoftDiceCoefficient(SimpleMetric):
+class StreamingMetric(Metric, ABC):
+    def __init__(self, name: str) -> None:
+        """
+        Abstract metric class for metrics that can be computed from sufficient statistics summed over batches (i.e.
+        confusion matrix counts), rather than from every prediction and target. Each update reduces the batch to its
+        statistics, which are added to a running total kept on the device of the predictions. Memory is therefore
+        independent of the size of the dataset, the predictions are not kept alive (along with their autograd graph)
+        and the statistics are only transferred to the host when the metric is computed.
+        User needs to define batch_statistics, which reduces a batch to its statistics, and compute_from_statistics,
+        which computes the metric from the statistics. Calling the metric computes it on the given batch alone.
+
+        Args:
+            name (str): Name of the metric.
+        """
+        super().__init__(name)
+        self.statistics: Optional[torch.Tensor] = None
+
+    def update(self, input: torch.Tensor, target: torch.Tensor) -> None:
+        """
+        This method updates the state of the metric by adding the statistics of the passed input and target pairing
+        to the running total.
+
+        Args:
+            input (torch.Tensor): The predictions of the model to be evaluated.
+            target (torch.Tensor): The ground truth target to evaluate predictions against.
+        """
+        with torch.no_grad():
+            batch_statistics = self.batch_statistics(input.detach(), target.detach())
+        if self.statistics is None:
+            self.statistics = batch_statistics
+        else:
+            assert (
+                self.statistics.shape == batch_statistics.shape
+            ), f"Batch statistics of shape {batch_statistics.shape} cannot be added to {self.statistics.shape}"
+            self.statistics += batch_statistics
+
+    def compute(self, name: Optional[str] = None) -> Metrics:
+        """
+        Compute metric on the statistics accumulated over updates.
+
+        Args:
+            name (Optional[str]): Optional name used in conjunction with class attribute name
+                to define key in metrics dictionary.
+
+        Raises:
+            AssertionError: The metric must have been updated.
+
+        Returns:
+            Metrics: A dictionary of string and Scalar representing the computed metric
+                and its associated key.
+        """
+        assert self.statistics is not None
+        result = self.compute_from_statistics(self.statistics)
+        result_key = f"{name} - {self.name}" if name is not None else self.name
+
+        return {result_key: result}
+
+    def clear(self) -> None:
+        """
+        Resets metrics by clearing the accumulated statistics.
+        """
+        self.statistics = None
+
+    def __call__(self, input: torch.Tensor, target: torch.Tensor) -> Scalar:
+        """
+        Computes the metric on the given predictions and target alone, without modifying the state of the metric.
+
+        Args:
+            input (torch.Tensor): The predictions of the model to be evaluated.
+            target (torch.Tensor): The ground truth target to evaluate predictions against.
+
+        Returns:
+            Scalar: The value of the metric.
+        """
+        with torch.no_grad():
+            return self.compute_from_statistics(self.batch_statistics(input.detach(), target.detach()))
+
+    @abstractmethod
+    def batch_statistics(self, input: torch.Tensor, target: torch.Tensor) -> torch.Tensor:
+        """
+        User defined method that reduces a batch of predictions and targets to the statistics from which the metric
+        is computed. The statistics of several batches are summed, so they must have the same shape for every batch.
+
+        Raises:
+            NotImplementedError: User must define this method.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def compute_from_statistics(self, statistics: torch.Tensor) -> Scalar:
+        """
+        User defined method that calculates the desired metric given the statistics summed over batches.
+
+        Raises:
+            NotImplementedError: User must define this method.
+        """
+        raise NotImplementedError
+
+
+class BinarySoftDiceCoefficient(StreamingMetric):
     def __init__(
         self,
         name: str = "BinarySoftDiceCoefficient",
@@ -181,7 +279,9 @@ class BinarySoftDiceCoefficient(SimpleMetric):
         logits_threshold: Optional[float] = 0.5,
     ):
         """
-        Binary DICE Coefficient Metric with configurable spatial dimensions and logits threshold.
+        Binary DICE Coefficient Metric with configurable spatial dimensions and logits threshold. The coefficient of
+        each image (and channel) is computed as batches are received, so that only the sum of the coefficients and
+        their number are accumulated.
 
         Args:
             name (str): Name of the metric.
@@ -199,7 +299,7 @@ class BinarySoftDiceCoefficient(SimpleMetric):
         self.logits_threshold = logits_threshold
         super().__init__(name)
 
-    def __call__(self, logits: torch.Tensor, target: torch.Tensor) -> Scalar:
+    def batch_statistics(self, logits: torch.Tensor, target: torch.Tensor) -> torch.Tensor:
         # Assuming the logits are to be mapped to binary. Note that this assumes the logits have already been
         # constrained to [0, 1]. The metric still functions if not, but results will be unpredictable.
         if self.logits_threshold:
@@ -211,10 +311,68 @@ class BinarySoftDiceCoefficient(SimpleMetric):
         dice = intersection / (union + self.epsilon)
         # If both inputs are empty the dice coefficient should be equal 1
         dice[union == 0] = 1
-        return torch.mean(dice).item()
+        # The sum of the coefficients and their number, kept on the device of the predictions. The sum is accumulated
+        # in double precision, except on devices without float64 support (i.e. MPS).
+        statistics_dtype = torch.float32 if dice.device.type == "mps" else torch.float64
+        dice_sum = dice.sum(dtype=statistics_dtype)
+        return torch.stack([dice_sum, dice_sum.new_tensor(dice.numel())])
+
+    def compute_from_statistics(self, statistics: torch.Tensor) -> Scalar:
+        dice_sum, dice_count = statistics.tolist()
+        return dice_sum / dice_count
 
 
-class Accuracy(SimpleMetric):
+class ConfusionMatrixMetric(StreamingMetric, ABC):
+    def __init__(self, name: str) -> None:
+        """
+        Abstract metric class for classification metrics computed from a confusion matrix, which is the only state
+        accumulated. The classes are those of the columns of the logits (two if the logits have a single column).
+        The targets are assumed to be class indices within these classes.
+
+        Args:
+            name (str): Name of the metric.
+        """
+        super().__init__(name)
+
+    def predictions(self, logits: torch.Tensor) -> torch.Tensor:
+        """
+        Maps logits to predicted classes. Defaults to the column with the highest logit.
+
+        Args:
+            logits (torch.Tensor): The logits, with batch first and classes second.
+
+        Returns:
+            torch.Tensor: The predicted classes.
+        """
+        return torch.argmax(logits, 1)
+
+    def batch_statistics(self, logits: torch.Tensor, target: torch.Tensor) -> torch.Tensor:
+        # assuming batch first
+        assert logits.shape[0] == target.shape[0]
+        num_classes = logits.shape[1] if len(logits.shape) > 1 and logits.shape[1] > 1 else 2
+        preds = self.predictions(logits).reshape(-1).long()
+        labels = target.reshape(-1).long()
+        assert preds.shape == labels.shape, f"Predictions of shape {preds.shape} and targets {labels.shape} differ"
+        # Entry (i, j) of the confusion matrix counts the examples of class i predicted as class j
+        counts = torch.bincount(labels * num_classes + preds, minlength=num_classes**2)
+        return counts.reshape(num_classes, num_classes)
+
+    def compute_from_statistics(self, statistics: torch.Tensor) -> Scalar:
+        return self.compute_from_confusion_matrix(statistics.cpu().numpy().astype(np.float64))
+
+    @abstractmethod
+    def compute_from_confusion_matrix(self, confusion_matrix: np.ndarray) -> Scalar:
+        """
+        User defined method that calculates the desired metric given the confusion matrix, whose entry (i, j) counts
+        the examples of class i predicted as class j.
+
+        Raises:
+            NotImplementedError: User must define this method.
+        """
+        raise NotImplementedError
+
+
+class Accuracy(ConfusionMatrixMetric):
     def __init__(self, name: str = "accuracy"):
         """
         Accuracy metric for classification tasks.
@@ -225,20 +383,17 @@ class Accuracy(SimpleMetric):
         """
         super().__init__(name)
 
-    def __call__(self, logits: torch.Tensor, target: torch.Tensor) -> Scalar:
-        # assuming batch first
-        assert logits.shape[0] == target.shape[0]
+    def predictions(self, logits: torch.Tensor) -> torch.Tensor:
         # Single value output, assume binary logits
         if len(logits.shape) == 1 or logits.shape[1] == 1:
-            preds = (logits > 0.5).int()
-        else:
-            preds = torch.argmax(logits, 1)
-        target = target.cpu().detach()
-        preds = preds.cpu().detach()
-        return sklearn_metrics.accuracy_score(target, preds)
+            return (logits > 0.5).int()
+        return torch.argmax(logits, 1)
 
+    def compute_from_confusion_matrix(self, confusion_matrix: np.ndarray) -> Scalar:
+        return float(np.trace(confusion_matrix) / confusion_matrix.sum())
 
-class BalancedAccuracy(SimpleMetric):
+
+class BalancedAccuracy(ConfusionMatrixMetric):
     def __init__(self, name: str = "balanced_accuracy"):
         """
         Balanced accuracy metric for classification tasks. Used for the evaluation of imbalanced datasets.
@@ -247,60 +402,106 @@ class BalancedAccuracy(SimpleMetric):
         """
         super().__init__(name)
 
-    def __call__(self, logits: torch.Tensor, target: torch.Tensor) -> Scalar:
-        # assuming batch first
-        assert logits.shape[0] == target.shape[0]
-        target = target.cpu().detach()
-        logits = logits.cpu().detach()
-        y_true = target.reshape(-1)
-        preds = np.argmax(logits, axis=1)
-        return sklearn_metrics.balanced_accuracy_score(y_true, preds)
+    def compute_from_confusion_matrix(self, confusion_matrix: np.ndarray) -> Scalar:
+        # As in sklearn, the recall is averaged over the classes present in the targets
+        class_counts = confusion_matrix.sum(axis=1)
+        present = class_counts > 0
+        return float(np.mean(np.diag(confusion_matrix)[present] / class_counts[present]))
 
 
-class ROC_AUC(SimpleMetric):
-    def __init__(self, name: str = "ROC_AUC score"):
+class ROC_AUC(StreamingMetric):
+    def __init__(self, name: str = "ROC_AUC score", num_bins: int = 1000):
         """
-        Area under the Receiver Operator Curve (AUCROC) metric for classification. For more information:
-        https://scikit-learn.org/stable/modules/generated/sklearn.metrics.balanced_accuracy_score.html
+        Area under the Receiver Operator Curve (AUCROC) metric for classification, computed one-vs-rest for each
+        class and averaged, weighted by the number of examples of each class. For more information:
+        https://scikit-learn.org/stable/modules/generated/sklearn.metrics.roc_auc_score.html
+
+        Rather than keeping every predicted probability, a histogram of the probabilities of each class is
+        accumulated, separately for the examples of that class and the others. The curve is then computed from the
+        histograms, so the result is exact for probabilities that fall in distinct bins and treats probabilities
+        within the same bin as ties otherwise.
+
+        Args:
+            name (str, optional): Name of the metric. Defaults to "ROC_AUC score".
+            num_bins (int, optional): Number of bins of the histograms, which evenly partition [0, 1]. Defaults to
+                1000.
         """
         super().__init__(name)
+        self.num_bins = num_bins
 
-    def __call__(self, logits: torch.Tensor, target: torch.Tensor) -> Scalar:
+    def batch_statistics(self, logits: torch.Tensor, target: torch.Tensor) -> torch.Tensor:
         assert logits.shape[0] == target.shape[0]
-        prob = torch.nn.functional.softmax(logits, dim=1)
-        prob = prob.cpu().detach()
-        target = target.cpu().detach()
-        y_true = target.reshape(-1)
-        return sklearn_metrics.roc_auc_score(y_true, prob, average="weighted", multi_class="ovr")
-
-
-class F1(SimpleMetric):
+        prob = torch.nn.functional.softmax(logits.float(), dim=1)
+        num_classes = prob.shape[1]
+        bins = torch.clamp((prob * self.num_bins).long(), max=self.num_bins - 1)
+        # Whether each example belongs to each class
+        positives = torch.nn.functional.one_hot(target.reshape(-1).long(), num_classes).long()
+        classes = torch.arange(num_classes, device=prob.device)
+        # Histograms of shape (num_classes, 2, num_bins), for the examples of other classes then those of the class
+        indices = (classes * 2 + positives) * self.num_bins + bins
+        counts = torch.bincount(indices.reshape(-1), minlength=num_classes * 2 * self.num_bins)
+        return counts.reshape(num_classes, 2, self.num_bins)
+
+    def compute_from_statistics(self, statistics: torch.Tensor) -> Scalar:
+        histograms = statistics.cpu().numpy().astype(np.float64)
+        class_aucs, class_counts = [], []
+        for class_index, (negatives, positives) in enumerate(histograms):
+            num_positives, num_negatives = positives.sum(), negatives.sum()
+            if num_positives == 0 or num_negatives == 0:
+                raise ValueError(
+                    f"ROC AUC is not defined, as class {class_index} is present in all or none of the targets"
+                )
+            # Each positive is ranked above the negatives in lower bins and tied with those in the same bin
+            negatives_below = np.cumsum(negatives) - negatives
+            class_aucs.append(
+                (positives * (negatives_below + 0.5 * negatives)).sum() / (num_positives * num_negatives)
+            )
+            class_counts.append(num_positives)
+        return float(np.average(class_aucs, weights=class_counts))
+
+
+class F1(ConfusionMatrixMetric):
     def __init__(
         self,
         name: str = "F1 score",
         average: Optional[str] = "weighted",
     ):
         """
-        Computes the F1 score using the sklearn f1_score function. As such, the values of average are correspond to
-        those of that function.
+        Computes the F1 score from the accumulated confusion matrix, as the sklearn f1_score function does. As such,
+        the values of average are correspond to those of that function.
 
         Args:
             name (str, optional): Name of the metric. Defaults to "F1 score".
             average (Optional[str], optional): Whether to perform averaging of the F1 scores and how. The values of
-                this string corresponds to those of the sklearn f1_score function. See:
+                this string corresponds to those of the sklearn f1_score function ("binary", "micro", "macro",
+                "weighted" or None). See:
                 https://scikit-learn.org/stable/modules/generated/sklearn.metrics.f1_score.html
                 Defaults to "weighted".
         """
         super().__init__(name)
+        assert average in {"binary", "micro", "macro", "weighted", None}, f"Unsupported average: {average}"
         self.average = average
 
-    def __call__(self, logits: torch.Tensor, target: torch.Tensor) -> Scalar:
-        assert logits.shape[0] == target.shape[0]
-        target = target.cpu().detach()
-        logits = logits.cpu().detach()
-        y_true = target.reshape(-1)
-        preds = np.argmax(logits, axis=1)
-        return sklearn_metrics.f1_score(y_true, preds, average=self.average)
+    def compute_from_confusion_matrix(self, confusion_matrix: np.ndarray) -> Scalar:
+        true_positives = np.diag(confusion_matrix)
+        class_counts = confusion_matrix.sum(axis=1)
+        predicted_counts = confusion_matrix.sum(axis=0)
+        if self.average == "micro":
+            return float(true_positives.sum() / confusion_matrix.sum())
+        denominators = class_counts + predicted_counts
+        # As in sklearn, the score of a class that is neither present nor predicted is 0
+        class_scores = np.divide(
+            2 * true_positives, denominators, out=np.zeros_like(true_positives), where=denominators > 0
+        )
+        if self.average == "binary":
+            return float(class_scores[1])
+        # As in sklearn, only the classes present in the targets or predictions are scored
+        labels = denominators > 0
+        if self.average == "macro":
+            return float(np.mean(class_scores[labels]))
+        if self.average == "weighted":
+            return float(np.average(class_scores, weights=class_counts))
+        return class_scores[labels]  # type: ignore
 
 
 class MetricManager:
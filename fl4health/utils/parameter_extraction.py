@@ -1,7 +1,8 @@
 import torch.nn as nn
-from flwr.common.parameter import ndarrays_to_parameters
 from flwr.common.typing import Parameters
 
+from fl4health.utils.serialization import ndarrays_to_parameters
+
 
 def get_all_model_parameters(model: nn.Module) -> Parameters:
     """
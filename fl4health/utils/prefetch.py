@@ -0,0 +1,187 @@
+import queue
+import threading
+from typing import Any, Iterable, Iterator, Optional
+
+import torch
+
+# Placed in the queue by the loading thread once the wrapped loader is exhausted
+_END_OF_DATA = object()
+
+
+class _LoaderException:
+    def __init__(self, exception: BaseException) -> None:
+        # Wraps an exception raised by the wrapped loader, to be re-raised by the consuming thread
+        self.exception = exception
+
+
+def move_batch_to_device(batch: Any, device: torch.device, non_blocking: bool = False) -> Any:
+    """
+    Moves every tensor of a batch (i.e. an (input, target) tuple, where the input may be a dictionary of tensors)
+    to the device, preserving the structure of the batch.
+
+    Args:
+        batch (Any): The batch. Tensors may be nested in tuples, lists and dictionaries.
+        device (torch.device): The device to move the tensors to.
+        non_blocking (bool, optional): Whether the copies are asynchronous with respect to the host, which requires
+            the tensors to be in pinned memory. Defaults to False.
+
+    Returns:
+        Any: The batch, with its tensors on the device.
+    """
+    if isinstance(batch, torch.Tensor):
+        return batch.to(device, non_blocking=non_blocking)
+    if isinstance(batch, dict):
+        return {key: move_batch_to_device(value, device, non_blocking) for key, value in batch.items()}
+    if isinstance(batch, (tuple, list)):
+        return type(batch)(move_batch_to_device(value, device, non_blocking) for value in batch)
+    return batch
+
+
+def pin_batch_memory(batch: Any) -> Any:
+    """
+    Copies every tensor of a batch that is not already in pinned (page-locked) memory to pinned memory, preserving
+    the structure of the batch, so that it can be copied to a GPU asynchronously.
+
+    Args:
+        batch (Any): The batch. Tensors may be nested in tuples, lists and dictionaries.
+
+    Returns:
+        Any: The batch, with its tensors in pinned memory.
+    """
+    if isinstance(batch, torch.Tensor):
+        return batch if batch.is_pinned() else batch.pin_memory()
+    if isinstance(batch, dict):
+        return {key: pin_batch_memory(value) for key, value in batch.items()}
+    if isinstance(batch, (tuple, list)):
+        return type(batch)(pin_batch_memory(value) for value in batch)
+    return batch
+
+
+def _put(batch_queue: queue.Queue, stop_event: threading.Event, item: Any) -> bool:
+    # Waits for space in the queue, unless the consumer stops iterating in the meantime
+    while not stop_event.is_set():
+        try:
+            batch_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _load_batches(
+    loader_iterator: Iterator[Any], batch_queue: queue.Queue, stop_event: threading.Event, pin_memory: bool
+) -> None:
+    # Runs in the loading thread, which must not reference the PrefetchIterator, so that the iterator is garbage
+    # collected (and the thread stopped) when the consumer drops it
+    try:
+        for batch in loader_iterator:
+            if pin_memory:
+                batch = pin_batch_memory(batch)
+            if not _put(batch_queue, stop_event, batch):
+                return
+    except Exception as exception:
+        _put(batch_queue, stop_event, _LoaderException(exception))
+        return
+    _put(batch_queue, stop_event, _END_OF_DATA)
+
+
+class PrefetchIterator(Iterator[Any]):
+    def __init__(self, data_loader: Iterable[Any], device: torch.device, num_prefetch_batches: int) -> None:
+        """
+        Iterator over the batches of a data loader, moved to the device ahead of their use. A background thread
+        loads (and collates) up to num_prefetch_batches batches ahead of the consumer and, if the device is a GPU,
+        pins them. When a batch is requested, the copy of the following batch to the device is issued on a separate
+        CUDA stream, so that it overlaps with the computation on the current batch. On CPU, only loading overlaps
+        with computation.
+
+        Args:
+            data_loader (Iterable[Any]): The data loader whose batches are prefetched.
+            device (torch.device): The device the batches are moved to.
+            num_prefetch_batches (int): The maximum number of batches loaded ahead of the consumer.
+        """
+        assert num_prefetch_batches > 0, "At least one batch must be prefetched"
+        self.stop_event = threading.Event()
+        self.device = device
+        use_cuda_stream = device.type == "cuda" and torch.cuda.is_available()
+        self.copy_stream: Optional[torch.cuda.Stream] = torch.cuda.Stream(device) if use_cuda_stream else None
+        self.batch_queue: queue.Queue = queue.Queue(maxsize=num_prefetch_batches)
+        self.loading_thread = threading.Thread(
+            target=_load_batches,
+            args=(iter(data_loader), self.batch_queue, self.stop_event, use_cuda_stream),
+            daemon=True,
+        )
+        self.loading_thread.start()
+        # The batch whose copy to the device has been issued, returned by the next call to __next__, if any
+        self.next_batch: Any = None
+
+    def _issue_next_copy(self, block: bool) -> Any:
+        # Takes the next loaded batch and issues its copy to the device. Without blocking, None is returned if the
+        # loading thread has not loaded the batch yet.
+        try:
+            batch = self.batch_queue.get(block=block)
+        except queue.Empty:
+            return None
+        if batch is _END_OF_DATA or isinstance(batch, _LoaderException):
+            return batch
+        if self.copy_stream is None:
+            return move_batch_to_device(batch, self.device)
+        with torch.cuda.stream(self.copy_stream):
+            return move_batch_to_device(batch, self.device, non_blocking=True)
+
+    def _record_current_stream(self, batch: Any) -> None:
+        # The batch was allocated on the copy stream, but is used on the current stream, so its memory must not be
+        # reused until the current stream is done with it
+        if isinstance(batch, torch.Tensor):
+            batch.record_stream(torch.cuda.current_stream(self.device))
+        elif isinstance(batch, dict):
+            for value in batch.values():
+                self._record_current_stream(value)
+        elif isinstance(batch, (tuple, list)):
+            for value in batch:
+                self._record_current_stream(value)
+
+    def __next__(self) -> Any:
+        batch = self.next_batch if self.next_batch is not None else self._issue_next_copy(block=True)
+        self.next_batch = batch
+        if batch is _END_OF_DATA:
+            raise StopIteration
+        if isinstance(batch, _LoaderException):
+            self.close()
+            raise batch.exception
+        if self.copy_stream is not None:
+            torch.cuda.current_stream(self.device).wait_stream(self.copy_stream)
+            self._record_current_stream(batch)
+        # Issue the copy of the following batch, if already loaded, so that it overlaps with the use of this batch
+        self.next_batch = self._issue_next_copy(block=False)
+        return batch
+
+    def close(self) -> None:
+        """Stops the loading thread, i.e. when the consumer stops iterating before the loader is exhausted."""
+        self.stop_event.set()
+
+    def __del__(self) -> None:
+        self.close()
+
+
+class PrefetchLoader(Iterable[Any]):
+    def __init__(self, data_loader: Iterable[Any], device: torch.device, num_prefetch_batches: int = 2) -> None:
+        """
+        Wraps a data loader so that its batches are loaded in a background thread and moved to the device ahead of
+        their use (see PrefetchIterator). Each iteration over the wrapper iterates once over the data loader.
+
+        Args:
+            data_loader (Iterable[Any]): The data loader whose batches are prefetched. Batches may be tensors or
+                tuples, lists and dictionaries of tensors.
+            device (torch.device): The device the batches are moved to.
+            num_prefetch_batches (int, optional): The maximum number of batches loaded ahead of the consumer.
+                Defaults to 2.
+        """
+        self.data_loader = data_loader
+        self.device = device
+        self.num_prefetch_batches = num_prefetch_batches
+
+    def __iter__(self) -> PrefetchIterator:
+        return PrefetchIterator(self.data_loader, self.device, self.num_prefetch_batches)
+
+    def __len__(self) -> int:
+        return len(self.data_loader)  # type: ignore
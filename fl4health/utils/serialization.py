@@ -0,0 +1,167 @@
+from io import BytesIO
+from typing import Iterable, Tuple
+
+import numpy as np
+import torch
+from flwr.common import NDArray, NDArrays, Parameters
+from flwr.common.parameter import bytes_to_ndarray as flwr_bytes_to_ndarray
+from flwr.common.parameter import ndarray_to_bytes as flwr_ndarray_to_bytes
+
+# Upper bound on the size of the temporary buffers used when tensors are copied chunk by chunk
+DEFAULT_CHUNK_SIZE_BYTES = 16 * 2**20
+
+
+def read_tensor_header(tensor: bytes) -> Tuple[Tuple[int, ...], bool, np.dtype, int]:
+    """
+    Reads the header of a serialized (.npy format) tensor without decoding its data.
+
+    Args:
+        tensor (bytes): The serialized tensor.
+
+    Returns:
+        Tuple[Tuple[int, ...], bool, np.dtype, int]: The shape, whether the data is in Fortran order, the dtype and
+            the offset of the data within the serialized tensor.
+    """
+    tensor_io = BytesIO(tensor)
+    version = np.lib.format.read_magic(tensor_io)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(tensor_io)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(tensor_io)
+    return shape, fortran_order, dtype, tensor_io.tell()
+
+
+def ndarray_to_bytes(ndarray: NDArray) -> bytes:
+    """
+    Serializes an array in the .npy format, as Flower's ndarray_to_bytes does, so that it can be decoded by either
+    implementation. Flower writes the array into an in-memory file and then copies the file's contents into a bytes
+    object. Here, the header and a view of the array's data are joined directly into the bytes object, so that the
+    data is copied once. Arrays that are not C-contiguous are made contiguous first.
+
+    Args:
+        ndarray (NDArray): The array to be serialized.
+
+    Returns:
+        bytes: The serialized array.
+    """
+    if ndarray.dtype.hasobject:
+        # Object arrays are pickled, which is left to numpy
+        return flwr_ndarray_to_bytes(ndarray)
+    if not ndarray.flags.c_contiguous:
+        ndarray = ndarray.copy(order="C")
+    header_io = BytesIO()
+    header = np.lib.format.header_data_from_array_1_0(ndarray)
+    try:
+        np.lib.format.write_array_header_1_0(header_io, header)
+    except ValueError:
+        # The header is too large for version 1.0 of the format (i.e. for very large structured dtypes)
+        np.lib.format.write_array_header_2_0(header_io, header)
+    return b"".join([header_io.getvalue(), ndarray.reshape(-1).view(np.uint8).data])
+
+
+def bytes_to_ndarray(tensor: bytes, copy: bool = False) -> NDArray:
+    """
+    Decodes a tensor serialized in the .npy format. By default, the array returned is a read-only view of the data
+    within the serialized tensor (np.frombuffer), so no copy is made. Flower's bytes_to_ndarray always copies the data.
+
+    Args:
+        tensor (bytes): The serialized tensor.
+        copy (bool, optional): Whether to return a writable copy of the data rather than a read-only view. Defaults
+            to False.
+
+    Returns:
+        NDArray: The decoded array.
+    """
+    shape, fortran_order, dtype, data_offset = read_tensor_header(tensor)
+    if dtype.hasobject:
+        return flwr_bytes_to_ndarray(tensor)
+    ndarray = np.frombuffer(tensor, dtype=dtype, count=int(np.prod(shape)), offset=data_offset)
+    ndarray = ndarray.reshape(shape, order="F" if fortran_order else "C")
+    return ndarray.copy() if copy else ndarray
+
+
+def bytes_to_ndarray_into(tensor: bytes, out: NDArray, chunk_size_bytes: int = DEFAULT_CHUNK_SIZE_BYTES) -> NDArray:
+    """
+    Decodes a serialized tensor directly into a preallocated array (i.e. a layer of a flat buffer or a memory-mapped
+    file), casting it to the dtype of out. The data is copied from a view of the serialized tensor in chunks of
+    bounded size, so that no temporary array the size of the tensor is created, even when casting.
+
+    Args:
+        tensor (bytes): The serialized tensor.
+        out (NDArray): The C-contiguous array that the tensor is decoded into. Must have the shape of the tensor.
+        chunk_size_bytes (int, optional): Upper bound on the number of bytes copied at a time. Defaults to
+            DEFAULT_CHUNK_SIZE_BYTES.
+
+    Returns:
+        NDArray: out, holding the decoded tensor.
+    """
+    ndarray = bytes_to_ndarray(tensor)
+    assert out.shape == ndarray.shape, f"Serialized tensor has shape {ndarray.shape}, out has shape {out.shape}"
+    if not (out.flags.c_contiguous and ndarray.flags.c_contiguous):
+        np.copyto(out, ndarray, casting="unsafe")
+        return out
+    flat_out, flat_ndarray = out.reshape(-1), ndarray.reshape(-1)
+    chunk_length = max(1, chunk_size_bytes // max(out.itemsize, ndarray.itemsize))
+    for start in range(0, flat_out.size, chunk_length):
+        np.copyto(flat_out[start : start + chunk_length], flat_ndarray[start : start + chunk_length], casting="unsafe")
+    return out
+
+
+def copy_ndarray_into_tensor(
+    ndarray: NDArray, tensor: torch.Tensor, chunk_size_bytes: int = DEFAULT_CHUNK_SIZE_BYTES
+) -> None:
+    """
+    Copies an array into the existing storage of a tensor (i.e. a model parameter), casting it to the dtype and
+    device of the tensor. Writable arrays are wrapped as tensors without copying. Torch does not support read-only
+    arrays (i.e. views decoded by bytes_to_ndarray), so these are staged through writable copies in chunks of bounded
+    size rather than copied whole.
+
+    Args:
+        ndarray (NDArray): The array to be copied. Must have the shape of the tensor.
+        tensor (torch.Tensor): The tensor that the array is copied into.
+        chunk_size_bytes (int, optional): Upper bound on the size of each staging copy. Defaults to
+            DEFAULT_CHUNK_SIZE_BYTES.
+    """
+    assert tuple(tensor.shape) == ndarray.shape, f"Array has shape {ndarray.shape}, tensor has shape {tensor.shape}"
+    with torch.no_grad():
+        # from_numpy does not support negative strides, so such arrays are copied as well
+        if ndarray.flags.writeable and all(stride >= 0 for stride in ndarray.strides):
+            tensor.copy_(torch.from_numpy(ndarray))
+        elif not (ndarray.flags.c_contiguous and tensor.is_contiguous()):
+            tensor.copy_(torch.from_numpy(ndarray.copy()))
+        else:
+            flat_tensor, flat_ndarray = tensor.view(-1), ndarray.reshape(-1)
+            chunk_length = max(1, chunk_size_bytes // ndarray.itemsize)
+            for start in range(0, flat_ndarray.size, chunk_length):
+                chunk = flat_ndarray[start : start + chunk_length].copy()
+                flat_tensor[start : start + chunk_length].copy_(torch.from_numpy(chunk))
+
+
+def ndarrays_to_parameters(ndarrays: Iterable[NDArray]) -> Parameters:
+    """
+    Serializes arrays into a Flower Parameters object, copying each array's data once (see ndarray_to_bytes). The
+    result is identical to that of Flower's ndarrays_to_parameters.
+
+    Args:
+        ndarrays (Iterable[NDArray]): The arrays to be serialized.
+
+    Returns:
+        Parameters: The serialized arrays.
+    """
+    return Parameters(tensors=[ndarray_to_bytes(ndarray) for ndarray in ndarrays], tensor_type="numpy.ndarray")
+
+
+def parameters_to_ndarrays(parameters: Parameters, copy: bool = False) -> NDArrays:
+    """
+    Decodes a Flower Parameters object. By default, the arrays are read-only views of the serialized tensors (see
+    bytes_to_ndarray), which remain valid for as long as the arrays are referenced. Callers that modify the arrays in
+    place must request copies.
+
+    Args:
+        parameters (Parameters): The serialized arrays.
+        copy (bool, optional): Whether to return writable copies rather than read-only views. Defaults to False.
+
+    Returns:
+        NDArrays: The decoded arrays.
+    """
+    return [bytes_to_ndarray(tensor, copy) for tensor in parameters.tensors]
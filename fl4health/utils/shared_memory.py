@@ -0,0 +1,236 @@
+import json
+from logging import WARNING
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from flwr.common import FitRes, NDArrays, Parameters
+from flwr.common.logger import log
+from flwr.server.client_proxy import ClientProxy
+
+from fl4health.utils.serialization import ndarrays_to_parameters, parameters_to_ndarrays
+
+# Config (server to client) and metrics (client to server) key holding the name of the shared memory segment that
+# holds the parameters, in place of the parameters themselves
+SHARED_MEMORY_PARAMETERS_KEY = "shared_memory_parameters"
+# Config key indicating whether clients should write their updated parameters back through shared memory
+SHARED_MEMORY_WRITE_BACK_KEY = "shared_memory_write_back"
+# Arrays are aligned within segments so that the views have the alignment numpy expects for any dtype
+_ALIGNMENT = 64
+_HEADER_LENGTH_BYTES = 8
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def write_ndarrays_to_shared_memory(ndarrays: NDArrays) -> SharedMemory:
+    """
+    Creates a POSIX shared memory segment holding the arrays. The segment starts with the length of a JSON header
+    describing the dtype, shape and offset of each array, followed by the header and the (aligned) data of the arrays.
+
+    Args:
+        ndarrays (NDArrays): The arrays to be shared. Object arrays are not supported.
+
+    Returns:
+        SharedMemory: The new segment. The caller is responsible for unlinking it once it is no longer needed.
+    """
+    layout: List[Dict[str, Any]] = []
+    offset = 0
+    for ndarray in ndarrays:
+        assert not ndarray.dtype.hasobject, "Object arrays cannot be shared through shared memory"
+        layout.append({"dtype": ndarray.dtype.str, "shape": list(ndarray.shape), "offset": offset})
+        offset = _align(offset + ndarray.nbytes)
+    header = json.dumps(layout).encode()
+    data_start = _align(_HEADER_LENGTH_BYTES + len(header))
+
+    segment = SharedMemory(create=True, size=max(data_start + offset, 1))
+    assert segment.buf is not None
+    segment.buf[:_HEADER_LENGTH_BYTES] = len(header).to_bytes(_HEADER_LENGTH_BYTES, "little")
+    segment.buf[_HEADER_LENGTH_BYTES : _HEADER_LENGTH_BYTES + len(header)] = header
+    for ndarray, array_layout in zip(ndarrays, layout):
+        shared_array = np.frombuffer(
+            segment.buf, dtype=ndarray.dtype, count=ndarray.size, offset=data_start + array_layout["offset"]
+        ).reshape(ndarray.shape)
+        np.copyto(shared_array, ndarray)
+        del shared_array
+    return segment
+
+
+def read_ndarrays_from_shared_memory(segment: SharedMemory) -> NDArrays:
+    """
+    Maps the arrays held by a segment written by write_ndarrays_to_shared_memory. The arrays are read-only views of
+    the segment, so no data is copied. The segment can only be closed once the views are no longer referenced.
+
+    Args:
+        segment (SharedMemory): The segment holding the arrays.
+
+    Returns:
+        NDArrays: Read-only views of the arrays.
+    """
+    assert segment.buf is not None, "The segment is closed"
+    header_length = int.from_bytes(segment.buf[:_HEADER_LENGTH_BYTES], "little")
+    layout = json.loads(bytes(segment.buf[_HEADER_LENGTH_BYTES : _HEADER_LENGTH_BYTES + header_length]))
+    data_start = _align(_HEADER_LENGTH_BYTES + header_length)
+    ndarrays = []
+    for array_layout in layout:
+        shape = tuple(array_layout["shape"])
+        # Unlike np.ndarray, np.frombuffer holds an export of the segment's buffer, so that the segment cannot be
+        # unmapped while the array is referenced
+        ndarray = np.frombuffer(
+            segment.buf,
+            dtype=np.dtype(array_layout["dtype"]),
+            count=int(np.prod(shape)),
+            offset=data_start + array_layout["offset"],
+        ).reshape(shape)
+        ndarray.flags.writeable = False
+        ndarrays.append(ndarray)
+    return ndarrays
+
+
+def attach_shared_memory(name: str) -> SharedMemory:
+    """
+    Attaches to an existing segment owned by another process. Python's resource tracker would otherwise unlink the
+    segment when the attaching process exits, so it is told to stop tracking the segment.
+
+    Args:
+        name (str): The name of the segment.
+
+    Returns:
+        SharedMemory: The attached segment.
+    """
+    segment = SharedMemory(name=name)
+    resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore
+    return segment
+
+
+def close_shared_memory(segments: List[SharedMemory]) -> List[SharedMemory]:
+    """
+    Closes the given segments, skipping those still referenced by views.
+
+    Args:
+        segments (List[SharedMemory]): The segments to be closed.
+
+    Returns:
+        List[SharedMemory]: The segments that could not be closed yet.
+    """
+    open_segments = []
+    for segment in segments:
+        try:
+            segment.close()
+        except BufferError:
+            open_segments.append(segment)
+    return open_segments
+
+
+def write_parameters_for_server(ndarrays: NDArrays) -> str:
+    """
+    Writes a client's updated parameters to a new segment to be read, and unlinked, by the server
+    (see read_parameters_from_client).
+
+    Args:
+        ndarrays (NDArrays): The client's updated parameters.
+
+    Returns:
+        str: The name of the segment.
+    """
+    segment = write_ndarrays_to_shared_memory(ndarrays)
+    # Ownership of the segment passes to the server, which unlinks it
+    resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore
+    segment.close()
+    return segment.name
+
+
+def read_parameters_from_client(name: str) -> Parameters:
+    """
+    Reads the parameters written by a client with write_parameters_for_server and unlinks the segment.
+
+    Args:
+        name (str): The name of the segment.
+
+    Returns:
+        Parameters: The client's parameters.
+    """
+    segment = SharedMemory(name=name)
+    ndarrays = read_ndarrays_from_shared_memory(segment)
+    parameters = ndarrays_to_parameters(ndarrays)
+    del ndarrays
+    segment.close()
+    segment.unlink()
+    return parameters
+
+
+def unlink_unread_client_parameters(fit_results: Sequence[Union[Tuple[ClientProxy, FitRes], BaseException]]) -> int:
+    """
+    Unlinks the segments written by clients with write_parameters_for_server that the server has not read, such as
+    those of failed clients, of rounds that were not aggregated or of results decoded by strategies that do not read
+    shared memory. Segments that have already been read (and unlinked) are skipped.
+
+    Args:
+        fit_results (Sequence[Union[Tuple[ClientProxy, FitRes], BaseException]]): The results and/or failures of a
+            fit round.
+
+    Returns:
+        int: The number of segments that were unlinked.
+    """
+    num_unlinked = 0
+    for fit_result in fit_results:
+        if isinstance(fit_result, BaseException) or SHARED_MEMORY_PARAMETERS_KEY not in fit_result[1].metrics:
+            continue
+        try:
+            segment = SharedMemory(name=str(fit_result[1].metrics[SHARED_MEMORY_PARAMETERS_KEY]))
+        except FileNotFoundError:
+            continue
+        segment.close()
+        segment.unlink()
+        num_unlinked += 1
+    return num_unlinked
+
+
+class SharedMemoryParameterPublisher:
+    def __init__(self, write_back_updates: bool = False) -> None:
+        """
+        Server-side publisher of the global parameters through POSIX shared memory, for clients running on the same
+        host as the server (i.e. simulations). The parameters of each round are written once to a shared memory
+        segment and the clients receive only the name of the segment, which they map read-only, rather than a copy
+        of the parameters each. The segment of the previous round is unlinked when a new one is published. Clients
+        that have mapped it keep access to it until they close it.
+
+        Args:
+            write_back_updates (bool, optional): Whether clients also write their updated parameters to shared
+                memory, sending only the name of the segment back. This requires a strategy decoding client results
+                with BasicFedAvg.maybe_decode_results (i.e. BasicFedAvg, FedAvgDynamicLayer or
+                FedAvgSparseCooTensor). Defaults to False.
+        """
+        self.write_back_updates = write_back_updates
+        self.segment: Optional[SharedMemory] = None
+        self.published_parameters: Optional[Parameters] = None
+
+    def publish(self, parameters: Parameters) -> str:
+        """
+        Publishes the parameters to a new segment, unless they are the parameters that were last published (i.e.
+        the same global parameters are sent for fitting and evaluation).
+
+        Args:
+            parameters (Parameters): The global parameters.
+
+        Returns:
+            str: The name of the segment holding the parameters.
+        """
+        if self.segment is not None and parameters is self.published_parameters:
+            return self.segment.name
+        segment = write_ndarrays_to_shared_memory(parameters_to_ndarrays(parameters))
+        self.close()
+        self.segment, self.published_parameters = segment, parameters
+        return segment.name
+
+    def close(self) -> None:
+        """Unlinks the segment that was last published, if any."""
+        if self.segment is not None:
+            try:
+                self.segment.close()
+                self.segment.unlink()
+            except FileNotFoundError:
+                log(WARNING, f"Shared memory segment {self.segment.name} was already unlinked")
+            self.segment, self.published_parameters = None, None
@@ -0,0 +1,78 @@
+import argparse
+import time
+from typing import List
+
+import numpy as np
+from flwr.common import ndarrays_to_parameters
+from flwr.server.client_manager import SimpleClientManager
+
+from fl4health.server.async_server import AsyncFlServer
+from fl4health.server.base_server import FlServer
+from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.strategies.fedbuff import FedBuff
+from tests.test_utils.custom_client_proxy import DelayedFitClientProxy
+
+
+def construct_clients(num_clients: int, fit_delay: float, straggler_delay: float) -> List[DelayedFitClientProxy]:
+    # All clients but one are fast, the last one simulates a slow hospital site.
+    return [DelayedFitClientProxy(f"client_{i}", fit_delay) for i in range(num_clients - 1)] + [
+        DelayedFitClientProxy("straggler", straggler_delay)
+    ]
+
+
+def run_synchronous(num_clients: int, num_rounds: int, fit_delay: float, straggler_delay: float) -> float:
+    client_manager = SimpleClientManager()
+    for client in construct_clients(num_clients, fit_delay, straggler_delay):
+        client_manager.register(client)
+    strategy = BasicFedAvg(
+        initial_parameters=ndarrays_to_parameters([np.zeros(1000)]),
+        min_fit_clients=num_clients,
+        min_available_clients=num_clients,
+        fraction_evaluate=0.0,
+    )
+    server = FlServer(client_manager, strategy)
+    start_time = time.perf_counter()
+    server.fit(num_rounds, timeout=None)
+    return time.perf_counter() - start_time
+
+
+def run_asynchronous(
+    num_clients: int, num_rounds: int, fit_delay: float, straggler_delay: float, buffer_size: int
+) -> float:
+    client_manager = SimpleClientManager()
+    for client in construct_clients(num_clients, fit_delay, straggler_delay):
+        client_manager.register(client)
+    strategy = FedBuff(
+        initial_parameters=ndarrays_to_parameters([np.zeros(1000)]),
+        min_fit_clients=num_clients,
+        min_available_clients=num_clients,
+        fraction_evaluate=0.0,
+        buffer_size=buffer_size,
+    )
+    server = AsyncFlServer(client_manager, strategy)
+    start_time = time.perf_counter()
+    # Each synchronous round aggregates num_clients updates, so we run enough buffered rounds to aggregate the
+    # same total number of client updates.
+    server.fit((num_rounds * num_clients) // buffer_size, timeout=None)
+    return time.perf_counter() - start_time
+
+
+def main(num_clients: int, num_rounds: int, fit_delay: float, straggler_delay: float, buffer_size: int) -> None:
+    total_updates = num_rounds * num_clients
+    sync_time = run_synchronous(num_clients, num_rounds, fit_delay, straggler_delay)
+    async_time = run_asynchronous(num_clients, num_rounds, fit_delay, straggler_delay, buffer_size)
+    print(f"Clients: {num_clients}, Straggler delay: {straggler_delay}s, Other clients delay: {fit_delay}s")
+    print(f"Synchronous FedAvg: {sync_time:.2f}s ({total_updates / sync_time:.2f} updates/s)")
+    print(f"Buffered FedBuff (K={buffer_size}): {async_time:.2f}s ({total_updates / async_time:.2f} updates/s)")
+    print(f"Speedup: {sync_time / async_time:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate synchronous vs buffered asynchronous aggregation")
+    parser.add_argument("--num_clients", type=int, default=5)
+    parser.add_argument("--num_rounds", type=int, default=5)
+    parser.add_argument("--fit_delay", type=float, default=0.1)
+    parser.add_argument("--straggler_delay", type=float, default=0.5)
+    parser.add_argument("--buffer_size", type=int, default=3)
+    args = parser.parse_args()
+    main(args.num_clients, args.num_rounds, args.fit_delay, args.straggler_delay, args.buffer_size)
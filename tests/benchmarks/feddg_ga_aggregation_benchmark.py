@@ -0,0 +1,92 @@
+import argparse
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+import numpy as np
+from flwr.common import Code, FitRes, NDArrays, Status, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.client_proxy import ClientProxy
+
+from fl4health.strategies.feddg_ga_strategy import FedDgGaStrategy
+from tests.test_utils.custom_client_proxy import CustomClientProxy
+
+
+def construct_results(num_clients: int, layer_sizes: List[int]) -> List[Tuple[ClientProxy, FitRes]]:
+    rng = np.random.default_rng(2023)
+    return [
+        (
+            CustomClientProxy(str(client_index)),
+            FitRes(
+                Status(Code.OK, ""),
+                ndarrays_to_parameters([rng.random(layer_size, dtype=np.float32) for layer_size in layer_sizes]),
+                num_examples=1,
+                metrics={},
+            ),
+        )
+        for client_index in range(num_clients)
+    ]
+
+
+def per_layer_weight_and_aggregate(strategy: FedDgGaStrategy, results: List[Tuple[ClientProxy, FitRes]]) -> NDArrays:
+    # The previous implementation, which allocates new arrays for each layer of each client
+    aggregated_results = None
+    for client_proxy, fit_res in results:
+        weighted_client_parameters = parameters_to_ndarrays(fit_res.parameters)
+        for i in range(len(weighted_client_parameters)):
+            weighted_client_parameters[i] = (
+                weighted_client_parameters[i] * strategy.adjustment_weights[client_proxy.cid]
+            )
+        if aggregated_results is None:
+            aggregated_results = weighted_client_parameters
+        else:
+            for i in range(len(weighted_client_parameters)):
+                aggregated_results[i] = aggregated_results[i] + weighted_client_parameters[i]
+    assert aggregated_results is not None
+    return aggregated_results
+
+
+def profile(aggregate: Callable[[], NDArrays], repeats: int) -> Tuple[float, float, NDArrays]:
+    # Warm up, so that buffers persisting across rounds are allocated before measuring
+    aggregated = aggregate()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        aggregated = aggregate()
+    elapsed = (time.perf_counter() - start_time) / repeats
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak_memory / 2**20, [layer.copy() for layer in aggregated]
+
+
+def main(client_counts: List[int], num_large_layers: int, num_small_layers: int, repeats: int) -> None:
+    # A mix of a few large layers (i.e. conv/linear weights) and many small ones (i.e. biases and norms)
+    layer_sizes = [1_000_000] * num_large_layers + [512] * num_small_layers
+    model_size = 4 * sum(layer_sizes) / 2**20
+    print(f"Parameters per client: {sum(layer_sizes)} ({model_size:.1f} MiB)")
+    print(f"{'clients':>8} {'per-layer s':>12} {'fused s':>10} {'per-layer MiB':>14} {'fused MiB':>10}")
+    for num_clients in client_counts:
+        results = construct_results(num_clients, layer_sizes)
+        strategy = FedDgGaStrategy()
+        strategy.adjustment_weights = {client_proxy.cid: 1.0 / num_clients for client_proxy, _ in results}
+
+        per_layer_time, per_layer_memory, per_layer_aggregate = profile(
+            lambda: per_layer_weight_and_aggregate(strategy, results), repeats
+        )
+        fused_time, fused_memory, fused_aggregate = profile(
+            lambda: strategy.weight_and_aggregate_results(results), repeats
+        )
+        assert all(np.allclose(a, b) for a, b in zip(per_layer_aggregate, fused_aggregate)), "Results differ"
+        print(
+            f"{num_clients:>8} {per_layer_time:>12.4f} {fused_time:>10.4f} "
+            f"{per_layer_memory:>14.1f} {fused_memory:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FedDG-GA aggregation as the number of clients grows")
+    parser.add_argument("--client_counts", type=int, nargs="+", default=[2, 4, 8, 16, 32])
+    parser.add_argument("--num_large_layers", type=int, default=4)
+    parser.add_argument("--num_small_layers", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    main(args.client_counts, args.num_large_layers, args.num_small_layers, args.repeats)
@@ -0,0 +1,74 @@
+import argparse
+import multiprocessing
+import resource
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import torch
+import torch.nn as nn
+from flwr.common import NDArrays, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.common.typing import Config
+
+from fl4health.parameter_exchange.full_exchanger import FullParameterExchanger
+
+
+class CopyingFullParameterExchanger(FullParameterExchanger):
+    # The previous implementation, which copies the model when building new tensors and again when loading them
+    def push_parameters(
+        self, model: nn.Module, initial_model: Optional[nn.Module] = None, config: Optional[Config] = None
+    ) -> NDArrays:
+        return [val.cpu().numpy() for _, val in model.state_dict().items()]
+
+    def pull_parameters(self, parameters: NDArrays, model: nn.Module, config: Optional[Config] = None) -> None:
+        params_dict = zip(model.state_dict().keys(), parameters)
+        state_dict = OrderedDict({k: torch.tensor(v) for k, v in params_dict})
+        model.load_state_dict(state_dict, strict=True)
+
+
+def construct_model(num_layers: int, layer_width: int) -> nn.Module:
+    layers = []
+    for _ in range(num_layers):
+        layers.extend([nn.Linear(layer_width, layer_width), nn.BatchNorm1d(layer_width)])
+    return nn.Sequential(*layers)
+
+
+def max_rss_mib() -> float:
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_rounds(zero_copy: bool, num_layers: int, layer_width: int, num_rounds: int) -> Tuple[float, float]:
+    # Each configuration runs in a fresh process, as the peak RSS of a process cannot be reset
+    torch.manual_seed(2023)
+    model = construct_model(num_layers, layer_width)
+    exchanger = FullParameterExchanger() if zero_copy else CopyingFullParameterExchanger()
+    # The serialized server model, as received by the client at the start of each round
+    server_parameters = ndarrays_to_parameters([val.numpy().copy() for val in model.state_dict().values()])
+    baseline_rss = max_rss_mib()
+
+    start_time = time.perf_counter()
+    for _ in range(num_rounds):
+        # A round of a client: set the server model, then send back the model
+        exchanger.pull_parameters(parameters_to_ndarrays(server_parameters), model)
+        ndarrays_to_parameters(exchanger.push_parameters(model))
+    return (time.perf_counter() - start_time) / num_rounds, max_rss_mib() - baseline_rss
+
+
+def main(num_layers: int, layer_width: int, num_rounds: int) -> None:
+    model_size = 4 * sum(p.numel() for p in construct_model(num_layers, layer_width).state_dict().values()) / 2**20
+    print(f"Model size: {model_size:.1f} MiB, Rounds: {num_rounds}")
+    print(f"{'exchanger':>10} {'seconds/round':>14} {'peak RSS increase (MiB)':>24}")
+    with multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        for name, zero_copy in [("copying", False), ("zero-copy", True)]:
+            latency, rss_increase = pool.apply(run_rounds, (zero_copy, num_layers, layer_width, num_rounds))
+            print(f"{name:>10} {latency:>14.4f} {rss_increase:>24.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark copying vs zero-copy full parameter exchange")
+    parser.add_argument("--num_layers", type=int, default=16)
+    parser.add_argument("--layer_width", type=int, default=2048)
+    parser.add_argument("--num_rounds", type=int, default=5)
+    args = parser.parse_args()
+    main(args.num_layers, args.layer_width, args.num_rounds)
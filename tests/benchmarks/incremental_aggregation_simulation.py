@@ -0,0 +1,61 @@
+import argparse
+import time
+from typing import Tuple
+
+import numpy as np
+from flwr.common import ndarrays_to_parameters
+from flwr.server.client_manager import SimpleClientManager
+
+from fl4health.reporting.metrics import MetricsReporter
+from fl4health.server.base_server import FlServer
+from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.utils.metric_aggregation import fit_metrics_aggregation_fn
+from tests.test_utils.custom_client_proxy import DelayedFitClientProxy
+
+
+def run_fit_rounds(
+    num_clients: int, num_rounds: int, layer_size: int, fit_delay: float, incremental_aggregation: bool
+) -> Tuple[float, float]:
+    client_manager = SimpleClientManager()
+    # Clients finish training at staggered times, as in a real federation
+    for i in range(num_clients):
+        client_manager.register(DelayedFitClientProxy(f"client_{i}", fit_delay * (i + 1), num_samples=i + 1))
+    strategy = BasicFedAvg(
+        min_fit_clients=num_clients,
+        min_available_clients=num_clients,
+        fit_metrics_aggregation_fn=fit_metrics_aggregation_fn,
+        incremental_aggregation=incremental_aggregation,
+    )
+    metrics_reporter = MetricsReporter()
+    server = FlServer(client_manager, strategy, metrics_reporter=metrics_reporter)
+    server.parameters = ndarrays_to_parameters([np.zeros(layer_size, dtype=np.float32) for _ in range(4)])
+
+    post_barrier_time = 0.0
+    start_time = time.perf_counter()
+    for server_round in range(1, num_rounds + 1):
+        fit_round_results = server.fit_round(server_round, timeout=None)
+        assert fit_round_results is not None and fit_round_results[0] is not None
+        server.parameters = fit_round_results[0]
+        if incremental_aggregation:
+            timings = metrics_reporter.metrics["rounds"][server_round]["incremental_aggregation"]
+            post_barrier_time += timings["post_barrier_aggregation_time"]
+    return time.perf_counter() - start_time, post_barrier_time
+
+
+def main(num_clients: int, num_rounds: int, layer_size: int, fit_delay: float) -> None:
+    barrier_time, _ = run_fit_rounds(num_clients, num_rounds, layer_size, fit_delay, False)
+    incremental_time, post_barrier_time = run_fit_rounds(num_clients, num_rounds, layer_size, fit_delay, True)
+    print(f"Clients: {num_clients}, Rounds: {num_rounds}, Parameters: {4 * layer_size}")
+    print(f"Aggregation at the barrier: {barrier_time:.2f}s")
+    print(f"Incremental aggregation: {incremental_time:.2f}s ({post_barrier_time:.3f}s spent after the barrier)")
+    print(f"Time saved: {barrier_time - incremental_time:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate aggregation at the barrier vs incremental aggregation")
+    parser.add_argument("--num_clients", type=int, default=8)
+    parser.add_argument("--num_rounds", type=int, default=3)
+    parser.add_argument("--layer_size", type=int, default=2**22)
+    parser.add_argument("--fit_delay", type=float, default=0.2)
+    args = parser.parse_args()
+    main(args.num_clients, args.num_rounds, args.layer_size, args.fit_delay)
@@ -0,0 +1,58 @@
+import argparse
+import time
+from typing import Dict
+
+import torch
+import torch.nn as nn
+
+from fl4health.parameter_exchange.parameter_selection_criteria import compute_drift_norms
+
+
+def per_layer_drift_norms(model: nn.Module, initial_model: nn.Module, normalize: bool) -> Dict[str, float]:
+    # The previous computation, which computes the norm of each layer separately and transfers it to the host
+    drift_norms = {}
+    initial_model_states = initial_model.state_dict()
+    for layer_name, layer_param in model.state_dict().items():
+        t_diff = (layer_param - initial_model_states[layer_name]).float()
+        drift_norm = torch.linalg.norm(t_diff)
+        if normalize:
+            drift_norm /= torch.numel(t_diff)
+        drift_norms[layer_name] = drift_norm.item()
+    return drift_norms
+
+
+def construct_model(num_layers: int, layer_width: int) -> nn.Module:
+    return nn.Sequential(*[nn.Linear(layer_width, layer_width) for _ in range(num_layers)])
+
+
+def main(num_layers: int, layer_width: int, num_workers: int, repeats: int, device: torch.device) -> None:
+    torch.manual_seed(2023)
+    initial_model = construct_model(num_layers, layer_width).to(device)
+    model = construct_model(num_layers, layer_width).to(device)
+    num_parameters = sum(parameter.numel() for parameter in model.parameters())
+    print(f"Device: {device}, Layers: {2 * num_layers}, Parameters: {num_parameters}")
+
+    timed_functions = {
+        "per layer": lambda: per_layer_drift_norms(model, initial_model, True),
+        "batched": lambda: compute_drift_norms(model, initial_model, True),
+        f"batched ({num_workers} threads)": lambda: compute_drift_norms(
+            model, initial_model, True, num_workers=num_workers
+        ),
+    }
+    for name, function in timed_functions.items():
+        function()
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            function()
+        print(f"{name:>24}: {(time.perf_counter() - start_time) / repeats:.4f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the drift norm computation of layer selection")
+    parser.add_argument("--num_layers", type=int, default=500)
+    parser.add_argument("--layer_width", type=int, default=256)
+    parser.add_argument("--num_workers", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+    main(args.num_layers, args.layer_width, args.num_workers, args.repeats, torch.device(args.device))
@@ -0,0 +1,57 @@
+import argparse
+import os
+import time
+from typing import List, Tuple
+
+import numpy as np
+from flwr.common import NDArrays
+
+from fl4health.strategies.aggregate_utils import aggregate_results
+from fl4health.strategies.parallel_aggregate import ParallelAggregationBackend
+
+
+def construct_results(num_clients: int, layer_sizes: List[int]) -> List[Tuple[NDArrays, int]]:
+    rng = np.random.default_rng(2023)
+    return [
+        ([rng.random(layer_size, dtype=np.float32) for layer_size in layer_sizes], int(rng.integers(1, 1000)))
+        for _ in range(num_clients)
+    ]
+
+
+def time_aggregation(
+    results: List[Tuple[NDArrays, int]], backend: ParallelAggregationBackend, repeats: int
+) -> Tuple[float, NDArrays]:
+    # Warm up the thread pool so that thread startup isn't included in the timing
+    aggregated = aggregate_results(results, True, backend)
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        aggregated = aggregate_results(results, True, backend)
+    return (time.perf_counter() - start_time) / repeats, aggregated
+
+
+def main(num_clients: int, num_large_layers: int, num_small_layers: int, repeats: int) -> None:
+    # A mix of a few very large layers (i.e. conv/linear weights) and many small ones (i.e. biases and norms)
+    layer_sizes = [4_000_000] * num_large_layers + [512] * num_small_layers
+    results = construct_results(num_clients, layer_sizes)
+    max_workers = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, 8, 16, max_workers} & set(range(1, max_workers + 1)))
+
+    serial_time, serial_aggregate = time_aggregation(results, ParallelAggregationBackend(num_workers=1), repeats)
+    print(f"Clients: {num_clients}, Parameters per client: {sum(layer_sizes)}, Available cores: {max_workers}")
+    print(f"{'workers':>8} {'seconds':>10} {'speedup':>8}")
+    for num_workers in worker_counts:
+        backend = ParallelAggregationBackend(num_workers=num_workers)
+        elapsed, aggregate = time_aggregation(results, backend, repeats)
+        backend.shutdown()
+        assert all(np.array_equal(a, b) for a, b in zip(serial_aggregate, aggregate)), "Results are not identical"
+        print(f"{num_workers:>8} {elapsed:>10.4f} {serial_time / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark layer-parallel aggregation against core count")
+    parser.add_argument("--num_clients", type=int, default=16)
+    parser.add_argument("--num_large_layers", type=int, default=4)
+    parser.add_argument("--num_small_layers", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    main(args.num_clients, args.num_large_layers, args.num_small_layers, args.repeats)
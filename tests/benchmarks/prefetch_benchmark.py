@@ -0,0 +1,85 @@
+import argparse
+import time
+from typing import Iterable, Tuple
+
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Dataset
+
+from fl4health.utils.prefetch import PrefetchLoader
+
+
+class SlowDataset(Dataset):
+    def __init__(self, num_samples: int, sample_shape: Tuple[int, ...], load_time: float) -> None:
+        # Simulates samples that take time to load and decode (i.e. reading images from disk)
+        self.num_samples = num_samples
+        self.sample_shape = sample_shape
+        self.load_time = load_time
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    def __getitem__(self, index: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        time.sleep(self.load_time)
+        return torch.randn(self.sample_shape), torch.tensor(index % 10)
+
+
+def steps_per_second(
+    batches: Iterable[Tuple[torch.Tensor, torch.Tensor]], model: nn.Module, device: torch.device
+) -> float:
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
+    criterion = nn.CrossEntropyLoss()
+    steps = 0
+    start_time = time.perf_counter()
+    for input, target in batches:
+        input, target = input.to(device), target.to(device)
+        optimizer.zero_grad()
+        criterion(model(input), target).backward()
+        optimizer.step()
+        steps += 1
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+    return steps / (time.perf_counter() - start_time)
+
+
+def main(
+    num_samples: int,
+    batch_size: int,
+    load_time: float,
+    hidden_size: int,
+    num_prefetch_batches: int,
+    device: torch.device,
+) -> None:
+    torch.manual_seed(2023)
+    sample_shape = (3, 32, 32)
+    data_loader = DataLoader(SlowDataset(num_samples, sample_shape, load_time), batch_size=batch_size)
+    model = nn.Sequential(nn.Flatten(), nn.Linear(3 * 32 * 32, hidden_size), nn.ReLU(), nn.Linear(hidden_size, 10)).to(
+        device
+    )
+    print(f"Device: {device}, Batches: {len(data_loader)}, Load time per batch: {load_time * batch_size:.4f} s")
+
+    loaders = {
+        "synchronous": data_loader,
+        f"prefetch ({num_prefetch_batches} batches)": PrefetchLoader(data_loader, device, num_prefetch_batches),
+    }
+    for name, loader in loaders.items():
+        print(f"{name:>24}: {steps_per_second(loader, model, device):.2f} steps/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the training throughput of prefetched data loading")
+    parser.add_argument("--num_samples", type=int, default=2048)
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--load_time", type=float, default=0.0002)
+    parser.add_argument("--hidden_size", type=int, default=1024)
+    parser.add_argument("--num_prefetch_batches", type=int, default=2)
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+    main(
+        args.num_samples,
+        args.batch_size,
+        args.load_time,
+        args.hidden_size,
+        args.num_prefetch_batches,
+        torch.device(args.device),
+    )
@@ -0,0 +1,68 @@
+import argparse
+import math
+import time
+from typing import Callable, Dict, List, Optional
+
+import torch
+import torch.nn as nn
+
+from fl4health.parameter_exchange.parameter_selection_criteria import largest_final_magnitude_scores
+from fl4health.parameter_exchange.sparse_coo_parameter_exchanger import SparseCooParameterExchanger
+
+
+class SortingSparseCooParameterExchanger(SparseCooParameterExchanger):
+    # The previous threshold computation, which sorts every score of the model and checks the uniqueness of the
+    # scores of each tensor
+    def compute_score_threshold(self, all_scores: torch.Tensor) -> float:
+        sorted_scores, _ = torch.sort(all_scores, descending=True)
+        n_top_scores = math.ceil(len(sorted_scores) * self.sparsity_level)
+        return sorted_scores[(n_top_scores - 1)].item()
+
+    def generate_parameter_scores(
+        self, model: nn.Module, initial_model: Optional[nn.Module]
+    ) -> Dict[str, torch.Tensor]:
+        parameter_scores = super().generate_parameter_scores(model, initial_model)
+        for param_scores in parameter_scores.values():
+            torch.unique(input=param_scores, sorted=False, return_inverse=False, return_counts=False)
+        return parameter_scores
+
+
+def construct_model(num_layers: int, layer_width: int) -> nn.Module:
+    return nn.Sequential(*[nn.Linear(layer_width, layer_width) for _ in range(num_layers)])
+
+
+def time_selection(exchanger: SparseCooParameterExchanger, model: nn.Module, repeats: int) -> float:
+    exchanger.select_parameters(model)
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        exchanger.select_parameters(model)
+    return (time.perf_counter() - start_time) / repeats
+
+
+def main(layer_widths: List[int], num_layers: int, sparsity_level: float, sample_size: int, repeats: int) -> None:
+    exchanger_factories: List[Callable[[], SparseCooParameterExchanger]] = [
+        lambda: SortingSparseCooParameterExchanger(sparsity_level, largest_final_magnitude_scores),
+        lambda: SparseCooParameterExchanger(sparsity_level, largest_final_magnitude_scores),
+        lambda: SparseCooParameterExchanger(
+            sparsity_level, largest_final_magnitude_scores, threshold_sample_size=sample_size
+        ),
+    ]
+    print(f"Sparsity level: {sparsity_level}, Layers: {num_layers}, Sample size: {sample_size}")
+    print(f"{'parameters':>12} {'sort (s)':>10} {'kthvalue (s)':>13} {'sampled (s)':>12}")
+    torch.manual_seed(2023)
+    for layer_width in layer_widths:
+        model = construct_model(num_layers, layer_width)
+        num_parameters = sum(parameter.numel() for parameter in model.parameters())
+        timings = [time_selection(factory(), model, repeats) for factory in exchanger_factories]
+        print(f"{num_parameters:>12} {timings[0]:>10.4f} {timings[1]:>13.4f} {timings[2]:>12.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parameter selection of the sparse COO exchanger")
+    parser.add_argument("--layer_widths", type=int, nargs="+", default=[256, 1024, 2048, 4096])
+    parser.add_argument("--num_layers", type=int, default=4)
+    parser.add_argument("--sparsity_level", type=float, default=0.01)
+    parser.add_argument("--sample_size", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    main(args.layer_widths, args.num_layers, args.sparsity_level, args.sample_size, args.repeats)
@@ -1,14 +1,29 @@
 import datetime
 from pathlib import Path
-from typing import Dict, Optional, Union
-from unittest.mock import MagicMock
+from typing import Dict, Optional, Tuple, Union
+from unittest.mock import MagicMock, patch
 
 import freezegun
+import numpy as np
+import pytest
 import torch
 from flwr.common import Scalar
 from freezegun import freeze_time
-
-from fl4health.clients.basic_client import BasicClient
+from torch.utils.data import DataLoader, TensorDataset
+
+from fl4health.clients.basic_client import BasicClient, create_grad_scaler
+from fl4health.parameter_exchange.full_exchanger import FullParameterExchanger
+from fl4health.parameter_exchange.packing_exchanger import ParameterExchangerWithPacking
+from fl4health.parameter_exchange.parameter_packer import ParameterPackerWithControlVariates
+from fl4health.utils.metrics import Accuracy
+from fl4health.utils.prefetch import PrefetchLoader
+from fl4health.utils.serialization import parameters_to_ndarrays
+from fl4health.utils.shared_memory import (
+    SHARED_MEMORY_PARAMETERS_KEY,
+    SHARED_MEMORY_WRITE_BACK_KEY,
+    read_parameters_from_client,
+    write_parameters_for_server,
+)
 
 freezegun.configure(extend_ignore_list=["transformers"])  # type: ignore
 
@@ -136,3 +151,199 @@ class MockBasicClient(BasicClient):
         self.get_data_loaders.return_value = mock_data_loader, mock_data_loader
         self.get_optimizer = MagicMock()  # type: ignore
         self.get_criterion = MagicMock()  # type: ignore
+
+
+def test_parameter_exchange_instrumentation() -> None:
+    fl_client = BasicClient(Path(""), [], torch.device("cpu"), instrument_parameter_exchange=True)
+    fl_client.model = torch.nn.Linear(4, 2)
+    exchanger = ParameterExchangerWithPacking(ParameterPackerWithControlVariates(2))
+    exchanger.instrumentation = fl_client.exchange_instrumentation
+    model_weights = FullParameterExchanger().push_parameters(fl_client.model)
+    control_variates = [np.zeros_like(weights) for weights in model_weights]
+
+    with fl_client.time_parameter_exchange("decode_time"):
+        exchanger.unpack_parameters(model_weights + control_variates)
+    with fl_client.time_parameter_exchange("encode_time"):
+        sent_parameters = exchanger.pack_parameters(model_weights, control_variates)
+    fl_client.report_parameter_exchange(1, model_weights + control_variates, sent_parameters)
+
+    exchange_metrics = fl_client.metrics_reporter.metrics["rounds"][1]["parameter_exchange"]
+    for timing in ["decode_time", "encode_time", "pack_time", "unpack_time"]:
+        assert exchange_metrics[timing] >= 0.0
+    # Sending the control variates along with the weights doubles the payload
+    assert exchange_metrics["packed_extra_tensor_bytes"] == [32, 8]
+    assert exchange_metrics["packed_extra_bytes"] == 40
+    assert exchange_metrics["sent_bytes"] == exchange_metrics["received_bytes"] == 80
+    assert exchange_metrics["model_bytes"] == 40
+    assert exchange_metrics["compression_ratio"] == 0.5
+
+    # The collected values are cleared once reported
+    fl_client.report_parameter_exchange(2, model_weights)
+    assert fl_client.metrics_reporter.metrics["rounds"][2]["parameter_exchange"] == {
+        "received_tensor_bytes": [32, 8],
+        "received_bytes": 40,
+    }
+
+
+def test_shared_memory_parameter_exchange() -> None:
+    fl_client = BasicClient(Path(""), [], torch.device("cpu"))
+    model_weights = FullParameterExchanger().push_parameters(torch.nn.Linear(4, 2))
+    # Without a segment in the config, the parameters sent are used
+    assert fl_client.maybe_map_shared_parameters(model_weights, {}) is model_weights
+    assert fl_client.maybe_write_back_parameters(model_weights, {"metric": 1.0}, {}) == (
+        model_weights,
+        {"metric": 1.0},
+    )
+
+    # A segment written like those published by the server
+    published_name = write_parameters_for_server(model_weights)
+    shared_weights = fl_client.maybe_map_shared_parameters([], {SHARED_MEMORY_PARAMETERS_KEY: published_name})
+    assert all(np.array_equal(shared, weights) for shared, weights in zip(shared_weights, model_weights))
+    assert len(fl_client.shared_memory_segments) == 1
+
+    sent_parameters, metrics = fl_client.maybe_write_back_parameters(
+        model_weights, {"metric": 1.0}, {SHARED_MEMORY_WRITE_BACK_KEY: True}
+    )
+    assert sent_parameters == [] and metrics["metric"] == 1.0
+    written_weights = parameters_to_ndarrays(read_parameters_from_client(str(metrics[SHARED_MEMORY_PARAMETERS_KEY])))
+    assert all(np.array_equal(written, weights) for written, weights in zip(written_weights, model_weights))
+
+    # The segment is only closed once the arrays mapped from it are no longer referenced
+    fl_client.shutdown()
+    assert len(fl_client.shared_memory_segments) == 1
+    del shared_weights
+    fl_client.shutdown()
+    assert len(fl_client.shared_memory_segments) == 0
+    read_parameters_from_client(published_name)
+
+
+def test_maybe_prefetch() -> None:
+    data_loader = DataLoader(TensorDataset(torch.ones(4, 2), torch.zeros(4)), batch_size=2)
+    fl_client = BasicClient(Path(""), [], torch.device("cpu"))
+    assert fl_client.maybe_prefetch(data_loader) is data_loader
+    fl_client = BasicClient(Path(""), [], torch.device("cpu"), prefetch_batches=2)
+    prefetch_loader = fl_client.maybe_prefetch(data_loader)
+    assert isinstance(prefetch_loader, PrefetchLoader) and prefetch_loader.num_prefetch_batches == 2
+    assert len(list(prefetch_loader)) == 2
+
+
+def _get_accumulating_client(batch_size: int, gradient_accumulation_steps: int) -> BasicClient:
+    torch.manual_seed(42)
+    fl_client = BasicClient(Path(""), [], torch.device("cpu"), gradient_accumulation_steps=gradient_accumulation_steps)
+    fl_client.model = torch.nn.Linear(2, 1)
+    fl_client.optimizers = {"global": torch.optim.SGD(fl_client.model.parameters(), lr=0.1)}
+    fl_client.criterion = torch.nn.MSELoss()
+    inputs = torch.arange(12.0).reshape(6, 2) / 10.0
+    fl_client.train_loader = DataLoader(TensorDataset(inputs, inputs.sum(dim=1, keepdim=True)), batch_size=batch_size)
+    fl_client.update_after_step = MagicMock()  # type: ignore
+    return fl_client
+
+
+def test_gradient_accumulation_matches_large_batch() -> None:
+    accumulating_client = _get_accumulating_client(batch_size=2, gradient_accumulation_steps=3)
+    large_batch_client = _get_accumulating_client(batch_size=6, gradient_accumulation_steps=1)
+
+    accumulated_losses, _ = accumulating_client.train_by_epochs(2)
+    large_batch_losses, _ = large_batch_client.train_by_epochs(2)
+
+    # Three micro-batches make up one optimizer step per epoch, over the same samples as the large batches
+    for accumulated, expected in zip(accumulating_client.model.parameters(), large_batch_client.model.parameters()):
+        assert torch.allclose(accumulated, expected, atol=1e-6)
+    assert accumulated_losses["backward"] == pytest.approx(large_batch_losses["backward"], rel=1e-5)
+    assert accumulating_client.total_steps == 2
+    assert accumulating_client.train_loss_meter.num_losses == pytest.approx(1.0)
+    assert [call.args[0] for call in accumulating_client.update_after_step.call_args_list] == [0, 1]  # type: ignore
+
+
+def test_gradient_accumulation_counts_optimizer_steps() -> None:
+    # Three batches per epoch with two micro-batches per step: the last cycle of each epoch is cut short
+    fl_client = _get_accumulating_client(batch_size=2, gradient_accumulation_steps=2)
+    fl_client.train_by_epochs(1)
+    assert fl_client.total_steps == 2 and fl_client.train_loss_meter.num_losses == pytest.approx(2.0)
+
+    fl_client = _get_accumulating_client(batch_size=2, gradient_accumulation_steps=2)
+    fl_client.train_by_steps(3)
+    assert fl_client.total_steps == 3 and fl_client.train_loss_meter.num_losses == pytest.approx(3.0)
+    assert [call.args[0] for call in fl_client.update_after_step.call_args_list] == [0, 1, 2]  # type: ignore
+
+
+def test_gradient_accumulation_closes_cycle_cut_short_by_empty_batches() -> None:
+    inputs = torch.arange(12.0).reshape(6, 2) / 10.0
+    targets = inputs.sum(dim=1, keepdim=True)
+    batches = [(inputs[index : index + 2], targets[index : index + 2]) for index in range(0, 6, 2)]
+    empty_batch = (torch.zeros(0, 2), torch.zeros(0, 1))
+
+    for train_by_steps in [False, True]:
+        # The last cycle expects a second micro-batch, but the last batch turns out to be empty
+        fl_client = _get_accumulating_client(batch_size=2, gradient_accumulation_steps=2)
+        fl_client.train_loader = batches + [empty_batch]  # type: ignore
+        expected_client = _get_accumulating_client(batch_size=2, gradient_accumulation_steps=2)
+        expected_client.train_loader = batches  # type: ignore
+        expected_client.train_by_epochs(1)
+        if train_by_steps:
+            fl_client.train_by_steps(2)
+        else:
+            fl_client.train_by_epochs(1)
+
+        # The open cycle is closed with a step on the micro-batch it holds, as if the cycle had been cut short
+        for parameter, expected in zip(fl_client.model.parameters(), expected_client.model.parameters()):
+            assert torch.allclose(parameter, expected, atol=1e-6)
+        assert fl_client.total_steps == 2 and fl_client.train_loss_meter.num_losses == pytest.approx(2.0)
+        assert [call.args[0] for call in fl_client.update_after_step.call_args_list] == [0, 1]  # type: ignore
+        assert fl_client.deferred_optimizers == []
+
+
+def _train_classifier(autocast_dtype: Optional[torch.dtype]) -> Tuple[float, Dict[str, Scalar]]:
+    torch.manual_seed(42)
+    inputs = torch.randn(256, 8)
+    targets = (inputs[:, :4].sum(dim=1) > inputs[:, 4:].sum(dim=1)).long()
+    fl_client = BasicClient(Path(""), [Accuracy("accuracy")], torch.device("cpu"), autocast_dtype=autocast_dtype)
+    fl_client.model = torch.nn.Sequential(torch.nn.Linear(8, 32), torch.nn.ReLU(), torch.nn.Linear(32, 2))
+    fl_client.optimizers = {"global": torch.optim.SGD(fl_client.model.parameters(), lr=0.1)}
+    fl_client.criterion = torch.nn.CrossEntropyLoss()
+    fl_client.train_loader = DataLoader(TensorDataset(inputs[:192], targets[:192]), batch_size=16)
+    fl_client.val_loader = DataLoader(TensorDataset(inputs[192:], targets[192:]), batch_size=16)
+    fl_client.train_by_epochs(5)
+    return fl_client.validate()
+
+
+def test_bfloat16_autocast_matches_full_precision() -> None:
+    full_precision_loss, full_precision_metrics = _train_classifier(None)
+    mixed_precision_loss, mixed_precision_metrics = _train_classifier(torch.bfloat16)
+
+    full_precision_accuracy = full_precision_metrics["val - prediction - accuracy"]
+    assert isinstance(full_precision_accuracy, float) and full_precision_accuracy > 0.8
+    assert mixed_precision_loss == pytest.approx(full_precision_loss, abs=0.05)
+    assert mixed_precision_metrics["val - prediction - accuracy"] == pytest.approx(full_precision_accuracy, abs=0.05)
+
+
+def test_autocast_predictions_are_full_precision() -> None:
+    fl_client = BasicClient(Path(""), [], torch.device("cpu"), autocast_dtype=torch.bfloat16)
+    fl_client.model = torch.nn.Linear(2, 2)
+    fl_client.criterion = torch.nn.CrossEntropyLoss()
+    with fl_client.autocast():
+        assert fl_client.model(torch.ones(1, 2)).dtype == torch.bfloat16
+    losses, preds = fl_client.val_step(torch.ones(3, 2), torch.zeros(3, dtype=torch.long))
+    assert preds["prediction"].dtype == torch.float32 and losses.checkpoint.dtype == torch.float32
+    assert fl_client.grad_scaler is None
+    fl_client = BasicClient(Path(""), [], torch.device("cpu"), autocast_dtype=torch.float16)
+    assert isinstance(fl_client.grad_scaler, type(create_grad_scaler(torch.device("cpu"))))
+
+
+def test_float16_autocast_scales_gradients() -> None:
+    full_precision_client = _get_accumulating_client(batch_size=2, gradient_accumulation_steps=1)
+    mixed_precision_client = _get_accumulating_client(batch_size=2, gradient_accumulation_steps=1)
+    mixed_precision_client.autocast_dtype = torch.float16
+    # A small initial scale, so that no step is skipped because of overflowing scaled gradients
+    mixed_precision_client.grad_scaler = torch.amp.GradScaler("cpu", init_scale=256.0)
+
+    with patch.object(mixed_precision_client.grad_scaler, "update", wraps=mixed_precision_client.grad_scaler.update):
+        mixed_precision_client.train_by_steps(3)
+        # The scale is updated once per optimizer step
+        assert mixed_precision_client.grad_scaler.update.call_count == 3  # type: ignore
+    full_precision_client.train_by_steps(3)
+
+    # Gradients are unscaled before the optimizer steps, so the updates match those in full precision
+    assert mixed_precision_client.grad_scaler.get_scale() == 256.0
+    for mixed, full in zip(mixed_precision_client.model.parameters(), full_precision_client.model.parameters()):
+        assert torch.allclose(mixed, full, atol=1e-2)
@@ -1,9 +1,13 @@
+from pathlib import Path
+from typing import List, Optional
+
 import numpy as np
 import pytest
+import torch
 from flwr.common.typing import NDArrays
 from opacus.grad_sample.grad_sample_module import GradSampleModule
 from opacus.optimizers.optimizer import DPOptimizer
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, TensorDataset
 
 from examples.models.cnn_model import Net
 from fl4health.clients.scaffold_client import DPScaffoldClient, ScaffoldClient
@@ -62,3 +66,35 @@ def test_dp_scaffold_client(get_client: DPScaffoldClient) -> None:  # noqa
     assert hasattr(client, "client_control_variates")
     assert hasattr(client, "server_control_variates")
     assert hasattr(client, "client_control_variates_updates")
+
+
+def _get_linear_scaffold_client(autocast_dtype: Optional[torch.dtype]) -> ScaffoldClient:
+    torch.manual_seed(42)
+    client = ScaffoldClient(data_path=Path(""), metrics=[], device=torch.device("cpu"))
+    client.model = torch.nn.Linear(2, 1)
+    client.optimizers = {"global": torch.optim.SGD(client.model.parameters(), lr=0.1)}
+    client.criterion = torch.nn.MSELoss()
+    inputs = torch.arange(12.0).reshape(6, 2) / 10.0
+    client.train_loader = DataLoader(TensorDataset(inputs, inputs.sum(dim=1, keepdim=True)), batch_size=2)
+    # A drift correction larger than the gradients, so that correcting scaled gradients would be caught
+    client.server_control_variates = [np.full(p.shape, 2.0, dtype=np.float32) for p in client.model.parameters()]
+    client.client_control_variates = [np.zeros(p.shape, dtype=np.float32) for p in client.model.parameters()]
+    if autocast_dtype is not None:
+        client.autocast_dtype = autocast_dtype
+        client.grad_scaler = torch.amp.GradScaler("cpu", init_scale=256.0)
+    return client
+
+
+def test_scaffold_client_float16_autocast() -> None:
+    full_precision_client = _get_linear_scaffold_client(None)
+    mixed_precision_client = _get_linear_scaffold_client(torch.float16)
+    output_dtypes: List[torch.dtype] = []
+    mixed_precision_client.model.register_forward_hook(lambda _, __, output: output_dtypes.append(output.dtype))
+
+    full_precision_client.train_by_steps(3)
+    mixed_precision_client.train_by_steps(3)
+
+    # The forward pass runs under autocast and the correction is applied to the unscaled gradients
+    assert output_dtypes == [torch.float16] * 3
+    for mixed, full in zip(mixed_precision_client.model.parameters(), full_precision_client.model.parameters()):
+        assert torch.allclose(mixed, full, atol=1e-2)
@@ -0,0 +1,138 @@
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+from flwr.common import Code, FitRes, Status, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.client_proxy import ClientProxy
+
+from fl4health.clients.basic_client import BasicClient
+from fl4health.parameter_exchange.delta_exchanger import (
+    DeltaParameterExchanger,
+    add_delta_ndarrays,
+    decode_delta_ndarrays,
+)
+from fl4health.parameter_exchange.full_exchanger import FullParameterExchanger
+from fl4health.parameter_exchange.quantization import QuantizationType, dequantize_ndarrays
+from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.utils.metrics import Accuracy
+from tests.test_utils.custom_client_proxy import CustomClientProxy
+
+
+def test_delta_exchange_round_trip() -> None:
+    torch.manual_seed(42)
+    linear, norm = nn.Linear(8, 4), nn.BatchNorm1d(4)
+    model = nn.Sequential(linear, norm)
+    exchanger = DeltaParameterExchanger(FullParameterExchanger())
+    exchanger.record_global_weights(model)
+    global_weights = [array.copy() for array in FullParameterExchanger().push_parameters(model)]
+
+    with torch.no_grad():
+        linear.weight.add_(0.5)
+    model(torch.rand(3, 8))
+    local_weights = FullParameterExchanger().push_parameters(model)
+    pushed = exchanger.push_parameters(model)
+
+    deltas = decode_delta_ndarrays(pushed, global_weights)
+    assert np.allclose(deltas[0], 0.5)
+    # num_batches_tracked is not floating point, so its absolute value is sent
+    assert deltas[-1] == 1
+    updated = add_delta_ndarrays(global_weights, deltas)
+    for local_array, updated_array in zip(local_weights, updated):
+        assert updated_array.dtype == local_array.dtype
+        assert np.allclose(local_array, updated_array)
+
+
+def test_top_k_delta_exchange_with_error_feedback() -> None:
+    model = nn.Linear(100, 10, bias=False)
+    exchanger = DeltaParameterExchanger(FullParameterExchanger(), top_k_fraction=0.1, error_feedback=True)
+    global_weights = [model.weight.detach().numpy().copy()]
+    exchanger.record_global_weights(model)
+    update = np.random.RandomState(42).randn(10, 100).astype(np.float32)
+    with torch.no_grad():
+        model.weight.add_(torch.from_numpy(update))
+
+    pushed = exchanger.push_parameters(model)
+    # Only the indices and values of the largest 10% of the entries are sent
+    assert exchanger.encoded_bytes < exchanger.full_precision_bytes / 4
+    first_delta = decode_delta_ndarrays(pushed, global_weights)[0]
+    assert np.count_nonzero(first_delta) == 100
+    threshold = np.sort(np.abs(update).ravel())[-100]
+    assert np.array_equal(first_delta != 0, np.abs(update) >= threshold)
+    assert np.allclose(first_delta[first_delta != 0], update[first_delta != 0])
+
+    # The entries that were dropped are carried over, so the full update is sent over the following rounds, even
+    # without further local updates
+    with torch.no_grad():
+        model.weight.copy_(torch.from_numpy(global_weights[0]))
+    sent_update = first_delta
+    for _ in range(9):
+        sent_update += decode_delta_ndarrays(exchanger.push_parameters(model), global_weights)[0]
+    assert np.allclose(sent_update, update, atol=1e-5)
+
+
+def test_quantized_delta_exchange() -> None:
+    model = nn.Linear(16, 4)
+    exchanger = DeltaParameterExchanger(FullParameterExchanger(), quantization_type=QuantizationType.INT8)
+    global_weights = [array.copy() for array in FullParameterExchanger().push_parameters(model)]
+    exchanger.record_global_weights(model)
+    with torch.no_grad():
+        model.weight.add_(1e-3)
+
+    deltas = decode_delta_ndarrays(dequantize_ndarrays(exchanger.push_parameters(model)), global_weights)
+    # Quantizing the small deltas rather than the weights keeps the error relative to the size of the update
+    assert np.allclose(deltas[0], 1e-3, atol=1e-5)
+    assert np.allclose(deltas[1], 0.0)
+    assert exchanger.encoded_bytes < exchanger.full_precision_bytes / 2
+
+
+def test_strategy_aggregates_client_deltas() -> None:
+    model = nn.Linear(3, 2)
+    initial_weights = [array.copy() for array in FullParameterExchanger().push_parameters(model)]
+    strategy = BasicFedAvg(initial_parameters=ndarrays_to_parameters(initial_weights), delta_aggregation=True)
+
+    global_weights = initial_weights
+    for _ in range(2):
+        results: List[Tuple[ClientProxy, FitRes]] = []
+        for client_index in range(2):
+            FullParameterExchanger().pull_parameters(global_weights, model)
+            exchanger = DeltaParameterExchanger(FullParameterExchanger(), top_k_fraction=0.5)
+            exchanger.record_global_weights(model)
+            with torch.no_grad():
+                model.weight[0].add_(float(client_index + 1))
+            parameters = ndarrays_to_parameters(exchanger.push_parameters(model))
+            results.append((CustomClientProxy(str(client_index)), FitRes(Status(Code.OK, ""), parameters, 1, {})))
+
+        aggregated, _ = strategy.aggregate_fit(1, results, [])
+        assert aggregated is not None
+        aggregated_ndarrays = parameters_to_ndarrays(aggregated)
+        # Only half of the entries of the weights change, so the top-k deltas hold the full update
+        assert np.allclose(aggregated_ndarrays[0][0], global_weights[0][0] + 1.5)
+        assert np.allclose(aggregated_ndarrays[0][1], global_weights[0][1])
+        assert np.allclose(aggregated_ndarrays[1], global_weights[1])
+        assert strategy.global_model_weights is not None
+        assert np.allclose(strategy.global_model_weights[0], aggregated_ndarrays[0])
+        global_weights = aggregated_ndarrays
+
+
+def test_basic_client_records_global_weights() -> None:
+    client = BasicClient(data_path=Path(""), metrics=[Accuracy()], device=torch.device("cpu"))
+    client.model = nn.Linear(3, 2)
+    exchanger = DeltaParameterExchanger(FullParameterExchanger())
+    client.parameter_exchanger = exchanger
+    client.initialized = True
+
+    global_weights = [np.ones((2, 3), dtype=np.float32), np.zeros(2, dtype=np.float32)]
+    client.set_parameters(global_weights, {"current_server_round": 1}, fitting_round=True)
+    assert exchanger.global_weights is not None
+    assert np.array_equal(exchanger.global_weights[0], global_weights[0])
+
+    with torch.no_grad():
+        client.model.weight.add_(2.0)
+    deltas = decode_delta_ndarrays(client.get_parameters({}), global_weights)
+    assert np.allclose(deltas[0], 2.0)
+
+    # Evaluation rounds do not change the weights the deltas are computed against
+    client.set_parameters([np.zeros((2, 3)), np.zeros(2)], {"current_server_round": 1}, fitting_round=False)
+    assert np.array_equal(exchanger.global_weights[0], global_weights[0])
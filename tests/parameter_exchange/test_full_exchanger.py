@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+
+from fl4health.parameter_exchange.full_exchanger import FullParameterExchanger
+
+
+def test_full_parameter_exchange_is_zero_copy() -> None:
+    linear, norm = nn.Linear(4, 3), nn.BatchNorm1d(3)
+    model = nn.Sequential(linear, norm)
+    exchanger = FullParameterExchanger()
+
+    pushed = exchanger.push_parameters(model)
+    assert len(pushed) == len(model.state_dict())
+    # Pushed arrays are views of the model storage
+    assert np.shares_memory(pushed[0], linear.weight.detach().numpy())
+
+    weight_storage = linear.weight.data_ptr()
+    new_parameters = [np.full(array.shape, 2.0, dtype=np.float64) for array in pushed]
+    # Counters such as num_batches_tracked are integer 0-d arrays
+    new_parameters[-1] = np.array(5)
+    exchanger.pull_parameters(new_parameters, model)
+
+    # Incoming arrays are copied into the existing storage, cast to the model's dtypes
+    assert linear.weight.data_ptr() == weight_storage
+    assert linear.weight.dtype == torch.float32
+    assert linear.weight.requires_grad
+    assert torch.all(linear.weight == 2.0)
+    assert norm.running_var is not None and norm.num_batches_tracked is not None
+    assert torch.all(norm.running_var == 2.0)
+    assert norm.num_batches_tracked.item() == 5
+    # The incoming arrays are not aliased by the model
+    new_parameters[0][:] = 3.0
+    assert torch.all(linear.weight == 2.0)
+
+
+def test_full_parameter_exchange_with_mismatched_parameters() -> None:
+    model = nn.Linear(4, 3)
+    exchanger = FullParameterExchanger()
+    with pytest.raises(AssertionError):
+        exchanger.pull_parameters([np.zeros((3, 4))], model)
+    with pytest.raises(AssertionError):
+        exchanger.pull_parameters([np.zeros((4, 3)), np.zeros(3)], model)
+    # Reversed (negatively strided) arrays are supported
+    exchanger.pull_parameters([np.zeros((3, 4)), np.arange(3.0)[::-1]], model)
+    assert torch.equal(model.bias, torch.tensor([2.0, 1.0, 0.0]))
@@ -52,3 +52,15 @@ def test_nested_model_exclusion() -> None:
     # These weights should be zero, as they were "exchanged"
     weights = model.decoder.decoding_blocks[0].conv2.conv_layer.weight
     assert torch.all(torch.eq(weights, torch.zeros_like(weights)))
+
+
+def test_exclusion_matches_whole_module_names() -> None:
+    model = nn.Sequential(*[nn.Linear(2, 2) for _ in range(11)])
+    model[1] = nn.BatchNorm1d(2)
+    exchanger = LayerExchangerWithExclusions(model, {nn.BatchNorm1d})
+
+    # Only the layers of module "1" are excluded, not those of module "10", which shares its prefix
+    assert exchanger.should_layer_be_excluded("1.weight")
+    assert exchanger.should_layer_be_excluded("1.running_mean")
+    assert not exchanger.should_layer_be_excluded("10.weight")
+    assert len(exchanger.layers_to_transfer) == 20
@@ -3,7 +3,10 @@ import torch
 import torch.nn as nn
 
 from fl4health.parameter_exchange.layer_exchanger import DynamicLayerExchanger, FixedLayerExchanger
-from fl4health.parameter_exchange.parameter_selection_criteria import LayerSelectionFunctionConstructor
+from fl4health.parameter_exchange.parameter_selection_criteria import (
+    LayerSelectionFunctionConstructor,
+    compute_drift_norms,
+)
 from tests.test_utils.models_for_test import LinearModel, ToyConvNet
 
 
@@ -78,3 +81,53 @@ def test_norm_drift_layer_exchange() -> None:
     layers_to_exchange, layer_names = exchanger.unpack_parameters(layers_with_names_to_exchange)
     assert len(layer_names) == 2
     assert len(layers_to_exchange) == 2
+
+
+def test_dynamic_layer_exchange_with_layer_ids() -> None:
+    initial_model = ToyConvNet()
+    model = ToyConvNet()
+    nn.init.constant_(initial_model.fc2.weight, 0)
+    nn.init.constant_(model.fc2.weight, 1)
+    selection_function = LayerSelectionFunctionConstructor(
+        norm_threshold=1, exchange_percentage=0.5, normalize=False
+    ).select_by_threshold()
+    name_exchanger = DynamicLayerExchanger(selection_function)
+    id_exchanger = DynamicLayerExchanger(selection_function, use_layer_ids=True)
+
+    packed_with_names = name_exchanger.push_parameters(model, initial_model)
+    packed_with_ids = id_exchanger.push_parameters(model, initial_model)
+    layer_names = list(model.state_dict().keys())
+    # The selected layers are identified by their position in the state dictionary
+    assert packed_with_ids[-1].dtype == np.int32
+    assert [layer_names[layer_id] for layer_id in packed_with_ids[-1]] == packed_with_names[-1].tolist()
+    assert packed_with_ids[-1].nbytes < packed_with_names[-1].nbytes
+    _, unpacked_names = id_exchanger.unpack_parameters(packed_with_ids)
+    assert unpacked_names == packed_with_names[-1].tolist()
+
+    # Layers sent back by id are written into the corresponding layers of another model
+    fc2_id = layer_names.index("fc2.weight")
+    new_model = ToyConvNet()
+    new_exchanger = DynamicLayerExchanger(selection_function, use_layer_ids=True)
+    new_exchanger.pull_parameters([np.full((64, 120), 3.0), np.array([fc2_id], dtype=np.int32)], new_model)
+    assert torch.all(new_model.fc2.weight == 3.0)
+
+
+def test_batched_drift_norms() -> None:
+    torch.manual_seed(42)
+    initial_model = ToyConvNet(include_bn=True)
+    model = ToyConvNet(include_bn=True)
+    # Integer buffers are cast to floating point to compute their drift
+    model.state_dict()["bn1.num_batches_tracked"].add_(3)
+    initial_states, model_states = initial_model.state_dict(), model.state_dict()
+    for normalize in [True, False]:
+        expected_norms = {}
+        for layer_name, layer in model_states.items():
+            expected_norms[layer_name] = torch.linalg.norm((layer - initial_states[layer_name]).float()).item()
+            if normalize:
+                expected_norms[layer_name] /= layer.numel()
+        # Small groups processed on several threads give the same norms as a single fused group
+        for num_workers, group_size in [(1, 2**18), (3, 100)]:
+            drift_norms = compute_drift_norms(model, initial_model, normalize, num_workers, group_size)
+            assert list(drift_norms.keys()) == list(expected_norms.keys())
+            for layer_name, drift_norm in drift_norms.items():
+                assert np.isclose(drift_norm, expected_norms[layer_name], rtol=1e-5)
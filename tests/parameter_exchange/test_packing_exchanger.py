@@ -24,6 +24,11 @@ from fl4health.parameter_exchange.parameter_selection_criteria import (
     smallest_magnitude_change_scores,
 )
 from fl4health.parameter_exchange.sparse_coo_parameter_exchanger import SparseCooParameterExchanger
+from fl4health.parameter_exchange.sparse_index_encoding import (
+    SparseIndexEncoding,
+    decode_sparse_indices,
+    encode_sparse_indices,
+)
 from tests.test_utils.models_for_test import ConstantConvNet, ToyConvNet
 
 
@@ -280,3 +285,77 @@ def test_sparse_coo_parameter_exchanger() -> None:
     assert len(indices[0]) == 64
     assert (shapes[0] == np.array([4, 16])).all()
     assert tensor_names[0] == "fc2.weight"
+
+
+@pytest.mark.parametrize("density", [0.001, 0.05, 0.5, 0.95])
+def test_sparse_index_encodings(density: float) -> None:
+    np.random.seed(42)
+    shape = (64, 32, 3, 3)
+    flat_indices = np.flatnonzero(np.random.rand(*shape) < density)
+    encoded_sizes = {}
+    for encoding in SparseIndexEncoding:
+        encoded = encode_sparse_indices(flat_indices, shape, encoding)
+        assert np.array_equal(decode_sparse_indices(encoded, shape), flat_indices)
+        encoded_sizes[encoding] = encoded.nbytes
+
+    # The automatic encoding is the most compact one, and always much smaller than int64 coordinates
+    assert encoded_sizes[SparseIndexEncoding.AUTO] == min(encoded_sizes.values())
+    assert encoded_sizes[SparseIndexEncoding.AUTO] * 4 < encoded_sizes[SparseIndexEncoding.COORDINATES]
+    if density >= 0.5:
+        assert encoded_sizes[SparseIndexEncoding.AUTO] == encoded_sizes[SparseIndexEncoding.BITMASK]
+
+
+def test_sparse_coo_parameter_exchanger_with_compact_indices() -> None:
+    torch.manual_seed(42)
+    model = ToyConvNet(include_bn=False)
+    initial_model = ToyConvNet(include_bn=False)
+    coordinate_exchanger = SparseCooParameterExchanger(
+        sparsity_level=0.1, score_gen_function=largest_final_magnitude_scores
+    )
+    compact_exchanger = SparseCooParameterExchanger(
+        sparsity_level=0.1,
+        score_gen_function=largest_final_magnitude_scores,
+        index_encoding=SparseIndexEncoding.AUTO,
+    )
+
+    coordinate_parameters = coordinate_exchanger.push_parameters(model, initial_model)
+    compact_parameters = compact_exchanger.push_parameters(model, initial_model)
+    assert sum(array.nbytes for array in compact_parameters) < sum(array.nbytes for array in coordinate_parameters) / 2
+
+    # Either encoding loads the same values into a model
+    coordinate_model = copy.deepcopy(initial_model)
+    compact_model = copy.deepcopy(initial_model)
+    coordinate_exchanger.pull_parameters(coordinate_parameters, coordinate_model)
+    coordinate_exchanger.pull_parameters(compact_parameters, compact_model)
+    for coordinate_tensor, compact_tensor in zip(
+        coordinate_model.state_dict().values(), compact_model.state_dict().values()
+    ):
+        assert torch.equal(coordinate_tensor, compact_tensor)
+
+
+def test_sparse_coo_parameter_exchanger_score_threshold() -> None:
+    torch.manual_seed(42)
+    all_scores = torch.rand(200_000)
+    exact_exchanger = SparseCooParameterExchanger(
+        sparsity_level=0.05, score_gen_function=largest_final_magnitude_scores
+    )
+    sorted_scores, _ = torch.sort(all_scores, descending=True)
+    assert exact_exchanger.compute_score_threshold(all_scores) == sorted_scores[10_000 - 1].item()
+
+    # The sampled threshold selects close to the intended fraction of parameters
+    sampled_exchanger = SparseCooParameterExchanger(
+        sparsity_level=0.05, score_gen_function=largest_final_magnitude_scores, threshold_sample_size=50_000
+    )
+    sampled_threshold = sampled_exchanger.compute_score_threshold(all_scores)
+    selected_fraction = (all_scores >= sampled_threshold).float().mean().item()
+    assert abs(selected_fraction - 0.05) < 0.01
+
+
+def test_sparse_coo_parameter_exchanger_with_tied_scores() -> None:
+    model = ConstantConvNet(constants=[1.0, 1.0, 1.0, 1.0])
+    parameter_exchanger = SparseCooParameterExchanger(
+        sparsity_level=0.1, score_gen_function=largest_final_magnitude_scores
+    )
+    # Every score is tied with the threshold, so every parameter is selected
+    nonzero_vals, _ = parameter_exchanger.select_parameters(model)
+    assert sum(len(t) for t in nonzero_vals) == sum(p.numel() for p in model.parameters())
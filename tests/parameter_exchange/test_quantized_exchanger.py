@@ -0,0 +1,102 @@
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+from flwr.common import Code, FitRes, NDArrays, Status, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.client_proxy import ClientProxy
+
+from fl4health.parameter_exchange.full_exchanger import FullParameterExchanger
+from fl4health.parameter_exchange.layer_exchanger import FixedLayerExchanger
+from fl4health.parameter_exchange.quantization import (
+    QuantizationType,
+    dequantize_array,
+    dequantize_ndarrays,
+    quantize_array,
+    quantize_ndarrays,
+)
+from fl4health.parameter_exchange.quantized_exchanger import QuantizedParameterExchanger
+from fl4health.strategies.basic_fedavg import BasicFedAvg
+from tests.test_utils.custom_client_proxy import CustomClientProxy
+
+
+@pytest.mark.parametrize(
+    "quantization_type,tolerance",
+    [(QuantizationType.FP16, 1e-3), (QuantizationType.BF16, 1e-2), (QuantizationType.INT8, 1e-2)],
+)
+def test_quantization_round_trip(quantization_type: QuantizationType, tolerance: float) -> None:
+    np.random.seed(42)
+    ndarrays: NDArrays = [
+        np.random.rand(8, 3, 3).astype(np.float32) - 0.5,
+        np.random.rand(5).astype(np.float32) + 2.0,
+        np.zeros((2, 2), dtype=np.float32),
+        np.array(7),
+        np.array(["layer_1", "layer_2"]),
+    ]
+    packed = quantize_ndarrays(ndarrays, quantization_type)
+    dequantized = dequantize_ndarrays(packed)
+
+    assert len(dequantized) == len(ndarrays)
+    for array, dequantized_array in zip(ndarrays[:3], dequantized[:3]):
+        assert dequantized_array.shape == array.shape
+        assert dequantized_array.dtype == np.float32
+        assert np.allclose(array, dequantized_array, rtol=tolerance, atol=tolerance)
+    # Zero is represented exactly and non floating point tensors are sent as is
+    assert np.array_equal(dequantized[2], ndarrays[2])
+    assert dequantized[3] == 7
+    assert dequantized[4].tolist() == ["layer_1", "layer_2"]
+
+
+def test_int8_quantization_is_per_channel() -> None:
+    # Channels with very different ranges are each quantized over their own range
+    array = np.stack([np.linspace(0.0, 1e-3, 10), np.linspace(-100.0, 100.0, 10)]).astype(np.float32)
+    encoded = quantize_array(array, QuantizationType.INT8)
+    assert encoded[0].dtype == np.int8 and encoded[1].shape == (2,) and encoded[2].shape == (2,)
+    dequantized = dequantize_array(encoded, QuantizationType.INT8)
+    assert np.allclose(dequantized[0], array[0], atol=1e-5)
+    assert np.allclose(dequantized[1], array[1], atol=0.5)
+
+
+def test_quantized_exchanger_with_error_feedback() -> None:
+    model = nn.Linear(16, 4)
+    exchanger = QuantizedParameterExchanger(FullParameterExchanger(), QuantizationType.INT8, error_feedback=True)
+    weights = model.weight.detach().numpy().copy()
+
+    dequantized_sum = np.zeros_like(weights)
+    num_rounds = 20
+    for _ in range(num_rounds):
+        dequantized_sum += dequantize_ndarrays(exchanger.push_parameters(model))[0]
+    # The model itself is not modified
+    assert np.array_equal(model.weight.detach().numpy(), weights)
+    # With error feedback, the quantization errors cancel out over rounds rather than accumulating
+    single_round_error = np.abs(dequantize_ndarrays(quantize_ndarrays([weights], QuantizationType.INT8))[0] - weights)
+    assert np.abs(dequantized_sum / num_rounds - weights).max() < single_round_error.max() / 4
+
+    assert exchanger.full_precision_bytes == 4 * (16 * 4 + 4)
+    assert exchanger.encoded_bytes < exchanger.full_precision_bytes / 2
+
+    # Pulled parameters are passed to the wrapped exchanger unchanged
+    exchanger.pull_parameters([np.ones((4, 16)), np.zeros(4)], model)
+    assert torch.all(model.weight == 1.0)
+
+
+def test_strategy_dequantizes_client_parameters() -> None:
+    model = nn.Linear(3, 2)
+    exchanger = QuantizedParameterExchanger(FixedLayerExchanger(["weight"]), QuantizationType.FP16)
+    results: List[Tuple[ClientProxy, FitRes]] = []
+    client_weights = []
+    for client_index in range(2):
+        nn.init.constant_(model.weight, float(client_index + 1))
+        client_weights.append(model.weight.detach().numpy().copy())
+        parameters = ndarrays_to_parameters(exchanger.push_parameters(model))
+        results.append((CustomClientProxy(str(client_index)), FitRes(Status(Code.OK, ""), parameters, 1, {})))
+
+    strategy = BasicFedAvg(dequantize_client_parameters=True)
+    aggregated, _ = strategy.aggregate_fit(1, results, [])
+    assert aggregated is not None
+    aggregated_ndarrays = parameters_to_ndarrays(aggregated)
+    assert len(aggregated_ndarrays) == 1
+    assert np.allclose(aggregated_ndarrays[0], 1.5)
+    # The client results are not modified
+    assert len(parameters_to_ndarrays(results[0][1].parameters)) == 2
@@ -0,0 +1,77 @@
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from flwr.common import Parameters, Scalar, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.common.typing import FitRes
+from flwr.server.client_manager import SimpleClientManager
+from flwr.server.client_proxy import ClientProxy
+
+from fl4health.reporting.metrics import MetricsReporter
+from fl4health.server.async_server import AsyncFlServer
+from fl4health.strategies.fedbuff import BufferedFitResult, FedBuff
+from tests.test_utils.custom_client_proxy import DelayedFitClientProxy
+
+
+def test_async_server_aggregates_stale_updates_from_stragglers() -> None:
+    client_manager = SimpleClientManager()
+    fast_client = DelayedFitClientProxy("fast", update_value=1.0)
+    # The gated client trains freely in the first round only, so that the straggler fills the second buffer
+    gated_client_release = threading.Event()
+    gated_client = DelayedFitClientProxy("gated", update_value=1.0, release=gated_client_release)
+    # The straggler trains from the initial model, but only finishes once the first round has been aggregated
+    slow_client_release = threading.Event()
+    slow_client = DelayedFitClientProxy("slow", update_value=4.0, release=slow_client_release)
+    for client in [fast_client, gated_client, slow_client]:
+        client_manager.register(client)
+
+    strategy = FedBuff(
+        initial_parameters=ndarrays_to_parameters([np.zeros(4)]),
+        min_available_clients=3,
+        fraction_evaluate=0.0,
+        buffer_size=2,
+        staleness_exponent=1.0,
+        weighted_aggregation=False,
+    )
+    metrics_reporter = MetricsReporter()
+    server = AsyncFlServer(client_manager, strategy, metrics_reporter=metrics_reporter)
+    aggregate_buffered_fit = strategy.aggregate_buffered_fit
+    drain_in_flight_clients = server.drain_in_flight_clients
+
+    def aggregate_and_release_straggler(
+        server_round: int,
+        results: List[BufferedFitResult],
+        failures: List[Union[Tuple[ClientProxy, FitRes], BaseException]],
+    ) -> Tuple[Optional[Parameters], Dict[str, Scalar]]:
+        aggregated = aggregate_buffered_fit(server_round, results, failures)
+        if server_round == 1:
+            gated_client_release.clear()
+            slow_client_release.set()
+        return aggregated
+
+    def release_and_drain_in_flight_clients() -> None:
+        gated_client_release.set()
+        drain_in_flight_clients()
+
+    gated_client_release.set()
+    with patch.object(strategy, "aggregate_buffered_fit", side_effect=aggregate_and_release_straggler), patch.object(
+        server, "drain_in_flight_clients", side_effect=release_and_drain_in_flight_clients
+    ):
+        server.fit(num_rounds=2, timeout=None)
+
+    assert fast_client.num_fits == 2 and gated_client.num_fits == 2 and slow_client.num_fits == 1
+    assert not server.in_flight
+    first_round, second_round = (metrics_reporter.metrics["rounds"][server_round] for server_round in [1, 2])
+    assert first_round["staleness"]["values"] == [0, 0]
+    # The straggler's update is aggregated one global model update late
+    assert sorted(second_round["staleness"]["values"]) == [0, 1]
+    assert second_round["staleness"]["max"] == 1
+    # The first round averages two deltas of 1.0. In the second, the straggler's delta of 4.0 is down-weighted by
+    # (1 + 1)^-1 and averaged with the fast client's delta of 1.0. The gated client's update is discarded.
+    assert np.allclose(parameters_to_ndarrays(server.parameters)[0], np.full(4, 1.0 + (0.5 * 4.0 + 1.0) / 2))
+    assert strategy.model_version == 2
+    assert second_round["num_updates_aggregated"] == 2
+    assert second_round["num_clients_in_flight"] == 1
+    assert second_round["staleness"]["mean"] == pytest.approx(0.5)
@@ -1,19 +1,37 @@
 import datetime
+import os
+import threading
+from dataclasses import replace
+from multiprocessing.shared_memory import SharedMemory
 from pathlib import Path
+from typing import List, Optional
 from unittest.mock import Mock, patch
 
+import numpy as np
 import pytest
 import torch
 import torch.nn as nn
-from flwr.common.parameter import ndarrays_to_parameters
+from flwr.common.parameter import ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.common.typing import FitIns, FitRes
 from flwr.server.history import History
+from flwr.server.strategy import FedAvg
 from freezegun import freeze_time
 
 from fl4health.checkpointing.checkpointer import BestLossTorchCheckpointer
 from fl4health.client_managers.base_sampling_manager import SimpleClientManager
 from fl4health.client_managers.poisson_sampling_manager import PoissonSamplingClientManager
 from fl4health.parameter_exchange.full_exchanger import FullParameterExchanger
+from fl4health.reporting.metrics import MetricsReporter
 from fl4health.server.base_server import FlServer, FlServerWithCheckpointing
+from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.strategies.memory_mapped_aggregate import MemoryMappedAggregator
+from fl4health.utils.metric_aggregation import fit_metrics_aggregation_fn
+from fl4health.utils.shared_memory import (
+    SHARED_MEMORY_PARAMETERS_KEY,
+    SharedMemoryParameterPublisher,
+    write_parameters_for_server,
+)
+from tests.test_utils.custom_client_proxy import DelayedFitClientProxy
 from tests.test_utils.models_for_test import LinearTransform
 
 model = LinearTransform()
@@ -147,3 +165,229 @@ def test_metrics_reporter_evaluate_round(mock_evaluate_round: Mock) -> None:
             },
         },
     }
+
+
+def test_fit_round_with_incremental_aggregation() -> None:
+    initial_parameters = ndarrays_to_parameters([np.zeros((3, 2)), np.ones(4, dtype=np.float32)])
+    fit_round_results = []
+    # With incremental aggregation, the clients finish out of order, one at a time: each client is released once
+    # the result of the previous one has been accumulated.
+    arrival_order = [1, 2, 0]
+    for incremental_aggregation in [False, True]:
+        client_manager = SimpleClientManager()
+        releases = [threading.Event() for _ in arrival_order]
+        for i, release in enumerate(releases):
+            client_manager.register(
+                DelayedFitClientProxy(f"c{i}", num_samples=i + 1, update_value=float(i), release=release)
+            )
+        strategy = BasicFedAvg(
+            min_available_clients=3,
+            fit_metrics_aggregation_fn=fit_metrics_aggregation_fn,
+            incremental_aggregation=incremental_aggregation,
+        )
+        metrics_reporter = MetricsReporter()
+        fl_server = FlServer(client_manager, strategy, metrics_reporter=metrics_reporter)
+        fl_server.parameters = initial_parameters
+        accumulated_values = []
+        accumulate_fit_result = strategy.accumulate_fit_result
+
+        def accumulate_and_release_next(server_round: int, fit_res: FitRes) -> None:
+            accumulate_fit_result(server_round, fit_res)
+            accumulated_values.append(fit_res.metrics["update_value"])
+            if len(accumulated_values) < len(arrival_order):
+                releases[arrival_order[len(accumulated_values)]].set()
+
+        if incremental_aggregation:
+            releases[arrival_order[0]].set()
+        else:
+            for release in releases:
+                release.set()
+        with patch.object(strategy, "accumulate_fit_result", side_effect=accumulate_and_release_next):
+            fit_round_results.append(fl_server.fit_round(server_round=1, timeout=None))
+        # Each result is accumulated as it arrives with incremental aggregation, and not at all otherwise
+        assert accumulated_values == ([1.0, 2.0, 0.0] if incremental_aggregation else [])
+
+    assert fit_round_results[0] is not None and fit_round_results[1] is not None
+    parameters, metrics, (results, failures) = fit_round_results[1]
+    target_parameters, target_metrics, _ = fit_round_results[0]
+    assert parameters is not None and target_parameters is not None
+    for layer, target_layer in zip(parameters_to_ndarrays(parameters), parameters_to_ndarrays(target_parameters)):
+        assert layer.dtype == target_layer.dtype
+        assert np.allclose(layer, target_layer)
+    assert metrics == target_metrics
+    # Weighted by sample counts 1, 2 and 3
+    assert metrics["update_value"] == pytest.approx(8.0 / 6.0)
+    assert len(results) == 3 and not failures
+
+    timings = metrics_reporter.metrics["rounds"][1]["incremental_aggregation"]
+    assert set(timings) == {"total_aggregation_time", "post_barrier_aggregation_time", "barrier_time_saved"}
+    assert all(timing >= 0.0 for timing in timings.values())
+    assert timings["post_barrier_aggregation_time"] + timings["barrier_time_saved"] == pytest.approx(
+        timings["total_aggregation_time"]
+    )
+
+
+def test_fit_round_spills_memory_mapped_results_as_they_arrive(tmp_path: Path) -> None:
+    initial_parameters = ndarrays_to_parameters([np.zeros((3, 2)), np.ones(4, dtype=np.float32)])
+    client_manager = SimpleClientManager()
+    releases = [threading.Event() for _ in range(3)]
+    for i, release in enumerate(releases):
+        client_manager.register(
+            DelayedFitClientProxy(f"c{i}", num_samples=i + 1, update_value=float(i), release=release)
+        )
+    strategy = BasicFedAvg(
+        min_available_clients=3,
+        memory_mapped_aggregator=MemoryMappedAggregator(spill_directory=str(tmp_path)),
+        instrument_parameter_exchange=True,
+    )
+    metrics_reporter = MetricsReporter()
+    fl_server = FlServer(client_manager, strategy, metrics_reporter=metrics_reporter)
+    fl_server.parameters = initial_parameters
+    # The number of tensors still held by each result and the number of spill files once it has been accumulated
+    held_tensors = []
+    spill_files = []
+    accumulate_fit_result = strategy.accumulate_fit_result
+
+    def accumulate_and_release_next(server_round: int, fit_res: FitRes) -> None:
+        accumulate_fit_result(server_round, fit_res)
+        held_tensors.append(len(fit_res.parameters.tensors))
+        spill_files.append(sum(len(files) for _, _, files in os.walk(tmp_path)))
+        # The remaining clients are only released once the previous result has been spilled
+        if len(held_tensors) < len(releases):
+            releases[len(held_tensors)].set()
+
+    releases[0].set()
+    with patch.object(strategy, "accumulate_fit_result", side_effect=accumulate_and_release_next):
+        fit_round_results = fl_server.fit_round(server_round=1, timeout=None)
+    # Each result is spilled and released before the next client returns, so before the end of the round
+    assert held_tensors == [0, 0, 0]
+    assert spill_files == [1, 2, 3]
+    assert os.listdir(tmp_path) == []
+
+    assert fit_round_results is not None
+    parameters, _, (results, _) = fit_round_results
+    assert parameters is not None and len(results) == 3
+    # Weighted by sample counts 1, 2 and 3
+    for layer, initial_layer in zip(parameters_to_ndarrays(parameters), parameters_to_ndarrays(initial_parameters)):
+        assert layer.dtype == initial_layer.dtype
+        assert np.allclose(layer, initial_layer + 8.0 / 6.0)
+    # The payload sizes are recorded before the results are released
+    exchange_metrics = metrics_reporter.metrics["rounds"][1]["parameter_exchange"]
+    assert exchange_metrics["received_bytes"] == 3 * sum(len(tensor) for tensor in initial_parameters.tensors)
+
+
+class FedAvgWithCustomAggregation(BasicFedAvg):
+    def supports_incremental_aggregation(self) -> bool:
+        # The custom aggregate_fit has no incremental equivalent
+        return False
+
+
+def test_fit_round_defers_to_strategy_for_incremental_aggregation() -> None:
+    client_manager = SimpleClientManager()
+    for i in range(2):
+        client_manager.register(DelayedFitClientProxy(f"c{i}", update_value=float(i)))
+    strategy = FedAvgWithCustomAggregation(min_available_clients=2, incremental_aggregation=True)
+    fl_server = FlServer(client_manager, strategy)
+    fl_server.parameters = ndarrays_to_parameters([np.zeros(2)])
+    with patch.object(strategy, "accumulate_fit_result") as accumulate, patch.object(
+        strategy, "aggregate_fit", wraps=strategy.aggregate_fit
+    ) as aggregate_fit:
+        assert fl_server.fit_round(server_round=1, timeout=None) is not None
+    accumulate.assert_not_called()
+    aggregate_fit.assert_called_once()
+
+
+def test_fit_round_reports_parameter_exchange() -> None:
+    initial_parameters = ndarrays_to_parameters([np.zeros((3, 2)), np.ones(4, dtype=np.float32)])
+    global_parameters_bytes = sum(len(tensor) for tensor in initial_parameters.tensors)
+    for incremental_aggregation in [False, True]:
+        client_manager = SimpleClientManager()
+        for i in range(2):
+            client_manager.register(DelayedFitClientProxy(f"c{i}", update_value=float(i)))
+        strategy = BasicFedAvg(
+            min_available_clients=2,
+            fit_metrics_aggregation_fn=fit_metrics_aggregation_fn,
+            incremental_aggregation=incremental_aggregation,
+            instrument_parameter_exchange=True,
+        )
+        metrics_reporter = MetricsReporter()
+        fl_server = FlServer(client_manager, strategy, metrics_reporter=metrics_reporter)
+        fl_server.parameters = initial_parameters
+        fit_round_results = fl_server.fit_round(server_round=1, timeout=None)
+        assert fit_round_results is not None
+
+        exchange_metrics = metrics_reporter.metrics["rounds"][1]["parameter_exchange"]
+        # The clients send back updated parameters of the same size as the global parameters
+        assert exchange_metrics["received_bytes_per_client"] == {
+            "c0": global_parameters_bytes,
+            "c1": global_parameters_bytes,
+        }
+        assert exchange_metrics["received_tensor_bytes"]["c0"] == [
+            len(tensor) for tensor in initial_parameters.tensors
+        ]
+        assert exchange_metrics["received_bytes"] == 2 * global_parameters_bytes
+        assert exchange_metrics["compression_ratio"] == pytest.approx(1.0)
+        assert exchange_metrics["sent_bytes"] == global_parameters_bytes
+        # Incremental aggregation reports its own aggregation times
+        assert ("aggregation_time" in exchange_metrics) != incremental_aggregation
+
+
+class SharedMemoryFitClientProxy(DelayedFitClientProxy):
+    """Simulated client writing its parameters back through shared memory, as a BasicClient asked to would."""
+
+    def __init__(self, cid: str) -> None:
+        super().__init__(cid)
+        self.segment_names: List[str] = []
+
+    def fit(self, ins: FitIns, timeout: Optional[float]) -> FitRes:
+        fit_res = super().fit(ins, timeout)
+        segment_name = write_parameters_for_server(parameters_to_ndarrays(fit_res.parameters))
+        self.segment_names.append(segment_name)
+        return replace(
+            fit_res,
+            parameters=ndarrays_to_parameters([]),
+            metrics={**fit_res.metrics, SHARED_MEMORY_PARAMETERS_KEY: segment_name},
+        )
+
+
+def test_fit_round_releases_unread_shared_memory_results() -> None:
+    client_manager = SimpleClientManager()
+    clients = [SharedMemoryFitClientProxy(f"c{i}") for i in range(2)]
+    for client in clients:
+        client_manager.register(client)
+    # The flwr strategy does not read the parameters the clients wrote back
+    fl_server = FlServer(client_manager, FedAvg(min_available_clients=2))
+    fl_server.parameters = ndarrays_to_parameters([np.zeros(2)])
+    assert fl_server.fit_round(server_round=1, timeout=None) is not None
+    for client in clients:
+        assert len(client.segment_names) == 1
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=client.segment_names[0])
+
+
+def test_shutdown_releases_strategy_resources() -> None:
+    publisher = SharedMemoryParameterPublisher()
+    strategy = BasicFedAvg(shared_memory_publisher=publisher)
+    segment_name = publisher.publish(ndarrays_to_parameters([np.zeros(2)]))
+    FlServer(SimpleClientManager(), strategy).shutdown()
+    assert publisher.segment is None
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=segment_name)
+    # Strategies without a shutdown hook are left alone
+    FlServer(SimpleClientManager(), FedAvg()).shutdown()
+
+
+def test_fit_round_reports_parameter_exchange_for_any_strategy() -> None:
+    client_manager = SimpleClientManager()
+    for i in range(2):
+        client_manager.register(DelayedFitClientProxy(f"c{i}", update_value=float(i)))
+    strategy = FedAvg(min_available_clients=2)
+    strategy.instrument_parameter_exchange = True  # type: ignore
+    metrics_reporter = MetricsReporter()
+    fl_server = FlServer(client_manager, strategy, metrics_reporter=metrics_reporter)
+    fl_server.parameters = ndarrays_to_parameters([np.zeros(2)])
+    assert fl_server.fit_round(server_round=1, timeout=None) is not None
+
+    exchange_metrics = metrics_reporter.metrics["rounds"][1]["parameter_exchange"]
+    assert set(exchange_metrics["received_bytes_per_client"]) == {"c0", "c1"}
+    assert exchange_metrics["aggregation_time"] >= 0.0
@@ -1,7 +1,13 @@
 import numpy as np
 import pytest
+from flwr.common import ndarrays_to_parameters
 
-from fl4health.strategies.aggregate_utils import aggregate_losses, aggregate_results
+from fl4health.strategies.aggregate_utils import (
+    StreamingAggregator,
+    aggregate_losses,
+    aggregate_results,
+    streaming_aggregate_results,
+)
 
 
 def test_aggregate_results() -> None:
@@ -46,3 +52,48 @@ def test_aggregate_losses() -> None:
 
     assert pytest.approx(weighted_aggregate, abs=0.0001) == (1.0 * 3 + 2.0 * 2 + 10.0 * 1) / (6.0)
     assert pytest.approx(unweighted_aggregate, abs=0.0001) == (13.0) / (3.0)
+
+
+def test_streaming_aggregate_results_matches_aggregate_results() -> None:
+    np.random.seed(42)
+    results = [
+        ([np.random.rand(4, 3).astype(np.float32), np.random.rand(5).astype(np.float32)], num_examples)
+        for num_examples in [3, 7, 1, 12]
+    ]
+    parameters_results = [(ndarrays_to_parameters(ndarrays), num_examples) for ndarrays, num_examples in results]
+
+    for weighted in [True, False]:
+        target = aggregate_results(results, weighted=weighted)
+        streamed = streaming_aggregate_results(parameters_results, weighted=weighted)
+        assert len(streamed) == len(target)
+        for streamed_layer, target_layer in zip(streamed, target):
+            assert streamed_layer.dtype == np.float32
+            assert streamed_layer.shape == target_layer.shape
+            assert np.allclose(streamed_layer, target_layer, atol=1e-6)
+
+
+def test_streaming_aggregator_incremental_updates() -> None:
+    aggregator = StreamingAggregator(weighted=True)
+    aggregator.update_from_ndarrays([np.ones((2, 2)), np.array([1, 2], dtype=np.int64)], 1)
+    aggregator.update(ndarrays_to_parameters([3.0 * np.ones((2, 2)), np.array([3, 4], dtype=np.int64)]), 3)
+    aggregated = aggregator.compute()
+
+    assert np.allclose(aggregated[0], 2.5 * np.ones((2, 2)))
+    # Integer layers are averaged into float64, as they are for aggregate_results
+    assert aggregated[1].dtype == np.float64
+    assert np.allclose(aggregated[1], np.array([2.5, 3.5]))
+
+    # Mismatched layer shapes and counts should be rejected, without modifying the accumulated state
+    with pytest.raises(AssertionError):
+        aggregator.update_from_ndarrays([np.ones((2, 2)), np.array([1, 2, 3], dtype=np.int64)], 1)
+    with pytest.raises(AssertionError):
+        aggregator.update(ndarrays_to_parameters([np.ones((2, 2)), np.array([1, 2]), np.ones(1)]), 1)
+    with pytest.raises(AssertionError):
+        aggregator.update(ndarrays_to_parameters([np.ones((2, 2))]), 1)
+    assert aggregator.num_updates == 2 and aggregator.total_weight == 4.0
+    for layer, aggregated_layer in zip(aggregator.compute(), aggregated):
+        assert np.array_equal(layer, aggregated_layer)
+
+    aggregator.clear()
+    aggregator.update_from_ndarrays([np.full((3,), 2.0)], 5)
+    assert np.allclose(aggregator.compute()[0], np.full((3,), 2.0))
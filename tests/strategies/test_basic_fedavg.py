@@ -1,7 +1,10 @@
 import random
-from typing import List, Tuple
+from dataclasses import replace
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Tuple, Union
 
 import numpy as np
+import pytest
 from flwr.common import (
     Code,
     EvaluateRes,
@@ -17,6 +20,13 @@ from flwr.server.client_proxy import ClientProxy
 
 from fl4health.client_managers.poisson_sampling_manager import PoissonSamplingClientManager
 from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.utils.shared_memory import (
+    SHARED_MEMORY_PARAMETERS_KEY,
+    SHARED_MEMORY_WRITE_BACK_KEY,
+    SharedMemoryParameterPublisher,
+    read_ndarrays_from_shared_memory,
+    write_parameters_for_server,
+)
 from tests.test_utils.custom_client_proxy import CustomClientProxy
 
 
@@ -173,3 +183,91 @@ def test_configure_eval() -> None:
     assert len(simple_config_res) == 3
     # Client three should be the second chosen.
     assert simple_config_res[1][0].cid == "c3"
+
+
+def test_shared_memory_parameter_exchange() -> None:
+    publisher = SharedMemoryParameterPublisher(write_back_updates=True)
+    strategy = BasicFedAvg(fit_metrics_aggregation_fn=fit_metrics_aggregation_fn, shared_memory_publisher=publisher)
+    fit_instructions = strategy.configure_fit(
+        server_round=1, parameters=client_params[0], client_manager=simple_client_manager
+    )
+    evaluate_instructions = strategy.configure_evaluate(
+        server_round=1, parameters=client_params[0], client_manager=simple_client_manager
+    )
+    # Every client receives the name of the same segment in place of the parameters
+    segment_names = {ins.config[SHARED_MEMORY_PARAMETERS_KEY] for _, ins in fit_instructions + evaluate_instructions}
+    assert len(segment_names) == 1
+    assert all(ins.parameters.tensors == [] for _, ins in fit_instructions + evaluate_instructions)
+    assert all(ins.config[SHARED_MEMORY_WRITE_BACK_KEY] for _, ins in fit_instructions)
+
+    # Clients in other processes attach with attach_shared_memory, which stops their resource tracker from
+    # unlinking the segment when they exit. The publisher is in this process, so the segment is opened directly.
+    segment = SharedMemory(name=str(segment_names.pop()))
+    shared_ndarrays = read_ndarrays_from_shared_memory(segment)
+    assert np.array_equal(shared_ndarrays[0], np.ones((3, 3)))
+    del shared_ndarrays
+    segment.close()
+
+    # Clients write their parameters back, sending the names of their segments in the metrics
+    shared_results: List[Tuple[ClientProxy, FitRes]] = [
+        (
+            client_proxy,
+            replace(
+                fit_res,
+                parameters=ndarrays_to_parameters([]),
+                metrics={
+                    **fit_res.metrics,
+                    SHARED_MEMORY_PARAMETERS_KEY: write_parameters_for_server(
+                        parameters_to_ndarrays(fit_res.parameters)
+                    ),
+                },
+            ),
+        )
+        for client_proxy, fit_res in clients_res
+    ]
+    parameters, metrics = strategy.aggregate_fit(server_round=1, results=shared_results, failures=[])
+    assert metrics == {"metric": 0.4}
+    assert parameters is not None
+    aggregated_ndarrays = parameters_to_ndarrays(parameters)
+    assert np.allclose(aggregated_ndarrays[0], 3.0)
+    assert np.allclose(aggregated_ndarrays[1], 25.0 / 8.0)
+    publisher.close()
+
+
+def write_back_results(results: List[Tuple[ClientProxy, FitRes]]) -> List[Tuple[ClientProxy, FitRes]]:
+    # Simulates clients writing their parameters back through shared memory
+    return [
+        (
+            client_proxy,
+            replace(
+                fit_res,
+                parameters=ndarrays_to_parameters([]),
+                metrics={
+                    **fit_res.metrics,
+                    SHARED_MEMORY_PARAMETERS_KEY: write_parameters_for_server(
+                        parameters_to_ndarrays(fit_res.parameters)
+                    ),
+                },
+            ),
+        )
+        for client_proxy, fit_res in results
+    ]
+
+
+def test_rejected_round_releases_shared_memory_results() -> None:
+    publisher = SharedMemoryParameterPublisher(write_back_updates=True)
+    strategy = BasicFedAvg(accept_failures=False, shared_memory_publisher=publisher)
+    shared_results = write_back_results(clients_res)
+    # A client that returned its parameters, but with a failing status
+    failed_results = write_back_results([(CustomClientProxy("c3"), client0_res)])
+    failures: List[Union[Tuple[ClientProxy, FitRes], BaseException]] = [*failed_results, Exception("Client failed")]
+    segment_names = [
+        str(fit_res.metrics[SHARED_MEMORY_PARAMETERS_KEY]) for _, fit_res in shared_results + failed_results
+    ]
+
+    parameters, _ = strategy.aggregate_fit(server_round=1, results=shared_results, failures=failures)
+    assert parameters is None
+    # None of the segments are left behind, even though none were read
+    for segment_name in segment_names:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=segment_name)
@@ -1,7 +1,12 @@
+from typing import List, Tuple
+
 import numpy as np
-from flwr.common import NDArrays, Parameters, ndarrays_to_parameters
+from flwr.common import Code, FitRes, NDArrays, Parameters, Status, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.client_proxy import ClientProxy
 
 from fl4health.strategies.fedavg_dynamic_layer import FedAvgDynamicLayer
+from fl4health.strategies.parallel_aggregate import ParallelAggregationBackend
+from tests.test_utils.custom_client_proxy import CustomClientProxy
 
 client0_res = [np.ones((3, 3)), np.ones((4, 4))] + [np.array(["layer1", "layer2"])]
 client1_res = [np.full((4, 4), 2)] + [np.array(["layer2"])]
@@ -38,3 +43,44 @@ def test_aggregate() -> None:
     assert expected_result.keys() == aggregate_result.keys()
     for key in expected_result.keys():
         assert (expected_result[key] == aggregate_result[key]).all()
+
+
+def test_aggregate_with_parallel_backend() -> None:
+    params: Parameters = ndarrays_to_parameters([np.ones((10)) for _ in range(5)])
+    aggregate_input = list(zip(clients_res, client_train_sizes))
+    for weighted_aggregation in [True, False]:
+        serial_strategy = FedAvgDynamicLayer(initial_parameters=params, weighted_aggregation=weighted_aggregation)
+        parallel_strategy = FedAvgDynamicLayer(
+            initial_parameters=params,
+            weighted_aggregation=weighted_aggregation,
+            aggregation_backend=ParallelAggregationBackend(num_workers=2, chunk_size=4),
+        )
+        serial_result = serial_strategy.aggregate(aggregate_input)
+        parallel_result = parallel_strategy.aggregate(aggregate_input)
+
+        assert serial_result.keys() == parallel_result.keys()
+        for key in serial_result.keys():
+            assert np.array_equal(serial_result[key], parallel_result[key])
+
+
+def test_aggregate_fit_with_layer_ids() -> None:
+    name_strategy = FedAvgDynamicLayer()
+    id_strategy = FedAvgDynamicLayer(use_layer_ids=True)
+    layer_ids = {"layer1": 0, "layer2": 1, "layer3": 2, "layer4": 3}
+    name_results: List[Tuple[ClientProxy, FitRes]] = []
+    id_results: List[Tuple[ClientProxy, FitRes]] = []
+    for client_index, (client_res, train_size) in enumerate(zip(clients_res, client_train_sizes)):
+        ids = np.array([layer_ids[name] for name in client_res[-1]], dtype=np.int32)
+        for results, packed in [(name_results, client_res), (id_results, client_res[:-1] + [ids])]:
+            fit_res = FitRes(Status(Code.OK, ""), ndarrays_to_parameters(packed), train_size, {})
+            results.append((CustomClientProxy(str(client_index)), fit_res))
+
+    name_parameters, _ = name_strategy.aggregate_fit(1, name_results, [])
+    id_parameters, _ = id_strategy.aggregate_fit(1, id_results, [])
+    assert name_parameters is not None and id_parameters is not None
+    name_ndarrays = parameters_to_ndarrays(name_parameters)
+    id_ndarrays = parameters_to_ndarrays(id_parameters)
+    # The aggregated layers are sent back with their ids
+    assert [layer_ids[name] for name in name_ndarrays[-1]] == id_ndarrays[-1].tolist()
+    for name_layer, id_layer in zip(name_ndarrays[:-1], id_ndarrays[:-1]):
+        assert np.array_equal(name_layer, id_layer)
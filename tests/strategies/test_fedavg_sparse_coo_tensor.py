@@ -1,9 +1,12 @@
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 import numpy as np
+import pytest
 import torch
 from flwr.common import NDArray, NDArrays
 
+from fl4health.parameter_exchange.parameter_packer import SparseCooParameterPacker
+from fl4health.parameter_exchange.sparse_index_encoding import SparseIndexEncoding
 from fl4health.strategies.fedavg_sparse_coo_tensor import FedAvgSparseCooTensor
 
 client1_tensor_names = ["tensor1", "tensor2"]
@@ -95,3 +98,68 @@ def test_aggregate() -> None:
     assert expected_results.keys() == aggregated_results.keys()
     for key in expected_results.keys():
         assert (expected_results[key] == aggregated_results[key]).all()
+
+
+@pytest.mark.parametrize("index_encoding", [SparseIndexEncoding.COORDINATES, SparseIndexEncoding.AUTO])
+def test_aggregate_matches_dense_reference(index_encoding: SparseIndexEncoding) -> None:
+    torch.manual_seed(42)
+    packer = SparseCooParameterPacker(index_encoding)
+    shapes = {"conv": (4, 3, 3, 3), "bias": (4,)}
+    client_dense_tensors: List[Dict[str, torch.Tensor]] = []
+    results = []
+    for num_examples in client_train_sizes:
+        names, values, indices, tensor_shapes = [], [], [], []
+        dense_tensors: Dict[str, torch.Tensor] = {}
+        for name, shape in shapes.items():
+            dense = torch.rand(shape) * (torch.rand(shape) > 0.7)
+            dense_tensors[name] = dense
+            selected_values, selected_indices, tensor_shape = packer.extract_sparse_info_from_dense(dense)
+            names.append(name)
+            values.append(selected_values)
+            indices.append(selected_indices)
+            tensor_shapes.append(tensor_shape)
+        client_dense_tensors.append(dense_tensors)
+        results.append((values + indices + tensor_shapes + [np.array(names)], num_examples))
+
+    weighted_strategy = FedAvgSparseCooTensor(weighted_aggregation=True)
+    unweighted_strategy = FedAvgSparseCooTensor(weighted_aggregation=False)
+    weighted_result = weighted_strategy.aggregate(results)
+    unweighted_result = unweighted_strategy.aggregate(results)
+
+    for name in shapes:
+        weighted_target = torch.stack(
+            [dense[name] * num_examples for dense, num_examples in zip(client_dense_tensors, client_train_sizes)]
+        ).sum(dim=0)
+        unweighted_target = torch.stack([dense[name] for dense in client_dense_tensors]).sum(dim=0)
+        assert torch.allclose(weighted_result[name], weighted_target / total_train_size)
+        assert torch.allclose(unweighted_result[name], unweighted_target / len(client_train_sizes))
+
+
+def test_aggregate_mixed_precision_clients() -> None:
+    packer = SparseCooParameterPacker()
+    indices = np.array([[0], [2]])
+    shape = np.array([4])
+    client_values: NDArrays = [
+        np.array([1.0, 1.0 / 3.0], dtype=np.float16),
+        np.array([2.0, 1.0 / 3.0], dtype=np.float32),
+    ]
+    results = [
+        (packer.pack_parameters([values], ([indices], [shape], ["tensor"])), num_examples)
+        for values, num_examples in zip(client_values, [1, 2])
+    ]
+
+    # A client sending a wider dtype than the first client does not break the aggregation, and the aggregate has the
+    # promoted dtype of the clients
+    aggregated = FedAvgSparseCooTensor(weighted_aggregation=True).aggregate(results)["tensor"]
+    assert aggregated.dtype == torch.float32
+    expected = torch.tensor([5.0 / 3.0, 0.0, (float(np.float16(1.0 / 3.0)) + 2.0 / 3.0) / 3.0, 0.0])
+    assert torch.allclose(aggregated, expected)
+
+    # Half precision values are accumulated in full precision, and only cast back to half precision once
+    half_precision_results = [
+        (packer.pack_parameters([np.array([0.1], dtype=np.float16)], ([indices[:1]], [shape], ["tensor"])), 1)
+        for _ in range(1000)
+    ]
+    half_precision_aggregate = FedAvgSparseCooTensor(weighted_aggregation=False).aggregate(half_precision_results)
+    assert half_precision_aggregate["tensor"].dtype == torch.float16
+    assert half_precision_aggregate["tensor"][0].item() == np.float16(0.1)
@@ -0,0 +1,83 @@
+from typing import List, Tuple
+
+import numpy as np
+from flwr.common import Code, FitRes, NDArrays, Status, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.client_manager import SimpleClientManager
+from flwr.server.client_proxy import ClientProxy
+
+from fl4health.strategies.fedbuff import FedBuff
+from tests.test_utils.custom_client_proxy import CustomClientProxy
+
+
+def construct_fit_res(parameters: NDArrays, num_examples: int) -> FitRes:
+    return FitRes(
+        status=Status(Code.OK, ""),
+        parameters=ndarrays_to_parameters(parameters),
+        num_examples=num_examples,
+        metrics={},
+    )
+
+
+initial_weights = [np.zeros((2, 2)), np.zeros(3)]
+
+
+def test_staleness_weight() -> None:
+    strategy = FedBuff(initial_parameters=ndarrays_to_parameters(initial_weights), staleness_exponent=0.5)
+    assert strategy.staleness_weight(0) == 1.0
+    assert np.isclose(strategy.staleness_weight(3), 0.5)
+    no_staleness_strategy = FedBuff(initial_parameters=ndarrays_to_parameters(initial_weights), staleness_exponent=0)
+    assert no_staleness_strategy.staleness_weight(10) == 1.0
+
+
+def test_synchronous_aggregation_matches_fedavg() -> None:
+    strategy = FedBuff(initial_parameters=ndarrays_to_parameters(initial_weights))
+    results: List[Tuple[ClientProxy, FitRes]] = [
+        (CustomClientProxy("c0"), construct_fit_res([np.ones((2, 2)), np.ones(3)], 1)),
+        (CustomClientProxy("c1"), construct_fit_res([np.full((2, 2), 4.0), np.full(3, 4.0)], 3)),
+    ]
+    parameters, _ = strategy.aggregate_fit(1, results, [])
+    assert parameters is not None
+    aggregated = parameters_to_ndarrays(parameters)
+    assert np.allclose(aggregated[0], np.full((2, 2), 3.25))
+    assert np.allclose(aggregated[1], np.full(3, 3.25))
+    assert strategy.model_version == 1
+
+
+def test_buffered_aggregation_with_staleness() -> None:
+    strategy = FedBuff(
+        initial_parameters=ndarrays_to_parameters(initial_weights),
+        weighted_aggregation=False,
+        staleness_exponent=1.0,
+        buffer_size=1,
+    )
+    # First update moves the global model from 0 to 2
+    fresh_res = construct_fit_res([np.full((2, 2), 2.0), np.full(3, 2.0)], 10)
+    strategy.aggregate_buffered_fit(1, [(CustomClientProxy("c0"), fresh_res, 0)], [])
+    assert strategy.model_version == 1
+
+    # A straggler that trained from version 0 returns a model of all 4s. Its delta of 4 is computed against
+    # version 0 and down-weighted by 1 / (1 + 1).
+    stale_res = construct_fit_res([np.full((2, 2), 4.0), np.full(3, 4.0)], 10)
+    parameters, _ = strategy.aggregate_buffered_fit(2, [(CustomClientProxy("c1"), stale_res, 0)], [])
+    assert parameters is not None
+    aggregated = parameters_to_ndarrays(parameters)
+    assert np.allclose(aggregated[0], np.full((2, 2), 4.0))
+    assert np.allclose(aggregated[1], np.full(3, 4.0))
+
+    # Only versions still in use are retained
+    strategy.prune_model_versions(set())
+    assert list(strategy.model_versions.keys()) == [2]
+
+
+def test_busy_clients_are_not_sampled() -> None:
+    strategy = FedBuff(initial_parameters=ndarrays_to_parameters(initial_weights), min_available_clients=3)
+    client_manager = SimpleClientManager()
+    for cid in ["c0", "c1", "c2"]:
+        client_manager.register(CustomClientProxy(cid))
+
+    strategy.set_busy_clients({"c1"})
+    fit_instructions = strategy.configure_fit(1, ndarrays_to_parameters(initial_weights), client_manager)
+    assert sorted(client.cid for client, _ in fit_instructions) == ["c0", "c2"]
+
+    eval_instructions = strategy.configure_evaluate(1, ndarrays_to_parameters(initial_weights), client_manager)
+    assert sorted(client.cid for client, _ in eval_instructions) == ["c0", "c2"]
@@ -178,6 +178,29 @@ def test_weight_and_aggregate_results_with_existing_weights() -> None:
     assert aggregated_results[0].tolist() == [approx(1.73, abs=0.0005), approx(1.8270, abs=0.0005)]
 
 
+def test_weight_and_aggregate_results_reuses_buffers() -> None:
+    np.random.seed(42)
+    client_ndarrays = [
+        [np.random.rand(3, 4).astype(np.float32), np.random.rand(5).astype(np.float32)] for _ in range(5)
+    ]
+    test_fit_results: List[Tuple[ClientProxy, FitRes]] = [
+        (CustomClientProxy(str(i)), FitRes(Status(Code.OK, ""), ndarrays_to_parameters(ndarrays), 1, {}))
+        for i, ndarrays in enumerate(client_ndarrays)
+    ]
+    strategy = FedDgGaStrategy()
+    strategy.adjustment_weights = {str(i): 0.1 * (i + 1) for i in range(5)}
+
+    for _ in range(2):
+        aggregated_results = strategy.weight_and_aggregate_results(test_fit_results)
+        for layer_index, layer in enumerate(aggregated_results):
+            target = sum(0.1 * (i + 1) * ndarrays[layer_index] for i, ndarrays in enumerate(client_ndarrays))
+            assert layer.dtype == np.float32
+            assert np.allclose(layer, target)
+        accumulation_buffer = strategy.accumulation_buffer
+    # The same buffer is used across rounds
+    assert strategy.accumulation_buffer is accumulation_buffer
+
+
 def test_update_weights_by_ga() -> None:
     test_cids = ["1", "2"]
     test_val_loss_key = FairnessMetricType.LOSS.value
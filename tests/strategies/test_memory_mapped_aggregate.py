@@ -0,0 +1,140 @@
+import os
+from dataclasses import replace
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pytest
+from flwr.common import Code, FitRes, NDArrays, Parameters, Status, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.client_proxy import ClientProxy
+
+from fl4health.strategies.aggregate_utils import aggregate_results
+from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.strategies.fedprox import FedProx
+from fl4health.strategies.memory_mapped_aggregate import MemoryMappedAggregator, decode_tensors
+from tests.test_utils.custom_client_proxy import CustomClientProxy
+
+
+def construct_results(num_clients: int) -> List[Tuple[NDArrays, int]]:
+    np.random.seed(42)
+    return [
+        (
+            [
+                np.random.rand(7, 5).astype(np.float32),
+                np.random.rand(11),
+                np.random.randint(0, 10, size=(3,)),
+                np.zeros((0, 4), dtype=np.float32),
+            ],
+            client_index + 1,
+        )
+        for client_index in range(num_clients)
+    ]
+
+
+@pytest.mark.parametrize("weighted", [True, False])
+def test_memory_mapped_aggregate_matches_aggregate_results(tmp_path: Path, weighted: bool) -> None:
+    results = construct_results(4)
+    # A chunk size that does not divide the layer sizes exercises partial chunks
+    aggregator = MemoryMappedAggregator(spill_directory=str(tmp_path), chunk_size=4)
+    aggregated = aggregator.aggregate(
+        ((decode_tensors(ndarrays_to_parameters(ndarrays)), num_examples) for ndarrays, num_examples in results),
+        weighted,
+    )
+    target = aggregate_results(results, weighted)
+
+    assert len(aggregated) == len(target)
+    for aggregated_layer, target_layer in zip(aggregated, target):
+        assert aggregated_layer.shape == target_layer.shape
+        assert aggregated_layer.dtype == target_layer.dtype
+        assert np.allclose(aggregated_layer, target_layer, rtol=1e-6)
+    # Spill files are removed once aggregation completes
+    assert os.listdir(tmp_path) == []
+
+
+def test_spill_files_are_removed_on_failure(tmp_path: Path) -> None:
+    aggregator = MemoryMappedAggregator(spill_directory=str(tmp_path))
+    mismatched_results = [([np.ones((2, 2))], 1), ([np.ones((3, 3))], 1)]
+    with pytest.raises(AssertionError):
+        aggregator.aggregate(mismatched_results)
+    assert os.listdir(tmp_path) == []
+
+
+def construct_fit_res(parameters: NDArrays, num_examples: int) -> FitRes:
+    return FitRes(
+        status=Status(Code.OK, ""),
+        parameters=ndarrays_to_parameters(parameters),
+        num_examples=num_examples,
+        metrics={},
+    )
+
+
+def aggregate_incrementally(strategy: BasicFedAvg, results: List[Tuple[ClientProxy, FitRes]]) -> Optional[Parameters]:
+    # Accumulates copies of the results, as the parameters of the accumulated results are released
+    strategy.begin_incremental_aggregation(server_round=1)
+    copied_results = [(client, replace(fit_res)) for client, fit_res in results]
+    for _, fit_res in copied_results:
+        strategy.accumulate_fit_result(server_round=1, fit_res=fit_res)
+        assert fit_res.parameters.tensors == []
+    parameters, _ = strategy.finalize_incremental_aggregation(server_round=1, results=copied_results, failures=[])
+    return parameters
+
+
+def test_strategies_with_memory_mapped_aggregator(tmp_path: Path) -> None:
+    results = construct_results(3)
+    clients_res: List[Tuple[ClientProxy, FitRes]] = [
+        (CustomClientProxy(f"c{i}"), construct_fit_res(ndarrays, num_examples))
+        for i, (ndarrays, num_examples) in enumerate(results)
+    ]
+    aggregator = MemoryMappedAggregator(spill_directory=str(tmp_path), chunk_size=8)
+
+    in_memory_strategy = BasicFedAvg()
+    out_of_core_strategy = BasicFedAvg(memory_mapped_aggregator=aggregator)
+    target, _ = in_memory_strategy.aggregate_fit(server_round=1, results=clients_res, failures=[])
+    parameters, _ = out_of_core_strategy.aggregate_fit(server_round=1, results=clients_res, failures=[])
+    incremental_parameters = aggregate_incrementally(out_of_core_strategy, clients_res)
+    assert target is not None and parameters is not None and incremental_parameters is not None
+    for layer, incremental_layer, target_layer in zip(
+        parameters_to_ndarrays(parameters),
+        parameters_to_ndarrays(incremental_parameters),
+        parameters_to_ndarrays(target),
+    ):
+        assert np.allclose(layer, target_layer, rtol=1e-6)
+        assert np.array_equal(incremental_layer, layer)
+
+    # FedProx clients pack their training loss after the model weights
+    fedprox_res: List[Tuple[ClientProxy, FitRes]] = [
+        (client, construct_fit_res(ndarrays + [np.array(float(num_examples))], num_examples))
+        for client, (ndarrays, num_examples) in zip([client for client, _ in clients_res], results)
+    ]
+    initial_parameters = ndarrays_to_parameters(results[0][0])
+    for incremental in [False, True]:
+        fedprox = FedProx(
+            initial_parameters=initial_parameters, proximal_weight=0.1, memory_mapped_aggregator=aggregator
+        )
+        if incremental:
+            parameters = aggregate_incrementally(fedprox, fedprox_res)
+        else:
+            parameters, _ = fedprox.aggregate_fit(server_round=1, results=fedprox_res, failures=[])
+        assert parameters is not None
+        fedprox_ndarrays = parameters_to_ndarrays(parameters)
+        for layer, target_layer in zip(fedprox_ndarrays[:-1], parameters_to_ndarrays(target)):
+            assert np.allclose(layer, target_layer, rtol=1e-6)
+        assert fedprox_ndarrays[-1] == 0.1
+        # Unweighted average of the train losses 1, 2 and 3
+        assert fedprox.previous_loss == 2.0
+        assert os.listdir(tmp_path) == []
+
+
+def test_rejected_incremental_round_removes_spill_files(tmp_path: Path) -> None:
+    strategy = BasicFedAvg(
+        accept_failures=False, memory_mapped_aggregator=MemoryMappedAggregator(spill_directory=str(tmp_path))
+    )
+    strategy.begin_incremental_aggregation(server_round=1)
+    results: List[Tuple[ClientProxy, FitRes]] = [(CustomClientProxy("c0"), construct_fit_res([np.ones(3)], 1))]
+    strategy.accumulate_fit_result(server_round=1, fit_res=results[0][1])
+    assert os.listdir(tmp_path) != []
+    parameters, _ = strategy.finalize_incremental_aggregation(
+        server_round=1, results=results, failures=[Exception("Client failed")]
+    )
+    assert parameters is None
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,110 @@
+from typing import List, Tuple
+
+import numpy as np
+from flwr.common import Code, FitRes, NDArray, NDArrays, Status, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.client_proxy import ClientProxy
+
+from fl4health.strategies.aggregate_utils import aggregate_results
+from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.strategies.noisy_aggregate import gaussian_noisy_unweighted_aggregate
+from fl4health.strategies.parallel_aggregate import ParallelAggregationBackend
+from tests.test_utils.custom_client_proxy import CustomClientProxy
+
+
+def construct_results(num_clients: int) -> List[Tuple[NDArrays, int]]:
+    np.random.seed(2023)
+    return [
+        (
+            [
+                np.random.rand(37, 11).astype(np.float32),
+                np.random.rand(5).astype(np.float32),
+                np.random.rand(3, 4, 5, 2),
+                np.array(np.random.rand()),
+            ],
+            np.random.randint(1, 100),
+        )
+        for _ in range(num_clients)
+    ]
+
+
+def test_parallel_aggregate_results_is_bit_identical() -> None:
+    results = construct_results(7)
+    # A small chunk size forces the large layers to be split across several tasks
+    backend = ParallelAggregationBackend(num_workers=4, chunk_size=16)
+
+    for weighted in [True, False]:
+        serial = aggregate_results(results, weighted)
+        parallel = aggregate_results(results, weighted, backend)
+        assert len(serial) == len(parallel)
+        for serial_layer, parallel_layer in zip(serial, parallel):
+            assert np.asarray(serial_layer).dtype == parallel_layer.dtype
+            assert np.array_equal(serial_layer, parallel_layer)
+    backend.shutdown()
+
+
+def test_reduce_layers_with_mixed_groups() -> None:
+    backend = ParallelAggregationBackend(num_workers=2, chunk_size=4)
+    layer_groups: List[List[NDArray]] = [
+        [np.arange(10, dtype=np.float32), np.ones(10, dtype=np.float32)],
+        [np.ones((2, 3)), 2 * np.ones((2, 3)), 3 * np.ones((2, 3))],
+        # Mixed dtypes fall back to the serial reduction
+        [np.ones(3, dtype=np.float32), np.ones(3, dtype=np.float64)],
+    ]
+    reduced = backend.reduce_layers(layer_groups, scales=[[2, 1], None, None], divisors=[None, 3, None])
+
+    assert np.array_equal(reduced[0], 2 * np.arange(10, dtype=np.float32) + 1)
+    assert reduced[0].dtype == np.float32
+    assert np.allclose(reduced[1], 2 * np.ones((2, 3)))
+    assert np.allclose(reduced[2], 2 * np.ones(3))
+    assert reduced[2].dtype == np.float64
+
+
+def test_serial_backend_matches_parallel_backend() -> None:
+    results = construct_results(3)
+    client_arrays = [arrays for arrays, _ in results]
+    serial = ParallelAggregationBackend(num_workers=1).sum_client_arrays(client_arrays, divisor=3)
+    parallel = ParallelAggregationBackend(num_workers=3, chunk_size=8).sum_client_arrays(client_arrays, divisor=3)
+    for serial_layer, parallel_layer in zip(serial, parallel):
+        assert np.array_equal(serial_layer, parallel_layer)
+
+
+def test_noisy_aggregate_with_backend_is_bit_identical() -> None:
+    results = construct_results(4)
+    np.random.seed(42)
+    serial = gaussian_noisy_unweighted_aggregate(results, 1.0, 0.5)
+    np.random.seed(42)
+    parallel = gaussian_noisy_unweighted_aggregate(
+        results, 1.0, 0.5, ParallelAggregationBackend(num_workers=2, chunk_size=32)
+    )
+    for serial_layer, parallel_layer in zip(serial, parallel):
+        assert np.array_equal(serial_layer, parallel_layer)
+
+
+def test_basic_fedavg_with_backend_is_bit_identical() -> None:
+    clients_res: List[Tuple[ClientProxy, FitRes]] = [
+        (
+            CustomClientProxy(f"c{client_index}"),
+            FitRes(Status(Code.OK, ""), ndarrays_to_parameters(arrays), num_examples=num_examples, metrics={}),
+        )
+        for client_index, (arrays, num_examples) in enumerate(construct_results(7))
+    ]
+    backend = ParallelAggregationBackend(num_workers=4, chunk_size=16)
+
+    for weighted in [True, False]:
+        serial, _ = BasicFedAvg(weighted_aggregation=weighted).aggregate_fit(1, clients_res, [])
+        parallel_strategy = BasicFedAvg(weighted_aggregation=weighted, aggregation_backend=backend)
+        parallel, _ = parallel_strategy.aggregate_fit(1, clients_res, [])
+        # The backend also parallelizes the accumulation of results aggregated as they arrive
+        parallel_strategy.begin_incremental_aggregation(1)
+        for _, fit_res in clients_res:
+            parallel_strategy.accumulate_fit_result(1, fit_res)
+        incremental, _ = parallel_strategy.finalize_incremental_aggregation(1, clients_res, [])
+
+        assert serial is not None and parallel is not None and incremental is not None
+        for serial_layer, parallel_layer, incremental_layer in zip(
+            parameters_to_ndarrays(serial), parameters_to_ndarrays(parallel), parameters_to_ndarrays(incremental)
+        ):
+            assert serial_layer.dtype == parallel_layer.dtype == incremental_layer.dtype
+            assert np.array_equal(serial_layer, parallel_layer)
+            assert np.array_equal(serial_layer, incremental_layer)
+    backend.shutdown()
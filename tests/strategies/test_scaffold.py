@@ -1,7 +1,16 @@
+from dataclasses import replace
+from pathlib import Path
+from typing import List, Tuple
+
 import numpy as np
-from flwr.common import NDArrays, Parameters, ndarrays_to_parameters
+from flwr.common import Code, FitRes, NDArrays, Parameters, Status, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.client_proxy import ClientProxy
 
+from fl4health.strategies.memory_mapped_aggregate import MemoryMappedAggregator
+from fl4health.strategies.parallel_aggregate import ParallelAggregationBackend
 from fl4health.strategies.scaffold import Scaffold
+from tests.test_utils.custom_client_proxy import CustomClientProxy
+from tests.test_utils.models_for_test import SmallCnn, ToyConvNet
 
 
 def test_aggregate() -> None:
@@ -22,6 +31,26 @@ def test_aggregate() -> None:
         assert (new_ndarray == correct_ndarray).all()
 
 
+def test_aggregate_with_parallel_backend() -> None:
+    np.random.seed(42)
+    ndarrays: NDArrays = [np.random.rand(50, 3), np.random.rand(7)]
+    params: Parameters = ndarrays_to_parameters(ndarrays)
+    variates: Parameters = ndarrays_to_parameters([np.zeros_like(variate) for variate in ndarrays])
+    serial_strategy = Scaffold(initial_parameters=params, initial_control_variates=variates)
+    parallel_strategy = Scaffold(
+        initial_parameters=ndarrays_to_parameters(ndarrays),
+        initial_control_variates=variates,
+        aggregation_backend=ParallelAggregationBackend(num_workers=3, chunk_size=16),
+    )
+
+    client_ndarrays = [[np.random.rand(*ndarray.shape) for ndarray in ndarrays] for _ in range(5)]
+    serial_ndarrays = serial_strategy.aggregate(client_ndarrays)
+    parallel_ndarrays = parallel_strategy.aggregate(client_ndarrays)
+
+    for serial_ndarray, parallel_ndarray in zip(serial_ndarrays, parallel_ndarrays):
+        assert np.array_equal(serial_ndarray, parallel_ndarray)
+
+
 def test_compute_updated_parameters() -> None:
     layer_size = 10
     num_layers = 5
@@ -77,3 +106,123 @@ def test_compute_updated_control_variates() -> None:
 
     for control_variates, correct_control_variates in zip(server_control_variates, correct_server_control_variates):
         assert (control_variates == correct_control_variates).all()
+
+
+def test_fused_server_update_matches_unfused_update() -> None:
+    for model in [SmallCnn(), ToyConvNet()]:
+        np.random.seed(42)
+        model_weights = [val.cpu().numpy() for val in model.state_dict().values()]
+        fused_strategy = Scaffold(
+            initial_parameters=ndarrays_to_parameters(model_weights),
+            model=model,
+            learning_rate=0.5,
+            fraction_fit=0.5,
+        )
+        unfused_strategy = Scaffold(
+            initial_parameters=ndarrays_to_parameters(model_weights),
+            model=model,
+            learning_rate=0.5,
+            fraction_fit=0.5,
+        )
+
+        # Run several rounds to ensure that the persistent buffers are correctly reused
+        for _ in range(3):
+            client_packed_params = [
+                [(weights + np.random.rand(*weights.shape)).astype(weights.dtype) for weights in model_weights]
+                + [np.random.rand(*variates.shape).astype(variates.dtype) for variates in model_weights]
+                for _ in range(4)
+            ]
+            fused_strategy.fused_server_update([ndarrays_to_parameters(packed) for packed in client_packed_params])
+
+            aggregated_params = unfused_strategy.aggregate(client_packed_params)
+            weights, control_variates_update = unfused_strategy.parameter_packer.unpack_parameters(aggregated_params)
+            unfused_strategy.server_model_weights = unfused_strategy.compute_updated_weights(weights)
+            unfused_strategy.server_control_variates = unfused_strategy.compute_updated_control_variates(
+                control_variates_update
+            )
+
+            for fused, unfused in zip(fused_strategy.server_model_weights, unfused_strategy.server_model_weights):
+                assert fused.dtype == unfused.dtype
+                assert np.array_equal(fused, unfused)
+            for fused, unfused in zip(
+                fused_strategy.server_control_variates, unfused_strategy.server_control_variates
+            ):
+                assert np.array_equal(fused, unfused)
+
+
+def test_memory_mapped_aggregation_matches_fused_update(tmp_path: Path) -> None:
+    np.random.seed(42)
+    ndarrays: NDArrays = [np.random.rand(50, 3), np.random.rand(7)]
+    variates: Parameters = ndarrays_to_parameters([np.zeros_like(variate) for variate in ndarrays])
+    fused_strategy = Scaffold(initial_parameters=ndarrays_to_parameters(ndarrays), initial_control_variates=variates)
+    out_of_core_strategy = Scaffold(
+        initial_parameters=ndarrays_to_parameters(ndarrays),
+        initial_control_variates=variates,
+        memory_mapped_aggregator=MemoryMappedAggregator(spill_directory=str(tmp_path), chunk_size=16),
+    )
+
+    client_packed_params = [[np.random.rand(*ndarray.shape) for ndarray in ndarrays * 2] for _ in range(4)]
+    results: List[Tuple[ClientProxy, FitRes]] = [
+        (
+            CustomClientProxy(str(client_index)),
+            FitRes(Status(Code.OK, ""), ndarrays_to_parameters(packed), num_examples=1, metrics={}),
+        )
+        for client_index, packed in enumerate(client_packed_params)
+    ]
+    incremental_strategy = Scaffold(
+        initial_parameters=ndarrays_to_parameters(ndarrays),
+        initial_control_variates=variates,
+        memory_mapped_aggregator=MemoryMappedAggregator(spill_directory=str(tmp_path), chunk_size=16),
+    )
+    fused_parameters, _ = fused_strategy.aggregate_fit(server_round=1, results=results, failures=[])
+    out_of_core_strategy.aggregate_fit(server_round=1, results=results, failures=[])
+    # The results are spilled one at a time, as they would arrive at a server aggregating incrementally
+    incremental_strategy.begin_incremental_aggregation(server_round=1)
+    for _, fit_res in results:
+        incremental_strategy.accumulate_fit_result(server_round=1, fit_res=replace(fit_res))
+    incremental_parameters, _ = incremental_strategy.finalize_incremental_aggregation(
+        server_round=1, results=results, failures=[]
+    )
+
+    for strategy in [out_of_core_strategy, incremental_strategy]:
+        for fused, out_of_core in zip(fused_strategy.server_model_weights, strategy.server_model_weights):
+            assert np.allclose(fused, out_of_core)
+        for fused, out_of_core in zip(fused_strategy.server_control_variates, strategy.server_control_variates):
+            assert np.allclose(fused, out_of_core)
+    assert fused_parameters is not None and incremental_parameters is not None
+    for fused, incremental in zip(
+        parameters_to_ndarrays(fused_parameters), parameters_to_ndarrays(incremental_parameters)
+    ):
+        assert np.allclose(fused, incremental)
+
+
+def test_aggregate_fit_preserves_layer_dtypes() -> None:
+    np.random.seed(42)
+    # The last layer stands in for a batch norm counter
+    ndarrays: NDArrays = [np.random.rand(4, 3).astype(np.float32), np.array(10, dtype=np.int64)]
+    variates = ndarrays_to_parameters([np.zeros_like(ndarrays[0])])
+    strategy = Scaffold(initial_parameters=ndarrays_to_parameters(ndarrays), initial_control_variates=variates)
+
+    delta = strategy.compute_parameter_delta(ndarrays, ndarrays)
+    assert [layer.dtype for layer in delta] == [np.dtype(np.float32), np.dtype(np.int64)]
+
+    results: List[Tuple[ClientProxy, FitRes]] = [
+        (
+            CustomClientProxy(str(client_index)),
+            FitRes(
+                Status(Code.OK, ""),
+                ndarrays_to_parameters(
+                    [np.random.rand(4, 3).astype(np.float32), np.array(12, dtype=np.int64), np.ones((4, 3))]
+                ),
+                num_examples=1,
+                metrics={},
+            ),
+        )
+        for client_index in range(2)
+    ]
+    for server_round in range(1, 3):
+        parameters, _ = strategy.aggregate_fit(server_round=server_round, results=results, failures=[])
+        assert parameters is not None
+        weights = parameters_to_ndarrays(parameters)
+        assert [layer.dtype for layer in weights[:2]] == [np.dtype(np.float32), np.dtype(np.int64)]
+    assert weights[1] == 12
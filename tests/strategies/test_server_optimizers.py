@@ -0,0 +1,144 @@
+from typing import List, Tuple
+
+import numpy as np
+from flwr.common import Code, FitRes, NDArrays, Status, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.client_proxy import ClientProxy
+
+from fl4health.strategies.basic_fedavg import BasicFedAvg
+from fl4health.strategies.fedavg_dynamic_layer import FedAvgDynamicLayer
+from fl4health.strategies.fedprox import FedProx
+from fl4health.strategies.server_optimizers import (
+    FedAdamServerOptimizer,
+    FedAvgMServerOptimizer,
+    FedYogiServerOptimizer,
+)
+from tests.test_utils.custom_client_proxy import CustomClientProxy
+
+
+def reference_adaptive_step(
+    current_weights: NDArrays, aggregated_weights: NDArrays, m_t: NDArrays, v_t: NDArrays, yogi: bool
+) -> Tuple[NDArrays, NDArrays, NDArrays]:
+    # Mirrors the Flower FedAdam and FedYogi strategies
+    eta, beta_1, beta_2, tau = 0.1, 0.9, 0.99, 1e-3
+    delta_t = [x - y for x, y in zip(aggregated_weights, current_weights)]
+    m_t = [beta_1 * x + (1 - beta_1) * y for x, y in zip(m_t, delta_t)]
+    if yogi:
+        v_t = [x - (1.0 - beta_2) * y * y * np.sign(x - y * y) for x, y in zip(v_t, delta_t)]
+    else:
+        v_t = [beta_2 * x + (1 - beta_2) * y * y for x, y in zip(v_t, delta_t)]
+    new_weights = [x + eta * y / (np.sqrt(z) + tau) for x, y, z in zip(current_weights, m_t, v_t)]
+    return new_weights, m_t, v_t
+
+
+def test_adaptive_optimizers_match_reference() -> None:
+    np.random.seed(42)
+    initial_weights: NDArrays = [np.random.rand(4, 3).astype(np.float32), np.random.rand(5).astype(np.float32)]
+    for yogi in [False, True]:
+        optimizer = (
+            FedYogiServerOptimizer(learning_rate=0.1, tau=1e-3)
+            if yogi
+            else FedAdamServerOptimizer(learning_rate=0.1, tau=1e-3)
+        )
+        optimizer.initialize(initial_weights)
+        global_weights_buffer = optimizer.global_weights
+        reference_weights = [layer.astype(np.float64) for layer in initial_weights]
+        m_t: NDArrays = [np.zeros_like(layer) for layer in reference_weights]
+        v_t: NDArrays = [np.zeros_like(layer) for layer in reference_weights]
+        for _ in range(3):
+            aggregated_weights = [
+                (layer + np.random.rand(*layer.shape) - 0.5).astype(np.float32) for layer in reference_weights
+            ]
+            new_weights = optimizer.step(aggregated_weights)
+            reference_weights, m_t, v_t = reference_adaptive_step(
+                reference_weights, [layer.astype(np.float64) for layer in aggregated_weights], m_t, v_t, yogi
+            )
+            for layer, reference_layer in zip(new_weights, reference_weights):
+                assert layer.dtype == np.float32
+                assert np.allclose(layer, reference_layer, rtol=1e-4, atol=1e-5)
+        # State is updated in place in the preallocated buffers
+        assert optimizer.global_weights is global_weights_buffer
+
+
+def test_fedavgm_optimizer() -> None:
+    initial_weights: NDArrays = [np.zeros((2, 2)), np.zeros(3, dtype=np.int64)]
+    optimizer = FedAvgMServerOptimizer(learning_rate=1.0, momentum=0.5)
+    optimizer.initialize(initial_weights)
+
+    new_weights = optimizer.step([np.ones((2, 2)), np.full(3, 7, dtype=np.int64)])
+    # First step has no momentum, so the global weights are the aggregated weights
+    assert np.allclose(new_weights[0], np.ones((2, 2)))
+    assert new_weights[0].dtype == np.float64
+    # Integer layers are not optimized
+    assert np.array_equal(new_weights[1], np.full(3, 7))
+
+    new_weights = optimizer.step([np.full((2, 2), 2.0), np.full(3, 8, dtype=np.int64)])
+    # m = 0.5 * 1 + 1 = 1.5
+    assert np.allclose(new_weights[0], np.full((2, 2), 2.5))
+
+
+def test_layers_are_tracked_by_key() -> None:
+    optimizer = FedAvgMServerOptimizer(learning_rate=1.0, momentum=0.0)
+    new_weights = optimizer.step([np.ones(2, dtype=np.float32)], ["layer_1"])
+    # Untracked layers are set to their aggregated values
+    assert np.array_equal(new_weights[0], np.ones(2))
+
+    new_weights = optimizer.step(
+        [np.full(3, 4.0, dtype=np.float32), np.full(2, 3.0, dtype=np.float32)], ["layer_2", "layer_1"]
+    )
+    assert np.array_equal(new_weights[0], np.full(3, 4.0))
+    assert np.array_equal(new_weights[1], np.full(2, 3.0))
+    assert optimizer.num_elements == 5
+
+
+def construct_fit_res(parameters: NDArrays, num_examples: int) -> FitRes:
+    return FitRes(
+        status=Status(Code.OK, ""),
+        parameters=ndarrays_to_parameters(parameters),
+        num_examples=num_examples,
+        metrics={},
+    )
+
+
+def test_strategies_with_server_optimizer() -> None:
+    initial_weights: NDArrays = [np.zeros((2, 3), dtype=np.float32), np.zeros(4, dtype=np.float32)]
+    client_weights: List[NDArrays] = [[np.ones((2, 3)), np.ones(4)], [np.full((2, 3), 3.0), np.full(4, 3.0)]]
+    client_weights = [[layer.astype(np.float32) for layer in weights] for weights in client_weights]
+
+    # With momentum, the second round moves past the aggregated weights
+    strategy = BasicFedAvg(
+        initial_parameters=ndarrays_to_parameters(initial_weights),
+        server_optimizer=FedAvgMServerOptimizer(learning_rate=1.0, momentum=0.5),
+    )
+    fedprox = FedProx(
+        initial_parameters=ndarrays_to_parameters(initial_weights),
+        proximal_weight=0.1,
+        server_optimizer=FedAvgMServerOptimizer(learning_rate=1.0, momentum=0.5),
+    )
+    for server_round in [1, 2]:
+        results: List[Tuple[ClientProxy, FitRes]] = [
+            (CustomClientProxy(f"c{i}"), construct_fit_res(weights, 1)) for i, weights in enumerate(client_weights)
+        ]
+        parameters, _ = strategy.aggregate_fit(server_round, results, [])
+        fedprox_results: List[Tuple[ClientProxy, FitRes]] = [
+            (CustomClientProxy(f"c{i}"), construct_fit_res(weights + [np.array(1.0)], 1))
+            for i, weights in enumerate(client_weights)
+        ]
+        fedprox_parameters, _ = fedprox.aggregate_fit(server_round, fedprox_results, [])
+    assert parameters is not None and fedprox_parameters is not None
+    # Round 1: m = 2, x = 2. Round 2: m = 0.5 * 2 + 0 = 1, x = 3
+    for layer in parameters_to_ndarrays(parameters):
+        assert np.allclose(layer, 3.0)
+    fedprox_ndarrays = parameters_to_ndarrays(fedprox_parameters)
+    for layer in fedprox_ndarrays[:-1]:
+        assert np.allclose(layer, 3.0)
+    assert fedprox_ndarrays[-1] == 0.1
+
+    dynamic_strategy = FedAvgDynamicLayer(server_optimizer=FedAvgMServerOptimizer(learning_rate=0.5, momentum=0.0))
+    for value in [2.0, 4.0]:
+        dynamic_results: List[Tuple[ClientProxy, FitRes]] = [
+            (CustomClientProxy("c0"), construct_fit_res([np.full(4, value, dtype=np.float32), np.array(["fc"])], 1))
+        ]
+        dynamic_parameters, _ = dynamic_strategy.aggregate_fit(1, dynamic_results, [])
+    assert dynamic_parameters is not None
+    # The first aggregate of layer fc sets its weights to 2.0, then a half step is taken towards 4.0
+    assert np.allclose(parameters_to_ndarrays(dynamic_parameters)[0], 3.0)
@@ -1,5 +1,8 @@
+import threading
+import time
 from typing import Optional
 
+from flwr.common import ndarrays_to_parameters, parameters_to_ndarrays
 from flwr.common.typing import (
     Code,
     DisconnectRes,
@@ -60,3 +63,44 @@ class CustomClientProxy(ClientProxy):
         timeout: Optional[float],
     ) -> DisconnectRes:
         raise NotImplementedError
+
+
+class DelayedFitClientProxy(CustomClientProxy):
+    """
+    Simulated client whose fit takes a fixed amount of wall-clock time and, if a release event is provided, only
+    returns once the event is set. Tests drive the order in which clients finish with release events, while
+    benchmarks simulate training time with delays. The returned parameters are the received parameters shifted by
+    update_value, so that the client delta is known exactly.
+    """
+
+    def __init__(
+        self,
+        cid: str,
+        fit_delay: float = 0.0,
+        num_samples: int = 1,
+        update_value: float = 1.0,
+        release: Optional[threading.Event] = None,
+    ):
+        super().__init__(cid, num_samples)
+        self.fit_delay = fit_delay
+        self.update_value = update_value
+        self.num_samples = num_samples
+        self.release = release
+        self.num_fits = 0
+
+    def fit(
+        self,
+        ins: FitIns,
+        timeout: Optional[float],
+    ) -> FitRes:
+        # The timeout only keeps a test that never releases the client from hanging, it does not order the clients
+        assert self.release is None or self.release.wait(timeout=30.0), f"Client {self.cid} was never released"
+        time.sleep(self.fit_delay)
+        self.num_fits += 1
+        updated_parameters = [array + self.update_value for array in parameters_to_ndarrays(ins.parameters)]
+        return FitRes(
+            status=Status(code=Code.OK, message=""),
+            parameters=ndarrays_to_parameters(updated_parameters),
+            num_examples=self.num_samples,
+            metrics={"update_value": self.update_value},
+        )
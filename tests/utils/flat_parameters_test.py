@@ -0,0 +1,74 @@
+from typing import List
+
+import numpy as np
+from flwr.common import NDArrays, ndarrays_to_parameters
+
+from fl4health.utils.flat_parameters import FlatParameters, flat_dtype, flatten_client_ndarrays, restore_layer_dtypes
+
+
+def test_flat_dtype() -> None:
+    assert flat_dtype([np.dtype(np.float32), np.dtype(np.int64)]) == np.float32
+    assert flat_dtype([np.dtype(np.float32), np.dtype(np.float64)]) == np.float64
+    assert flat_dtype([np.dtype(np.int64)]) == np.float64
+
+
+def test_round_trip_is_zero_copy() -> None:
+    ndarrays: NDArrays = [np.random.rand(3, 4).astype(np.float32), np.arange(5), np.random.rand(2).astype(np.float32)]
+    flat_parameters = FlatParameters.from_ndarrays(ndarrays)
+    assert flat_parameters.dtype == np.float32
+    assert flat_parameters.size == 19
+    assert len(flat_parameters) == 3
+
+    layers = flat_parameters.to_ndarrays()
+    for layer, original_layer in zip(layers, ndarrays):
+        assert layer.shape == original_layer.shape
+        assert np.array_equal(layer, original_layer)
+        assert np.shares_memory(layer, flat_parameters.buffer)
+
+    # Views of a flat buffer are wrapped without copying
+    wrapped = FlatParameters.from_ndarrays(layers)
+    assert np.shares_memory(wrapped.buffer, flat_parameters.buffer)
+    wrapped.buffer += 1.0
+    assert np.array_equal(layers[1], np.arange(5) + 1.0)
+
+    # Unless a copy is requested or the views are not consecutive
+    assert not np.shares_memory(FlatParameters.from_ndarrays(layers, copy=True).buffer, flat_parameters.buffer)
+    assert not np.shares_memory(FlatParameters.from_ndarrays([layers[0], layers[2]]).buffer, flat_parameters.buffer)
+
+
+def test_from_parameters() -> None:
+    ndarrays: NDArrays = [np.random.rand(3, 4), np.asfortranarray(np.random.rand(2, 3)), np.arange(4)]
+    parameters = ndarrays_to_parameters(ndarrays)
+    flat_parameters = FlatParameters.from_parameters(parameters)
+    assert flat_parameters.dtype == np.float64
+    for layer, original_layer in zip(flat_parameters.to_ndarrays(), ndarrays):
+        assert np.array_equal(layer, original_layer)
+
+    # Decoding into a provided buffer reuses it
+    out = FlatParameters.zeros_like(flat_parameters)
+    assert FlatParameters.from_parameters(parameters, out=out) is out
+    assert np.array_equal(out.buffer, flat_parameters.buffer)
+
+
+def test_flatten_client_ndarrays() -> None:
+    client_ndarrays: List[NDArrays] = [
+        [np.ones((2, 2), dtype=np.float32), np.ones(3, dtype=np.float32)],
+        [np.ones((2, 2)), np.ones(3)],
+    ]
+    flat_clients = flatten_client_ndarrays(client_ndarrays)
+    # All clients share a common dtype
+    assert all(flat_client.dtype == np.float64 for flat_client in flat_clients)
+    assert all(flat_client.has_same_layout(flat_clients[0]) for flat_client in flat_clients)
+
+
+def test_restore_layer_dtypes() -> None:
+    ndarrays: NDArrays = [np.random.rand(3, 4).astype(np.float32), np.array([3, 7]), np.array(5)]
+    layers = FlatParameters.from_ndarrays(ndarrays).to_ndarrays()
+    assert all(layer.dtype == np.float32 for layer in layers)
+    layers[1] += 0.4
+
+    restored = restore_layer_dtypes(layers, [ndarray.dtype for ndarray in ndarrays])
+    assert [layer.dtype for layer in restored] == [ndarray.dtype for ndarray in ndarrays]
+    assert np.array_equal(restored[1], [3, 7]) and restored[2] == 5
+    # Layers already of the right dtype are not copied
+    assert restored[0] is layers[0]
@@ -152,3 +152,24 @@ def test_training_losses_with_multiple_backward() -> None:
     assert losses_dict["model-1"] == pytest.approx(6.1020, rel=0.01)
     assert losses_dict["model-2"] == pytest.approx(8.1020, rel=0.01)
     assert len(losses_dict) == 3
+
+
+def test_loss_meter_accumulates_detached_running_sums() -> None:
+    weights = torch.tensor([1.0, 2.0], requires_grad=True)
+    loss_avg_meter = LossMeter[TrainingLosses](LossMeterType.AVERAGE, TrainingLosses)
+    for step in range(4):
+        backward = {"model-0": (weights * step).sum(), "model-1": (weights**2).sum() * step}
+        loss_avg_meter.update(TrainingLosses(backward=backward, additional_losses={"extra_loss": weights[0] * 2}))
+
+    # Only the running sums are kept and they do not reference the autograd graph
+    assert loss_avg_meter.num_losses == 4
+    running_sums = [loss for losses in loss_avg_meter.loss_sums.values() for loss in losses.values()]
+    assert len(running_sums) == 3
+    assert all(not loss.requires_grad and loss.dtype == torch.float32 for loss in running_sums)
+
+    loss_dict = loss_avg_meter.compute().as_dict()
+    assert loss_dict == pytest.approx({"model-0": 4.5, "model-1": 7.5, "extra_loss": 2.0})
+
+    loss_avg_meter.clear()
+    loss_avg_meter.update(TrainingLosses(backward=torch.tensor(1.0, dtype=torch.bfloat16)))
+    assert loss_avg_meter.compute().as_dict() == {"backward": 1.0}
@@ -5,6 +5,7 @@ from flwr.common.typing import Metrics
 from fl4health.utils.metric_aggregation import (
     evaluate_metrics_aggregation_fn,
     fit_metrics_aggregation_fn,
+    get_incremental_metric_aggregator,
     metric_aggregation,
     normalize_metrics,
     uniform_evaluate_metrics_aggregation_fn,
@@ -96,3 +97,23 @@ def test_uniform_evaluate_metrics_aggregation_fn() -> None:
     metrics = uniform_evaluate_metrics_aggregation_fn(client_metric_vals)
     gt_metrics = {"score": 11.0}
     assert metrics == gt_metrics
+
+
+def test_incremental_metric_aggregator() -> None:
+    metrics: List[Tuple[int, Metrics]] = [
+        (10, {"score": 1.0, "count": 2}),
+        (30, {"score": 3.0}),
+        (20, {"score": 0.5, "count": 5}),
+    ]
+    for metrics_aggregation_fn in [fit_metrics_aggregation_fn, uniform_evaluate_metrics_aggregation_fn]:
+        aggregator = get_incremental_metric_aggregator(metrics_aggregation_fn)
+        assert aggregator is not None
+        for num_examples, client_metrics in metrics:
+            aggregator.update(num_examples, client_metrics)
+        assert aggregator.compute() == metrics_aggregation_fn(metrics)
+
+        aggregator.clear()
+        aggregator.update(*metrics[0])
+        assert aggregator.compute() == metrics_aggregation_fn(metrics[:1])
+
+    assert get_incremental_metric_aggregator(lambda all_client_metrics: {}) is None
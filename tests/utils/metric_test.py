@@ -1,6 +1,7 @@
 import numpy as np
 import pytest
 import torch
+from sklearn import metrics as sklearn_metrics
 
 from fl4health.utils.metrics import F1, ROC_AUC, Accuracy, BalancedAccuracy, BinarySoftDiceCoefficient, MetricManager
 
@@ -262,3 +263,57 @@ def test_metric_manager() -> None:
 
     assert metrics["test - prediction - F1 score"] == pytest.approx(0.80285714285, abs=0.00001)
     assert metrics["test - prediction - accuracy"] == 0.8
+
+
+def test_streaming_metrics_match_full_dataset() -> None:
+    torch.manual_seed(42)
+    logits = torch.randn(300, 4, requires_grad=True)
+    target = torch.cat([torch.arange(4).repeat(25), torch.randint(0, 3, (200,))])
+    metrics = [Accuracy(), BalancedAccuracy(), F1(), F1(average="macro"), F1(average="micro"), ROC_AUC()]
+    for batch_logits, batch_target in zip(logits.split(32), target.split(32)):
+        for metric in metrics:
+            metric.update(batch_logits, batch_target)
+
+    # Only the sufficient statistics are accumulated, detached from the autograd graph
+    statistics = [metric.statistics for metric in metrics]
+    assert all(statistic is not None and not statistic.requires_grad for statistic in statistics)
+    assert metrics[0].statistics is not None and metrics[0].statistics.shape == (4, 4)
+    assert metrics[-1].statistics is not None and metrics[-1].statistics.shape == (4, 2, 1000)
+
+    preds = torch.argmax(logits, 1).numpy()
+    probs = torch.softmax(logits, 1).detach().numpy()
+    expected = [
+        sklearn_metrics.accuracy_score(target, preds),
+        sklearn_metrics.balanced_accuracy_score(target, preds),
+        sklearn_metrics.f1_score(target, preds, average="weighted"),
+        sklearn_metrics.f1_score(target, preds, average="macro"),
+        sklearn_metrics.f1_score(target, preds, average="micro"),
+    ]
+    for metric, expected_value in zip(metrics, expected):
+        assert metric.compute()[metric.name] == pytest.approx(expected_value)
+    # The binned ROC AUC is an approximation
+    expected_auc = sklearn_metrics.roc_auc_score(target, probs, average="weighted", multi_class="ovr")
+    assert metrics[-1].compute("val")["val - ROC_AUC score"] == pytest.approx(expected_auc, abs=1e-3)
+
+    metrics[0].clear()
+    assert metrics[0].statistics is None
+
+
+def test_streaming_binary_soft_dice_coefficient() -> None:
+    torch.manual_seed(42)
+    metric = BinarySoftDiceCoefficient(logits_threshold=None)
+    logits = torch.rand((12, 1, 4, 4, 4))
+    targets = (torch.rand((12, 1, 4, 4, 4)) > 0.5).float()
+    for batch_logits, batch_targets in zip(logits.split(5), targets.split(5)):
+        metric.update(batch_logits, batch_targets)
+    assert metric.statistics is not None and metric.statistics.shape == (2,)
+    assert metric.compute()["BinarySoftDiceCoefficient"] == pytest.approx(metric(logits, targets))
+
+
+def test_binary_soft_dice_coefficient_statistics_stay_on_device() -> None:
+    # The meta device stands in for a GPU: statistics must be built on the device of the predictions
+    metric = BinarySoftDiceCoefficient(logits_threshold=None)
+    logits = torch.rand((2, 1, 4, 4, 4), device="meta")
+    targets = torch.rand((2, 1, 4, 4, 4), device="meta")
+    statistics = metric.batch_statistics(logits, targets)
+    assert statistics.device == logits.device and statistics.shape == (2,)
@@ -0,0 +1,69 @@
+import gc
+import time
+from typing import Dict, Iterator, Tuple
+
+import pytest
+import torch
+from torch.utils.data import DataLoader, Dataset, TensorDataset
+
+from fl4health.utils.prefetch import PrefetchLoader, move_batch_to_device
+
+
+class DictDataset(Dataset):
+    def __len__(self) -> int:
+        return 10
+
+    def __getitem__(self, index: int) -> Tuple[Dict[str, torch.Tensor], torch.Tensor]:
+        return {"image": torch.full((3,), float(index)), "mask": torch.ones(2)}, torch.tensor(index)
+
+
+def test_prefetch_loader_yields_every_batch_in_order() -> None:
+    data_loader = DataLoader(TensorDataset(torch.arange(20.0).reshape(10, 2), torch.arange(10)), batch_size=3)
+    prefetch_loader = PrefetchLoader(data_loader, torch.device("cpu"), num_prefetch_batches=2)
+    assert len(prefetch_loader) == 4
+    # Each iteration over the wrapper is an iteration over the data loader
+    for _ in range(2):
+        batches = list(prefetch_loader)
+        assert len(batches) == 4
+        for (input, target), (expected_input, expected_target) in zip(batches, data_loader):
+            assert torch.equal(input, expected_input) and torch.equal(target, expected_target)
+
+    # Dictionary inputs are supported as well
+    dict_batches = list(PrefetchLoader(DataLoader(DictDataset(), batch_size=4), torch.device("cpu")))
+    assert [len(target) for _, target in dict_batches] == [4, 4, 2]
+    input, target = dict_batches[1]
+    assert torch.equal(input["image"][:, 0], torch.arange(4.0, 8.0)) and input["mask"].shape == (4, 2)
+    assert torch.equal(target, torch.arange(4, 8))
+
+
+def test_prefetch_loader_stops_loading_when_abandoned() -> None:
+    def infinite_batches() -> Iterator[torch.Tensor]:
+        while True:
+            yield torch.zeros(2)
+
+    iterator = iter(PrefetchLoader(infinite_batches(), torch.device("cpu"), num_prefetch_batches=1))
+    next(iterator)
+    loading_thread = iterator.loading_thread  # type: ignore
+    del iterator
+    gc.collect()
+    loading_thread.join(timeout=5.0)
+    assert not loading_thread.is_alive()
+
+
+def test_prefetch_loader_raises_loader_exceptions() -> None:
+    def failing_batches() -> Iterator[torch.Tensor]:
+        yield torch.zeros(2)
+        time.sleep(0.01)
+        raise RuntimeError("Corrupted sample")
+
+    iterator = iter(PrefetchLoader(failing_batches(), torch.device("cpu")))
+    assert torch.equal(next(iterator), torch.zeros(2))
+    with pytest.raises(RuntimeError, match="Corrupted sample"):
+        next(iterator)
+
+
+def test_move_batch_to_device() -> None:
+    batch = ({"image": torch.ones(2), "metadata": "scan_1"}, [torch.zeros(1)])
+    moved_batch = move_batch_to_device(batch, torch.device("cpu"))
+    assert isinstance(moved_batch, tuple) and isinstance(moved_batch[1], list)
+    assert moved_batch[0]["metadata"] == "scan_1" and torch.equal(moved_batch[0]["image"], torch.ones(2))
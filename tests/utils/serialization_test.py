@@ -0,0 +1,82 @@
+from typing import List
+
+import numpy as np
+import pytest
+import torch
+from flwr.common import NDArray
+from flwr.common.parameter import bytes_to_ndarray as flwr_bytes_to_ndarray
+from flwr.common.parameter import ndarray_to_bytes as flwr_ndarray_to_bytes
+
+from fl4health.utils.serialization import (
+    bytes_to_ndarray,
+    bytes_to_ndarray_into,
+    copy_ndarray_into_tensor,
+    ndarray_to_bytes,
+    ndarrays_to_parameters,
+    parameters_to_ndarrays,
+)
+
+ARRAYS: List[NDArray] = [
+    np.random.rand(3, 4).astype(np.float32),
+    np.arange(24, dtype=np.int64).reshape(2, 3, 4),
+    np.array(7),
+    np.array(0.5, dtype=np.float16),
+    np.zeros((0, 5)),
+    np.array(["layer_1", "layer_2"]),
+    np.array([True, False]),
+]
+
+
+@pytest.mark.parametrize("array", ARRAYS)
+def test_serialization_matches_flower(array: NDArray) -> None:
+    serialized = ndarray_to_bytes(array)
+    # The serialized tensors are identical to Flower's, so either side may decode them
+    assert serialized == flwr_ndarray_to_bytes(array)
+    decoded = bytes_to_ndarray(serialized)
+    assert decoded.dtype == array.dtype and decoded.shape == array.shape
+    assert np.array_equal(decoded, array)
+    assert np.array_equal(flwr_bytes_to_ndarray(serialized), array)
+
+
+def test_non_contiguous_arrays() -> None:
+    array = np.random.rand(4, 6)
+    for non_contiguous in [array.T, array[:, ::2], array[::-1]]:
+        assert np.array_equal(bytes_to_ndarray(ndarray_to_bytes(non_contiguous)), non_contiguous)
+    # Arrays serialized by Flower in Fortran order are decoded as well
+    assert np.array_equal(bytes_to_ndarray(flwr_ndarray_to_bytes(np.asfortranarray(array))), array)
+
+
+def test_decoded_arrays_are_views_unless_copied() -> None:
+    ndarrays = [np.random.rand(10, 10), np.arange(5)]
+    parameters = ndarrays_to_parameters(ndarrays)
+    views = parameters_to_ndarrays(parameters)
+    assert all(not view.flags.writeable for view in views)
+    with pytest.raises(ValueError):
+        views[0][0, 0] = 1.0
+
+    copies = parameters_to_ndarrays(parameters, copy=True)
+    copies[0][0, 0] = 1.0
+    assert views[0][0, 0] == ndarrays[0][0, 0]
+
+
+def test_decoding_into_preallocated_arrays_in_chunks() -> None:
+    array = np.random.rand(37, 11)
+    out = np.empty((37, 11), dtype=np.float32)
+    # A chunk size smaller than a row exercises the chunk boundaries
+    result = bytes_to_ndarray_into(ndarray_to_bytes(array), out, chunk_size_bytes=24)
+    assert result is out
+    assert np.array_equal(out, array.astype(np.float32))
+    with pytest.raises(AssertionError):
+        bytes_to_ndarray_into(ndarray_to_bytes(array), np.empty((11, 37)))
+
+
+def test_copy_ndarray_into_tensor() -> None:
+    tensor = torch.zeros(6, 5)
+    storage = tensor.data_ptr()
+    read_only = bytes_to_ndarray(ndarray_to_bytes(np.arange(30.0).reshape(6, 5)))
+    copy_ndarray_into_tensor(read_only, tensor, chunk_size_bytes=16)
+    assert tensor.data_ptr() == storage
+    assert torch.equal(tensor, torch.arange(30.0).reshape(6, 5))
+
+    copy_ndarray_into_tensor(np.ones((6, 5), dtype=np.float64)[::-1], tensor)
+    assert torch.all(tensor == 1.0)
@@ -0,0 +1,67 @@
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+from flwr.common import NDArrays, ndarrays_to_parameters
+
+from fl4health.utils.serialization import parameters_to_ndarrays
+from fl4health.utils.shared_memory import (
+    SharedMemoryParameterPublisher,
+    read_ndarrays_from_shared_memory,
+    read_parameters_from_client,
+    write_ndarrays_to_shared_memory,
+    write_parameters_for_server,
+)
+
+NDARRAYS: NDArrays = [
+    np.random.rand(3, 5).astype(np.float32),
+    np.arange(7, dtype=np.int64),
+    np.array(0.5, dtype=np.float16),
+    np.zeros((0, 4)),
+    np.array(["layer_1", "layer_2"]),
+    np.random.rand(4, 6).T,
+]
+
+
+def test_shared_memory_round_trip() -> None:
+    segment = write_ndarrays_to_shared_memory(NDARRAYS)
+    shared_ndarrays = read_ndarrays_from_shared_memory(segment)
+    for shared_ndarray, ndarray in zip(shared_ndarrays, NDARRAYS):
+        assert shared_ndarray.dtype == ndarray.dtype and shared_ndarray.shape == ndarray.shape
+        assert np.array_equal(shared_ndarray, ndarray)
+        assert not shared_ndarray.flags.writeable
+    with pytest.raises(ValueError):
+        shared_ndarrays[0][0, 0] = 1.0
+    # The segment cannot be closed while arrays mapped from it are referenced
+    with pytest.raises(BufferError):
+        segment.close()
+    del shared_ndarray, shared_ndarrays
+    segment.close()
+    segment.unlink()
+
+
+def test_write_back_parameters() -> None:
+    name = write_parameters_for_server(NDARRAYS)
+    parameters = read_parameters_from_client(name)
+    for decoded, ndarray in zip(parameters_to_ndarrays(parameters), NDARRAYS):
+        assert np.array_equal(decoded, ndarray)
+    # The server unlinks the segment once it has been read
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=name)
+
+
+def test_publisher_reuses_and_unlinks_segments() -> None:
+    publisher = SharedMemoryParameterPublisher()
+    parameters = ndarrays_to_parameters(NDARRAYS[:2])
+    name = publisher.publish(parameters)
+    # The same parameters (i.e. sent for fitting and then evaluation) are only published once
+    assert publisher.publish(parameters) == name
+
+    new_name = publisher.publish(ndarrays_to_parameters([np.ones(3)]))
+    assert new_name != name
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=name)
+
+    publisher.close()
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=new_name)